@@ -15,10 +15,15 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 # 加载环境变量
 load_dotenv()
 
+from utils.db import init_app as init_db
+
 # 创建Flask应用
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
 
+# 同一请求内的 Mapper 调用共享一个数据库连接
+init_db(app)
+
 # 配置CORS - 生产环境允许所有来源
 CORS(app, resources={
     r"/api/*": {
@@ -40,6 +45,7 @@ try:
     from controllers.fund_controller import fund_bp
     from controllers.news_controller import news_bp
     from controllers.behavior_controller import behavior_bp
+    from controllers.admin_controller import admin_bp
     
     app.register_blueprint(bill_bp)
     app.register_blueprint(transfer_bp)
@@ -49,6 +55,7 @@ try:
     app.register_blueprint(fund_bp)
     app.register_blueprint(news_bp)
     app.register_blueprint(behavior_bp)
+    app.register_blueprint(admin_bp)
     
     print("[Vercel] 蓝图注册成功")
 except ImportError as e:
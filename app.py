@@ -42,6 +42,7 @@ from controllers.ai_interaction import ai_interaction_bp
 from controllers.fund_controller import fund_bp
 from controllers.news_controller import news_bp
 from controllers.behavior_controller import behavior_bp
+from controllers.admin_controller import admin_bp
 
 app.register_blueprint(bill_bp)
 app.register_blueprint(transfer_bp)
@@ -51,11 +52,17 @@ app.register_blueprint(ai_interaction_bp)
 app.register_blueprint(fund_bp)
 app.register_blueprint(news_bp)
 app.register_blueprint(behavior_bp)
+app.register_blueprint(admin_bp)
 
 # 注册AI路由（使用新的注册方式）
 from controllers.ai_controller import register_ai_routes
 register_ai_routes(app)
 
+from utils.db import init_app as init_db
+
+# 同一请求内的 Mapper 调用共享一个数据库连接
+init_db(app)
+
 # 测试页面路由
 @app.route('/test_mock.html')
 def test_mock_page():
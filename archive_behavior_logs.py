@@ -0,0 +1,63 @@
+"""
+用户行为日志冷归档
+把早于 N 天的原始日志搬到本地列式压缩文件并从热表删除，建议每天在
+compact_behavior_logs.py 之后、maintain_behavior_partitions.py 之前运行
+
+用法:
+    python archive_behavior_logs.py                        # 归档早于 BEHAVIOR_ARCHIVE_AFTER_DAYS 天的日志
+    python archive_behavior_logs.py --after-days 5         # 归档早于5天的日志
+    python archive_behavior_logs.py --dry-run              # 只统计将要归档的日志
+    python archive_behavior_logs.py --status               # 查看归档文件概况
+    python archive_behavior_logs.py --query user_001 --days 30 --limit 20
+
+cron 示例（每天 00:20）:
+    20 0 * * * cd /path/to/Fin-ai && python compact_behavior_logs.py && python archive_behavior_logs.py
+"""
+
+import argparse
+import json
+import time
+
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+from services.behavior_archive_service import get_behavior_archive
+
+
+def main():
+    parser = argparse.ArgumentParser(description='用户行为日志冷归档')
+    parser.add_argument('--after-days', type=int, help='归档早于该天数的日志（默认读取 BEHAVIOR_ARCHIVE_AFTER_DAYS）')
+    parser.add_argument('--max-days', type=int, help='本次最多归档的天数')
+    parser.add_argument('--dry-run', action='store_true', help='只统计不写文件、不删除')
+    parser.add_argument('--status', action='store_true', help='打印归档文件概况后退出')
+    parser.add_argument('--query', metavar='USER_ID', help='查询某个用户的归档日志后退出')
+    parser.add_argument('--days', type=int, default=30, help='--query 查询最近多少天，默认 30')
+    parser.add_argument('--limit', type=int, default=20, help='--query 返回条数，默认 20')
+    args = parser.parse_args()
+
+    archive = get_behavior_archive()
+    if args.after_days:
+        archive.after_days = args.after_days
+
+    if args.status:
+        print(json.dumps(archive.stats(), ensure_ascii=False, indent=2))
+        return
+
+    if args.query:
+        start_time = int(time.time() * 1000) - args.days * 24 * 60 * 60 * 1000
+        rows = archive.query(args.query, start_time=start_time, limit=args.limit)
+        print(json.dumps(rows, ensure_ascii=False, indent=2, default=str))
+        return
+
+    results = archive.run(dry_run=args.dry_run, max_days=args.max_days)
+    archived = [item for item in results if item['rows']]
+    prefix = '[DRY-RUN] ' if args.dry_run else '[OK] '
+    print(f"{prefix}归档 {len(archived)} 天 / {sum(item['rows'] for item in archived)} 条日志，"
+          f"写入 {sum(item['bytes'] for item in archived)} 字节，"
+          f"热表删除 {sum(item['deleted'] for item in archived)} 条")
+
+
+if __name__ == '__main__':
+    main()
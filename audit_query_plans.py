@@ -0,0 +1,536 @@
+"""
+SQL 执行计划审计
+逐个调用 mapper/ 下的数据访问方法（使用代表性参数），对其发出的每条语句
+执行 EXPLAIN FORMAT=JSON，标记全表扫描、全索引扫描、filesort 与临时表，
+并与基线对比，出现计划退化时以非零状态码退出。
+
+基线文件 query_plan_baseline.json 不随代码提交（执行计划取决于目标库的版本、数据量与统计信息），
+首次在某个环境审计前先用 --update-baseline 生成；没有基线时所有风险项都按退化处理。
+
+所有审计调用都在事务中执行并最终回滚，写操作不会落库。
+
+用法:
+    python audit_query_plans.py --seed 2000          # 写入审计用样本数据并更新统计信息
+    python audit_query_plans.py --update-baseline    # 首次运行：生成基线（之后用于接受当前执行计划为新基线）
+    python audit_query_plans.py                      # 审计并与基线对比
+    python audit_query_plans.py --report plans.json  # 输出完整报告
+    python audit_query_plans.py --cleanup            # 删除审计样本数据
+"""
+
+import argparse
+import importlib
+import inspect
+import json
+import os
+import pkgutil
+import sys
+import time
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+import mapper
+from mapper import news_mapper
+from mapper.ai_suggestion_mapper import AISuggestionMapper
+from mapper.behavior_archive_mapper import BehaviorArchiveMapper
+from mapper.behavior_mapper import BehaviorMapper
+from mapper.behavior_rollup_mapper import BehaviorRollupMapper
+from mapper.behavior_session_mapper import BehaviorSessionMapper
+from mapper.behavior_stats_mapper import BehaviorStatsMapper
+from mapper.bill_mapper import BillMapper
+from mapper.fund_mapper import FundMapper
+from mapper.transfer_mapper import TransferMapper
+from mapper.user_mapper import UserMapper
+from utils.db import db_execute, db_execute_many, get_db_connection, unit_of_work
+from utils.db_metrics import add_statement_hook, fingerprint, remove_statement_hook
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'query_plan_baseline.json')
+
+# 审计使用的代表性参数
+AUDIT_USER = 'plan_audit_user'
+AUDIT_ACCOUNT = '6222000000000001'
+AUDIT_FUND = 'PA0001'
+AUDIT_MONTH = date.today().strftime('%Y-%m')
+AUDIT_DAY = date.today().strftime('%Y-%m-%d')
+AUDIT_NOW_MS = int(time.time() * 1000)
+AUDIT_HOUR = datetime.now().replace(minute=0, second=0, microsecond=0)
+AUDIT_HOUR_MS = int(AUDIT_HOUR.timestamp() * 1000)
+
+_EXPLAINABLE = ('select', 'insert', 'update', 'delete', 'replace', 'with')
+
+
+def _consume(iterator, limit=50):
+    """流式接口只读取前若干行，验证语句即可"""
+    return list(islice(iterator, limit))
+
+
+# (用例名, 调用) —— 用例名为「类名.方法名」或「模块名.函数名」，方括号内为参数变体
+CASES = [
+    # 用户
+    ('UserMapper.get_user_by_id', lambda: UserMapper.get_user_by_id(AUDIT_USER)),
+    ('UserMapper.verify_user_login', lambda: UserMapper.verify_user_login(AUDIT_USER, 'x')),
+    ('UserMapper.insert_user', lambda: UserMapper.insert_user('plan_audit_new', 'x', 'audit')),
+    ('UserMapper.update_user_info', lambda: UserMapper.update_user_info(AUDIT_USER, 'audit')),
+    ('UserMapper.register_user', lambda: UserMapper.register_user(
+        'plan_audit_reg', 'x', 'audit', '110101199001011234', '13800000000',
+        '北京', '工程师', 50, 'R3', 'growth')),
+    ('UserMapper.check_username_exists', lambda: UserMapper.check_username_exists(AUDIT_USER)),
+
+    # 账单
+    ('BillMapper.get_bills_by_user[month]', lambda: BillMapper.get_bills_by_user(AUDIT_USER, AUDIT_MONTH)),
+    ('BillMapper.get_bills_by_user[all]', lambda: BillMapper.get_bills_by_user(AUDIT_USER)),
+    ('BillMapper.iter_bills_by_user', lambda: _consume(
+        BillMapper.iter_bills_by_user(AUDIT_USER, '2000-01-01', AUDIT_DAY))),
+    ('BillMapper.get_bill_statistics', lambda: BillMapper.get_bill_statistics(AUDIT_USER, AUDIT_MONTH)),
+    ('BillMapper.get_category_expenses', lambda: BillMapper.get_category_expenses(AUDIT_USER, AUDIT_MONTH)),
+    ('BillMapper.insert_bill', lambda: BillMapper.insert_bill(
+        AUDIT_USER, '审计商户', '餐饮', -10, AUDIT_DAY)),
+    ('BillMapper.insert_bills', lambda: BillMapper.insert_bills([
+        {'user_id': AUDIT_USER, 'merchant': '审计商户', 'category': '餐饮',
+         'amount': -10, 'transaction_date': AUDIT_DAY}] * 2)),
+    ('BillMapper.get_abnormal_transactions', lambda: BillMapper.get_abnormal_transactions(
+        AUDIT_USER, AUDIT_MONTH, 1000)),
+
+    # 转账
+    ('TransferMapper.get_recent_accounts', lambda: TransferMapper.get_recent_accounts(AUDIT_USER)),
+    ('TransferMapper.get_transfer_history[account]', lambda: TransferMapper.get_transfer_history(
+        AUDIT_USER, AUDIT_ACCOUNT)),
+    ('TransferMapper.get_transfer_history[all]', lambda: TransferMapper.get_transfer_history(AUDIT_USER)),
+    ('TransferMapper.check_account_exists', lambda: TransferMapper.check_account_exists(
+        AUDIT_USER, AUDIT_ACCOUNT)),
+    ('TransferMapper.insert_transfer', lambda: TransferMapper.insert_transfer(
+        AUDIT_USER, AUDIT_ACCOUNT, '审计', 10, AUDIT_DAY)),
+    ('TransferMapper.insert_transfers', lambda: TransferMapper.insert_transfers([
+        {'user_id': AUDIT_USER, 'recipient_account': AUDIT_ACCOUNT, 'recipient_name': '审计',
+         'amount': 10, 'transfer_date': AUDIT_DAY}] * 2)),
+    ('TransferMapper.get_transfer_statistics', lambda: TransferMapper.get_transfer_statistics(AUDIT_USER)),
+
+    # 基金
+    ('FundMapper.get_fund_details', lambda: FundMapper.get_fund_details(AUDIT_FUND)),
+    ('FundMapper.get_fund_by_code', lambda: FundMapper.get_fund_by_code(AUDIT_FUND)),
+    ('FundMapper.get_funds[default]', lambda: FundMapper.get_funds()),
+    ('FundMapper.get_funds[filtered]', lambda: FundMapper.get_funds(
+        page=2, category='股票型', risk_level='中高风险', order_by='nav', order_dir='desc')),
+    ('FundMapper.create_fund', lambda: FundMapper.create_fund(_fund_row('PA9999'))),
+    ('FundMapper.create_funds', lambda: FundMapper.create_funds([_fund_row('PA9998'), _fund_row('PA9997')])),
+    ('FundMapper.update_fund', lambda: FundMapper.update_fund(AUDIT_FUND, {'nav': 1.2345})),
+    ('FundMapper.delete_fund', lambda: FundMapper.delete_fund(AUDIT_FUND)),
+
+    # AI 建议
+    ('AISuggestionMapper.get_suggestion', lambda: AISuggestionMapper.get_suggestion('home', 'default')),
+    ('AISuggestionMapper.upsert_suggestion', lambda: AISuggestionMapper.upsert_suggestion(
+        'home', 'default', json.dumps({'audit': True}))),
+
+    # 资讯
+    ('news_mapper.get_all_news[category]', lambda: news_mapper.get_all_news('市场', limit=10)),
+    ('news_mapper.get_all_news[all]', lambda: news_mapper.get_all_news(limit=10, offset=20)),
+    ('news_mapper.get_news_by_id', lambda: news_mapper.get_news_by_id(1)),
+    ('news_mapper.search_news', lambda: news_mapper.search_news('基金')),
+    ('news_mapper.get_hot_news', lambda: news_mapper.get_hot_news()),
+    ('news_mapper.increase_read_count', lambda: news_mapper.increase_read_count(1)),
+    ('news_mapper.get_news_count[category]', lambda: news_mapper.get_news_count('市场')),
+    ('news_mapper.get_news_count[all]', lambda: news_mapper.get_news_count()),
+
+    # 用户行为
+    ('BehaviorMapper.batch_insert_logs', lambda: BehaviorMapper.batch_insert_logs(
+        [_behavior_event(i, prefix='audit_tx') for i in range(2)])),
+    ('BehaviorMapper.get_user_behaviors[user]', lambda: BehaviorMapper.get_user_behaviors(AUDIT_USER)),
+    ('BehaviorMapper.get_user_behaviors[filtered]', lambda: BehaviorMapper.get_user_behaviors(
+        AUDIT_USER, start_time=AUDIT_NOW_MS - 86400000, end_time=AUDIT_NOW_MS,
+        event_type='click', page='home')),
+    ('BehaviorMapper.get_user_behaviors_page[first]', lambda: BehaviorMapper.get_user_behaviors_page(
+        AUDIT_USER, limit=101, fields=['event_type', 'page'])),
+    ('BehaviorMapper.get_user_behaviors_page[after]', lambda: BehaviorMapper.get_user_behaviors_page(
+        AUDIT_USER, after=(AUDIT_NOW_MS, 10 ** 9), limit=101)),
+    ('BehaviorMapper.iter_user_behaviors', lambda: _consume(BehaviorMapper.iter_user_behaviors(
+        AUDIT_USER, start_time=AUDIT_NOW_MS - 86400000))),
+    ('BehaviorMapper.get_user_behavior_stats', lambda: BehaviorMapper.get_user_behavior_stats(AUDIT_USER)),
+    ('BehaviorMapper.get_recent_user_path', lambda: BehaviorMapper.get_recent_user_path(AUDIT_USER)),
+    ('BehaviorMapper.iter_page_views', lambda: _consume(BehaviorMapper.iter_page_views(
+        AUDIT_NOW_MS - 7 * 86400000))),
+
+    # 用户行为计数汇总
+    ('BehaviorStatsMapper.apply_deltas', lambda: BehaviorStatsMapper.apply_deltas(
+        [(AUDIT_USER, AUDIT_DAY, 'click', 'home', 3, 1500, AUDIT_NOW_MS)],
+        [(AUDIT_USER, AUDIT_DAY, 'audit_session_0')])),
+    ('BehaviorStatsMapper.get_daily_counters', lambda: BehaviorStatsMapper.get_daily_counters(
+        AUDIT_USER, date.today() - timedelta(days=6))),
+    ('BehaviorStatsMapper.get_session_ids', lambda: BehaviorStatsMapper.get_session_ids(
+        AUDIT_USER, date.today() - timedelta(days=6))),
+
+    # 用户行为汇总
+    ('BehaviorRollupMapper.get_checkpoint', lambda: BehaviorRollupMapper.get_checkpoint('plan_audit_job')),
+    ('BehaviorRollupMapper.save_checkpoint', lambda: BehaviorRollupMapper.save_checkpoint(
+        'plan_audit_job', 1, AUDIT_NOW_MS)),
+    ('BehaviorRollupMapper.get_log_batch', lambda: BehaviorRollupMapper.get_log_batch(0, 1000, settle_seconds=30)),
+    ('BehaviorRollupMapper.iter_log_timestamps', lambda: _consume(BehaviorRollupMapper.iter_log_timestamps(0, 1000))),
+    ('BehaviorRollupMapper.rebuild_bucket', lambda: BehaviorRollupMapper.rebuild_bucket(
+        'hourly', AUDIT_HOUR, AUDIT_HOUR_MS, AUDIT_HOUR_MS + 3600000, 10 ** 12)),
+    ('BehaviorRollupMapper.add_bucket_delta', lambda: BehaviorRollupMapper.add_bucket_delta(
+        'daily', AUDIT_DAY, AUDIT_HOUR_MS, AUDIT_HOUR_MS + 3600000, 0, 10 ** 12)),
+    ('BehaviorRollupMapper.aggregate_rollup[hourly]', lambda: BehaviorRollupMapper.aggregate_rollup(
+        'hourly', AUDIT_HOUR, AUDIT_HOUR, user_id=AUDIT_USER)),
+    ('BehaviorRollupMapper.aggregate_rollup[daily]', lambda: BehaviorRollupMapper.aggregate_rollup(
+        'daily', date.today() - timedelta(days=30), date.today())),
+    ('BehaviorRollupMapper.aggregate_raw[user]', lambda: BehaviorRollupMapper.aggregate_raw(
+        AUDIT_HOUR_MS, AUDIT_NOW_MS, user_id=AUDIT_USER)),
+    ('BehaviorRollupMapper.aggregate_raw[after_checkpoint]', lambda: BehaviorRollupMapper.aggregate_raw(
+        AUDIT_NOW_MS - 86400000, AUDIT_NOW_MS, after_id=10 ** 9)),
+    ('BehaviorRollupMapper.purge_compacted_logs', lambda: BehaviorRollupMapper.purge_compacted_logs(0, 3650, 10)),
+
+    # 用户会话
+    ('BehaviorRollupMapper.get_log_batch[with_session]', lambda: BehaviorRollupMapper.get_log_batch(
+        0, 1000, settle_seconds=30, with_session=True)),
+    ('BehaviorSessionMapper.iter_session_events', lambda: _consume(BehaviorSessionMapper.iter_session_events(
+        ['audit_session_0', 'audit_session_1']))),
+    ('BehaviorSessionMapper.replace_sessions', lambda: BehaviorSessionMapper.replace_sessions(
+        [{'session_id': 'audit_session_0', 'user_id': AUDIT_USER, 'started_at': AUDIT_NOW_MS,
+          'ended_at': AUDIT_NOW_MS, 'duration_ms': 0, 'event_count': 1, 'interaction_count': 0,
+          'page_view_count': 1, 'unique_page_count': 1, 'total_dwell_ms': 0,
+          'entry_page': 'home', 'exit_page': 'home', 'is_bounce': 1}],
+        [{'session_id': 'audit_session_0', 'seq': 1, 'user_id': AUDIT_USER, 'page': 'home',
+          'entered_at': AUDIT_NOW_MS, 'left_at': AUDIT_NOW_MS, 'dwell_ms': 0, 'event_count': 1,
+          'end_reason': 'last_seen'}])),
+    ('BehaviorSessionMapper.get_user_sessions', lambda: BehaviorSessionMapper.get_user_sessions(
+        AUDIT_USER, start_time=AUDIT_NOW_MS - 86400000)),
+    ('BehaviorSessionMapper.get_page_visits', lambda: BehaviorSessionMapper.get_page_visits(['audit_session_0'])),
+    ('BehaviorSessionMapper.get_user_page_dwell', lambda: BehaviorSessionMapper.get_user_page_dwell(
+        AUDIT_USER, AUDIT_NOW_MS - 86400000)),
+
+    # 用户行为冷归档
+    ('BehaviorArchiveMapper.get_oldest_log_timestamp', lambda: BehaviorArchiveMapper.get_oldest_log_timestamp()),
+    ('BehaviorArchiveMapper.iter_logs_between', lambda: _consume(BehaviorArchiveMapper.iter_logs_between(
+        AUDIT_NOW_MS - 86400000, AUDIT_NOW_MS))),
+    ('BehaviorArchiveMapper.get_range_summary', lambda: BehaviorArchiveMapper.get_range_summary(
+        AUDIT_NOW_MS - 86400000, AUDIT_NOW_MS)),
+    ('BehaviorArchiveMapper.delete_archived_logs', lambda: BehaviorArchiveMapper.delete_archived_logs(
+        0, 1, 0, 10)),
+]
+
+
+def _fund_row(code):
+    return {
+        'code': code, 'name': f'审计基金{code}', 'nav': 1.0, 'change_percent': '+0.00%',
+        'fund_change': '+0.0000', 'category': '股票型', 'risk': '中高风险', 'manager': '审计',
+    }
+
+
+def _behavior_event(index, prefix='audit'):
+    pages = ('home', 'bill', 'transfer', 'fund', 'news')
+    return {
+        'event_id': f'{prefix}_{AUDIT_NOW_MS}_{index}',
+        'event_type': ('click', 'page_view', 'page_leave')[index % 3],
+        'user_id': AUDIT_USER,
+        'session_id': f'audit_session_{index // 50}',
+        'page': pages[index % len(pages)],
+        'element_type': 'button',
+        'element_id': f'btn_{index % 7}',
+        'timestamp': AUDIT_NOW_MS - index * 60000,
+    }
+
+
+# ----------------------------------------------------------------------
+# 执行计划采集
+# ----------------------------------------------------------------------
+class PlanCollector:
+    """语句执行前回调：对同一游标先执行 EXPLAIN FORMAT=JSON 并解析风险项"""
+
+    def __init__(self):
+        self.case = None
+        self.statements = {}
+
+    def __call__(self, cursor, query, args):
+        fp = fingerprint(query)
+        if not fp.startswith(_EXPLAINABLE):
+            return
+        key = f"{self.case} :: {fp}"
+        if key in self.statements:
+            return
+
+        # executemany 只取第一行参数做计划分析
+        if isinstance(args, (list, tuple)) and args and isinstance(args[0], (list, tuple, dict)):
+            args = args[0]
+
+        entry = {'case': self.case, 'fingerprint': fp, 'flags': [], 'tables': [], 'error': None}
+        try:
+            cursor.execute('EXPLAIN FORMAT=JSON ' + query, args)
+            row = cursor.fetchone()
+            plan = json.loads(next(iter(row.values())) if isinstance(row, dict) else row[0])
+            entry['flags'], entry['tables'] = analyze_plan(plan)
+        except Exception as e:
+            entry['error'] = str(e)
+        self.statements[key] = entry
+
+
+def analyze_plan(plan):
+    """
+    解析 EXPLAIN FORMAT=JSON 结果
+
+    Returns:
+        (flags, tables)：风险标记列表（如 full_scan:Bills、filesort、temporary）
+        与各表的访问方式
+    """
+    flags = []
+    tables = []
+
+    def add(flag):
+        if flag not in flags:
+            flags.append(flag)
+
+    def walk(node):
+        if isinstance(node, dict):
+            table = node.get('table')
+            if isinstance(table, dict) and 'access_type' in table:
+                name = table.get('table_name', '?')
+                access = table['access_type']
+                tables.append({
+                    'table': name,
+                    'access_type': access,
+                    'key': table.get('key'),
+                    'rows': table.get('rows_examined_per_scan'),
+                })
+                if access == 'ALL':
+                    add(f"full_scan:{name}")
+                elif access == 'index':
+                    add(f"full_index_scan:{name}")
+            if node.get('using_filesort') is True:
+                add('filesort')
+            if node.get('using_temporary_table') is True:
+                add('temporary')
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(plan)
+    return sorted(flags), tables
+
+
+class _Rollback(Exception):
+    """审计用例执行完毕后强制回滚事务"""
+
+
+def run_audit():
+    """执行全部用例，返回 (语句计划, 用例错误)"""
+    collector = PlanCollector()
+    case_errors = {}
+    add_statement_hook(collector)
+    try:
+        for name, call in CASES:
+            collector.case = name
+            try:
+                with unit_of_work():
+                    call()
+                    raise _Rollback()
+            except _Rollback:
+                pass
+            except Exception as e:
+                case_errors[name] = f"{type(e).__name__}: {e}"
+    finally:
+        remove_statement_hook(collector)
+    return collector.statements, case_errors
+
+
+def find_uncovered():
+    """列出 mapper/ 下没有审计用例的公开方法"""
+    covered = {name.split('[', 1)[0] for name, _ in CASES}
+    methods = []
+    for info in pkgutil.iter_modules(mapper.__path__):
+        module = importlib.import_module(f"mapper.{info.name}")
+        for attr, value in vars(module).items():
+            if attr.startswith('_'):
+                continue
+            if inspect.isclass(value) and value.__module__ == module.__name__:
+                for name, member in vars(value).items():
+                    if not name.startswith('_') and isinstance(member, staticmethod):
+                        methods.append(f"{attr}.{name}")
+            elif inspect.isfunction(value) and value.__module__ == module.__name__:
+                methods.append(f"{info.name}.{attr}")
+    return sorted(set(methods) - covered)
+
+
+# ----------------------------------------------------------------------
+# 基线对比
+# ----------------------------------------------------------------------
+def build_snapshot(statements, case_errors):
+    snapshot = {key: {'flags': entry['flags'], 'error': bool(entry['error'])}
+                for key, entry in statements.items()}
+    for name in case_errors:
+        snapshot[f"{name} :: <error>"] = {'flags': [], 'error': True}
+    return snapshot
+
+
+def compare(snapshot, baseline):
+    """返回 (退化项, 改善项)"""
+    regressions = []
+    improvements = []
+    for key, current in sorted(snapshot.items()):
+        previous = baseline.get(key, {'flags': [], 'error': False})
+        added = sorted(set(current['flags']) - set(previous['flags']))
+        removed = sorted(set(previous['flags']) - set(current['flags']))
+        if added:
+            regressions.append(f"{key}\n      新增: {', '.join(added)}")
+        if current['error'] and not previous['error']:
+            regressions.append(f"{key}\n      新增: 执行出错")
+        if removed:
+            improvements.append(f"{key}\n      消除: {', '.join(removed)}")
+    return regressions, improvements
+
+
+def print_report(statements, case_errors, uncovered):
+    print("=" * 100)
+    print(f"审计用例: {len(CASES)}  语句: {len(statements)}  用例出错: {len(case_errors)}")
+    print("=" * 100)
+    for key in sorted(statements):
+        entry = statements[key]
+        if entry['error']:
+            status = f"EXPLAIN 失败: {entry['error']}"
+        elif entry['flags']:
+            status = ', '.join(entry['flags'])
+        else:
+            status = 'ok'
+        print(f"[{entry['case']}] {status}")
+        for table in entry['tables']:
+            print(f"    {table['table']:<24} type={table['access_type']:<8} "
+                  f"key={table['key'] or '-':<24} rows={table['rows']}")
+        print(f"    {entry['fingerprint'][:160]}")
+    if case_errors:
+        print("\n用例执行出错:")
+        for name, error in sorted(case_errors.items()):
+            print(f"  ✗ {name}: {error}")
+    if uncovered:
+        print("\n未覆盖的 mapper 方法（请在 CASES 中补充用例）:")
+        for name in uncovered:
+            print(f"  - {name}")
+
+
+# ----------------------------------------------------------------------
+# 样本数据
+# ----------------------------------------------------------------------
+def seed(rows):
+    """写入审计用户的样本数据并刷新表统计信息，使执行计划接近生产数据分布"""
+    print(f"写入审计样本数据（每表 {rows} 行）...")
+    if not UserMapper.get_user_by_id(AUDIT_USER):
+        UserMapper.insert_user(AUDIT_USER, 'x', 'plan audit')
+
+    today = date.today()
+    categories = ('餐饮', '购物', '交通', '娱乐', '工资')
+    BillMapper.insert_bills(
+        {'user_id': AUDIT_USER, 'merchant': f'商户{i % 37}', 'category': categories[i % len(categories)],
+         'amount': (5000 if i % 30 == 0 else -(i % 500 + 1)),
+         'transaction_date': (today - timedelta(days=i % 365)).strftime('%Y-%m-%d')}
+        for i in range(rows)
+    )
+    TransferMapper.insert_transfers(
+        {'user_id': AUDIT_USER, 'recipient_account': f'62220000{i % 50:08d}',
+         'recipient_name': f'收款人{i % 50}', 'amount': i % 1000 + 1,
+         'transfer_date': (today - timedelta(days=i % 180)).strftime('%Y-%m-%d')}
+        for i in range(rows)
+    )
+    db_execute('DELETE FROM Fundings WHERE code LIKE %s', ('PA%',))
+    FundMapper.create_funds(_fund_row(f'PA{i:04d}') for i in range(min(rows, 5000)))
+    db_execute_many(
+        'INSERT INTO News (title, summary, category, source, author, publish_time) '
+        'VALUES (%s, %s, %s, %s, %s, %s)',
+        ((f'审计资讯{i}', '审计摘要', ('市场', '基金', '理财')[i % 3], '审计', '审计',
+          (today - timedelta(days=i % 90)).strftime('%Y-%m-%d 08:00:00'))
+         for i in range(rows))
+    )
+    BehaviorMapper.batch_insert_logs([_behavior_event(i) for i in range(rows)])
+
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            for table in ('Users', 'Bills', 'TransferHistory', 'Fundings', 'News', 'user_behavior_logs'):
+                cursor.execute(f'ANALYZE TABLE {table}')
+                cursor.fetchall()
+    finally:
+        conn.close()
+    print("✓ 样本数据写入完成，表统计信息已更新")
+
+
+def cleanup():
+    """删除审计样本数据"""
+    for sql, params in (
+        ('DELETE FROM Bills WHERE user_id = %s', (AUDIT_USER,)),
+        ('DELETE FROM TransferHistory WHERE user_id = %s', (AUDIT_USER,)),
+        ('DELETE FROM user_behavior_logs WHERE user_id = %s', (AUDIT_USER,)),
+        ('DELETE FROM Fundings WHERE code LIKE %s', ('PA%',)),
+        ('DELETE FROM News WHERE source = %s AND title LIKE %s', ('审计', '审计资讯%')),
+        ('DELETE FROM Users WHERE user_id = %s', (AUDIT_USER,)),
+    ):
+        db_execute(sql, params)
+    print("✓ 审计样本数据已删除")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='审计 mapper 语句执行计划')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='基线文件路径（不随代码提交，首次运行需先用 --update-baseline 生成）')
+    parser.add_argument('--update-baseline', action='store_true', help='以当前执行计划覆盖基线')
+    parser.add_argument('--report', help='输出 JSON 报告的路径')
+    parser.add_argument('--strict', action='store_true', help='存在任何风险项或未覆盖方法即失败，忽略基线')
+    parser.add_argument('--seed', type=int, metavar='ROWS', help='先写入审计样本数据')
+    parser.add_argument('--cleanup', action='store_true', help='删除审计样本数据后退出')
+    args = parser.parse_args()
+
+    if args.cleanup:
+        cleanup()
+        return
+    if args.seed:
+        seed(args.seed)
+
+    statements, case_errors = run_audit()
+    uncovered = find_uncovered()
+    print_report(statements, case_errors, uncovered)
+
+    snapshot = build_snapshot(statements, case_errors)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({
+                'statements': list(statements.values()),
+                'case_errors': case_errors,
+                'uncovered': uncovered,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\n报告已写入 {args.report}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"\n✓ 基线已更新: {args.baseline}（{len(snapshot)} 条）")
+        return
+
+    if args.strict:
+        failed = [key for key, item in snapshot.items() if item['flags'] or item['error']]
+        if failed or uncovered:
+            print(f"\n✗ 严格模式：{len(failed)} 条语句存在风险项，{len(uncovered)} 个方法未覆盖")
+            sys.exit(1)
+        print("\n✓ 严格模式：全部语句无风险项")
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    else:
+        print(f"\n⚠ 未找到基线 {args.baseline}，所有风险项均视为退化（首次运行请先执行 --update-baseline 生成基线）")
+
+    regressions, improvements = compare(snapshot, baseline)
+    if improvements:
+        print("\n执行计划改善（可运行 --update-baseline 接受）:")
+        for item in improvements:
+            print(f"  ✓ {item}")
+    if regressions:
+        print("\n执行计划退化:")
+        for item in regressions:
+            print(f"  ✗ {item}")
+        sys.exit(1)
+    print("\n✓ 未发现执行计划退化")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,617 @@
+"""
+行为日志上报压测
+按 src/config/tracking.config.js 中的事件类型与页面合成接近真实的上报流，压测
+/api/behavior/track（含去重、写缓冲 / BehaviorMapper.batch_insert_logs），输出
+p50/p95/p99 延迟、持续事件吞吐、数据库新增行数与拒绝率，结果保存为 JSON 便于对比。
+
+两种加载方式:
+    closed: --concurrency 个客户端各自串行发送（可用 --rate 限速）
+    open:   按 --rate 事件/秒的泊松到达发送批次，不等待前一个请求返回；
+            延迟从计划到达时刻算起，服务端排队也计入延迟
+
+用法:
+    python bench_behavior_ingest.py --duration 30 --concurrency 8                  # 压测本地服务
+    python bench_behavior_ingest.py --mode open --rate 2000 --duration 60
+    python bench_behavior_ingest.py --in-process --duration 10                      # 不启动服务，直接调用 Flask 应用
+    python bench_behavior_ingest.py --record workload.ndjson --duration 30          # 同时录制请求批次
+    python bench_behavior_ingest.py --replay workload.ndjson --mode open --rate 1000
+    python bench_behavior_ingest.py --compare instance/bench/a.json instance/bench/b.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+TRACKING_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'config', 'tracking.config.js')
+TRACK_PATH = '/api/behavior/track'
+DEFAULT_OUTPUT_DIR = os.path.join('instance', 'bench')
+
+# 页面专属事件：事件名包含关键字即只在该页面产生
+PAGE_EVENT_KEYWORDS = {
+    'financing': ('fund',),
+    'news': ('news',),
+    'transfer': ('transfer',),
+    'account': ('bill',),
+}
+# 由会话模拟显式产生的页面生命周期事件
+LIFECYCLE_EVENTS = {'page_view', 'page_leave'}
+
+# 对比结果时展示的指标（名称, 越大越好）
+COMPARE_METRICS = (
+    ('events_per_second', True),
+    ('accepted_events', True),
+    ('db_rows_written', True),
+    ('rejection_rate', False),
+    ('latency_ms.p50', False),
+    ('latency_ms.p95', False),
+    ('latency_ms.p99', False),
+    ('latency_ms.max', False),
+)
+
+
+# ---------- 事件合成 ----------
+
+def load_tracking_config(path=TRACKING_CONFIG):
+    """
+    从前端追踪配置中解析事件类型与追踪页面
+
+    Returns:
+        (事件类型列表, 页面列表)
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        source = f.read()
+    block = re.search(r'export const EventTypes\s*=\s*\{(.*?)\};', source, re.S)
+    pages = re.search(r'trackedPages:\s*\[([^\]]*)\]', source)
+    if not block or not pages:
+        raise ValueError(f"无法从 {path} 解析 EventTypes / trackedPages")
+    event_types = re.findall(r"^\s*\w+:\s*'([a-z_]+)'", block.group(1), re.M)
+    tracked_pages = re.findall(r"'([^']+)'", pages.group(1))
+    return event_types, tracked_pages
+
+
+class EventSynthesizer:
+    """按会话模拟用户行为，每次产出一个用户的一批事件（模拟前端队列攒批上报）
+
+    Args:
+        event_types: 事件类型
+        pages: 页面
+        users: 模拟用户数
+        batch_size: 每批事件数
+        seed: 随机种子
+        duplicate_rate: 批次中重复上一批事件（模拟客户端重试）的比例
+    """
+
+    def __init__(self, event_types, pages, users=1000, batch_size=50, seed=None, duplicate_rate=0.0):
+        self.random = random.Random(seed)
+        self.pages = pages
+        self.batch_size = batch_size
+        self.duplicate_rate = duplicate_rate
+        self.run_id = uuid.uuid4().hex[:8]
+        self._seq = 0
+        self._last_batch = None
+        self._lock = threading.Lock()
+
+        generic = [t for t in event_types if t not in LIFECYCLE_EVENTS
+                   and not any(k in t for keys in PAGE_EVENT_KEYWORDS.values() for k in keys)]
+        self.generic_events = generic
+        self.page_events = {
+            page: [t for t in event_types if any(k in t for k in PAGE_EVENT_KEYWORDS.get(page, ()))]
+            for page in pages
+        }
+        self.users = [
+            {'user_id': f"bench_{i:06d}", 'session_id': None, 'page': None, 'entered_at': 0, 'clock': 0}
+            for i in range(max(1, users))
+        ]
+
+    def _event(self, user, event_type, **fields):
+        self._seq += 1
+        event = {
+            'event_id': f"bench-{self.run_id}-{self._seq}",
+            'event_type': event_type,
+            'user_id': user['user_id'],
+            'session_id': user['session_id'],
+            'page': user['page'],
+            'page_url': f"/{user['page']}",
+            'context_data': {'source': 'bench'},
+            'timestamp': user['clock'],
+        }
+        event.update(fields)
+        return event
+
+    def _navigate(self, user, events):
+        if user['page'] is not None:
+            events.append(self._event(user, 'page_leave', duration=user['clock'] - user['entered_at']))
+        user['page'] = self.random.choice([p for p in self.pages if p != user['page']] or self.pages)
+        user['entered_at'] = user['clock']
+        events.append(self._event(user, 'page_view', referrer=''))
+
+    def _interaction(self, user):
+        choices = self.page_events.get(user['page']) or []
+        event_type = self.random.choice(choices if choices and self.random.random() < 0.6 else self.generic_events)
+        fields = {}
+        if event_type == 'scroll':
+            fields['scroll_depth'] = self.random.randint(0, 100)
+        elif event_type in ('click', 'input'):
+            fields.update(element_type='button', element_id=f"btn_{self.random.randint(1, 40)}",
+                          element_text='确定')
+        elif event_type == 'fund_view':
+            fields['business_data'] = {'fund_code': f"{self.random.randint(0, 999999):06d}"}
+        elif event_type.startswith('transfer_'):
+            fields['business_data'] = {'amount': self.random.randint(1, 50000)}
+        return self._event(user, event_type, **fields)
+
+    def next_batch(self):
+        """产出下一批事件（线程安全）"""
+        with self._lock:
+            if self._last_batch and self.random.random() < self.duplicate_rate:
+                return self._last_batch
+            user = self.random.choice(self.users)
+            now = int(time.time() * 1000)
+            if user['session_id'] is None or now - user['clock'] > 30 * 60 * 1000:
+                user.update(session_id=f"bench-{self.run_id}-{uuid.uuid4().hex[:12]}", page=None, clock=now)
+            user['clock'] = max(user['clock'], now - 5000)
+
+            events = []
+            if user['page'] is None:
+                self._navigate(user, events)
+            while len(events) < self.batch_size:
+                user['clock'] += self.random.randint(200, 3000)
+                if self.random.random() < 0.12:
+                    self._navigate(user, events)
+                else:
+                    events.append(self._interaction(user))
+            self._last_batch = events[:self.batch_size]
+            return self._last_batch
+
+
+class ReplaySource:
+    """回放录制的批次；默认重写事件ID并把时间平移到当前，避免被去重 / 唯一键吞掉
+
+    Args:
+        path: 录制文件（每行一个 JSON 数组）
+        keep_ids: 保留原事件ID与时间戳（用于压测去重路径）
+    """
+
+    def __init__(self, path, keep_ids=False):
+        with open(path, 'r', encoding='utf-8') as f:
+            self.batches = [json.loads(line) for line in f if line.strip()]
+        if not self.batches:
+            raise ValueError(f"录制文件为空: {path}")
+        self.keep_ids = keep_ids
+        self.run_id = uuid.uuid4().hex[:8]
+        first = min(event['timestamp'] for batch in self.batches for event in batch)
+        self.shift = int(time.time() * 1000) - first
+        self._index = 0
+        self._lock = threading.Lock()
+
+    def next_batch(self):
+        """取下一批，回放完毕返回 None"""
+        with self._lock:
+            if self._index >= len(self.batches):
+                return None
+            index = self._index
+            self._index += 1
+        batch = self.batches[index]
+        if self.keep_ids:
+            return batch
+        return [
+            dict(event, event_id=f"{event['event_id']}-r{self.run_id}",
+                 timestamp=event['timestamp'] + self.shift)
+            for event in batch
+        ]
+
+
+class Recorder:
+    """把发送的批次写入录制文件"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'w', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def write(self, batch):
+        line = json.dumps(batch, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def close(self):
+        self._file.close()
+
+
+# ---------- 发送 ----------
+
+class HttpTarget:
+    """通过 HTTP 压测运行中的服务（每个线程一个长连接）"""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or 'localhost'
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.https = parts.scheme == 'https'
+        self.path = (parts.path.rstrip('/') or '') + TRACK_PATH
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = self._local.conn = cls(self.host, self.port, timeout=30)
+        return conn
+
+    def send(self, body):
+        """发送一批，返回 (状态码, 响应 JSON)"""
+        conn = self._connection()
+        try:
+            conn.request('POST', self.path, body=body, headers={'Content-Type': 'application/json'})
+            resp = conn.getresponse()
+            payload = resp.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            self._local.conn = None
+            raise
+        try:
+            return resp.status, json.loads(payload)
+        except ValueError:
+            return resp.status, None
+
+    def drain(self, timeout):
+        """服务端写缓冲在其进程内，只能轮询行数等待写入"""
+        return None
+
+
+class InProcessTarget:
+    """直接调用本进程内的 Flask 应用（无需启动服务，包含完整的请求处理链路）"""
+
+    def __init__(self):
+        from app import app
+        self.app = app
+        self._local = threading.local()
+
+    def send(self, body):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        resp = client.post(TRACK_PATH, data=body, content_type='application/json')
+        return resp.status_code, resp.get_json(silent=True)
+
+    def drain(self, timeout):
+        from services.behavior_write_buffer import get_behavior_write_buffer
+        buffer = get_behavior_write_buffer()
+        return buffer.flush(timeout) if buffer is not None else True
+
+
+def count_db_rows():
+    """当前行为日志行数；无法连接数据库时返回 None"""
+    try:
+        from utils.db import db_query
+        row = db_query("SELECT COUNT(*) AS n FROM user_behavior_logs", fetch_one=True)
+        return int(row['n'])
+    except Exception as e:
+        print(f"[bench] 无法统计数据库行数: {str(e)}")
+        return None
+
+
+def wait_db_rows(baseline, expected, timeout):
+    """轮询直到新增行数达到 expected 或不再增长，返回最终行数"""
+    deadline = time.time() + timeout
+    last = count_db_rows()
+    while last is not None and last - baseline < expected and time.time() < deadline:
+        time.sleep(0.5)
+        current = count_db_rows()
+        if current == last:
+            break
+        last = current
+    return last
+
+
+class Stats:
+    """请求结果收集（线程安全）"""
+
+    def __init__(self):
+        self.latencies = []
+        self.service_times = []
+        self.status_counts = {}
+        self.requests = 0
+        self.sent_events = 0
+        self.accepted_events = 0
+        self.duplicates = 0
+        self.rejected_events = 0
+        self.errors = 0
+        self.late_requests = 0
+        self._lock = threading.Lock()
+
+    def add(self, events, latency, service_time, status, payload):
+        data = (payload or {}).get('data') or {}
+        accepted = data.get('inserted', data.get('queued', 0)) if status in (200, 202) else 0
+        with self._lock:
+            self.requests += 1
+            self.sent_events += events
+            self.latencies.append(latency)
+            self.service_times.append(service_time)
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            if status in (200, 202):
+                self.accepted_events += accepted or 0
+                self.duplicates += data.get('duplicates', 0)
+            else:
+                self.rejected_events += events
+
+    def add_error(self, events):
+        with self._lock:
+            self.requests += 1
+            self.sent_events += events
+            self.errors += 1
+            self.rejected_events += events
+            self.status_counts['error'] = self.status_counts.get('error', 0) + 1
+
+
+def percentile(sorted_values, q):
+    """线性插值分位数"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def latency_summary(values):
+    values = sorted(values)
+    return {
+        'p50': round(percentile(values, 0.50) * 1000, 2),
+        'p95': round(percentile(values, 0.95) * 1000, 2),
+        'p99': round(percentile(values, 0.99) * 1000, 2),
+        'max': round(values[-1] * 1000, 2) if values else 0.0,
+        'mean': round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+    }
+
+
+def send_batch(target, batch, stats, scheduled_at, recorder=None):
+    if recorder is not None:
+        recorder.write(batch)
+    body = json.dumps({'events': batch, 'meta': {'client_time': int(time.time() * 1000)}},
+                      ensure_ascii=False).encode('utf-8')
+    started = time.perf_counter()
+    try:
+        status, payload = target.send(body)
+    except Exception:
+        stats.add_error(len(batch))
+        return
+    finished = time.perf_counter()
+    stats.add(len(batch), finished - scheduled_at, finished - started, status, payload)
+
+
+def run_closed(target, source, stats, args, recorder):
+    """闭环：每个客户端收到响应后再发下一批；设置 --rate 时按固定间隔排期"""
+    deadline = time.perf_counter() + args.duration
+    interval = args.concurrency * args.batch_size / args.rate if args.rate else 0.0
+
+    def worker(index):
+        next_at = time.perf_counter() + interval * index / args.concurrency
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                return
+            if interval:
+                if next_at > now:
+                    time.sleep(next_at - now)
+                scheduled_at = next_at
+                next_at += interval
+            else:
+                scheduled_at = now
+            batch = source.next_batch()
+            if batch is None:
+                return
+            send_batch(target, batch, stats, scheduled_at, recorder)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_open(target, source, stats, args, recorder):
+    """开环：批次按泊松过程到达，与响应快慢无关"""
+    rng = random.Random(args.seed)
+    batches_per_second = args.rate / args.batch_size
+    pending = threading.Semaphore(args.max_in_flight)
+    start = time.perf_counter()
+    deadline = start + args.duration
+    next_at = start
+
+    def task(batch, scheduled_at):
+        try:
+            send_batch(target, batch, stats, scheduled_at, recorder)
+        finally:
+            pending.release()
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        while True:
+            next_at += rng.expovariate(batches_per_second)
+            if next_at >= deadline:
+                break
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -0.05:
+                stats.late_requests += 1
+            batch = source.next_batch()
+            if batch is None:
+                break
+            if not pending.acquire(timeout=max(0.0, deadline - time.perf_counter())):
+                break
+            pool.submit(task, batch, next_at)
+
+
+# ---------- 结果 ----------
+
+def build_result(args, stats, elapsed, rows_before, rows_after):
+    db_rows = rows_after - rows_before if rows_before is not None and rows_after is not None else None
+    return {
+        'tool': 'bench_behavior_ingest',
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'config': {
+            'target': 'in-process' if args.in_process else args.url,
+            'mode': args.mode,
+            'rate': args.rate,
+            'concurrency': args.concurrency,
+            'batch_size': args.batch_size,
+            'duration': args.duration,
+            'users': args.users,
+            'seed': args.seed,
+            'duplicate_rate': args.duplicate_rate,
+            'replay': args.replay,
+            'label': args.label,
+            'env': {name: os.getenv(name) for name in (
+                'DB_BACKEND', 'BEHAVIOR_WRITE_BEHIND', 'BEHAVIOR_DEDUP', 'BEHAVIOR_BUFFER_BATCH_SIZE')},
+        },
+        'results': {
+            'elapsed_s': round(elapsed, 3),
+            'requests': stats.requests,
+            'sent_events': stats.sent_events,
+            'accepted_events': stats.accepted_events,
+            'duplicates': stats.duplicates,
+            'rejected_events': stats.rejected_events,
+            'rejection_rate': round(stats.rejected_events / stats.sent_events, 4) if stats.sent_events else 0.0,
+            'errors': stats.errors,
+            'late_requests': stats.late_requests,
+            'status_counts': {str(k): v for k, v in sorted(stats.status_counts.items(), key=lambda kv: str(kv[0]))},
+            'events_per_second': round(stats.accepted_events / elapsed, 1) if elapsed else 0.0,
+            'requests_per_second': round(stats.requests / elapsed, 1) if elapsed else 0.0,
+            'db_rows_written': db_rows,
+            'latency_ms': latency_summary(stats.latencies),
+            'service_time_ms': latency_summary(stats.service_times),
+        },
+    }
+
+
+def print_result(result):
+    r = result['results']
+    c = result['config']
+    print("=" * 72)
+    print(f"目标: {c['target']}  模式: {c['mode']}  并发: {c['concurrency']}  批大小: {c['batch_size']}"
+          + (f"  目标速率: {c['rate']} 事件/秒" if c['rate'] else ''))
+    print("=" * 72)
+    print(f"请求 {r['requests']}（{r['requests_per_second']}/s）  发送事件 {r['sent_events']}  "
+          f"接受 {r['accepted_events']}  重复 {r['duplicates']}")
+    print(f"持续吞吐: {r['events_per_second']} 事件/秒  数据库新增行: {r['db_rows_written']}")
+    print(f"拒绝率: {r['rejection_rate'] * 100:.2f}%  状态码: {r['status_counts']}  延迟排期: {r['late_requests']}")
+    lat, svc = r['latency_ms'], r['service_time_ms']
+    print(f"延迟(ms)   p50 {lat['p50']:>8}  p95 {lat['p95']:>8}  p99 {lat['p99']:>8}  max {lat['max']:>8}")
+    print(f"服务(ms)   p50 {svc['p50']:>8}  p95 {svc['p95']:>8}  p99 {svc['p99']:>8}  max {svc['max']:>8}")
+
+
+def _metric(result, name):
+    value = result['results']
+    for part in name.split('.'):
+        value = (value or {}).get(part)
+    return value
+
+
+def compare(base_path, new_path):
+    """对比两次压测结果"""
+    with open(base_path, 'r', encoding='utf-8') as f:
+        base = json.load(f)
+    with open(new_path, 'r', encoding='utf-8') as f:
+        new = json.load(f)
+    print(f"基线: {base_path}  ({base['config'].get('label') or base['started_at']})")
+    print(f"对比: {new_path}  ({new['config'].get('label') or new['started_at']})")
+    print(f"{'指标':<22} {'基线':>12} {'对比':>12} {'变化':>10}")
+    for name, higher_is_better in COMPARE_METRICS:
+        a, b = _metric(base, name), _metric(new, name)
+        if a is None or b is None:
+            print(f"{name:<22} {str(a):>12} {str(b):>12} {'-':>10}")
+            continue
+        change = (b - a) / a * 100 if a else 0.0
+        better = (change > 0) == higher_is_better if change else None
+        mark = '' if better is None else (' +' if better else ' -')
+        print(f"{name:<22} {a:>12} {b:>12} {change:>+9.1f}%{mark}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='行为日志上报压测')
+    parser.add_argument('--url', default=os.getenv('API_BASE_URL', 'http://localhost:5000'), help='服务地址')
+    parser.add_argument('--in-process', action='store_true', help='直接调用本进程内的 Flask 应用')
+    parser.add_argument('--mode', choices=['closed', 'open'], default='closed', help='加载方式，默认 closed')
+    parser.add_argument('--rate', type=float, help='目标事件/秒（open 模式必填，closed 模式用于限速）')
+    parser.add_argument('--duration', type=float, default=30, help='压测时长（秒），默认 30')
+    parser.add_argument('--concurrency', type=int, default=8, help='客户端线程数，默认 8')
+    parser.add_argument('--max-in-flight', type=int, default=1000, help='open 模式最多未完成请求数，默认 1000')
+    parser.add_argument('--batch-size', type=int, default=50, help='每次上报事件数（接口上限 100），默认 50')
+    parser.add_argument('--users', type=int, default=1000, help='模拟用户数，默认 1000')
+    parser.add_argument('--seed', type=int, help='随机种子')
+    parser.add_argument('--duplicate-rate', type=float, default=0.0, help='重发上一批的比例（模拟客户端重试）')
+    parser.add_argument('--record', metavar='FILE', help='把发送的批次录制到文件')
+    parser.add_argument('--replay', metavar='FILE', help='回放录制的批次')
+    parser.add_argument('--keep-ids', action='store_true', help='回放时保留原事件ID与时间戳')
+    parser.add_argument('--no-db-count', action='store_true', help='不统计数据库新增行数')
+    parser.add_argument('--drain-timeout', type=float, default=30, help='结束后等待写入完成的秒数，默认 30')
+    parser.add_argument('--label', help='结果标签，便于对比')
+    parser.add_argument('--output', help=f'结果 JSON 路径，默认 {DEFAULT_OUTPUT_DIR}/ingest_<时间>.json')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help='对比两次结果后退出')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.mode == 'open' and not args.rate:
+        parser.error('open 模式需要 --rate')
+    args.batch_size = max(1, min(args.batch_size, 100))
+    args.concurrency = max(1, args.concurrency)
+
+    if args.replay:
+        source = ReplaySource(args.replay, keep_ids=args.keep_ids)
+    else:
+        event_types, pages = load_tracking_config()
+        source = EventSynthesizer(event_types, pages, users=args.users, batch_size=args.batch_size,
+                                  seed=args.seed, duplicate_rate=args.duplicate_rate)
+    target = InProcessTarget() if args.in_process else HttpTarget(args.url)
+    recorder = Recorder(args.record) if args.record else None
+    rows_before = None if args.no_db_count else count_db_rows()
+
+    stats = Stats()
+    print(f"开始压测（{args.mode}，{args.duration}s）...")
+    start = time.perf_counter()
+    try:
+        if args.mode == 'open':
+            run_open(target, source, stats, args, recorder)
+        else:
+            run_closed(target, source, stats, args, recorder)
+    finally:
+        if recorder is not None:
+            recorder.close()
+    elapsed = time.perf_counter() - start
+
+    rows_after = None
+    if rows_before is not None:
+        target.drain(args.drain_timeout)
+        rows_after = wait_db_rows(rows_before, stats.accepted_events, args.drain_timeout)
+
+    result = build_result(args, stats, elapsed, rows_before, rows_after)
+    print_result(result)
+
+    output = args.output or os.path.join(DEFAULT_OUTPUT_DIR, f"ingest_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存: {output}")
+    if args.record:
+        print(f"请求批次已录制: {args.record}")
+
+
+if __name__ == '__main__':
+    main()
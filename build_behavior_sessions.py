@@ -0,0 +1,70 @@
+"""
+用户会话重建任务
+从 user_behavior_logs 增量重建会话表与页面访问停留表，可中断、可重复执行（从检查点继续）
+
+用法:
+    python build_behavior_sessions.py                  # 处理全部新增日志后退出
+    python build_behavior_sessions.py --loop 60        # 每60秒增量处理一次
+    python build_behavior_sessions.py --rebuild        # 重置检查点，从头重建全部会话
+    python build_behavior_sessions.py --status         # 查看检查点
+"""
+
+import argparse
+import json
+import time
+
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+from services.session_service import JOB_SESSIONS, get_session_job
+from mapper.behavior_rollup_mapper import BehaviorRollupMapper
+
+
+def run_once(job, args):
+    summary = job.run(max_batches=args.max_batches)
+    print(f"[OK] {summary['batches']} 批 / {summary['rows']} 条日志，重建 {summary['sessions']} 个会话；"
+          f"耗时 {summary['elapsed_ms']}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='用户会话重建任务')
+    parser.add_argument('--batch-size', type=int, help='每批日志条数（默认读取 BEHAVIOR_SESSION_BATCH_SIZE）')
+    parser.add_argument('--max-batches', type=int, help='本次最多处理的批次数')
+    parser.add_argument('--loop', type=float, metavar='SECONDS', help='常驻运行，每隔 SECONDS 秒处理一次')
+    parser.add_argument('--rebuild', action='store_true', help='重置检查点后从头重建')
+    parser.add_argument('--status', action='store_true', help='只打印检查点')
+    args = parser.parse_args()
+
+    job = get_session_job()
+    if args.batch_size:
+        job.batch_size = args.batch_size
+
+    if args.status:
+        print(json.dumps(BehaviorRollupMapper.get_checkpoint(JOB_SESSIONS), ensure_ascii=False, indent=2))
+        return
+
+    if args.rebuild:
+        job.reset()
+        print("[OK] 已重置会话检查点")
+
+    if not args.loop:
+        run_once(job, args)
+        return
+
+    print(f"开始常驻重建会话，间隔 {args.loop}s（Ctrl+C 退出）...")
+    try:
+        while True:
+            try:
+                run_once(job, args)
+            except Exception as e:
+                # 本批事务已回滚，下轮从检查点继续
+                print(f"[ERROR] 会话重建失败: {str(e)}")
+            time.sleep(args.loop)
+    except KeyboardInterrupt:
+        print("\n已停止")
+
+
+if __name__ == '__main__':
+    main()
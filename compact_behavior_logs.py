@@ -0,0 +1,69 @@
+"""
+用户行为日志汇总任务
+把 user_behavior_logs 增量汇总到小时 / 天汇总表，可中断、可重复执行（从检查点继续）
+
+用法:
+    python compact_behavior_logs.py                    # 处理全部新增日志后退出
+    python compact_behavior_logs.py --loop 60          # 每60秒增量处理一次
+    python compact_behavior_logs.py --purge-days 30    # 汇总后删除30天前已汇总的原始日志
+    python compact_behavior_logs.py --status           # 查看检查点
+"""
+
+import argparse
+import json
+import time
+
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+from services.behavior_rollup_service import get_rollup_job
+
+
+def run_once(job, args):
+    summary = job.run(max_batches=args.max_batches)
+    print(f"[OK] 小时级 {summary['hourly_batches']} 批 / {summary['hourly_rows']} 条日志 / "
+          f"{summary['hourly_buckets']} 个桶；天级 {summary['daily_batches']} 批 / "
+          f"{summary['daily_buckets']} 个桶；耗时 {summary['elapsed_ms']}ms")
+    if args.purge_days:
+        deleted = job.purge(days=args.purge_days)
+        print(f"[OK] 已删除 {deleted} 条已汇总的原始日志（{args.purge_days} 天前）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='用户行为日志汇总任务')
+    parser.add_argument('--batch-size', type=int, help='小时级每批日志条数（默认读取 BEHAVIOR_ROLLUP_BATCH_SIZE）')
+    parser.add_argument('--max-batches', type=int, help='本次最多处理的小时级批次数')
+    parser.add_argument('--loop', type=float, metavar='SECONDS', help='常驻运行，每隔 SECONDS 秒处理一次')
+    parser.add_argument('--purge-days', type=int, help='汇总后删除早于该天数且已汇总的原始日志')
+    parser.add_argument('--status', action='store_true', help='只打印检查点')
+    args = parser.parse_args()
+
+    job = get_rollup_job()
+    if args.batch_size:
+        job.batch_size = args.batch_size
+
+    if args.status:
+        print(json.dumps(job.checkpoints(), ensure_ascii=False, indent=2))
+        return
+
+    if not args.loop:
+        run_once(job, args)
+        return
+
+    print(f"开始常驻汇总，间隔 {args.loop}s（Ctrl+C 退出）...")
+    try:
+        while True:
+            try:
+                run_once(job, args)
+            except Exception as e:
+                # 本批事务已回滚，下轮从检查点继续
+                print(f"[ERROR] 汇总失败: {str(e)}")
+            time.sleep(args.loop)
+    except KeyboardInterrupt:
+        print("\n已停止")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+运维管理控制器（Controller）
+提供数据库连接池、SQL 执行统计与行为日志写缓冲等运维接口
+
+访问控制：配置了 ADMIN_TOKEN 时需在请求头 X-Admin-Token 中携带；
+未配置时仅 development 环境可访问。
+"""
+
+import hmac
+import os
+from functools import wraps
+
+from flask import Blueprint, request
+from utils.response import success_response, error_response, handle_exceptions
+from utils.db import get_pool_stats, query_stats
+from services.behavior_write_buffer import get_behavior_write_buffer
+from services.behavior_suggestion_service import get_suggestion_scheduler
+from services.behavior_counter_service import get_behavior_counters
+from services.behavior_archive_service import get_behavior_archive
+from services.behavior_dedup import get_behavior_dedup
+from services.navigation_graph_service import get_navigation_graph
+from services.ai_response_cache import get_ai_response_cache
+
+# 创建Blueprint
+admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
+
+
+def require_admin(func):
+    """装饰器：校验运维接口访问权限"""
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        token = os.getenv('ADMIN_TOKEN')
+        if token:
+            provided = request.headers.get('X-Admin-Token', '')
+            if not hmac.compare_digest(provided, token):
+                return error_response('FORBIDDEN', message='无权访问运维接口', status_code=403)
+        elif os.getenv('FLASK_ENV', 'development') != 'development':
+            return error_response('FORBIDDEN', message='未配置 ADMIN_TOKEN，运维接口已禁用', status_code=403)
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+@admin_bp.route('/query-stats', methods=['GET'])
+@handle_exceptions
+@require_admin
+def get_query_stats():
+    """
+    获取 SQL 指纹统计（按总耗时排序的前N条）
+
+    Query参数:
+        - top: 返回条数（可选，默认20）
+        - order_by: 排序字段 total_ms|count|max_ms|avg_ms|errors|rows（可选，默认total_ms）
+    """
+    top = int(request.args.get('top', 20))
+    order_by = request.args.get('order_by', 'total_ms')
+    return success_response({
+        'summary': query_stats.summary(),
+        'queries': query_stats.top(top, order_by),
+    }, message='获取SQL统计成功')
+
+
+@admin_bp.route('/query-stats/reset', methods=['POST'])
+@handle_exceptions
+@require_admin
+def reset_query_stats():
+    """清空 SQL 指纹统计"""
+    query_stats.reset()
+    return success_response(None, message='SQL统计已清空')
+
+
+@admin_bp.route('/db-pool', methods=['GET'])
+@handle_exceptions
+@require_admin
+def get_db_pool():
+    """获取连接池实时统计"""
+    return success_response(get_pool_stats(), message='获取连接池统计成功')
+
+
+@admin_bp.route('/behavior-buffer', methods=['GET'])
+@handle_exceptions
+@require_admin
+def get_behavior_buffer():
+    """获取行为日志写缓冲实时统计（未启用时 data 为 null）"""
+    write_buffer = get_behavior_write_buffer()
+    return success_response(write_buffer.stats() if write_buffer else None, message='获取写缓冲统计成功')
+
+
+@admin_bp.route('/behavior-analysis', methods=['GET'])
+@handle_exceptions
+@require_admin
+def get_behavior_analysis():
+    """获取行为日志 AI 建议后台调度统计"""
+    return success_response(get_suggestion_scheduler().stats(), message='获取建议调度统计成功')
+
+
+@admin_bp.route('/behavior-counters', methods=['GET'])
+@handle_exceptions
+@require_admin
+def get_behavior_counters_stats():
+    """获取行为增量计数器实时统计"""
+    return success_response(get_behavior_counters().stats(), message='获取行为计数统计成功')
+
+
+@admin_bp.route('/behavior-counters/flush', methods=['POST'])
+@handle_exceptions
+@require_admin
+def flush_behavior_counters():
+    """立即把内存中的计数增量落库"""
+    return success_response({'flushed_buckets': get_behavior_counters().flush()}, message='计数增量已落库')
+
+
+@admin_bp.route('/behavior-archive', methods=['GET'])
+@handle_exceptions
+@require_admin
+def get_behavior_archive_stats():
+    """获取行为日志冷归档文件概况"""
+    return success_response(get_behavior_archive().stats(), message='获取行为归档概况成功')
+
+
+@admin_bp.route('/behavior-dedup', methods=['GET'])
+@handle_exceptions
+@require_admin
+def get_behavior_dedup_stats():
+    """获取行为日志写入前去重统计（重复率、布隆过滤器占用）"""
+    dedup = get_behavior_dedup()
+    if dedup is None:
+        return success_response({'enabled': False}, message='行为日志去重未启用')
+    return success_response(dict(dedup.stats(), enabled=True), message='获取行为去重统计成功')
+
+
+@admin_bp.route('/navigation-graph', methods=['GET'])
+@handle_exceptions
+@require_admin
+def get_navigation_graph_stats():
+    """获取页面跳转图统计（页面数、用户数、跳转数、预热状态）"""
+    return success_response(get_navigation_graph().stats(), message='获取页面跳转图统计成功')
+
+
+@admin_bp.route('/ai-cache', methods=['GET'])
+@handle_exceptions
+@require_admin
+def get_ai_cache_stats():
+    """获取大模型响应缓存统计（命中率、条数、各页面类型命中情况）"""
+    cache = get_ai_response_cache()
+    if cache is None:
+        return success_response({'enabled': False}, message='大模型响应缓存未启用')
+    return success_response(dict(cache.stats(), enabled=True), message='获取大模型缓存统计成功')
+
+
+@admin_bp.route('/ai-cache/clear', methods=['POST'])
+@handle_exceptions
+@require_admin
+def clear_ai_cache():
+    """清空大模型响应缓存（内存与磁盘）"""
+    cache = get_ai_response_cache()
+    if cache is not None:
+        cache.clear()
+    return success_response(None, message='大模型响应缓存已清空')
@@ -5,17 +5,32 @@
 
 from flask import Blueprint, request, jsonify
 from mapper.behavior_mapper import behavior_mapper
+from services.behavior_write_buffer import get_behavior_write_buffer, BufferFullError
+from services.behavior_dedup import get_behavior_dedup
+from services.behavior_ingest_service import create_ingestor, IngestTooLargeError, UnsupportedEncodingError
+from services.behavior_suggestion_service import get_latest_suggestion
+from services.behavior_counter_service import get_behavior_counters
+from services.behavior_rollup_service import get_rollup_stats
+from services.behavior_archive_service import query_archived_behaviors
+from services.session_service import get_user_session_summary
+from services.navigation_graph_service import get_navigation_graph
 from utils.response import success_response, error_response
+from utils.cursor import encode_cursor, decode_cursor, InvalidCursorError
+import zlib
 from datetime import datetime
 
 # 创建蓝图
 behavior_bp = Blueprint('behavior', __name__, url_prefix='/api/behavior')
 
+# /query 每页条数上限
+MAX_QUERY_LIMIT = 1000
+
 
 @behavior_bp.route('/track', methods=['POST'])
 def track_behaviors():
     """
     接收并存储用户行为日志
+    启用写缓冲时事件入队后立即返回 202，由后台线程批量写入；队列已满返回 503
     
     请求体格式：
     {
@@ -55,30 +70,51 @@ def track_behaviors():
         if not valid_events:
             return error_response('没有有效的事件数据', 400)
         
-        # 批量插入数据库
-        affected_rows = behavior_mapper.batch_insert_logs(valid_events)
+        # 丢弃最近已写入过的重复事件（客户端重试），不确定的交给唯一键判断
+        new_events, duplicates = valid_events, 0
+        dedup = get_behavior_dedup()
+        if dedup is not None:
+            new_events, duplicates = dedup.filter(valid_events)
+        
+        # 写入：优先进入写缓冲，未启用时同步批量插入
+        write_buffer = get_behavior_write_buffer()
+        if not new_events:
+            affected_rows = 0
+        elif write_buffer is not None:
+            try:
+                write_buffer.enqueue(new_events)
+            except BufferFullError as e:
+                response, status_code = error_response(str(e), message='行为日志队列繁忙，请稍后重试', status_code=503)
+                return response, status_code, {'Retry-After': str(int(e.retry_after))}
+            affected_rows = None
+        else:
+            affected_rows = behavior_mapper.batch_insert_logs(new_events)
         
-        # 如果有用户ID，调用mock服务分析用户日志
+        # 如果有用户ID，取该用户最近一次后台分析的建议（按间隔去抖触发，不等待分析完成）
         ai_suggestion = None
         if user_id:
             try:
-                from services.mock import analyze_user_logs
-                ai_suggestion = analyze_user_logs(user_id)
-                print(f"[behavior_controller] 已为用户 {user_id} 生成AI建议")
+                ai_suggestion = get_latest_suggestion(user_id)
             except Exception as e:
-                print(f"[behavior_controller] 生成AI建议失败: {str(e)}")
+                print(f"[behavior_controller] 获取AI建议失败: {str(e)}")
         
         response_data = {
             'received': len(events),
             'valid': len(valid_events),
-            'inserted': affected_rows,
+            'duplicates': duplicates,
             'server_time': int(datetime.now().timestamp() * 1000)
         }
+        if affected_rows is None:
+            response_data['queued'] = len(new_events)
+        else:
+            response_data['inserted'] = affected_rows
         
         # 如果有AI建议，添加到响应中
         if ai_suggestion:
             response_data['ai_suggestion'] = ai_suggestion
         
+        if affected_rows is None:
+            return success_response(response_data, '行为日志已接收', 202)
         return success_response(response_data, '行为日志上报成功')
         
     except Exception as e:
@@ -86,10 +122,56 @@ def track_behaviors():
         return error_response(f'服务器错误: {str(e)}', 500)
 
 
+@behavior_bp.route('/ingest', methods=['POST'])
+def ingest_behaviors():
+    """
+    批量导入行为日志（流式）
+    请求体为 NDJSON，每行一个事件；也可以是 sendBeacon 发出的 JSON 数组或 {"events": [...]}。
+    支持 Content-Encoding: gzip / deflate，sendBeacon 无法设置请求头时可用 ?encoding=gzip 指定。
+    
+    返回：
+    {
+        "lines": 1000, "received": 1000, "accepted": 998, "rejected": 2, "duplicates": 0,
+        "queued": 998,      // 未启用写缓冲时为 "inserted"
+        "errors": [{"line": 17, "error": "缺少必填字段: event_id"}, ...]
+    }
+    """
+    ingestor = create_ingestor()
+    encoding = request.args.get('encoding') or request.headers.get('Content-Encoding')
+    try:
+        ingestor.feed_stream(request.stream, encoding)
+    except UnsupportedEncodingError as e:
+        return error_response(str(e), message='不支持的压缩格式', status_code=415)
+    except zlib.error as e:
+        return error_response(f'请求体解压失败: {str(e)}', message='请求体格式错误', status_code=400)
+    except IngestTooLargeError as e:
+        # 之前的批次已写入，随结果返回；客户端拆分后重试时由去重与唯一键忽略
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '导入数据过大',
+            'data': ingestor.result(),
+        }), 413
+    except BufferFullError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '行为日志队列繁忙，请稍后重试',
+            'data': ingestor.result(),
+        }), 503, {'Retry-After': str(int(e.retry_after))}
+    except Exception as e:
+        print(f"[behavior_controller] 导入失败: {str(e)}")
+        return error_response(f'服务器错误: {str(e)}', 500)
+    
+    if ingestor.queued:
+        return success_response(ingestor.result(), '行为日志已接收', 202)
+    return success_response(ingestor.result(), '行为日志导入成功')
+
+
 @behavior_bp.route('/query', methods=['POST'])
 def query_behaviors():
     """
-    查询用户行为日志
+    查询用户行为日志（按 timestamp、id 倒序，游标分页）
     
     请求体格式：
     {
@@ -98,8 +180,14 @@ def query_behaviors():
         "end_time": 1234567890,
         "event_type": "click",
         "page": "home",
-        "limit": 100
+        "limit": 100,               // 每页条数，最大 1000
+        "cursor": "...",            // 可选，上一页返回的 next_cursor，过滤条件须与上一页一致
+        "fields": ["event_type", "page", "timestamp"],  // 可选，返回的字段，默认全部
+        "raw_json": false,          // 可选，为 true 时 business_data / context_data 不解析，原样返回字符串
+        "include_archive": false    // 可选，同时查询冷归档中的历史日志（不支持 cursor）
     }
+    
+    返回 next_cursor 为 null 表示没有更多数据
     """
     try:
         data = request.get_json()
@@ -112,21 +200,86 @@ def query_behaviors():
         end_time = data.get('end_time')
         event_type = data.get('event_type')
         page = data.get('page')
-        limit = data.get('limit', 100)
+        limit = max(1, min(int(data.get('limit', 100)), MAX_QUERY_LIMIT))
+        
+        fields = data.get('fields')
+        if isinstance(fields, str):
+            fields = [name.strip() for name in fields.split(',') if name.strip()]
+        if fields:
+            unknown = [name for name in fields if name not in behavior_mapper.QUERY_FIELDS]
+            if unknown:
+                return error_response(f"未知字段: {', '.join(unknown)}", message='参数错误', status_code=400)
+        
+        if data.get('include_archive'):
+            if data.get('cursor'):
+                return error_response('include_archive 不支持 cursor 分页', message='参数错误', status_code=400)
+            behaviors = behavior_mapper.get_user_behaviors(
+                user_id=user_id,
+                start_time=start_time,
+                end_time=end_time,
+                event_type=event_type,
+                page=page,
+                limit=limit
+            )
+            archived = query_archived_behaviors(
+                user_id,
+                start_time=start_time,
+                end_time=end_time,
+                event_type=event_type,
+                page=page,
+                limit=limit
+            )
+            # 归档与删除之间的短暂窗口内两边可能有同一条日志
+            seen_ids = {item['id'] for item in behaviors}
+            behaviors.extend(item for item in archived if item['id'] not in seen_ids)
+            behaviors.sort(key=lambda item: item['timestamp'], reverse=True)
+            behaviors = behaviors[:limit]
+            if fields:
+                behaviors = [{name: item.get(name) for name in fields} for item in behaviors]
+            return success_response({
+                'behaviors': behaviors,
+                'count': len(behaviors)
+            })
+        
+        # 游标绑定过滤条件，换条件后旧游标失效
+        filters = {
+            'user_id': user_id, 'start_time': start_time, 'end_time': end_time,
+            'event_type': event_type, 'page': page,
+        }
+        after = None
+        if data.get('cursor'):
+            try:
+                position = decode_cursor(data['cursor'], filters)
+            except InvalidCursorError as e:
+                return error_response(str(e), message='参数错误', status_code=400)
+            after = (position['t'], position['i'])
         
-        # 查询数据
-        behaviors = behavior_mapper.get_user_behaviors(
+        # 多取一条判断是否还有下一页
+        rows = behavior_mapper.get_user_behaviors_page(
             user_id=user_id,
+            after=after,
             start_time=start_time,
             end_time=end_time,
             event_type=event_type,
             page=page,
-            limit=limit
+            limit=limit + 1,
+            fields=fields,
+            decode_json=not data.get('raw_json')
         )
+        has_more = len(rows) > limit
+        behaviors = rows[:limit]
+        next_cursor = None
+        if has_more:
+            last = behaviors[-1]
+            next_cursor = encode_cursor({'t': last['timestamp'], 'i': last['id']}, filters)
+        if fields:
+            behaviors = [{name: item[name] for name in fields} for item in behaviors]
         
         return success_response({
             'behaviors': behaviors,
-            'count': len(behaviors)
+            'count': len(behaviors),
+            'has_more': has_more,
+            'next_cursor': next_cursor
         })
         
     except Exception as e:
@@ -154,8 +307,8 @@ def get_behavior_stats():
         user_id = data.get('user_id')
         days = data.get('days', 7)
         
-        # 获取统计数据
-        stats = behavior_mapper.get_user_behavior_stats(user_id, days)
+        # 获取统计数据（读取增量计数汇总，不扫描原始日志）
+        stats = get_behavior_counters().get_user_stats(user_id, days)
         
         return success_response(stats)
         
@@ -164,6 +317,117 @@ def get_behavior_stats():
         return error_response(f'统计失败: {str(e)}', 500)
 
 
+@behavior_bp.route('/rollup-stats', methods=['POST'])
+def get_behavior_rollup_stats():
+    """
+    按时间窗口统计行为数据（可跨用户），自动选择小时/天汇总表或原始日志
+    
+    请求体格式：
+    {
+        "start_time": 1234567890000,   // 可选，默认 end_time 前7天
+        "end_time": 1234567890000,     // 可选，默认当前时间
+        "user_id": "12345",            // 可选
+        "page": "home",                // 可选
+        "event_type": "click"          // 可选
+    }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        end_time = int(data.get('end_time') or datetime.now().timestamp() * 1000)
+        start_time = int(data.get('start_time') or end_time - 7 * 24 * 3600 * 1000)
+        if start_time >= end_time:
+            return error_response('start_time必须早于end_time', 400)
+        
+        stats = get_rollup_stats(
+            start_time, end_time,
+            user_id=data.get('user_id'),
+            page=data.get('page'),
+            event_type=data.get('event_type')
+        )
+        stats['start_time'] = start_time
+        stats['end_time'] = end_time
+        
+        return success_response(stats)
+        
+    except Exception as e:
+        print(f"[behavior_controller] 汇总统计失败: {str(e)}")
+        return error_response(f'汇总统计失败: {str(e)}', 500)
+
+
+@behavior_bp.route('/sessions', methods=['POST'])
+def get_behavior_sessions():
+    """
+    查询用户会话汇总（会话时长、页面数、停留时长、跳出率），数据由 build_behavior_sessions.py 增量重建
+    
+    请求体格式：
+    {
+        "user_id": "12345",
+        "start_time": 1234567890000,   // 可选，会话开始时间下限
+        "end_time": 1234567890000,     // 可选，会话开始时间上限
+        "limit": 50,                   // 可选，最多返回的会话数
+        "include_visits": false        // 可选，附带每个会话的页面访问明细
+    }
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or not data.get('user_id'):
+            return error_response('user_id不能为空', 400)
+        
+        result = get_user_session_summary(
+            data['user_id'],
+            start_time=data.get('start_time'),
+            end_time=data.get('end_time'),
+            limit=max(1, min(int(data.get('limit', 50)), MAX_QUERY_LIMIT)),
+            include_visits=bool(data.get('include_visits'))
+        )
+        
+        return success_response(result)
+        
+    except Exception as e:
+        print(f"[behavior_controller] 会话查询失败: {str(e)}")
+        return error_response(f'会话查询失败: {str(e)}', 500)
+
+
+@behavior_bp.route('/navigation', methods=['POST'])
+def get_navigation():
+    """
+    查询页面跳转图：从某页面出发最常去的下一页，以及最常见的三页路径
+    
+    请求体格式：
+    {
+        "page": "home",          // 可选，不传时只返回全站常见路径
+        "user_id": "12345",      // 可选，同时返回该用户自己的下一页排行
+        "limit": 5,              // 可选，下一页条数
+        "path_limit": 10         // 可选，常见路径条数
+    }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        page = data.get('page')
+        user_id = data.get('user_id')
+        limit = max(1, min(int(data.get('limit', 5)), 50))
+        path_limit = max(1, min(int(data.get('path_limit', 10)), 50))
+        
+        graph = get_navigation_graph()
+        result = {
+            'page': page,
+            'common_paths': graph.common_paths(path_limit, page=page),
+            'warming': graph.warming,
+        }
+        if page:
+            result['next_pages'] = graph.top_next_pages(page, limit)
+            if user_id:
+                result['user_next_pages'] = graph.top_next_pages(page, limit, user_id=user_id)
+        
+        return success_response(result)
+        
+    except Exception as e:
+        print(f"[behavior_controller] 跳转图查询失败: {str(e)}")
+        return error_response(f'跳转图查询失败: {str(e)}', 500)
+
+
 @behavior_bp.route('/path', methods=['POST'])
 def get_user_path():
     """
@@ -0,0 +1,120 @@
+"""
+初始化用户行为计数汇总表
+创建 user_behavior_daily_counters / user_behavior_daily_sessions 两张表，
+并从 user_behavior_logs 回填已有日志的计数（仅在汇总表为空或指定 --rebuild 时回填）
+
+计数按 用户 × 自然日（按事件时间戳） × 事件类型 × 页面 汇总，
+写入行为日志时由 services.behavior_counter_service 增量维护。
+"""
+
+import argparse
+import pymysql
+import os
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+COUNTERS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS user_behavior_daily_counters (
+    user_id VARCHAR(50) NOT NULL COMMENT '用户ID',
+    stat_date DATE NOT NULL COMMENT '统计日期（按事件时间戳）',
+    event_type VARCHAR(50) NOT NULL COMMENT '事件类型',
+    page VARCHAR(50) NOT NULL DEFAULT '' COMMENT '页面（无页面时为空字符串）',
+    event_count INT NOT NULL DEFAULT 0 COMMENT '事件数',
+    total_duration BIGINT NOT NULL DEFAULT 0 COMMENT '停留时长合计(ms)',
+    last_timestamp BIGINT NOT NULL DEFAULT 0 COMMENT '最近事件时间戳(ms)',
+    PRIMARY KEY (user_id, stat_date, event_type, page)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用户行为日计数表';
+"""
+
+SESSIONS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS user_behavior_daily_sessions (
+    user_id VARCHAR(50) NOT NULL COMMENT '用户ID',
+    stat_date DATE NOT NULL COMMENT '统计日期（按事件时间戳）',
+    session_id VARCHAR(100) NOT NULL COMMENT '会话ID',
+    PRIMARY KEY (user_id, stat_date, session_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用户行为日会话表（用于统计去重会话数）';
+"""
+
+BACKFILL_COUNTERS_SQL = """
+INSERT INTO user_behavior_daily_counters
+    (user_id, stat_date, event_type, page, event_count, total_duration, last_timestamp)
+SELECT
+    user_id,
+    DATE(FROM_UNIXTIME(timestamp / 1000)) AS stat_date,
+    event_type,
+    COALESCE(page, '') AS page,
+    COUNT(*),
+    COALESCE(SUM(duration), 0),
+    MAX(timestamp)
+FROM user_behavior_logs
+WHERE user_id IS NOT NULL AND timestamp >= %s
+GROUP BY user_id, stat_date, event_type, COALESCE(page, '')
+"""
+
+BACKFILL_SESSIONS_SQL = """
+INSERT IGNORE INTO user_behavior_daily_sessions (user_id, stat_date, session_id)
+SELECT DISTINCT user_id, DATE(FROM_UNIXTIME(timestamp / 1000)), session_id
+FROM user_behavior_logs
+WHERE user_id IS NOT NULL AND session_id IS NOT NULL AND timestamp >= %s
+"""
+
+
+def create_behavior_counters_tables(rebuild=False):
+    """创建行为计数汇总表并回填
+
+    Args:
+        rebuild: 清空汇总表后重新回填
+    """
+
+    # 连接数据库
+    conn = pymysql.connect(
+        host=os.getenv('DB_HOST', 'localhost'),
+        user=os.getenv('DB_USER', 'root'),
+        password=os.getenv('DB_PASSWORD', ''),
+        database=os.getenv('DB_NAME', 'Fin'),
+        port=int(os.getenv('DB_PORT', '3306')),
+        charset='utf8mb4'
+    )
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(COUNTERS_TABLE_SQL)
+            cursor.execute(SESSIONS_TABLE_SQL)
+            print("[OK] 行为计数汇总表创建成功")
+
+            if rebuild:
+                cursor.execute("DELETE FROM user_behavior_daily_counters")
+                cursor.execute("DELETE FROM user_behavior_daily_sessions")
+                print("[OK] 已清空汇总表，准备重新回填")
+
+            cursor.execute("SELECT COUNT(*) FROM user_behavior_daily_counters")
+            if cursor.fetchone()[0] == 0:
+                # 回填全部已有日志（起始时间戳 0）
+                cursor.execute(BACKFILL_COUNTERS_SQL, (0,))
+                print(f"[OK] 回填计数 {cursor.rowcount} 行")
+                cursor.execute(BACKFILL_SESSIONS_SQL, (0,))
+                print(f"[OK] 回填会话 {cursor.rowcount} 行")
+            else:
+                print("[INFO] 汇总表已有数据，跳过回填（需要重建时使用 --rebuild）")
+
+        conn.commit()
+        print("\n[SUCCESS] 行为计数汇总表初始化完成！")
+        print("\n[INFO] 注意：回填期间仍在运行的服务进程，其尚未落库的增量会在之后叠加，")
+        print("  重建建议在停止写入或低峰期执行。")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"[ERROR] 错误: {str(e)}")
+        raise
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='初始化用户行为计数汇总表')
+    parser.add_argument('--rebuild', action='store_true', help='清空汇总表后从行为日志重新回填')
+    args = parser.parse_args()
+
+    print("开始初始化用户行为计数汇总表...")
+    create_behavior_counters_tables(rebuild=args.rebuild)
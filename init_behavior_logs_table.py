@@ -1,12 +1,19 @@
 """
 初始化用户行为日志表
-创建 user_behavior_logs 表，并设置7天自动清理机制
+创建按天 RANGE 分区（分区键为事件时间戳 timestamp）的 user_behavior_logs 表；
+已存在的非分区表会被转换为分区表。
+
+过期数据由 maintain_behavior_partitions.py 整分区删除（替代原先逐行 DELETE 的定时事件），
+该脚本同时预建未来的日分区，建议每天通过 cron 运行一次。
 """
 
 import pymysql
 import os
+from datetime import date, timedelta
 from dotenv import load_dotenv
 
+from services.behavior_partition_service import partition_clause
+
 # 加载环境变量
 load_dotenv()
 
@@ -25,11 +32,20 @@ def create_behavior_logs_table():
     
     try:
         with conn.cursor() as cursor:
-            # 创建用户行为日志表
+            retention_days = int(os.getenv('BEHAVIOR_LOG_RETENTION_DAYS', '7'))
+            days_ahead = int(os.getenv('BEHAVIOR_PARTITION_DAYS_AHEAD', '7'))
+            partitions = partition_clause(
+                date.today() - timedelta(days=retention_days),
+                date.today() + timedelta(days=days_ahead)
+            )
+
+            # 分区表的主键与唯一键必须包含分区列 timestamp：
+            # 主键为 (id, timestamp)，event_id 去重改为 (event_id, timestamp) 唯一键
+            # （同一事件重试上报时时间戳不变，仍能去重）
             create_table_sql = """
             CREATE TABLE IF NOT EXISTS user_behavior_logs (
-                id INT AUTO_INCREMENT PRIMARY KEY COMMENT '自增主键',
-                event_id VARCHAR(64) NOT NULL UNIQUE COMMENT '事件唯一ID',
+                id INT NOT NULL AUTO_INCREMENT COMMENT '自增主键',
+                event_id VARCHAR(64) NOT NULL COMMENT '事件唯一ID',
                 event_type VARCHAR(50) NOT NULL COMMENT '事件类型',
                 
                 -- 用户信息
@@ -58,11 +74,14 @@ def create_behavior_logs_table():
                 context_data JSON COMMENT '设备和环境信息',
                 
                 -- 时间戳
-                timestamp BIGINT NOT NULL COMMENT '事件时间戳(ms)',
+                timestamp BIGINT NOT NULL COMMENT '事件时间戳(ms)，分区键',
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '记录创建时间',
                 
-                -- 索引
-                INDEX idx_user_id (user_id),
+                -- 主键与索引
+                PRIMARY KEY (id, timestamp),
+                UNIQUE KEY uk_event (event_id, timestamp),
+                -- 按用户分页查询（ORDER BY timestamp DESC, id DESC）；兼作 user_id 单列索引
+                INDEX idx_user_timestamp (user_id, timestamp),
                 INDEX idx_session_id (session_id),
                 INDEX idx_event_type (event_type),
                 INDEX idx_page (page),
@@ -70,52 +89,73 @@ def create_behavior_logs_table():
                 INDEX idx_created_at (created_at),
                 INDEX idx_user_event (user_id, event_type),
                 INDEX idx_user_page (user_id, page)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用户行为日志表';
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用户行为日志表'
+            {partitions};
             """
             
-            cursor.execute(create_table_sql)
-            print("[OK] 用户行为日志表创建成功")
+            cursor.execute("""
+                SELECT
+                    (SELECT COUNT(*) FROM information_schema.TABLES
+                     WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'user_behavior_logs') AS table_exists,
+                    (SELECT COUNT(*) FROM information_schema.PARTITIONS
+                     WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'user_behavior_logs'
+                       AND PARTITION_NAME IS NOT NULL) AS partition_count
+            """)
+            table_exists, partition_count = cursor.fetchone()
             
-            # 创建自动清理旧数据的事件（7天）
-            # 首先启用事件调度器
-            cursor.execute("SET GLOBAL event_scheduler = ON;")
-            print("[OK] 启用MySQL事件调度器")
+            if not table_exists:
+                cursor.execute(create_table_sql.format(partitions=partitions))
+                print("[OK] 用户行为日志表（按天分区）创建成功")
+            elif not partition_count:
+                # 旧版非分区表：调整主键/唯一键后转换为分区表（需重建整表，建议低峰期执行）
+                print("[INFO] 检测到非分区的旧表，开始转换为分区表...")
+                cursor.execute("""
+                    ALTER TABLE user_behavior_logs
+                        MODIFY id INT NOT NULL AUTO_INCREMENT COMMENT '自增主键',
+                        DROP PRIMARY KEY,
+                        ADD PRIMARY KEY (id, timestamp),
+                        DROP INDEX event_id,
+                        ADD UNIQUE KEY uk_event (event_id, timestamp)
+                """)
+                cursor.execute(f"ALTER TABLE user_behavior_logs {partitions}")
+                print("[OK] 已转换为按天分区表")
+            else:
+                print(f"[OK] 用户行为日志表已是分区表（{partition_count} 个分区）")
             
-            # 创建定时清理事件
-            create_event_sql = """
-            CREATE EVENT IF NOT EXISTS cleanup_old_behavior_logs
-            ON SCHEDULE EVERY 1 DAY
-            STARTS CURRENT_TIMESTAMP
-            DO
-            DELETE FROM user_behavior_logs 
-            WHERE created_at < DATE_SUB(NOW(), INTERVAL 7 DAY);
-            """
-            
-            cursor.execute(create_event_sql)
-            print("[OK] 自动清理事件创建成功（每天清理7天前的数据）")
+            # 旧表补建 (user_id, timestamp) 索引，替代被其覆盖的 idx_user_id
+            cursor.execute("""
+                SELECT INDEX_NAME FROM information_schema.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'user_behavior_logs'
+                  AND INDEX_NAME IN ('idx_user_id', 'idx_user_timestamp')
+            """)
+            index_names = {row[0] for row in cursor.fetchall()}
+            if 'idx_user_timestamp' not in index_names:
+                alter = "ALTER TABLE user_behavior_logs ADD INDEX idx_user_timestamp (user_id, timestamp)"
+                if 'idx_user_id' in index_names:
+                    alter += ", DROP INDEX idx_user_id"
+                cursor.execute(alter)
+                print("[OK] 已创建索引 idx_user_timestamp (user_id, timestamp)")
             
-            # 创建手动清理存储过程
-            create_procedure_sql = """
-            CREATE PROCEDURE IF NOT EXISTS sp_cleanup_behavior_logs(IN days INT)
-            BEGIN
-                DELETE FROM user_behavior_logs 
-                WHERE created_at < DATE_SUB(NOW(), INTERVAL days DAY);
-                SELECT ROW_COUNT() AS deleted_rows;
-            END;
-            """
+            # 过期数据改为整分区删除，移除逐行 DELETE 的定时清理事件
+            cursor.execute("DROP EVENT IF EXISTS cleanup_old_behavior_logs")
+            print("[OK] 已移除逐行清理事件 cleanup_old_behavior_logs")
             
-            cursor.execute(create_procedure_sql)
-            print("[OK] 手动清理存储过程创建成功")
+            # 逐行 DELETE 的手动清理存储过程同样改由整分区删除代替
+            cursor.execute("DROP PROCEDURE IF EXISTS sp_cleanup_behavior_logs")
+            print("[OK] 已移除逐行清理存储过程 sp_cleanup_behavior_logs")
             
         conn.commit()
         print("\n[SUCCESS] 数据库初始化完成！")
         print("\n[INFO] 表结构说明：")
         print("  - 表名：user_behavior_logs")
-        print("  - 保留期：7天（自动清理）")
+        print("  - 分区：按事件时间戳每天一个分区")
+        print("  - 保留期：7天（maintain_behavior_partitions.py 整分区删除）")
         print("  - 预计容量：10万条/天 x 7天 = 70万条")
         print("  - 索引：已优化查询性能")
-        print("\n[INFO] 手动清理方法：")
-        print("  CALL sp_cleanup_behavior_logs(7);  -- 清理7天前的数据")
+        print("\n[INFO] 分区维护（预建未来分区 + 删除过期分区），建议每天运行：")
+        print("  python maintain_behavior_partitions.py")
+        print("\n[INFO] 手动清理方法（整分区删除）：")
+        print("  python maintain_behavior_partitions.py --retention-days 3  # 只保留最近3天")
         
     except Exception as e:
         conn.rollback()
@@ -0,0 +1,125 @@
+"""
+初始化用户行为汇总（rollup）表
+创建小时级 / 天级汇总表与后台任务检查点表，汇总数据由 compact_behavior_logs.py 增量写入
+
+汇总键：(时间桶, user_id, page, event_type)
+汇总值：事件数、去重会话数、duration / scroll_depth 的合计与最大值
+会话集合：每个汇总键下出现过的 session_id，跨行 / 跨时间段统计去重会话数时按集合合并，不能把会话数相加
+"""
+
+import pymysql
+import os
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+HOURLY_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS user_behavior_rollup_hourly (
+    bucket_start DATETIME NOT NULL COMMENT '小时起点（按事件时间戳）',
+    user_id VARCHAR(50) NOT NULL DEFAULT '' COMMENT '用户ID（匿名为空字符串）',
+    page VARCHAR(50) NOT NULL DEFAULT '' COMMENT '页面（无页面时为空字符串）',
+    event_type VARCHAR(50) NOT NULL COMMENT '事件类型',
+    event_count INT NOT NULL DEFAULT 0 COMMENT '事件数',
+    session_count INT NOT NULL DEFAULT 0 COMMENT '去重会话数',
+    duration_sum BIGINT NOT NULL DEFAULT 0 COMMENT '停留时长合计(ms)',
+    duration_max INT NOT NULL DEFAULT 0 COMMENT '停留时长最大值(ms)',
+    scroll_depth_sum BIGINT NOT NULL DEFAULT 0 COMMENT '滚动深度合计(%)',
+    scroll_depth_max INT NOT NULL DEFAULT 0 COMMENT '滚动深度最大值(%)',
+    PRIMARY KEY (bucket_start, user_id, page, event_type),
+    INDEX idx_user_bucket (user_id, bucket_start)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用户行为小时汇总表';
+"""
+
+DAILY_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS user_behavior_rollup_daily (
+    bucket_start DATE NOT NULL COMMENT '日期（按事件时间戳）',
+    user_id VARCHAR(50) NOT NULL DEFAULT '' COMMENT '用户ID（匿名为空字符串）',
+    page VARCHAR(50) NOT NULL DEFAULT '' COMMENT '页面（无页面时为空字符串）',
+    event_type VARCHAR(50) NOT NULL COMMENT '事件类型',
+    event_count INT NOT NULL DEFAULT 0 COMMENT '事件数',
+    session_count INT NOT NULL DEFAULT 0 COMMENT '去重会话数',
+    duration_sum BIGINT NOT NULL DEFAULT 0 COMMENT '停留时长合计(ms)',
+    duration_max INT NOT NULL DEFAULT 0 COMMENT '停留时长最大值(ms)',
+    scroll_depth_sum BIGINT NOT NULL DEFAULT 0 COMMENT '滚动深度合计(%)',
+    scroll_depth_max INT NOT NULL DEFAULT 0 COMMENT '滚动深度最大值(%)',
+    PRIMARY KEY (bucket_start, user_id, page, event_type),
+    INDEX idx_user_bucket (user_id, bucket_start)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用户行为日汇总表';
+"""
+
+HOURLY_SESSIONS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS user_behavior_rollup_hourly_sessions (
+    bucket_start DATETIME NOT NULL COMMENT '小时起点（按事件时间戳）',
+    user_id VARCHAR(50) NOT NULL DEFAULT '' COMMENT '用户ID（匿名为空字符串）',
+    page VARCHAR(50) NOT NULL DEFAULT '' COMMENT '页面（无页面时为空字符串）',
+    event_type VARCHAR(50) NOT NULL COMMENT '事件类型',
+    session_id VARCHAR(100) NOT NULL COMMENT '会话ID',
+    PRIMARY KEY (bucket_start, user_id, page, event_type, session_id),
+    INDEX idx_user_bucket (user_id, bucket_start)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用户行为小时汇总会话集合表';
+"""
+
+DAILY_SESSIONS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS user_behavior_rollup_daily_sessions (
+    bucket_start DATE NOT NULL COMMENT '日期（按事件时间戳）',
+    user_id VARCHAR(50) NOT NULL DEFAULT '' COMMENT '用户ID（匿名为空字符串）',
+    page VARCHAR(50) NOT NULL DEFAULT '' COMMENT '页面（无页面时为空字符串）',
+    event_type VARCHAR(50) NOT NULL COMMENT '事件类型',
+    session_id VARCHAR(100) NOT NULL COMMENT '会话ID',
+    PRIMARY KEY (bucket_start, user_id, page, event_type, session_id),
+    INDEX idx_user_bucket (user_id, bucket_start)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用户行为日汇总会话集合表';
+"""
+
+CHECKPOINTS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS behavior_job_checkpoints (
+    job_name VARCHAR(50) PRIMARY KEY COMMENT '任务名',
+    last_id BIGINT NOT NULL DEFAULT 0 COMMENT '已处理到的 user_behavior_logs.id',
+    last_timestamp BIGINT NOT NULL DEFAULT 0 COMMENT '已处理到的事件时间戳(ms)',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='行为日志后台任务检查点表';
+"""
+
+
+def create_behavior_rollup_tables():
+    """创建行为汇总表与任务检查点表"""
+
+    # 连接数据库
+    conn = pymysql.connect(
+        host=os.getenv('DB_HOST', 'localhost'),
+        user=os.getenv('DB_USER', 'root'),
+        password=os.getenv('DB_PASSWORD', ''),
+        database=os.getenv('DB_NAME', 'Fin'),
+        port=int(os.getenv('DB_PORT', '3306')),
+        charset='utf8mb4'
+    )
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(HOURLY_TABLE_SQL)
+            print("[OK] 小时汇总表创建成功")
+            cursor.execute(DAILY_TABLE_SQL)
+            print("[OK] 日汇总表创建成功")
+            cursor.execute(HOURLY_SESSIONS_TABLE_SQL)
+            cursor.execute(DAILY_SESSIONS_TABLE_SQL)
+            print("[OK] 汇总会话集合表创建成功")
+            cursor.execute(CHECKPOINTS_TABLE_SQL)
+            print("[OK] 任务检查点表创建成功")
+
+        conn.commit()
+        print("\n[SUCCESS] 行为汇总表初始化完成！")
+        print("\n[INFO] 运行汇总任务：")
+        print("  python compact_behavior_logs.py            # 处理全部新增日志")
+        print("  python compact_behavior_logs.py --loop 60  # 每60秒增量处理一次")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"[ERROR] 错误: {str(e)}")
+        raise
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    print("开始初始化用户行为汇总表...")
+    create_behavior_rollup_tables()
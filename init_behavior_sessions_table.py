@@ -0,0 +1,89 @@
+"""
+初始化用户会话表
+创建会话汇总表与页面访问（停留时长）表，数据由 build_behavior_sessions.py 从行为日志增量重建
+
+会话：按 session_id 聚合，包含起止时间、时长、页面数、入口 / 出口页面、是否跳出
+页面访问：会话内按时间顺序的每次页面访问及停留时长
+"""
+
+import pymysql
+import os
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+SESSIONS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS user_behavior_sessions (
+    session_id VARCHAR(100) NOT NULL COMMENT '会话ID',
+    user_id VARCHAR(50) NOT NULL DEFAULT '' COMMENT '用户ID（匿名为空字符串）',
+    started_at BIGINT NOT NULL COMMENT '首个事件时间戳(ms)',
+    ended_at BIGINT NOT NULL COMMENT '最后一个事件时间戳(ms)',
+    duration_ms BIGINT NOT NULL DEFAULT 0 COMMENT '会话时长(ms)',
+    event_count INT NOT NULL DEFAULT 0 COMMENT '事件数',
+    interaction_count INT NOT NULL DEFAULT 0 COMMENT '交互事件数（页面访问/离开/心跳等被动事件除外）',
+    page_view_count INT NOT NULL DEFAULT 0 COMMENT '页面访问次数',
+    unique_page_count INT NOT NULL DEFAULT 0 COMMENT '访问的不同页面数',
+    total_dwell_ms BIGINT NOT NULL DEFAULT 0 COMMENT '页面停留时长合计(ms)',
+    entry_page VARCHAR(50) NOT NULL DEFAULT '' COMMENT '入口页面',
+    exit_page VARCHAR(50) NOT NULL DEFAULT '' COMMENT '出口页面',
+    is_bounce TINYINT NOT NULL DEFAULT 0 COMMENT '是否跳出（只访问一个页面且无交互）',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+    PRIMARY KEY (session_id),
+    INDEX idx_user_started (user_id, started_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用户会话表';
+"""
+
+PAGE_VISITS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS user_behavior_page_visits (
+    session_id VARCHAR(100) NOT NULL COMMENT '会话ID',
+    seq INT NOT NULL COMMENT '会话内访问序号（从 1 开始）',
+    user_id VARCHAR(50) NOT NULL DEFAULT '' COMMENT '用户ID（匿名为空字符串）',
+    page VARCHAR(50) NOT NULL DEFAULT '' COMMENT '页面',
+    entered_at BIGINT NOT NULL COMMENT '进入时间戳(ms)',
+    left_at BIGINT NOT NULL COMMENT '离开时间戳(ms)',
+    dwell_ms BIGINT NOT NULL DEFAULT 0 COMMENT '停留时长(ms)',
+    event_count INT NOT NULL DEFAULT 0 COMMENT '本次访问内的事件数',
+    end_reason VARCHAR(20) NOT NULL DEFAULT '' COMMENT '结束方式：leave 页面离开 / navigate 跳转 / last_seen 会话结束',
+    PRIMARY KEY (session_id, seq),
+    INDEX idx_user_page (user_id, page)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='用户页面访问停留表';
+"""
+
+
+def create_behavior_sessions_tables():
+    """创建会话表与页面访问表"""
+
+    # 连接数据库
+    conn = pymysql.connect(
+        host=os.getenv('DB_HOST', 'localhost'),
+        user=os.getenv('DB_USER', 'root'),
+        password=os.getenv('DB_PASSWORD', ''),
+        database=os.getenv('DB_NAME', 'Fin'),
+        port=int(os.getenv('DB_PORT', '3306')),
+        charset='utf8mb4'
+    )
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(SESSIONS_TABLE_SQL)
+            print("[OK] 会话表创建成功")
+            cursor.execute(PAGE_VISITS_TABLE_SQL)
+            print("[OK] 页面访问表创建成功")
+
+        conn.commit()
+        print("\n[SUCCESS] 会话表初始化完成！")
+        print("\n[INFO] 运行会话重建任务（需先运行 init_behavior_rollup_tables.py 创建任务检查点表）：")
+        print("  python build_behavior_sessions.py            # 处理全部新增日志")
+        print("  python build_behavior_sessions.py --loop 60  # 每60秒增量处理一次")
+
+    except Exception as e:
+        conn.rollback()
+        print(f"[ERROR] 错误: {str(e)}")
+        raise
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    print("开始初始化用户会话表...")
+    create_behavior_sessions_tables()
@@ -0,0 +1,60 @@
+"""
+用户行为日志分区维护
+预建未来的日分区，并整分区删除过期日志（替代逐行 DELETE），建议每天通过 cron 运行一次
+
+用法:
+    python maintain_behavior_partitions.py                 # 预建 + 清理
+    python maintain_behavior_partitions.py --dry-run       # 只打印将要执行的操作
+    python maintain_behavior_partitions.py --list          # 列出分区
+    python maintain_behavior_partitions.py --retention-days 14 --days-ahead 10
+
+cron 示例（每天 00:30）:
+    30 0 * * * cd /path/to/Fin-ai && python maintain_behavior_partitions.py
+"""
+
+import argparse
+import sys
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+from services.behavior_partition_service import get_partition_manager
+
+
+def main():
+    parser = argparse.ArgumentParser(description='用户行为日志分区维护')
+    parser.add_argument('--retention-days', type=int, help='保留天数（默认读取 BEHAVIOR_LOG_RETENTION_DAYS）')
+    parser.add_argument('--days-ahead', type=int, help='预建未来分区天数（默认读取 BEHAVIOR_PARTITION_DAYS_AHEAD）')
+    parser.add_argument('--dry-run', action='store_true', help='只打印将要执行的操作')
+    parser.add_argument('--list', action='store_true', help='列出分区后退出')
+    args = parser.parse_args()
+
+    manager = get_partition_manager()
+    if args.retention_days:
+        manager.retention_days = args.retention_days
+    if args.days_ahead:
+        manager.days_ahead = args.days_ahead
+
+    if not manager.is_partitioned():
+        print("[ERROR] user_behavior_logs 不是分区表（或当前不是 MySQL 后端），请先运行 init_behavior_logs_table.py")
+        sys.exit(1)
+
+    if args.list:
+        print(f"{'partition':<12} {'rows':>10}  less than")
+        for partition in manager.list_partitions():
+            bound = partition['bound']
+            label = 'MAXVALUE' if bound is None else datetime.fromtimestamp(bound / 1000).strftime('%Y-%m-%d %H:%M')
+            print(f"{partition['name']:<12} {partition['rows']:>10}  {label}")
+        return
+
+    result = manager.run(dry_run=args.dry_run)
+    prefix = '[DRY-RUN] ' if args.dry_run else '[OK] '
+    print(f"{prefix}预建分区: {', '.join(result['created']) or '无'}")
+    print(f"{prefix}删除分区: {', '.join(result['dropped']) or '无'}")
+
+
+if __name__ == '__main__':
+    main()
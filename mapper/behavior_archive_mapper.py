@@ -0,0 +1,84 @@
+"""
+用户行为冷归档 Mapper
+按事件时间范围读取 / 删除原始日志，供归档任务把旧日志搬到本地列式文件
+"""
+
+from contextlib import closing
+from typing import Any, Dict, Iterator, Optional
+
+from mapper.behavior_mapper import BehaviorMapper
+from utils.db import db_query, db_execute, db_stream
+
+# 与 BehaviorMapper.get_user_behaviors 返回的字段一致
+ARCHIVE_COLUMNS = BehaviorMapper.QUERY_FIELDS
+
+
+class BehaviorArchiveMapper:
+    """用户行为冷归档数据访问对象"""
+
+    @staticmethod
+    def get_oldest_log_timestamp() -> Optional[int]:
+        """最早一条原始日志的事件时间戳，表为空时返回 None"""
+        row = db_query("SELECT MIN(timestamp) AS oldest FROM user_behavior_logs", fetch_one=True)
+        if not row or row['oldest'] is None:
+            return None
+        return int(row['oldest'])
+
+    @staticmethod
+    def iter_logs_between(start_time: int, end_time: int, batch_size: int = 2000) -> Iterator[Dict[str, Any]]:
+        """
+        流式读取 [start_time, end_time) 内的全部原始日志（JSON 字段保持原始字符串）
+
+        Args:
+            start_time: 开始时间戳（含）
+            end_time: 结束时间戳（不含）
+            batch_size: 每批从数据库读取的行数
+
+        Yields:
+            日志行
+        """
+        query = f"""
+            SELECT {', '.join(ARCHIVE_COLUMNS)}
+            FROM user_behavior_logs
+            WHERE timestamp >= %s AND timestamp < %s
+        """
+        with closing(db_stream(query, (start_time, end_time), batch_size=batch_size)) as rows:
+            yield from rows
+
+    @staticmethod
+    def get_range_summary(start_time: int, end_time: int) -> Dict[str, int]:
+        """
+        [start_time, end_time) 内的日志条数与最大ID，删除前用于核对归档是否完整
+
+        Returns:
+            {'rows': ..., 'max_id': ...}
+        """
+        row = db_query("""
+            SELECT COUNT(*) AS total, MAX(id) AS max_id
+            FROM user_behavior_logs
+            WHERE timestamp >= %s AND timestamp < %s
+        """, (start_time, end_time), fetch_one=True)
+        return {'rows': int(row['total'] or 0), 'max_id': int(row['max_id'] or 0)}
+
+    @staticmethod
+    def delete_archived_logs(start_time: int, end_time: int, max_id: int, limit: int = 5000) -> int:
+        """
+        删除 [start_time, end_time) 内已归档（id 不超过 max_id）的日志，每次最多 limit 条
+
+        Returns:
+            删除行数
+        """
+        boundary = db_query("""
+            SELECT MAX(id) AS boundary FROM (
+                SELECT id FROM user_behavior_logs
+                WHERE timestamp >= %s AND timestamp < %s AND id <= %s
+                ORDER BY id
+                LIMIT %s
+            ) t
+        """, (start_time, end_time, max_id, limit), fetch_one=True)
+        if not boundary or boundary['boundary'] is None:
+            return 0
+        return db_execute("""
+            DELETE FROM user_behavior_logs
+            WHERE timestamp >= %s AND timestamp < %s AND id <= %s
+        """, (start_time, end_time, boundary['boundary']))
@@ -4,18 +4,173 @@
 """
 
 import json
-from typing import List, Dict, Any, Optional
-from utils.db import get_db_connection, close_db_connection
+import time
+from contextlib import closing
+from typing import Callable, List, Dict, Any, Iterator, Optional, Tuple
+from utils import db_async
+from utils.db import get_db_connection, close_db_connection, db_execute_many, db_query, db_stream, unit_of_work
 
 
 class BehaviorMapper:
     """用户行为日志数据访问对象"""
     
+    # 除核心字段外的所有字段放入business_data
+    CORE_FIELDS = {
+        'event_id', 'event_type', 'user_id', 'session_id',
+        'page', 'page_url', 'referrer',
+        'element_type', 'element_id', 'element_text', 'element_class',
+        'duration', 'scroll_depth', 'timestamp', 'context'
+    }
+
+    INSERT_SQL = """
+    INSERT INTO user_behavior_logs (
+        event_id, event_type, user_id, session_id,
+        page, page_url, referrer,
+        element_type, element_id, element_text, element_class,
+        business_data, duration, scroll_depth,
+        context_data, timestamp
+    ) VALUES (
+        %s, %s, %s, %s,
+        %s, %s, %s,
+        %s, %s, %s, %s,
+        %s, %s, %s,
+        %s, %s
+    ) ON DUPLICATE KEY UPDATE
+        event_id = event_id
+    """
+
+    # 查询可返回的字段（与 get_user_behaviors 一致）
+    QUERY_FIELDS = (
+        'id', 'event_id', 'event_type', 'user_id', 'session_id',
+        'page', 'page_url', 'referrer',
+        'element_type', 'element_id', 'element_text', 'element_class',
+        'business_data', 'duration', 'scroll_depth',
+        'context_data', 'timestamp', 'created_at',
+    )
+
+    # 查询已存在 event_id 时每条 IN 语句的最多 ID 数
+    EXISTING_LOOKUP_CHUNK = 500
+
+    # 写入成功后的回调（如增量计数），参数为本次实际新写入的事件列表（不含唯一键忽略的重复事件）
+    _ingest_listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+
+    @classmethod
+    def add_ingest_listener(cls, listener: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """注册行为日志写入成功后的回调"""
+        if listener not in cls._ingest_listeners:
+            cls._ingest_listeners.append(listener)
+
+    @classmethod
+    def remove_ingest_listener(cls, listener: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """移除写入回调"""
+        if listener in cls._ingest_listeners:
+            cls._ingest_listeners.remove(listener)
+
+    @staticmethod
+    def _notify_ingested(events: List[Dict[str, Any]]) -> None:
+        """通知写入回调；回调异常只记录日志，不影响写入结果"""
+        for listener in list(BehaviorMapper._ingest_listeners):
+            try:
+                listener(events)
+            except Exception as e:
+                print(f"[BehaviorMapper] 写入回调执行失败: {str(e)}")
+
+    @staticmethod
+    def _build_log_row(event: Dict[str, Any]) -> tuple:
+        """将上报事件转换为 INSERT_SQL 的参数行"""
+        # 提取业务数据和上下文数据
+        context_data = event.get('context', {})
+        business_data = {
+            key: value for key, value in event.items()
+            if key not in BehaviorMapper.CORE_FIELDS and value is not None
+        }
+
+        return (
+            event.get('event_id'),
+            event.get('event_type'),
+            event.get('user_id'),
+            event.get('session_id'),
+            event.get('page'),
+            event.get('page_url'),
+            event.get('referrer'),
+            event.get('element_type'),
+            event.get('element_id'),
+            event.get('element_text'),
+            event.get('element_class'),
+            json.dumps(business_data, ensure_ascii=False) if business_data else None,
+            event.get('duration'),
+            event.get('scroll_depth'),
+            json.dumps(context_data, ensure_ascii=False) if context_data else None,
+            event.get('timestamp')
+        )
+
+    @staticmethod
+    def _timestamp_key(value: Any) -> Any:
+        """时间戳统一为整数毫秒，便于与数据库中的 BIGINT 比较"""
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return value
+
+    @staticmethod
+    def _existing_key_queries(events: List[Dict[str, Any]]) -> Iterator[Tuple[str, List[Any]]]:
+        """
+        生成查询已存在事件唯一键 (event_id, timestamp) 的语句
+
+        每条语句最多 EXISTING_LOOKUP_CHUNK 个 event_id，并带上该批时间戳的范围，
+        按天分区的表只探查范围内分区的 uk_event 索引
+
+        Yields:
+            (sql, params)
+        """
+        keys = {}
+        for event in events:
+            timestamp = BehaviorMapper._timestamp_key(event.get('timestamp'))
+            if event.get('event_id') and isinstance(timestamp, int):
+                keys.setdefault(event['event_id'], []).append(timestamp)
+        event_ids = list(keys)
+        chunk_size = BehaviorMapper.EXISTING_LOOKUP_CHUNK
+        for start in range(0, len(event_ids), chunk_size):
+            chunk = event_ids[start:start + chunk_size]
+            timestamps = [timestamp for event_id in chunk for timestamp in keys[event_id]]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            sql = f"""
+            SELECT event_id, timestamp FROM user_behavior_logs
+            WHERE timestamp BETWEEN %s AND %s AND event_id IN ({placeholders})
+            """
+            yield sql, [min(timestamps), max(timestamps)] + chunk
+
+    @staticmethod
+    def _drop_existing(events: List[Dict[str, Any]], existing_rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        去掉表中已存在以及批内重复的事件（与唯一键 uk_event (event_id, timestamp) 的判定一致）
+
+        Args:
+            events: 待写入事件
+            existing_rows: _existing_key_queries 查到的记录
+
+        Returns:
+            需要写入的新事件，保持原顺序
+        """
+        seen = {(row['event_id'], BehaviorMapper._timestamp_key(row['timestamp'])) for row in existing_rows}
+        new_events = []
+        for event in events:
+            if event.get('event_id'):
+                key = (event['event_id'], BehaviorMapper._timestamp_key(event.get('timestamp')))
+                if key in seen:
+                    continue
+                seen.add(key)
+            new_events.append(event)
+        return new_events
+
     @staticmethod
     def batch_insert_logs(events: List[Dict[str, Any]]) -> int:
         """
         批量插入行为日志
-        
+        在同一事务内先查出已存在的 (event_id, timestamp)，只写入新事件，提交后仅用新事件通知写入回调，
+        重复提交的事件不会让增量计数、跳转图等回调重复累加。
+        并发写入同一事件时仍由唯一索引忽略重复行（此时回调可能多计，影响行数少于新事件数时打印日志）
+
         Args:
             events: 事件列表
             
@@ -25,82 +180,90 @@ class BehaviorMapper:
         if not events:
             return 0
         
-        conn = None
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            # 批量插入SQL
-            insert_sql = """
-            INSERT INTO user_behavior_logs (
-                event_id, event_type, user_id, session_id,
-                page, page_url, referrer,
-                element_type, element_id, element_text, element_class,
-                business_data, duration, scroll_depth,
-                context_data, timestamp
-            ) VALUES (
-                %s, %s, %s, %s,
-                %s, %s, %s,
-                %s, %s, %s, %s,
-                %s, %s, %s,
-                %s, %s
-            ) ON DUPLICATE KEY UPDATE 
-                event_id = event_id  -- 避免重复插入
-            """
-            
-            # 准备批量数据
-            values_list = []
-            for event in events:
-                # 提取业务数据和上下文数据
-                business_data = {}
-                context_data = event.get('context', {})
-                
-                # 将除核心字段外的所有字段放入business_data
-                core_fields = {
-                    'event_id', 'event_type', 'user_id', 'session_id',
-                    'page', 'page_url', 'referrer',
-                    'element_type', 'element_id', 'element_text', 'element_class',
-                    'duration', 'scroll_depth', 'timestamp', 'context'
-                }
-                
-                for key, value in event.items():
-                    if key not in core_fields and value is not None:
-                        business_data[key] = value
-                
-                values = (
-                    event.get('event_id'),
-                    event.get('event_type'),
-                    event.get('user_id'),
-                    event.get('session_id'),
-                    event.get('page'),
-                    event.get('page_url'),
-                    event.get('referrer'),
-                    event.get('element_type'),
-                    event.get('element_id'),
-                    event.get('element_text'),
-                    event.get('element_class'),
-                    json.dumps(business_data, ensure_ascii=False) if business_data else None,
-                    event.get('duration'),
-                    event.get('scroll_depth'),
-                    json.dumps(context_data, ensure_ascii=False) if context_data else None,
-                    event.get('timestamp')
-                )
-                values_list.append(values)
-            
-            # 批量执行
-            affected_rows = cursor.executemany(insert_sql, values_list)
-            conn.commit()
-            
-            return affected_rows
-            
+            with unit_of_work():
+                existing_rows = []
+                for sql, params in BehaviorMapper._existing_key_queries(events):
+                    existing_rows.extend(db_query(sql, params))
+                new_events = BehaviorMapper._drop_existing(events, existing_rows)
+                affected = db_execute_many(
+                    BehaviorMapper.INSERT_SQL,
+                    (BehaviorMapper._build_log_row(event) for event in new_events)
+                ) if new_events else 0
         except Exception as e:
-            if conn:
-                conn.rollback()
             raise Exception(f"批量插入行为日志失败: {str(e)}")
-        finally:
-            if cursor:
-                cursor.close()
-            close_db_connection(conn)
+        BehaviorMapper._after_insert(new_events, affected)
+        return affected
+    
+    @staticmethod
+    async def batch_insert_logs_async(events: List[Dict[str, Any]]) -> int:
+        """batch_insert_logs 的协程版本，参数与返回值相同（查询已存在事件与写入不在同一事务内）"""
+        if not events:
+            return 0
+        
+        try:
+            existing_rows = []
+            for sql, params in BehaviorMapper._existing_key_queries(events):
+                existing_rows.extend(await db_async.db_query(sql, params))
+            new_events = BehaviorMapper._drop_existing(events, existing_rows)
+            affected = await db_async.db_execute_many(
+                BehaviorMapper.INSERT_SQL,
+                [BehaviorMapper._build_log_row(event) for event in new_events]
+            ) if new_events else 0
+        except Exception as e:
+            raise Exception(f"批量插入行为日志失败: {str(e)}")
+        BehaviorMapper._after_insert(new_events, affected)
+        return affected
+
+    @staticmethod
+    def _after_insert(new_events: List[Dict[str, Any]], affected: int) -> None:
+        """写入后通知回调；影响行数少于新事件数说明有并发写入的重复事件被唯一索引忽略"""
+        if not new_events:
+            return
+        if affected is not None and affected < len(new_events):
+            print(f"[BehaviorMapper] {len(new_events) - affected} 条事件已被并发写入，写入回调可能重复计数")
+        BehaviorMapper._notify_ingested(new_events)
+    
+    @staticmethod
+    def _build_filters(
+        user_id: str,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        event_type: Optional[str] = None,
+        page: Optional[str] = None
+    ) -> Tuple[str, List[Any]]:
+        """构建行为日志查询的 WHERE 子句与参数"""
+        conditions = ["user_id = %s"]
+        params = [user_id]
+        
+        if start_time:
+            conditions.append("timestamp >= %s")
+            params.append(start_time)
+        
+        if end_time:
+            conditions.append("timestamp <= %s")
+            params.append(end_time)
+        
+        if event_type:
+            conditions.append("event_type = %s")
+            params.append(event_type)
+        
+        if page:
+            conditions.append("page = %s")
+            params.append(page)
+        
+        return " AND ".join(conditions), params
+    
+    @staticmethod
+    def _decode_json_fields(row: Dict[str, Any]) -> Dict[str, Any]:
+        """解析 business_data / context_data 中的JSON字符串"""
+        for field in ('business_data', 'context_data'):
+            if row.get(field):
+                try:
+                    row[field] = json.loads(row[field])
+                except:
+                    pass
+        return row
     
     @staticmethod
     def get_user_behaviors(
@@ -127,30 +290,13 @@ class BehaviorMapper:
         """
         conn = None
         try:
-            conn = get_db_connection()
+            conn = get_db_connection(readonly=True)
             cursor = conn.cursor()
             
             # 构建查询条件
-            conditions = ["user_id = %s"]
-            params = [user_id]
-            
-            if start_time:
-                conditions.append("timestamp >= %s")
-                params.append(start_time)
-            
-            if end_time:
-                conditions.append("timestamp <= %s")
-                params.append(end_time)
-            
-            if event_type:
-                conditions.append("event_type = %s")
-                params.append(event_type)
-            
-            if page:
-                conditions.append("page = %s")
-                params.append(page)
-            
-            where_clause = " AND ".join(conditions)
+            where_clause, params = BehaviorMapper._build_filters(
+                user_id, start_time, end_time, event_type, page
+            )
             params.append(limit)
             
             query_sql = f"""
@@ -171,17 +317,7 @@ class BehaviorMapper:
             
             # 解析JSON字段
             for row in results:
-                if row.get('business_data'):
-                    try:
-                        row['business_data'] = json.loads(row['business_data'])
-                    except:
-                        pass
-                
-                if row.get('context_data'):
-                    try:
-                        row['context_data'] = json.loads(row['context_data'])
-                    except:
-                        pass
+                BehaviorMapper._decode_json_fields(row)
             
             return results
             
@@ -192,6 +328,107 @@ class BehaviorMapper:
                 cursor.close()
             close_db_connection(conn)
     
+    @staticmethod
+    def get_user_behaviors_page(
+        user_id: str,
+        after: Optional[Tuple[int, int]] = None,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        event_type: Optional[str] = None,
+        page: Optional[str] = None,
+        limit: int = 100,
+        fields: Optional[List[str]] = None,
+        decode_json: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        按 (timestamp, id) 倒序分页查询用户行为日志（keyset 分页）
+        从上一页最后一条之后继续读取，走 (user_id, timestamp) 索引，任意页的开销与第一页相同
+        
+        Args:
+            user_id: 用户ID
+            after: 上一页最后一条的 (timestamp, id)，第一页为 None
+            start_time: 开始时间戳
+            end_time: 结束时间戳
+            event_type: 事件类型
+            page: 页面
+            limit: 每页条数
+            fields: 返回的字段（须在 QUERY_FIELDS 中），默认全部；id 与 timestamp 总会返回
+            decode_json: 是否解析 business_data / context_data
+            
+        Returns:
+            行为日志列表
+        """
+        columns = list(fields or BehaviorMapper.QUERY_FIELDS)
+        unknown = [name for name in columns if name not in BehaviorMapper.QUERY_FIELDS]
+        if unknown:
+            raise ValueError(f"未知字段: {', '.join(unknown)}")
+        for name in ('timestamp', 'id'):
+            if name not in columns:
+                columns.insert(0, name)
+        
+        where_clause, params = BehaviorMapper._build_filters(
+            user_id, start_time, end_time, event_type, page
+        )
+        if after is not None:
+            where_clause += " AND (timestamp < %s OR (timestamp = %s AND id < %s))"
+            params.extend([after[0], after[0], after[1]])
+        params.append(limit)
+        
+        query_sql = f"""
+        SELECT {', '.join(columns)}
+        FROM user_behavior_logs
+        WHERE {where_clause}
+        ORDER BY timestamp DESC, id DESC
+        LIMIT %s
+        """
+        results = db_query(query_sql, params)
+        if decode_json:
+            for row in results:
+                BehaviorMapper._decode_json_fields(row)
+        return results
+    
+    @staticmethod
+    def iter_user_behaviors(
+        user_id: str,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        event_type: Optional[str] = None,
+        page: Optional[str] = None,
+        batch_size: int = 500
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        流式遍历用户行为日志（按时间正序），用于导出和离线分析
+        内存占用与日志总量无关；中途停止时请关闭返回的生成器
+        
+        Args:
+            user_id: 用户ID
+            start_time: 开始时间戳
+            end_time: 结束时间戳
+            event_type: 事件类型
+            page: 页面
+            batch_size: 每批从数据库读取的行数
+            
+        Yields:
+            行为日志（JSON字段已解析）
+        """
+        where_clause, params = BehaviorMapper._build_filters(
+            user_id, start_time, end_time, event_type, page
+        )
+        query_sql = f"""
+        SELECT 
+            id, event_id, event_type, user_id, session_id,
+            page, page_url, referrer,
+            element_type, element_id, element_text, element_class,
+            business_data, duration, scroll_depth,
+            context_data, timestamp, created_at
+        FROM user_behavior_logs
+        WHERE {where_clause}
+        ORDER BY timestamp ASC
+        """
+        with closing(db_stream(query_sql, params, batch_size=batch_size)) as rows:
+            for row in rows:
+                yield BehaviorMapper._decode_json_fields(row)
+    
     @staticmethod
     def get_user_behavior_stats(user_id: str, days: int = 7) -> Dict[str, Any]:
         """
@@ -206,7 +443,7 @@ class BehaviorMapper:
         """
         conn = None
         try:
-            conn = get_db_connection()
+            conn = get_db_connection(readonly=True)
             cursor = conn.cursor()
             
             stats_sql = """
@@ -220,12 +457,14 @@ class BehaviorMapper:
                 COUNT(*) as event_count
             FROM user_behavior_logs
             WHERE user_id = %s 
-                AND created_at >= DATE_SUB(NOW(), INTERVAL %s DAY)
+                AND timestamp >= %s
             GROUP BY event_type, page
             ORDER BY event_count DESC
             """
             
-            cursor.execute(stats_sql, (user_id, days))
+            # 按分区键 timestamp 过滤，只扫描最近 days 天的分区
+            start_time = int(time.time() * 1000) - days * 24 * 60 * 60 * 1000
+            cursor.execute(stats_sql, (user_id, start_time))
             results = cursor.fetchall()
             
             # 统计按事件类型和页面分组
@@ -279,7 +518,7 @@ class BehaviorMapper:
         """
         conn = None
         try:
-            conn = get_db_connection()
+            conn = get_db_connection(readonly=True)
             cursor = conn.cursor()
             
             query_sql = """
@@ -303,6 +542,30 @@ class BehaviorMapper:
                 cursor.close()
             close_db_connection(conn)
 
+    @staticmethod
+    def iter_page_views(start_time: int, batch_size: int = 2000) -> Iterator[Dict[str, Any]]:
+        """
+        流式读取 start_time 之后全部登录用户的页面访问，按 (user_id, timestamp, id) 排序
+        用于预热页面跳转图；中途停止时请关闭返回的生成器
+
+        Args:
+            start_time: 开始时间戳（毫秒）
+            batch_size: 每批从数据库读取的行数
+
+        Yields:
+            {'user_id', 'session_id', 'event_type', 'page', 'timestamp'}
+        """
+        query_sql = """
+        SELECT user_id, session_id, event_type, page, timestamp
+        FROM user_behavior_logs
+        WHERE event_type = 'page_view'
+            AND timestamp >= %s
+            AND user_id IS NOT NULL AND user_id <> ''
+        ORDER BY user_id, timestamp, id
+        """
+        with closing(db_stream(query_sql, [start_time], batch_size=batch_size)) as rows:
+            yield from rows
+
 
 # 创建单例
 behavior_mapper = BehaviorMapper()
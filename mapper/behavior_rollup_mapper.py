@@ -0,0 +1,355 @@
+"""
+用户行为汇总（rollup）Mapper
+负责小时 / 天汇总表、任务检查点与按时间范围的原始日志聚合
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.db import db_query, db_execute, db_stream
+
+# 汇总粒度 -> 表名（只允许这两张表拼接进 SQL）
+ROLLUP_TABLES = {
+    'hourly': 'user_behavior_rollup_hourly',
+    'daily': 'user_behavior_rollup_daily',
+}
+# 汇总粒度 -> 会话集合表名
+SESSION_TABLES = {
+    'hourly': 'user_behavior_rollup_hourly_sessions',
+    'daily': 'user_behavior_rollup_daily_sessions',
+}
+
+_ROLLUP_COLUMNS = """
+    bucket_start, user_id, page, event_type,
+    event_count, session_count,
+    duration_sum, duration_max,
+    scroll_depth_sum, scroll_depth_max
+"""
+
+# 从原始日志聚合出一个时间桶的汇总行
+_ROLLUP_SELECT = """
+    SELECT
+        %s, COALESCE(user_id, ''), COALESCE(page, ''), event_type,
+        COUNT(*), COUNT(DISTINCT session_id),
+        COALESCE(SUM(duration), 0), COALESCE(MAX(duration), 0),
+        COALESCE(SUM(scroll_depth), 0), COALESCE(MAX(scroll_depth), 0)
+    FROM user_behavior_logs
+    WHERE timestamp >= %s AND timestamp < %s AND id > %s AND id <= %s
+    GROUP BY COALESCE(user_id, ''), COALESCE(page, ''), event_type
+"""
+
+
+_SESSION_COLUMNS = "bucket_start, user_id, page, event_type, session_id"
+
+# 从原始日志取出一个时间桶内每个汇总键下的会话集合
+_SESSIONS_SELECT = """
+    SELECT DISTINCT %s, COALESCE(user_id, ''), COALESCE(page, ''), event_type, session_id
+    FROM user_behavior_logs
+    WHERE timestamp >= %s AND timestamp < %s AND id > %s AND id <= %s AND session_id IS NOT NULL
+"""
+
+
+class BehaviorRollupMapper:
+    """用户行为汇总数据访问对象"""
+
+    @staticmethod
+    def get_checkpoint(job_name: str) -> Dict[str, int]:
+        """
+        获取任务检查点
+
+        Args:
+            job_name: 任务名
+
+        Returns:
+            {'last_id': ..., 'last_timestamp': ...}，不存在时均为 0
+        """
+        query = """
+            SELECT last_id, last_timestamp
+            FROM behavior_job_checkpoints
+            WHERE job_name = %s
+        """
+        row = db_query(query, (job_name,), fetch_one=True)
+        if not row:
+            return {'last_id': 0, 'last_timestamp': 0}
+        return {'last_id': int(row['last_id']), 'last_timestamp': int(row['last_timestamp'])}
+
+    @staticmethod
+    def save_checkpoint(job_name: str, last_id: int, last_timestamp: int) -> int:
+        """
+        保存任务检查点（与汇总写入放在同一事务中）
+
+        Args:
+            job_name: 任务名
+            last_id: 已处理到的日志ID
+            last_timestamp: 已处理到的事件时间戳
+
+        Returns:
+            影响行数
+        """
+        query = """
+            INSERT INTO behavior_job_checkpoints (job_name, last_id, last_timestamp)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                last_id = VALUES(last_id),
+                last_timestamp = VALUES(last_timestamp)
+        """
+        return db_execute(query, (job_name, last_id, last_timestamp))
+
+    @staticmethod
+    def get_log_batch(
+        after_id: int,
+        limit: int,
+        upto_id: Optional[int] = None,
+        settle_seconds: int = 0,
+        with_session: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        按 id 顺序获取待处理日志的 id 与时间戳（with_session 时附带 session_id）
+
+        settle_seconds > 0 时，遇到写入不足该秒数的日志即截断：
+        并发写入的事务可能晚于更大的 id 提交，留出时间避免检查点越过尚未可见的行。
+
+        Args:
+            after_id: 从该 id 之后开始
+            limit: 最多条数
+            upto_id: 不超过该 id（可选）
+            settle_seconds: 写入后至少经过的秒数
+            with_session: 是否返回 session_id
+
+        Returns:
+            [{'id', 'timestamp'}, ...]
+        """
+        conditions = ["id > %s"]
+        params: List[Any] = [after_id]
+        if upto_id is not None:
+            conditions.append("id <= %s")
+            params.append(upto_id)
+
+        query = f"""
+            SELECT id, timestamp,{' session_id,' if with_session else ''}
+                CASE WHEN created_at <= DATE_SUB(NOW(), INTERVAL %s SECOND) THEN 1 ELSE 0 END AS settled
+            FROM user_behavior_logs
+            WHERE {' AND '.join(conditions)}
+            ORDER BY id
+            LIMIT %s
+        """
+        rows = db_query(query, [settle_seconds] + params + [limit])
+        if settle_seconds > 0:
+            for index, row in enumerate(rows):
+                if not row['settled']:
+                    return rows[:index]
+        return rows
+
+    @staticmethod
+    def iter_log_timestamps(after_id: int, upto_id: int):
+        """
+        流式遍历 id 区间 (after_id, upto_id] 内日志的时间戳
+
+        Yields:
+            事件时间戳（毫秒）
+        """
+        query = """
+            SELECT timestamp
+            FROM user_behavior_logs
+            WHERE id > %s AND id <= %s
+        """
+        for row in db_stream(query, (after_id, upto_id), batch_size=5000):
+            yield row['timestamp']
+
+    @staticmethod
+    def rebuild_bucket(resolution: str, bucket_start: Any, start_ms: int, end_ms: int, max_id: int) -> int:
+        """
+        用原始日志重算一个时间桶（先删后插，可重复执行）
+
+        Args:
+            resolution: hourly | daily
+            bucket_start: 桶起点（小时为 datetime，天为 date）
+            start_ms: 桶起点时间戳（毫秒，含）
+            end_ms: 桶终点时间戳（毫秒，不含）
+            max_id: 只统计 id 不超过该值的日志
+
+        Returns:
+            写入的汇总行数
+        """
+        table = ROLLUP_TABLES[resolution]
+        sessions_table = SESSION_TABLES[resolution]
+        params = (bucket_start, start_ms, end_ms, 0, max_id)
+        db_execute(f"DELETE FROM {table} WHERE bucket_start = %s", (bucket_start,))
+        db_execute(f"DELETE FROM {sessions_table} WHERE bucket_start = %s", (bucket_start,))
+        db_execute(f"INSERT INTO {sessions_table} ({_SESSION_COLUMNS}) {_SESSIONS_SELECT}", params)
+        query = f"INSERT INTO {table} ({_ROLLUP_COLUMNS}) {_ROLLUP_SELECT}"
+        return db_execute(query, params)
+
+    @staticmethod
+    def add_bucket_delta(
+        resolution: str,
+        bucket_start: Any,
+        start_ms: int,
+        end_ms: int,
+        after_id: int,
+        max_id: int
+    ) -> int:
+        """
+        把 id 区间 (after_id, max_id] 内新增日志叠加到时间桶
+        用于原始日志已部分清理、无法整桶重算的历史桶；
+        新增日志的会话并入会话集合（已有的会话不重复计），会话数按集合重新计算
+
+        Returns:
+            影响行数
+        """
+        table = ROLLUP_TABLES[resolution]
+        sessions_table = SESSION_TABLES[resolution]
+        params = (bucket_start, start_ms, end_ms, after_id, max_id)
+        db_execute(f"INSERT IGNORE INTO {sessions_table} ({_SESSION_COLUMNS}) {_SESSIONS_SELECT}", params)
+        query = f"""
+            INSERT INTO {table} ({_ROLLUP_COLUMNS}) {_ROLLUP_SELECT}
+            ON DUPLICATE KEY UPDATE
+                event_count = event_count + VALUES(event_count),
+                duration_sum = duration_sum + VALUES(duration_sum),
+                duration_max = GREATEST(duration_max, VALUES(duration_max)),
+                scroll_depth_sum = scroll_depth_sum + VALUES(scroll_depth_sum),
+                scroll_depth_max = GREATEST(scroll_depth_max, VALUES(scroll_depth_max))
+        """
+        affected = db_execute(query, params)
+        db_execute(f"""
+            UPDATE {table} AS r
+            SET session_count = (
+                SELECT COUNT(*) FROM {sessions_table} s
+                WHERE s.bucket_start = r.bucket_start AND s.user_id = r.user_id
+                    AND s.page = r.page AND s.event_type = r.event_type
+            )
+            WHERE r.bucket_start = %s
+        """, (bucket_start,))
+        return affected
+
+    @staticmethod
+    def _filters(user_id: Optional[str], page: Optional[str], event_type: Optional[str],
+                 raw: bool) -> Tuple[str, List[Any]]:
+        conditions, params = [], []
+        if user_id is not None:
+            conditions.append("user_id = %s")
+            params.append(user_id)
+        if page is not None:
+            conditions.append("COALESCE(page, '') = %s" if raw else "page = %s")
+            params.append(page)
+        if event_type is not None:
+            conditions.append("event_type = %s")
+            params.append(event_type)
+        return ''.join(f" AND {c}" for c in conditions), params
+
+    @staticmethod
+    def aggregate_rollup(
+        resolution: str,
+        start_bucket: Any,
+        end_bucket: Any,
+        user_id: Optional[str] = None,
+        page: Optional[str] = None,
+        event_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        按 (事件类型, 页面) 聚合汇总表中 [start_bucket, end_bucket) 的时间桶
+
+        Returns:
+            [{'event_type', 'page', 'event_count', 'session_count', 'duration_sum',
+              'duration_max', 'scroll_depth_sum', 'scroll_depth_max'}, ...]
+        """
+        table = ROLLUP_TABLES[resolution]
+        where, params = BehaviorRollupMapper._filters(user_id, page, event_type, raw=False)
+        query = f"""
+            SELECT event_type, page,
+                SUM(event_count) AS event_count, SUM(session_count) AS session_count,
+                SUM(duration_sum) AS duration_sum, MAX(duration_max) AS duration_max,
+                SUM(scroll_depth_sum) AS scroll_depth_sum, MAX(scroll_depth_max) AS scroll_depth_max
+            FROM {table}
+            WHERE bucket_start >= %s AND bucket_start < %s{where}
+            GROUP BY event_type, page
+        """
+        return db_query(query, [start_bucket, end_bucket] + params)
+
+    @staticmethod
+    def aggregate_raw(
+        start_ms: int,
+        end_ms: int,
+        user_id: Optional[str] = None,
+        page: Optional[str] = None,
+        event_type: Optional[str] = None,
+        after_id: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        按 (事件类型, 页面) 聚合原始日志 [start_ms, end_ms)，字段与 aggregate_rollup 相同
+
+        Args:
+            after_id: 只统计 id 大于该值的日志（尚未汇总的部分）
+        """
+        where, params = BehaviorRollupMapper._filters(user_id, page, event_type, raw=True)
+        query = f"""
+            SELECT event_type, COALESCE(page, '') AS page,
+                COUNT(*) AS event_count, COUNT(DISTINCT session_id) AS session_count,
+                COALESCE(SUM(duration), 0) AS duration_sum, COALESCE(MAX(duration), 0) AS duration_max,
+                COALESCE(SUM(scroll_depth), 0) AS scroll_depth_sum,
+                COALESCE(MAX(scroll_depth), 0) AS scroll_depth_max
+            FROM user_behavior_logs
+            WHERE timestamp >= %s AND timestamp < %s AND id > %s{where}
+            GROUP BY event_type, COALESCE(page, '')
+        """
+        return db_query(query, [start_ms, end_ms, after_id] + params)
+
+    @staticmethod
+    def count_distinct_sessions(
+        rollup_ranges: List[Tuple[str, Any, Any]],
+        raw_ranges: List[Tuple[int, int, int]],
+        user_id: Optional[str] = None,
+        page: Optional[str] = None,
+        event_type: Optional[str] = None
+    ) -> int:
+        """
+        统计多个时间段合计的去重会话数（会话集合取并集，跨时间段 / 跨页面的同一会话只计一次）
+
+        Args:
+            rollup_ranges: [(resolution, start_bucket, end_bucket), ...]，读会话集合表 [start_bucket, end_bucket)
+            raw_ranges: [(start_ms, end_ms, after_id), ...]，读原始日志中 id 大于 after_id 的部分
+
+        Returns:
+            去重会话数
+        """
+        parts, params = [], []
+        for resolution, start_bucket, end_bucket in rollup_ranges:
+            where, filter_params = BehaviorRollupMapper._filters(user_id, page, event_type, raw=False)
+            parts.append(f"""
+                SELECT session_id FROM {SESSION_TABLES[resolution]}
+                WHERE bucket_start >= %s AND bucket_start < %s{where}
+            """)
+            params += [start_bucket, end_bucket] + filter_params
+        for start_ms, end_ms, after_id in raw_ranges:
+            where, filter_params = BehaviorRollupMapper._filters(user_id, page, event_type, raw=True)
+            parts.append(f"""
+                SELECT session_id FROM user_behavior_logs
+                WHERE timestamp >= %s AND timestamp < %s AND id > %s AND session_id IS NOT NULL{where}
+            """)
+            params += [start_ms, end_ms, after_id] + filter_params
+        if not parts:
+            return 0
+        row = db_query(f"SELECT COUNT(*) AS sessions FROM ({' UNION '.join(parts)}) t", params, fetch_one=True)
+        return int(row['sessions'] or 0) if row else 0
+
+    @staticmethod
+    def purge_compacted_logs(max_id: int, days: int, limit: int = 5000) -> int:
+        """
+        删除已汇总（id 不超过 max_id）且写入早于 days 天的原始日志，每次最多 limit 条
+
+        Returns:
+            删除行数
+        """
+        boundary = db_query("""
+            SELECT MAX(id) AS boundary FROM (
+                SELECT id FROM user_behavior_logs
+                WHERE id <= %s AND created_at < DATE_SUB(NOW(), INTERVAL %s DAY)
+                ORDER BY id
+                LIMIT %s
+            ) t
+        """, (max_id, days, limit), fetch_one=True)
+        if not boundary or boundary['boundary'] is None:
+            return 0
+        return db_execute("""
+            DELETE FROM user_behavior_logs
+            WHERE id <= %s AND created_at < DATE_SUB(NOW(), INTERVAL %s DAY)
+        """, (boundary['boundary'], days))
@@ -0,0 +1,164 @@
+"""
+用户会话 Mapper
+负责会话表 / 页面访问表的读写，以及按会话读取原始日志
+"""
+
+from contextlib import closing
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from utils.db import db_query, db_execute, db_execute_many, db_stream
+
+_SESSION_COLUMNS = (
+    'session_id', 'user_id', 'started_at', 'ended_at', 'duration_ms',
+    'event_count', 'interaction_count', 'page_view_count', 'unique_page_count',
+    'total_dwell_ms', 'entry_page', 'exit_page', 'is_bounce',
+)
+
+_VISIT_COLUMNS = (
+    'session_id', 'seq', 'user_id', 'page', 'entered_at', 'left_at',
+    'dwell_ms', 'event_count', 'end_reason',
+)
+
+
+class BehaviorSessionMapper:
+    """用户会话数据访问对象"""
+
+    @staticmethod
+    def iter_session_events(session_ids: Sequence[str], batch_size: int = 2000) -> Iterator[Dict[str, Any]]:
+        """
+        流式读取指定会话的日志，按 (session_id, timestamp, id) 排序
+
+        Args:
+            session_ids: 会话ID列表
+            batch_size: 每批从数据库读取的行数
+
+        Yields:
+            {'id', 'session_id', 'user_id', 'event_type', 'page', 'duration', 'timestamp'}
+        """
+        if not session_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(session_ids))
+        query = f"""
+            SELECT id, session_id, user_id, event_type, page, duration, timestamp
+            FROM user_behavior_logs
+            WHERE session_id IN ({placeholders})
+            ORDER BY session_id, timestamp, id
+        """
+        with closing(db_stream(query, list(session_ids), batch_size=batch_size)) as rows:
+            yield from rows
+
+    @staticmethod
+    def replace_sessions(sessions: List[Dict[str, Any]], visits: List[Dict[str, Any]]) -> int:
+        """
+        写入重建后的会话及其页面访问（覆盖旧数据，调用方负责事务）
+
+        Args:
+            sessions: 会话行
+            visits: 这些会话的全部页面访问行
+
+        Returns:
+            写入的会话数
+        """
+        if not sessions:
+            return 0
+        session_ids = [session['session_id'] for session in sessions]
+        placeholders = ', '.join(['%s'] * len(session_ids))
+        db_execute(f"DELETE FROM user_behavior_page_visits WHERE session_id IN ({placeholders})", session_ids)
+
+        updates = ', '.join(f"{name} = VALUES({name})" for name in _SESSION_COLUMNS[1:])
+        db_execute_many(f"""
+            INSERT INTO user_behavior_sessions ({', '.join(_SESSION_COLUMNS)})
+            VALUES ({', '.join(['%s'] * len(_SESSION_COLUMNS))})
+            ON DUPLICATE KEY UPDATE {updates}
+        """, [tuple(session[name] for name in _SESSION_COLUMNS) for session in sessions])
+        if visits:
+            db_execute_many(f"""
+                INSERT INTO user_behavior_page_visits ({', '.join(_VISIT_COLUMNS)})
+                VALUES ({', '.join(['%s'] * len(_VISIT_COLUMNS))})
+            """, [tuple(visit[name] for name in _VISIT_COLUMNS) for visit in visits])
+        return len(sessions)
+
+    @staticmethod
+    def get_user_sessions(
+        user_id: str,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """
+        按开始时间倒序查询用户的会话
+
+        Args:
+            user_id: 用户ID
+            start_time: 会话开始时间下限（毫秒）
+            end_time: 会话开始时间上限（毫秒）
+            limit: 最多条数
+
+        Returns:
+            会话列表
+        """
+        conditions = ["user_id = %s"]
+        params: List[Any] = [user_id]
+        if start_time:
+            conditions.append("started_at >= %s")
+            params.append(start_time)
+        if end_time:
+            conditions.append("started_at <= %s")
+            params.append(end_time)
+        params.append(limit)
+        query = f"""
+            SELECT {', '.join(_SESSION_COLUMNS)}
+            FROM user_behavior_sessions
+            WHERE {' AND '.join(conditions)}
+            ORDER BY started_at DESC
+            LIMIT %s
+        """
+        return db_query(query, params)
+
+    @staticmethod
+    def get_page_visits(session_ids: Sequence[str]) -> List[Dict[str, Any]]:
+        """
+        查询会话的页面访问，按 (session_id, seq) 排序
+
+        Args:
+            session_ids: 会话ID列表
+
+        Returns:
+            页面访问列表
+        """
+        if not session_ids:
+            return []
+        placeholders = ', '.join(['%s'] * len(session_ids))
+        query = f"""
+            SELECT {', '.join(_VISIT_COLUMNS)}
+            FROM user_behavior_page_visits
+            WHERE session_id IN ({placeholders})
+            ORDER BY session_id, seq
+        """
+        return db_query(query, list(session_ids))
+
+    @staticmethod
+    def get_user_page_dwell(user_id: str, start_time: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        按页面汇总用户的访问次数与停留时长
+
+        Args:
+            user_id: 用户ID
+            start_time: 进入时间下限（毫秒）
+
+        Returns:
+            [{'page', 'visits', 'dwell_ms', 'avg_dwell_ms'}, ...]，按停留时长倒序
+        """
+        conditions = ["user_id = %s"]
+        params: List[Any] = [user_id]
+        if start_time:
+            conditions.append("entered_at >= %s")
+            params.append(start_time)
+        query = f"""
+            SELECT page, COUNT(*) AS visits, SUM(dwell_ms) AS dwell_ms, AVG(dwell_ms) AS avg_dwell_ms
+            FROM user_behavior_page_visits
+            WHERE {' AND '.join(conditions)}
+            GROUP BY page
+            ORDER BY dwell_ms DESC
+        """
+        return db_query(query, params)
@@ -0,0 +1,95 @@
+"""
+用户行为计数汇总 Mapper
+负责 user_behavior_daily_counters / user_behavior_daily_sessions 的读写
+"""
+
+from datetime import date
+from typing import Any, Dict, Iterable, List, Tuple
+
+from utils.db import db_query, db_execute_many, unit_of_work
+
+
+class BehaviorStatsMapper:
+    """用户行为计数汇总数据访问对象"""
+
+    # 增量叠加：同一 (用户, 日期, 事件类型, 页面) 的计数累加
+    UPSERT_COUNTERS_SQL = """
+    INSERT INTO user_behavior_daily_counters (
+        user_id, stat_date, event_type, page,
+        event_count, total_duration, last_timestamp
+    ) VALUES (
+        %s, %s, %s, %s,
+        %s, %s, %s
+    ) ON DUPLICATE KEY UPDATE
+        event_count = event_count + VALUES(event_count),
+        total_duration = total_duration + VALUES(total_duration),
+        last_timestamp = GREATEST(last_timestamp, VALUES(last_timestamp))
+    """
+
+    INSERT_SESSIONS_SQL = """
+    INSERT IGNORE INTO user_behavior_daily_sessions (
+        user_id, stat_date, session_id
+    ) VALUES (
+        %s, %s, %s
+    )
+    """
+
+    @staticmethod
+    def apply_deltas(counter_rows: Iterable[Tuple], session_rows: Iterable[Tuple]) -> int:
+        """
+        在一个事务内叠加计数增量并登记会话
+        失败时整体回滚，调用方可把增量放回内存稍后重试而不会重复计数
+
+        Args:
+            counter_rows: (user_id, stat_date, event_type, page, event_count, total_duration, last_timestamp)
+            session_rows: (user_id, stat_date, session_id)
+
+        Returns:
+            写入的计数行数
+        """
+        counter_rows = list(counter_rows)
+        session_rows = list(session_rows)
+        with unit_of_work():
+            if counter_rows:
+                db_execute_many(BehaviorStatsMapper.UPSERT_COUNTERS_SQL, counter_rows)
+            if session_rows:
+                db_execute_many(BehaviorStatsMapper.INSERT_SESSIONS_SQL, session_rows)
+        return len(counter_rows)
+
+    @staticmethod
+    def get_daily_counters(user_id: str, start_date: date) -> List[Dict[str, Any]]:
+        """
+        获取用户自 start_date 起的计数桶
+
+        Args:
+            user_id: 用户ID
+            start_date: 起始日期（含）
+
+        Returns:
+            计数桶列表
+        """
+        query = """
+            SELECT stat_date, event_type, page, event_count, total_duration, last_timestamp
+            FROM user_behavior_daily_counters
+            WHERE user_id = %s AND stat_date >= %s
+        """
+        return db_query(query, (user_id, start_date))
+
+    @staticmethod
+    def get_session_ids(user_id: str, start_date: date) -> List[str]:
+        """
+        获取用户自 start_date 起出现过的会话ID（去重）
+
+        Args:
+            user_id: 用户ID
+            start_date: 起始日期（含）
+
+        Returns:
+            会话ID列表
+        """
+        query = """
+            SELECT DISTINCT session_id
+            FROM user_behavior_daily_sessions
+            WHERE user_id = %s AND stat_date >= %s
+        """
+        return [row['session_id'] for row in db_query(query, (user_id, start_date))]
@@ -3,8 +3,10 @@
 负责账单相关的数据库操作
 """
 
-from utils.db import db_query, db_execute
-from typing import List, Dict, Optional
+from utils import db_async
+from utils.db import db_query, db_execute, db_execute_many, db_stream
+from typing import List, Dict, Iterator, Optional
+from contextlib import closing
 from datetime import datetime
 
 
@@ -29,7 +31,7 @@ class BillMapper:
                 SELECT id, user_id, merchant, category, amount, 
                        transaction_date, transaction_time, status, created_at
                 FROM Bills
-                WHERE user_id = %s AND DATE_FORMAT(transaction_date, '%Y-%m') = %s
+                WHERE user_id = %s AND DATE_FORMAT(transaction_date, '%%Y-%%m') = %s
                 ORDER BY transaction_date DESC, transaction_time DESC
             """
             return db_query(query, (user_id, month))
@@ -46,27 +48,53 @@ class BillMapper:
             return db_query(query, (user_id,))
     
     @staticmethod
-    def get_bill_statistics(user_id: str, month: str) -> Dict:
+    def iter_bills_by_user(user_id: str, start_date: Optional[str] = None,
+                           end_date: Optional[str] = None,
+                           batch_size: int = 500) -> Iterator[Dict]:
         """
-        获取用户指定月份的账单统计数据
+        流式遍历用户账单（按交易时间正序），用于导出和年度分析
+        内存占用与账单总量无关；中途停止时请关闭返回的生成器
         
         Args:
             user_id: 用户ID
-            month: 月份，格式：YYYY-MM
+            start_date: 起始日期（含），格式：YYYY-MM-DD
+            end_date: 结束日期（不含），格式：YYYY-MM-DD
+            batch_size: 每批从数据库读取的行数
             
-        Returns:
-            统计数据字典
+        Yields:
+            账单记录
         """
-        query = """
-            SELECT 
-                COUNT(*) as total_count,
-                SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) as total_income,
-                SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END) as total_expense,
-                AVG(CASE WHEN amount < 0 THEN ABS(amount) ELSE NULL END) as avg_expense
+        conditions = ["user_id = %s"]
+        params = [user_id]
+        if start_date:
+            conditions.append("transaction_date >= %s")
+            params.append(start_date)
+        if end_date:
+            conditions.append("transaction_date < %s")
+            params.append(end_date)
+        
+        query = f"""
+            SELECT id, user_id, merchant, category, amount, 
+                   transaction_date, transaction_time, status, created_at
             FROM Bills
-            WHERE user_id = %s AND DATE_FORMAT(transaction_date, '%Y-%m') = %s
+            WHERE {" AND ".join(conditions)}
+            ORDER BY transaction_date, transaction_time
         """
-        result = db_query(query, (user_id, month), fetch_one=True)
+        with closing(db_stream(query, params, batch_size=batch_size)) as rows:
+            yield from rows
+    
+    STATISTICS_SQL = """
+        SELECT 
+            COUNT(*) as total_count,
+            SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) as total_income,
+            SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END) as total_expense,
+            AVG(CASE WHEN amount < 0 THEN ABS(amount) ELSE NULL END) as avg_expense
+        FROM Bills
+        WHERE user_id = %s AND DATE_FORMAT(transaction_date, '%%Y-%%m') = %s
+    """
+    
+    @staticmethod
+    def _statistics_result(result: Optional[Dict]) -> Dict:
         return result or {
             'total_count': 0,
             'total_income': 0,
@@ -74,6 +102,27 @@ class BillMapper:
             'avg_expense': 0
         }
     
+    @staticmethod
+    def get_bill_statistics(user_id: str, month: str) -> Dict:
+        """
+        获取用户指定月份的账单统计数据
+        
+        Args:
+            user_id: 用户ID
+            month: 月份，格式：YYYY-MM
+            
+        Returns:
+            统计数据字典
+        """
+        result = db_query(BillMapper.STATISTICS_SQL, (user_id, month), fetch_one=True)
+        return BillMapper._statistics_result(result)
+    
+    @staticmethod
+    async def get_bill_statistics_async(user_id: str, month: str) -> Dict:
+        """get_bill_statistics 的协程版本，参数与返回值相同"""
+        result = await db_async.db_query(BillMapper.STATISTICS_SQL, (user_id, month), fetch_one=True)
+        return BillMapper._statistics_result(result)
+    
     @staticmethod
     def get_category_expenses(user_id: str, month: str) -> List[Dict]:
         """
@@ -93,7 +142,7 @@ class BillMapper:
                 COUNT(*) as transaction_count
             FROM Bills
             WHERE user_id = %s 
-              AND DATE_FORMAT(transaction_date, '%Y-%m') = %s
+              AND DATE_FORMAT(transaction_date, '%%Y-%%m') = %s
               AND amount < 0
             GROUP BY category
             ORDER BY total_amount DESC
@@ -128,6 +177,35 @@ class BillMapper:
         return db_execute(query, (user_id, merchant, category, amount, 
                                   transaction_date, transaction_time, status))
     
+    @staticmethod
+    def insert_bills(bills: List[Dict], chunk_size: int = 500) -> int:
+        """
+        批量插入账单记录（用于账单导入）
+        
+        Args:
+            bills: 账单列表，字段同 insert_bill 的参数，
+                   transaction_time 和 status 可省略
+            chunk_size: 每批写入行数，每批独立提交
+            
+        Returns:
+            插入的行数
+            
+        Raises:
+            BulkWriteError: 部分批次写入失败
+        """
+        query = """
+            INSERT INTO Bills 
+            (user_id, merchant, category, amount, transaction_date, transaction_time, status)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """
+        rows = (
+            (bill['user_id'], bill['merchant'], bill['category'], bill['amount'],
+             bill['transaction_date'], bill.get('transaction_time', '00:00:00'),
+             bill.get('status', 'completed'))
+            for bill in bills
+        )
+        return db_execute_many(query, rows, chunk_size=chunk_size)
+    
     @staticmethod
     def get_abnormal_transactions(user_id: str, month: str, threshold: float) -> List[Dict]:
         """
@@ -145,7 +223,7 @@ class BillMapper:
             SELECT id, merchant, category, amount, transaction_date
             FROM Bills
             WHERE user_id = %s 
-              AND DATE_FORMAT(transaction_date, '%Y-%m') = %s
+              AND DATE_FORMAT(transaction_date, '%%Y-%%m') = %s
               AND amount < 0
               AND ABS(amount) > %s
             ORDER BY ABS(amount) DESC
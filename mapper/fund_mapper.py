@@ -3,9 +3,10 @@
 负责基金相关的数据库操作
 """
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
-from utils.db import db_query, db_execute
+from utils import db_async
+from utils.db import db_query, db_execute, db_execute_many
 
 
 class FundMapper:
@@ -42,25 +43,18 @@ class FundMapper:
         return FundMapper.get_fund_details(fund_code)
 
     @staticmethod
-    def get_funds(
-        page: int = 1,
-        page_size: int = 20,
-        category: Optional[str] = None,
-        risk_level: Optional[str] = None,
-        order_by: str = "code",
-        order_dir: str = "asc",
-    ) -> Dict:
-        """分页获取基金列表，支持筛选和排序
+    def _build_funds_queries(
+        page: int,
+        page_size: int,
+        category: Optional[str],
+        risk_level: Optional[str],
+        order_by: str,
+        order_dir: str,
+    ) -> Tuple[str, List, str, List]:
+        """构建基金列表的计数语句与分页查询语句
 
-        Args:
-            page: 当前页码
-            page_size: 每页条数
-            category: 基金类别筛选
-            risk_level: 风险等级筛选
-            order_by: 排序字段（code|name|nav|change_percent）
-            order_dir: 排序方向 asc/desc
         Returns:
-            包含 `data` 和 `pagination` 的字典
+            (count_query, count_params, query, query_params)
         """
         params = []
         conditions = []
@@ -90,13 +84,13 @@ class FundMapper:
 
         base_query += f" ORDER BY {order_by} {order_dir_sql}"
 
-        total = db_query(count_query, params, fetch_one=True)["total"]
         offset = (page - 1) * page_size
         query = f"{base_query} LIMIT %s OFFSET %s"
         params_with_pagination = params + [page_size, offset]
+        return count_query, params, query, params_with_pagination
 
-        funds = db_query(query, params_with_pagination)
-
+    @staticmethod
+    def _funds_page(funds: List[Dict], total: int, page: int, page_size: int) -> Dict:
         return {
             "data": funds,
             "pagination": {
@@ -107,24 +101,83 @@ class FundMapper:
             },
         }
 
+    @staticmethod
+    def get_funds(
+        page: int = 1,
+        page_size: int = 20,
+        category: Optional[str] = None,
+        risk_level: Optional[str] = None,
+        order_by: str = "code",
+        order_dir: str = "asc",
+    ) -> Dict:
+        """分页获取基金列表，支持筛选和排序
+
+        Args:
+            page: 当前页码
+            page_size: 每页条数
+            category: 基金类别筛选
+            risk_level: 风险等级筛选
+            order_by: 排序字段（code|name|nav|change_percent）
+            order_dir: 排序方向 asc/desc
+        Returns:
+            包含 `data` 和 `pagination` 的字典
+        """
+        count_query, params, query, params_with_pagination = FundMapper._build_funds_queries(
+            page, page_size, category, risk_level, order_by, order_dir
+        )
+        total = db_query(count_query, params, fetch_one=True)["total"]
+        funds = db_query(query, params_with_pagination)
+        return FundMapper._funds_page(funds, total, page, page_size)
+
+    @staticmethod
+    async def get_funds_async(
+        page: int = 1,
+        page_size: int = 20,
+        category: Optional[str] = None,
+        risk_level: Optional[str] = None,
+        order_by: str = "code",
+        order_dir: str = "asc",
+    ) -> Dict:
+        """get_funds 的协程版本，参数与返回值相同"""
+        count_query, params, query, params_with_pagination = FundMapper._build_funds_queries(
+            page, page_size, category, risk_level, order_by, order_dir
+        )
+        total = (await db_async.db_query(count_query, params, fetch_one=True))["total"]
+        funds = await db_async.db_query(query, params_with_pagination)
+        return FundMapper._funds_page(funds, total, page, page_size)
+
+    FUND_COLUMNS = [
+        "code",
+        "name",
+        "nav",
+        "change_percent",
+        "fund_change",
+        "category",
+        "risk",
+        "manager",
+    ]
+
+    @staticmethod
+    def _insert_query() -> str:
+        cols_sql = ", ".join(FundMapper.FUND_COLUMNS)
+        placeholders = ", ".join(["%s"] * len(FundMapper.FUND_COLUMNS))
+        return f"INSERT INTO Fundings ({cols_sql}) VALUES ({placeholders})"
+
     @staticmethod
     def create_fund(data: Dict) -> int:
         """新增基金记录，返回影响行数"""
-        columns = [
-            "code",
-            "name",
-            "nav",
-            "change_percent",
-            "fund_change",
-            "category",
-            "risk",
-            "manager",
-        ]
-        cols_sql = ", ".join(columns)
-        placeholders = ", ".join(["%s"] * len(columns))
-        values = tuple(data.get(col) for col in columns)
-        query = f"INSERT INTO Fundings ({cols_sql}) VALUES ({placeholders})"
-        return db_execute(query, values)
+        values = tuple(data.get(col) for col in FundMapper.FUND_COLUMNS)
+        return db_execute(FundMapper._insert_query(), values)
+
+    @staticmethod
+    def create_funds(funds: List[Dict], chunk_size: int = 500) -> int:
+        """批量新增基金记录，按批次提交，返回影响行数
+
+        Raises:
+            BulkWriteError: 部分批次写入失败
+        """
+        rows = (tuple(data.get(col) for col in FundMapper.FUND_COLUMNS) for data in funds)
+        return db_execute_many(FundMapper._insert_query(), rows, chunk_size=chunk_size)
 
     @staticmethod
     def update_fund(code: str, updates: Dict) -> int:
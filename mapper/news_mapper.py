@@ -3,248 +3,166 @@
 负责资讯数据的数据库操作
 """
 
-from utils.db import get_db_connection
+from utils import db_async
+from utils.db import db_query, db_execute
+
+
+NEWS_COLUMNS = '''id, title, summary, content, category, source, author,
+                   publish_time, image_url, tags, read_count, created_at'''
+
+
+def _format_news(row):
+    """将数据库行转换为资讯字典，时间字段格式化为字符串"""
+    return {
+        'id': row['id'],
+        'title': row['title'],
+        'summary': row['summary'],
+        'content': row['content'],
+        'category': row['category'],
+        'source': row['source'],
+        'author': row['author'],
+        'publish_time': row['publish_time'].strftime('%Y-%m-%d %H:%M:%S') if row['publish_time'] else None,
+        'image_url': row['image_url'],
+        'tags': row['tags'],
+        'read_count': row['read_count'],
+        'created_at': row['created_at'].strftime('%Y-%m-%d %H:%M:%S') if row['created_at'] else None
+    }
+
+
+def _all_news_query(category=None, limit=None, offset=0):
+    """构建资讯列表查询语句与参数"""
+    if category:
+        sql = f'''
+        SELECT {NEWS_COLUMNS}
+        FROM News
+        WHERE category = %s
+        ORDER BY publish_time DESC
+        '''
+        params = [category]
+    else:
+        sql = f'''
+        SELECT {NEWS_COLUMNS}
+        FROM News
+        ORDER BY publish_time DESC
+        '''
+        params = []
+
+    # 添加分页
+    if limit:
+        sql += ' LIMIT %s OFFSET %s'
+        params.extend([limit, offset])
+
+    return sql, params
 
 
 def get_all_news(category=None, limit=None, offset=0):
     """
     获取资讯列表
-    
+
     Args:
         category: 分类筛选（可选）
         limit: 返回数量限制（可选）
         offset: 偏移量
-    
+
     Returns:
         list: 资讯列表
     """
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cursor:
-            if category:
-                sql = '''
-                SELECT id, title, summary, content, category, source, author, 
-                       publish_time, image_url, tags, read_count, created_at
-                FROM News 
-                WHERE category = %s
-                ORDER BY publish_time DESC
-                '''
-                params = [category]
-            else:
-                sql = '''
-                SELECT id, title, summary, content, category, source, author, 
-                       publish_time, image_url, tags, read_count, created_at
-                FROM News 
-                ORDER BY publish_time DESC
-                '''
-                params = []
-            
-            # 添加分页
-            if limit:
-                sql += ' LIMIT %s OFFSET %s'
-                params.extend([limit, offset])
-            
-            cursor.execute(sql, params)
-            results = cursor.fetchall()
-            
-            news_list = []
-            for row in results:
-                news_list.append({
-                    'id': row[0],
-                    'title': row[1],
-                    'summary': row[2],
-                    'content': row[3],
-                    'category': row[4],
-                    'source': row[5],
-                    'author': row[6],
-                    'publish_time': row[7].strftime('%Y-%m-%d %H:%M:%S') if row[7] else None,
-                    'image_url': row[8],
-                    'tags': row[9],
-                    'read_count': row[10],
-                    'created_at': row[11].strftime('%Y-%m-%d %H:%M:%S') if row[11] else None
-                })
-            
-            return news_list
-    finally:
-        conn.close()
+    sql, params = _all_news_query(category, limit, offset)
+    return [_format_news(row) for row in db_query(sql, params)]
+
+
+async def get_all_news_async(category=None, limit=None, offset=0):
+    """get_all_news 的协程版本，参数与返回值相同"""
+    sql, params = _all_news_query(category, limit, offset)
+    return [_format_news(row) for row in await db_async.db_query(sql, params)]
 
 
 def get_news_by_id(news_id):
     """
     根据ID获取资讯详情
-    
+
     Args:
         news_id: 资讯ID
-    
+
     Returns:
         dict: 资讯详情，不存在返回None
     """
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cursor:
-            sql = '''
-            SELECT id, title, summary, content, category, source, author, 
-                   publish_time, image_url, tags, read_count, created_at
-            FROM News 
-            WHERE id = %s
-            '''
-            cursor.execute(sql, [news_id])
-            row = cursor.fetchone()
-            
-            if row:
-                return {
-                    'id': row[0],
-                    'title': row[1],
-                    'summary': row[2],
-                    'content': row[3],
-                    'category': row[4],
-                    'source': row[5],
-                    'author': row[6],
-                    'publish_time': row[7].strftime('%Y-%m-%d %H:%M:%S') if row[7] else None,
-                    'image_url': row[8],
-                    'tags': row[9],
-                    'read_count': row[10],
-                    'created_at': row[11].strftime('%Y-%m-%d %H:%M:%S') if row[11] else None
-                }
-            return None
-    finally:
-        conn.close()
+    sql = f'''
+    SELECT {NEWS_COLUMNS}
+    FROM News
+    WHERE id = %s
+    '''
+    row = db_query(sql, [news_id], fetch_one=True)
+    return _format_news(row) if row else None
 
 
 def search_news(keyword):
     """
     搜索资讯
-    
+
     Args:
         keyword: 搜索关键词
-    
+
     Returns:
         list: 匹配的资讯列表
     """
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cursor:
-            sql = '''
-            SELECT id, title, summary, content, category, source, author, 
-                   publish_time, image_url, tags, read_count, created_at
-            FROM News 
-            WHERE title LIKE %s OR summary LIKE %s OR content LIKE %s
-            ORDER BY publish_time DESC
-            '''
-            search_pattern = f'%{keyword}%'
-            cursor.execute(sql, [search_pattern, search_pattern, search_pattern])
-            results = cursor.fetchall()
-            
-            news_list = []
-            for row in results:
-                news_list.append({
-                    'id': row[0],
-                    'title': row[1],
-                    'summary': row[2],
-                    'content': row[3],
-                    'category': row[4],
-                    'source': row[5],
-                    'author': row[6],
-                    'publish_time': row[7].strftime('%Y-%m-%d %H:%M:%S') if row[7] else None,
-                    'image_url': row[8],
-                    'tags': row[9],
-                    'read_count': row[10],
-                    'created_at': row[11].strftime('%Y-%m-%d %H:%M:%S') if row[11] else None
-                })
-            
-            return news_list
-    finally:
-        conn.close()
+    sql = f'''
+    SELECT {NEWS_COLUMNS}
+    FROM News
+    WHERE title LIKE %s OR summary LIKE %s OR content LIKE %s
+    ORDER BY publish_time DESC
+    '''
+    search_pattern = f'%{keyword}%'
+    rows = db_query(sql, [search_pattern, search_pattern, search_pattern])
+    return [_format_news(row) for row in rows]
 
 
 def get_hot_news(limit=10):
     """
     获取热门资讯（按阅读量排序）
-    
+
     Args:
         limit: 返回数量
-    
+
     Returns:
         list: 热门资讯列表
     """
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cursor:
-            sql = '''
-            SELECT id, title, summary, content, category, source, author, 
-                   publish_time, image_url, tags, read_count, created_at
-            FROM News 
-            ORDER BY read_count DESC, publish_time DESC
-            LIMIT %s
-            '''
-            cursor.execute(sql, [limit])
-            results = cursor.fetchall()
-            
-            news_list = []
-            for row in results:
-                news_list.append({
-                    'id': row[0],
-                    'title': row[1],
-                    'summary': row[2],
-                    'content': row[3],
-                    'category': row[4],
-                    'source': row[5],
-                    'author': row[6],
-                    'publish_time': row[7].strftime('%Y-%m-%d %H:%M:%S') if row[7] else None,
-                    'image_url': row[8],
-                    'tags': row[9],
-                    'read_count': row[10],
-                    'created_at': row[11].strftime('%Y-%m-%d %H:%M:%S') if row[11] else None
-                })
-            
-            return news_list
-    finally:
-        conn.close()
+    sql = f'''
+    SELECT {NEWS_COLUMNS}
+    FROM News
+    ORDER BY read_count DESC, publish_time DESC
+    LIMIT %s
+    '''
+    return [_format_news(row) for row in db_query(sql, [limit])]
 
 
 def increase_read_count(news_id):
     """
     增加资讯阅读量
-    
+
     Args:
         news_id: 资讯ID
-    
+
     Returns:
         bool: 是否成功
     """
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cursor:
-            sql = 'UPDATE News SET read_count = read_count + 1 WHERE id = %s'
-            cursor.execute(sql, [news_id])
-            conn.commit()
-            return cursor.rowcount > 0
-    finally:
-        conn.close()
+    sql = 'UPDATE News SET read_count = read_count + 1 WHERE id = %s'
+    return db_execute(sql, [news_id]) > 0
 
 
 def get_news_count(category=None):
     """
     获取资讯总数
-    
+
     Args:
         category: 分类筛选（可选）
-    
+
     Returns:
         int: 资讯总数
     """
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cursor:
-            if category:
-                sql = 'SELECT COUNT(*) FROM News WHERE category = %s'
-                cursor.execute(sql, [category])
-            else:
-                sql = 'SELECT COUNT(*) FROM News'
-                cursor.execute(sql)
-            
-            result = cursor.fetchone()
-            return result[0] if result else 0
-    finally:
-        conn.close()
-
+    if category:
+        result = db_query('SELECT COUNT(*) AS total FROM News WHERE category = %s',
+                          [category], fetch_one=True)
+    else:
+        result = db_query('SELECT COUNT(*) AS total FROM News', fetch_one=True)
+    return result['total'] if result else 0
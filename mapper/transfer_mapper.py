@@ -3,7 +3,7 @@
 负责转账历史相关的数据库操作
 """
 
-from utils.db import db_query, db_execute
+from utils.db import db_query, db_execute, db_execute_many
 from typing import List, Dict, Optional
 
 
@@ -118,6 +118,36 @@ class TransferMapper:
         return db_execute(query, (user_id, recipient_account, recipient_name, 
                                   amount, transfer_date, transfer_time, status))
     
+    @staticmethod
+    def insert_transfers(transfers: List[Dict], chunk_size: int = 500) -> int:
+        """
+        批量插入转账记录（用于转账历史导入）
+        
+        Args:
+            transfers: 转账记录列表，字段同 insert_transfer 的参数，
+                       transfer_time 和 status 可省略
+            chunk_size: 每批写入行数，每批独立提交
+            
+        Returns:
+            插入的行数
+            
+        Raises:
+            BulkWriteError: 部分批次写入失败
+        """
+        query = """
+            INSERT INTO TransferHistory
+            (user_id, recipient_account, recipient_name, amount, 
+             transfer_date, transfer_time, status)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """
+        rows = (
+            (transfer['user_id'], transfer['recipient_account'], transfer['recipient_name'],
+             transfer['amount'], transfer['transfer_date'],
+             transfer.get('transfer_time', '00:00:00'), transfer.get('status', 'completed'))
+            for transfer in transfers
+        )
+        return db_execute_many(query, rows, chunk_size=chunk_size)
+    
     @staticmethod
     def get_transfer_statistics(user_id: str, days: int = 30) -> Dict:
         """
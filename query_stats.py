@@ -0,0 +1,66 @@
+"""
+查看 SQL 执行统计
+从运行中的服务拉取按总耗时排序的 SQL 指纹统计并打印
+
+用法:
+    python query_stats.py --url http://localhost:5000 --top 20
+    python query_stats.py --order-by max_ms
+    python query_stats.py --reset
+"""
+
+import argparse
+import json
+import os
+import sys
+import urllib.request
+
+
+def fetch(url, token, method='GET'):
+    req = urllib.request.Request(url, method=method)
+    if token:
+        req.add_header('X-Admin-Token', token)
+    with urllib.request.urlopen(req, timeout=10) as resp:
+        return json.loads(resp.read().decode('utf-8'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='查看 SQL 指纹耗时统计')
+    parser.add_argument('--url', default=os.getenv('API_BASE_URL', 'http://localhost:5000'))
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--order-by', default='total_ms',
+                        choices=['total_ms', 'count', 'max_ms', 'avg_ms', 'errors', 'rows'])
+    parser.add_argument('--token', default=os.getenv('ADMIN_TOKEN', ''))
+    parser.add_argument('--reset', action='store_true', help='清空统计')
+    parser.add_argument('--json', action='store_true', help='输出原始JSON')
+    args = parser.parse_args()
+
+    base = args.url.rstrip('/')
+    if args.reset:
+        fetch(f"{base}/api/admin/query-stats/reset", args.token, method='POST')
+        print("SQL统计已清空")
+        return
+
+    result = fetch(f"{base}/api/admin/query-stats?top={args.top}&order_by={args.order_by}", args.token)
+    if not result.get('success'):
+        print(f"获取失败: {result.get('message')}")
+        sys.exit(1)
+
+    data = result['data']
+    if args.json:
+        print(json.dumps(data, ensure_ascii=False, indent=2))
+        return
+
+    summary = data['summary']
+    print("=" * 100)
+    print(f"语句总数: {summary['statements']}  总耗时: {summary['total_ms']}ms  "
+          f"指纹数: {summary['fingerprints']}  慢查询阈值: {summary['slow_query_ms']}ms")
+    print("=" * 100)
+    print(f"{'total_ms':>10} {'count':>7} {'avg_ms':>8} {'p95_ms':>8} {'max_ms':>8} {'rows':>8} {'err':>4}  caller")
+    for item in data['queries']:
+        print(f"{item['total_ms']:>10} {item['count']:>7} {item['avg_ms']:>8} {item['p95_ms']:>8} "
+              f"{item['max_ms']:>8} {item['rows']:>8} {item['errors']:>4}  {item['caller']}")
+        print(f"{'':>58}{item['fingerprint'][:160]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+个性化提示词构建
+首页、账单、转账建议的提示词原本直接写入精确数值（总支出、节余率、转账金额），
+不同用户、甚至同一用户的两次请求几乎不会得到相同的提示词，响应缓存无法命中。
+
+这里把数值按区间分档（支出区间、节余率档位、笔数档位、转账金额档位），同一档位生成
+完全相同的规范化提示词，从而在档位粒度上复用大模型响应缓存（services/ai_response_cache.py）。
+
+个性化程度（AI_PERSONALIZATION_LEVEL，可用 AI_PERSONALIZATION_LEVEL_<PAGE_TYPE> 按页面覆盖）:
+    exact:  精确数值，与分档前的提示词一致，几乎不命中缓存
+    fine:   细分档位，默认
+    coarse: 粗分档位，命中率最高
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+PERSONALIZATION_LEVELS = ('exact', 'fine', 'coarse')
+DEFAULT_LEVEL = 'fine'
+
+# 各档位的区间下界（升序），区间为 [bounds[i], bounds[i+1])
+MONEY_BANDS = {
+    'fine': (0, 100, 500, 1000, 2000, 3000, 5000, 8000, 10000, 20000, 50000),
+    'coarse': (0, 1000, 5000, 20000),
+}
+COUNT_BANDS = {
+    'fine': (0, 1, 5, 10, 20, 50, 100),
+    'coarse': (0, 1, 10, 50),
+}
+SAVING_RATE_BANDS = {
+    'fine': (0, 10, 20, 30, 50, 70),
+    'coarse': (0, 20, 50),
+}
+# 与 TransferSuggestionService 的风险 / 到账 / 手续费阈值（5000、10000、50000）对齐
+TRANSFER_AMOUNT_BANDS = {
+    'fine': (0, 1000, 5000, 10000, 50000, 200000),
+    'coarse': (0, 5000, 10000, 50000),
+}
+# 账单提示词保留的主要支出类别数
+CATEGORY_LIMITS = {'exact': None, 'fine': 3, 'coarse': 1}
+
+ACCOUNT_TYPE_NAMES = {'same_bank': '本行账户', 'other_bank': '跨行账户'}
+
+_BAND_NOTE = "\n以上数值均为区间，回答中不要出现具体金额。"
+
+
+def get_personalization_level(page_type: Optional[str] = None) -> str:
+    """
+    读取个性化程度
+
+    Args:
+        page_type: 页面类型，优先读取 AI_PERSONALIZATION_LEVEL_<PAGE_TYPE>
+
+    Returns:
+        exact / fine / coarse，配置无效时返回默认值
+    """
+    level = (os.getenv(f'AI_PERSONALIZATION_LEVEL_{page_type.upper()}') if page_type else None) \
+        or os.getenv('AI_PERSONALIZATION_LEVEL') or DEFAULT_LEVEL
+    level = level.strip().lower()
+    if level not in PERSONALIZATION_LEVELS:
+        print(f"[AIPromptBuilder] 无效的个性化程度 {level}，使用 {DEFAULT_LEVEL}")
+        return DEFAULT_LEVEL
+    return level
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def band(value: Any, bounds: Sequence[float], unit: str = '') -> str:
+    """
+    把数值归入区间并返回区间文字
+
+    Args:
+        value: 数值（None / 非数字按 0 处理）
+        bounds: 升序的区间下界
+        unit: 单位
+
+    Returns:
+        如 '1000-2000元'、'50000元以上'、'低于0%'；下界为 0 时恰好为 0 的值单独成档
+    """
+    value = _number(value)
+    if value < bounds[0]:
+        return f"低于{bounds[0]:g}{unit}"
+    if value == 0 and bounds[0] == 0:
+        return f"0{unit}"
+    for lower, upper in zip(bounds, bounds[1:]):
+        if lower <= value < upper:
+            return f"{lower:g}-{upper:g}{unit}"
+    return f"{bounds[-1]:g}{unit}以上"
+
+
+def build_home_prompt(bill_stats: Dict, transfer_stats: Dict, level: Optional[str] = None) -> str:
+    """
+    首页问候提示词
+
+    Args:
+        bill_stats: 本月账单统计（total_expense / total_count）
+        transfer_stats: 近30天转账统计（total_amount / total_count）
+        level: 个性化程度，默认读取环境变量
+    """
+    level = level or get_personalization_level('home')
+    header = "请作为个人财务助理，根据以下信息用不超过80字生成个性化首页问候与理财提示（中文）：\n"
+    if level == 'exact':
+        return (
+            header +
+            f"本月总支出: {bill_stats.get('total_expense', 0)} 元，交易笔数: {bill_stats.get('total_count', 0)}；" +
+            f"本月转账总额: {transfer_stats.get('total_amount', 0)} 元，转账次数: {transfer_stats.get('total_count', 0)}。"
+        )
+    return (
+        header +
+        f"本月总支出: {band(bill_stats.get('total_expense'), MONEY_BANDS[level], '元')}，"
+        f"交易笔数: {band(bill_stats.get('total_count'), COUNT_BANDS[level], '笔')}；"
+        f"本月转账总额: {band(transfer_stats.get('total_amount'), MONEY_BANDS[level], '元')}，"
+        f"转账次数: {band(transfer_stats.get('total_count'), COUNT_BANDS[level], '次')}。" +
+        _BAND_NOTE
+    )
+
+
+def build_bill_prompt(summary: Dict, categories: List[Dict], level: Optional[str] = None) -> str:
+    """
+    账单分析提示词
+
+    Args:
+        summary: 账单汇总（totalIncome / totalExpense / savingRate / transactionCount）
+        categories: 按支出倒序的类别分布
+        level: 个性化程度，默认读取环境变量
+    """
+    level = level or get_personalization_level('bill')
+    header = "请根据以下账单摘要与分类，给出3条专业的理财建议（每条不超过40字，中文）：\n"
+    names = [c.get('category') for c in categories]
+    if level == 'exact':
+        return (
+            header +
+            f"摘要：收入 {summary.get('totalIncome')} 元，支出 {summary.get('totalExpense')} 元，"
+            f"节余率 {summary.get('savingRate')}%，交易笔数 {summary.get('transactionCount')}。\n"
+            f"主要支出类别：{names}"
+        )
+    names = names[:CATEGORY_LIMITS[level]]
+    return (
+        header +
+        f"摘要：收入 {band(summary.get('totalIncome'), MONEY_BANDS[level], '元')}，"
+        f"支出 {band(summary.get('totalExpense'), MONEY_BANDS[level], '元')}，"
+        f"节余率 {band(summary.get('savingRate'), SAVING_RATE_BANDS[level], '%')}，"
+        f"交易笔数 {band(summary.get('transactionCount'), COUNT_BANDS[level], '笔')}。\n"
+        f"主要支出类别：{'、'.join(names) if names else '无'}" +
+        _BAND_NOTE
+    )
+
+
+def build_transfer_prompt(context: Dict, risk_level: str, level: Optional[str] = None) -> str:
+    """
+    转账建议提示词（分档后不再包含收款账号）
+
+    Args:
+        context: 转账上下文（recipientAccount / accountType / isFirstTimeAccount / amount）
+        risk_level: 风险等级 low / medium / high
+        level: 个性化程度，默认读取环境变量
+    """
+    level = level or get_personalization_level('transfer')
+    header = "你是一名资深金融理财助手，请根据以下转账场景给出3条精炼的转账建议（每条不超过40字，中文）：\n"
+    if level == 'exact':
+        return (
+            header +
+            f"收款账户: {context.get('recipientAccount')}，账户类型: {context.get('accountType')}，"
+            f"首次转账: {context.get('isFirstTimeAccount')}，金额: {context.get('amount')} 元，风险等级: {risk_level}。"
+        )
+    account_type = ACCOUNT_TYPE_NAMES.get(context.get('accountType'), '未知')
+    first_time = '是' if context.get('isFirstTimeAccount') else '否'
+    return (
+        header +
+        f"账户类型: {account_type}，首次转账: {first_time}，"
+        f"金额: {band(context.get('amount'), TRANSFER_AMOUNT_BANDS[level], '元')}，风险等级: {risk_level}。" +
+        _BAND_NOTE
+    )
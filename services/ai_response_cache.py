@@ -0,0 +1,307 @@
+"""
+大模型响应缓存
+按 (规范化后的提示词, 上下文, 模型, temperature) 的哈希缓存 ModelProvider.generate 的结果：
+
+    内存：LRU + 过期时间，命中直接返回
+    磁盘（可选）：本地 SQLite 文件，进程重启后仍可命中，读到后回填内存
+    过期时间按页面类型（context['type']：market / fund / bill / transfer / home / chat）分别配置，
+    为 0 的页面类型不缓存
+
+只缓存调用成功的结果，失败仍交给上层 service 的 fallback。
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# 各页面类型默认缓存秒数：行情变化快，对话上下文几乎不重复
+DEFAULT_PAGE_TTLS = {
+    'market': 300,
+    'fund': 3600,
+    'bill': 1800,
+    'transfer': 600,
+    'home': 1800,
+    'chat': 0,
+}
+
+_WHITESPACE = re.compile(r'\s+')
+
+# 磁盘缓存每写入多少次清理一次过期记录
+_PRUNE_EVERY = 500
+
+
+def make_cache_key(prompt: str, context: Optional[Dict[str, Any]], model: str, temperature: float) -> str:
+    """
+    计算缓存键：提示词合并空白，上下文按键排序序列化
+
+    Returns:
+        sha256 十六进制摘要
+    """
+    normalized = _WHITESPACE.sub(' ', prompt or '').strip()
+    payload = json.dumps(
+        [normalized, context or {}, model, round(float(temperature), 3)],
+        ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class _DiskStore:
+    """SQLite 磁盘缓存（单连接 + 锁，WAL 模式）"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS ai_response_cache (
+                cache_key TEXT PRIMARY KEY,
+                page_type TEXT NOT NULL DEFAULT '',
+                response TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._writes = 0
+        self.prune()
+
+    def get(self, key: str, now: float) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, expires_at FROM ai_response_cache WHERE cache_key = ? AND expires_at > ?",
+                (key, now)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set(self, key: str, page_type: str, response: str, expires_at: float, now: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ai_response_cache (cache_key, page_type, response, expires_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?)", (key, page_type, response, expires_at, now))
+            self._writes += 1
+            prune = self._writes % _PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def prune(self) -> int:
+        """删除过期记录"""
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM ai_response_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ai_response_cache").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM ai_response_cache")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class AIResponseCache:
+    """大模型响应缓存
+
+    Args:
+        max_entries: 内存 LRU 最多条数
+        default_ttl: 未配置页面类型的缓存秒数
+        page_ttls: 页面类型 -> 缓存秒数，0 表示不缓存
+        disk_path: 磁盘缓存文件路径，为空时只用内存
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        default_ttl: float = 600,
+        page_ttls: Optional[Dict[str, float]] = None,
+        disk_path: Optional[str] = None,
+    ):
+        self.max_entries = max(1, max_entries)
+        self.default_ttl = max(0.0, default_ttl)
+        self.page_ttls = dict(DEFAULT_PAGE_TTLS if page_ttls is None else page_ttls)
+        self._disk = _DiskStore(disk_path) if disk_path else None
+
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, Tuple[str, float]]' = OrderedDict()
+
+        # 统计信息
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._bypassed = 0
+        self._stores = 0
+        self._evictions = 0
+        self._expired = 0
+        self._disk_errors = 0
+        self._page_counts: Dict[str, Dict[str, int]] = {}
+
+    def ttl_for(self, page_type: Optional[str]) -> float:
+        """页面类型对应的缓存秒数"""
+        return self.page_ttls.get(page_type or '', self.default_ttl)
+
+    def _count(self, page_type: Optional[str], field: str) -> None:
+        counts = self._page_counts.setdefault(page_type or '', {'hits': 0, 'misses': 0})
+        counts[field] += 1
+
+    def get(self, key: str, page_type: Optional[str] = None) -> Optional[str]:
+        """
+        读取缓存
+
+        Returns:
+            命中返回缓存的响应文本，否则 None
+        """
+        if self.ttl_for(page_type) <= 0:
+            with self._lock:
+                self._bypassed += 1
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    self._count(page_type, 'hits')
+                    return entry[0]
+                del self._entries[key]
+                self._expired += 1
+
+        if self._disk is not None:
+            try:
+                found = self._disk.get(key, now)
+            except sqlite3.Error as e:
+                # 磁盘缓存读取失败按未命中处理
+                print(f"[AIResponseCache] 读取磁盘缓存失败: {str(e)}")
+                found = None
+                with self._lock:
+                    self._disk_errors += 1
+            if found is not None:
+                with self._lock:
+                    self._put(key, found[0], found[1])
+                    self._hits += 1
+                    self._disk_hits += 1
+                    self._count(page_type, 'hits')
+                return found[0]
+
+        with self._lock:
+            self._misses += 1
+            self._count(page_type, 'misses')
+        return None
+
+    def _put(self, key: str, response: str, expires_at: float) -> None:
+        self._entries[key] = (response, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def set(self, key: str, response: str, page_type: Optional[str] = None) -> None:
+        """写入缓存（页面类型缓存秒数为 0 时忽略）"""
+        ttl = self.ttl_for(page_type)
+        if ttl <= 0:
+            return
+        now = time.time()
+        with self._lock:
+            self._put(key, response, now + ttl)
+            self._stores += 1
+        if self._disk is not None:
+            try:
+                self._disk.set(key, page_type or '', response, now + ttl, now)
+            except sqlite3.Error as e:
+                print(f"[AIResponseCache] 写入磁盘缓存失败: {str(e)}")
+                with self._lock:
+                    self._disk_errors += 1
+
+    def clear(self) -> None:
+        """清空内存与磁盘缓存"""
+        with self._lock:
+            self._entries.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """运行统计"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            stats = {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self._hits,
+                'disk_hits': self._disk_hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'bypassed': self._bypassed,
+                'stores': self._stores,
+                'evictions': self._evictions,
+                'expired': self._expired,
+                'default_ttl': self.default_ttl,
+                'page_ttls': dict(self.page_ttls),
+                'pages': {page: dict(counts) for page, counts in self._page_counts.items()},
+                'disk_path': self._disk.path if self._disk is not None else None,
+                'disk_errors': self._disk_errors,
+            }
+        if self._disk is not None:
+            try:
+                stats['disk_entries'] = self._disk.count()
+            except sqlite3.Error as e:
+                print(f"[AIResponseCache] 统计磁盘缓存失败: {str(e)}")
+                stats['disk_entries'] = None
+        return stats
+
+
+_cache: Optional[AIResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def is_ai_cache_enabled() -> bool:
+    """是否启用大模型响应缓存（AI_CACHE，默认 1）"""
+    return os.getenv('AI_CACHE', '1').lower() not in ('0', 'false', 'no', 'off')
+
+
+def get_ai_response_cache() -> Optional[AIResponseCache]:
+    """获取全局大模型响应缓存，未启用时返回 None
+
+    环境变量:
+        AI_CACHE: 是否启用，默认 1
+        AI_CACHE_MAX_ENTRIES: 内存缓存条数上限，默认 1000
+        AI_CACHE_TTL: 未配置页面类型的缓存秒数，默认 600
+        AI_CACHE_TTL_<PAGE_TYPE>: 按页面类型覆盖缓存秒数（如 AI_CACHE_TTL_MARKET=300），0 表示不缓存
+        AI_CACHE_DISK_PATH: 磁盘缓存 SQLite 文件路径，留空只用内存
+    """
+    global _cache
+    if not is_ai_cache_enabled():
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                page_ttls = {
+                    page: float(os.getenv(f'AI_CACHE_TTL_{page.upper()}', str(ttl)))
+                    for page, ttl in DEFAULT_PAGE_TTLS.items()
+                }
+                options = dict(
+                    max_entries=int(os.getenv('AI_CACHE_MAX_ENTRIES', '1000')),
+                    default_ttl=float(os.getenv('AI_CACHE_TTL', '600')),
+                    page_ttls=page_ttls,
+                )
+                disk_path = os.getenv('AI_CACHE_DISK_PATH') or None
+                try:
+                    _cache = AIResponseCache(disk_path=disk_path, **options)
+                except (sqlite3.Error, OSError) as e:
+                    print(f"[AIResponseCache] 磁盘缓存不可用，只使用内存缓存: {str(e)}")
+                    _cache = AIResponseCache(**options)
+    return _cache
@@ -4,14 +4,19 @@ AI服务 Service
 """
 
 from typing import Dict, Any, Optional
-from services.model_provider import ModelProvider
+from services.model_provider import ModelProvider, get_model_provider
 
 
 class AIService:
     """AI服务类，提供通用的AI能力接口"""
     
-    def __init__(self):
-        self.model_provider = ModelProvider()
+    def __init__(self, page_type: str = 'chat'):
+        self.page_type = page_type
+    
+    @property
+    def model_provider(self) -> ModelProvider:
+        """共享的模型实例，第一次调用时才创建"""
+        return get_model_provider(self.page_type)
     
     def generate_ai_response(self, prompt: str, context: Optional[Dict[str, Any]] = None) -> str:
         """
@@ -0,0 +1,348 @@
+"""
+用户行为日志冷归档
+把早于 after_days 天的原始日志从 user_behavior_logs 搬到本地列式压缩文件（utils/columnar.py），
+每天一个文件：{archive_dir}/behavior_logs_YYYYMMDD.fcol，文件内按 timestamp 升序。
+
+列编码：
+    id / timestamp：差值编码（有序，压缩率高）
+    event_type、page、element_type 等低基数列：字典编码
+    event_id、element_text、business_data 等：原样字符串
+
+归档流程（每天一次，可重复执行）：
+    1. 流式读出当天日志，与已有归档文件合并（按 id 去重）后原子写入
+    2. 重新打开文件核对行数
+    3. 从热表删除已归档的日志：当天分区内的日志与读出的一致时整分区 DROP，否则按 id 分批 DELETE
+
+已运行过行为汇总任务（compact_behavior_logs.py）或会话重建任务（build_behavior_sessions.py）时，
+只归档两个任务都已处理完的日期（取两者检查点的较小值）；
+汇总任务不再整桶重算早于 after_days 的桶（见 get_rollup_job）。
+"""
+
+import json
+import os
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from mapper.behavior_archive_mapper import ARCHIVE_COLUMNS, BehaviorArchiveMapper
+from services.behavior_partition_service import compacted_upto_id, day_upper_bound, get_partition_manager
+from utils.columnar import ColumnarReader, write_table
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ARCHIVE_DIR = os.path.join(_PROJECT_ROOT, 'instance', 'behavior_archive')
+_FILE_PREFIX = 'behavior_logs_'
+_FILE_SUFFIX = '.fcol'
+
+# 列名 -> 编码方式
+COLUMN_ENCODINGS = {
+    'id': 'int',
+    'event_id': 'str',
+    'event_type': 'dict',
+    'user_id': 'dict',
+    'session_id': 'dict',
+    'page': 'dict',
+    'page_url': 'dict',
+    'referrer': 'dict',
+    'element_type': 'dict',
+    'element_id': 'dict',
+    'element_text': 'str',
+    'element_class': 'dict',
+    'business_data': 'str',
+    'duration': 'int',
+    'scroll_depth': 'int',
+    'context_data': 'str',
+    'timestamp': 'int',
+    'created_at': 'str',
+}
+_DELTA_COLUMNS = ('id', 'timestamp')
+_JSON_COLUMNS = ('business_data', 'context_data')
+
+
+def _day_start_ms(day: date) -> int:
+    return int(datetime.combine(day, datetime.min.time()).timestamp() * 1000)
+
+
+def _to_text(value: Any) -> Optional[str]:
+    """JSON / 时间字段统一存为字符串，读取时再还原"""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _decode_value(name: str, value: Any) -> Any:
+    """还原成与 BehaviorMapper.get_user_behaviors 相同的类型"""
+    if value is None:
+        return None
+    if name in _JSON_COLUMNS:
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    if name == 'created_at':
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    return value
+
+
+class BehaviorArchive:
+    """行为日志冷归档：归档任务与归档查询
+
+    Args:
+        archive_dir: 归档文件目录
+        after_days: 事件时间早于 (今天 - after_days) 的整天日志会被归档
+        batch_size: 从数据库流式读取的批大小
+        delete_batch_size: 按 id 分批删除时每批条数
+    """
+
+    def __init__(
+        self,
+        archive_dir: str = DEFAULT_ARCHIVE_DIR,
+        after_days: int = 3,
+        batch_size: int = 2000,
+        delete_batch_size: int = 5000,
+    ):
+        self.archive_dir = archive_dir
+        self.after_days = max(1, after_days)
+        self.batch_size = batch_size
+        self.delete_batch_size = delete_batch_size
+
+    # ---------- 文件 ----------
+
+    def archive_path(self, day: date) -> str:
+        return os.path.join(self.archive_dir, f"{_FILE_PREFIX}{day.strftime('%Y%m%d')}{_FILE_SUFFIX}")
+
+    def list_archive_days(self) -> List[date]:
+        """已归档的日期（升序）"""
+        if not os.path.isdir(self.archive_dir):
+            return []
+        days = []
+        for name in os.listdir(self.archive_dir):
+            if name.startswith(_FILE_PREFIX) and name.endswith(_FILE_SUFFIX):
+                try:
+                    days.append(datetime.strptime(name[len(_FILE_PREFIX):-len(_FILE_SUFFIX)], '%Y%m%d').date())
+                except ValueError:
+                    continue
+        return sorted(days)
+
+    def _write_day(self, day: date, rows: List[Dict[str, Any]]) -> int:
+        rows.sort(key=lambda row: (row['timestamp'], row['id']))
+        columns = {
+            name: {
+                'encoding': encoding,
+                'values': [row.get(name) for row in rows],
+                'delta': name in _DELTA_COLUMNS,
+            }
+            for name, encoding in COLUMN_ENCODINGS.items()
+        }
+        meta = {
+            'day': day.isoformat(),
+            'min_timestamp': rows[0]['timestamp'],
+            'max_timestamp': rows[-1]['timestamp'],
+            'max_id': max(row['id'] for row in rows),
+            'archived_at': datetime.now().isoformat(sep=' ', timespec='seconds'),
+        }
+        return write_table(self.archive_path(day), columns, len(rows), meta=meta)
+
+    # ---------- 归档任务 ----------
+
+    def archive_day(self, day: date, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        归档某一天的日志
+
+        Returns:
+            {'day', 'rows', 'bytes', 'deleted', 'skipped'（跳过原因，未跳过为 None）}
+        """
+        result = {'day': day.isoformat(), 'rows': 0, 'bytes': 0, 'deleted': 0, 'skipped': None}
+        start_ms, end_ms = _day_start_ms(day), day_upper_bound(day)
+        rows = []
+        for row in BehaviorArchiveMapper.iter_logs_between(start_ms, end_ms, batch_size=self.batch_size):
+            row = {name: row[name] for name in ARCHIVE_COLUMNS}
+            for name in _JSON_COLUMNS + ('created_at',):
+                row[name] = _to_text(row[name])
+            rows.append(row)
+        if not rows:
+            return result
+
+        max_id = max(row['id'] for row in rows)
+        safe_id = compacted_upto_id()
+        if safe_id is not None and max_id > safe_id:
+            result['skipped'] = '尚未完成天级汇总或会话重建'
+            return result
+        result['rows'] = len(rows)
+        if dry_run:
+            return result
+
+        # 与已有归档合并（晚到日志、上次删除中断等情况）
+        path = self.archive_path(day)
+        merged = rows
+        if os.path.exists(path):
+            archived = ColumnarReader(path).read(COLUMN_ENCODINGS)
+            new_ids = {row['id'] for row in rows}
+            merged = rows + [row for row in archived if row['id'] not in new_ids]
+        result['bytes'] = self._write_day(day, merged)
+        if ColumnarReader(path).rows != len(merged):
+            raise RuntimeError(f"归档文件校验失败: {path}")
+
+        # 从热表删除：分区内恰好是刚归档的这些日志时整分区删除
+        summary = BehaviorArchiveMapper.get_range_summary(start_ms, end_ms)
+        if summary['rows'] == len(rows) and summary['max_id'] == max_id:
+            manager = get_partition_manager()
+            if manager.is_partitioned() and manager.drop_day_partition(day):
+                result['deleted'] = len(rows)
+                return result
+        while True:
+            deleted = BehaviorArchiveMapper.delete_archived_logs(
+                start_ms, end_ms, max_id, limit=self.delete_batch_size
+            )
+            if not deleted:
+                break
+            result['deleted'] += deleted
+        return result
+
+    def run(self, dry_run: bool = False, max_days: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        归档热表中早于 (今天 - after_days) 的所有整天日志，从最早的一天开始
+
+        Args:
+            dry_run: 只统计不写文件、不删除
+            max_days: 本次最多归档的天数
+
+        Returns:
+            每天的归档结果
+        """
+        oldest = BehaviorArchiveMapper.get_oldest_log_timestamp()
+        if oldest is None:
+            return []
+        cutoff_day = date.today() - timedelta(days=self.after_days)
+        day = datetime.fromtimestamp(oldest / 1000).date()
+        results = []
+        while day < cutoff_day and (max_days is None or len(results) < max_days):
+            result = self.archive_day(day, dry_run=dry_run)
+            results.append(result)
+            if result['skipped']:
+                # 之后的日期同样未汇总
+                print(f"[BehaviorArchive] {day.isoformat()} {result['skipped']}，停止归档")
+                break
+            if result['rows'] and not dry_run:
+                print(f"[BehaviorArchive] {day.isoformat()} 已归档 {result['rows']} 条 "
+                      f"（{result['bytes']} 字节），热表删除 {result['deleted']} 条")
+            day += timedelta(days=1)
+        return results
+
+    # ---------- 查询 ----------
+
+    def query(
+        self,
+        user_id: str,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        event_type: Optional[str] = None,
+        page: Optional[str] = None,
+        limit: int = 100,
+        fields: Optional[Iterable[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        查询归档日志，参数与返回格式同 BehaviorMapper.get_user_behaviors（按 timestamp 倒序）
+
+        按文件名日期和文件头时间范围跳过不相关的文件，文件内按有序的 timestamp 二分定位；
+        只解压过滤与返回需要的列。
+
+        Args:
+            fields: 返回的字段，默认全部
+
+        Returns:
+            行为日志列表
+        """
+        fields = list(fields or ARCHIVE_COLUMNS)
+        unknown = [name for name in fields if name not in COLUMN_ENCODINGS]
+        if unknown:
+            raise ValueError(f"未知字段: {', '.join(unknown)}")
+
+        results: List[Dict[str, Any]] = []
+        for day in reversed(self.list_archive_days()):
+            if len(results) >= limit:
+                break
+            if end_time and _day_start_ms(day) > end_time:
+                continue
+            if start_time and day_upper_bound(day) <= start_time:
+                break
+
+            reader = ColumnarReader(self.archive_path(day))
+            if (end_time and reader.meta.get('min_timestamp', 0) > end_time) or \
+                    (start_time and reader.meta.get('max_timestamp', start_time) < start_time):
+                continue
+
+            filters = []
+            for name, value in (('user_id', user_id), ('event_type', event_type), ('page', page)):
+                if name == 'user_id' or value:
+                    column = reader.column(name)
+                    code = column.code_of(value)
+                    if code is None:
+                        break
+                    filters.append((column.codes, code))
+            else:
+                timestamps = reader.column('timestamp')
+                lo = bisect_left(timestamps, start_time) if start_time else 0
+                hi = bisect_right(timestamps, end_time) if end_time else reader.rows
+                matched = []
+                for index in range(hi - 1, lo - 1, -1):
+                    if all(codes[index] == code for codes, code in filters):
+                        matched.append(index)
+                        if len(results) + len(matched) >= limit:
+                            break
+                if matched:
+                    columns = {name: reader.column(name) for name in fields}
+                    for index in matched:
+                        results.append({name: _decode_value(name, columns[name][index]) for name in fields})
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """归档文件概况"""
+        files = []
+        for day in self.list_archive_days():
+            path = self.archive_path(day)
+            reader = ColumnarReader(path)
+            raw_bytes = sum(column['raw_length'] for column in reader.columns.values())
+            files.append({
+                'day': day.isoformat(),
+                'rows': reader.rows,
+                'bytes': os.path.getsize(path),
+                'raw_bytes': raw_bytes,
+            })
+        return {
+            'archive_dir': self.archive_dir,
+            'after_days': self.after_days,
+            'files': files,
+            'rows': sum(item['rows'] for item in files),
+            'bytes': sum(item['bytes'] for item in files),
+        }
+
+
+def get_archive_after_days() -> int:
+    """环境变量 BEHAVIOR_ARCHIVE_AFTER_DAYS：早于该天数的日志归档，默认 3"""
+    return max(1, int(os.getenv('BEHAVIOR_ARCHIVE_AFTER_DAYS', '3')))
+
+
+def get_behavior_archive() -> BehaviorArchive:
+    """
+    按环境变量创建冷归档
+
+    环境变量:
+        BEHAVIOR_ARCHIVE_DIR: 归档目录，默认 instance/behavior_archive
+        BEHAVIOR_ARCHIVE_AFTER_DAYS: 早于该天数的日志归档，默认 3（应小于 BEHAVIOR_LOG_RETENTION_DAYS）
+    """
+    return BehaviorArchive(
+        archive_dir=os.getenv('BEHAVIOR_ARCHIVE_DIR') or DEFAULT_ARCHIVE_DIR,
+        after_days=get_archive_after_days(),
+    )
+
+
+def query_archived_behaviors(user_id: str, **kwargs) -> List[Dict[str, Any]]:
+    """查询归档日志，参数同 BehaviorArchive.query"""
+    return get_behavior_archive().query(user_id, **kwargs)
@@ -0,0 +1,335 @@
+"""
+用户行为增量计数
+行为日志经 BehaviorMapper.batch_insert_logs 写入成功后（只通知实际新写入的事件，
+重复提交的事件不计入），按 用户 × 日期 × 事件类型 × 页面在内存中累加计数、停留时长与会话，定期把增量叠加到汇总表
+（user_behavior_daily_counters / user_behavior_daily_sessions）。
+
+行为统计与日志分析读取汇总表中的计数桶并合并内存中尚未落库的增量，
+耗时与桶数量相关，与原始日志条数无关。
+"""
+
+import atexit
+import os
+import threading
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from mapper.behavior_mapper import BehaviorMapper
+from mapper.behavior_stats_mapper import BehaviorStatsMapper
+from utils.db import use_primary
+
+# (日期, 事件类型, 页面) -> [事件数, 停留时长合计, 最近事件时间戳]
+_BucketKey = Tuple[date, str, str]
+
+# 读取统计时乐观重试的次数，之后等待落库结束再读
+_SNAPSHOT_ATTEMPTS = 3
+
+
+class BehaviorCounters:
+    """用户行为计数器
+
+    Args:
+        flush_interval: 增量落库间隔（秒），0 表示每次写入后同步落库
+        max_pending: 内存中待落库的计数桶上限，超出后立即触发落库
+    """
+
+    def __init__(self, flush_interval: float = 10, max_pending: int = 50000):
+        self.flush_interval = max(0.0, flush_interval)
+        self.max_pending = max(1, max_pending)
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[str, Dict[_BucketKey, List[int]]] = {}
+        self._pending_sessions: Dict[str, Set[Tuple[date, str]]] = {}
+        self._pending_buckets = 0
+        # 正在落库的增量（落库期间的读取会等待落库结束，见 get_user_stats）
+        self._flushing: Dict[str, Dict[_BucketKey, List[int]]] = {}
+        self._flushing_sessions: Dict[str, Set[Tuple[date, str]]] = {}
+        # 落库序号：开始与结束落库时各加 1，奇数表示正在落库
+        self._flush_epoch = 0
+
+        self._thread = None
+        self._pid = None
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+
+        # 统计信息
+        self._ingested_total = 0
+        self._flushes_total = 0
+        self._flushed_buckets = 0
+        self._failed_flushes = 0
+        self._last_error = None
+
+    def ingest(self, events: List[Dict[str, Any]]) -> None:
+        """累加一批已写入的事件（同批内重复的 event_id 只计一次）"""
+        seen = set()
+        counted = 0
+        with self._lock:
+            for event in events:
+                user_id = event.get('user_id')
+                event_id = event.get('event_id')
+                if not user_id or event_id in seen:
+                    continue
+                seen.add(event_id)
+                timestamp = int(event.get('timestamp') or 0)
+                day = datetime.fromtimestamp(timestamp / 1000).date()
+                key = (day, str(event.get('event_type')), event.get('page') or '')
+
+                buckets = self._pending.setdefault(user_id, {})
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = [0, 0, 0]
+                    self._pending_buckets += 1
+                bucket[0] += 1
+                bucket[1] += _as_int(event.get('duration'))
+                bucket[2] = max(bucket[2], timestamp)
+
+                if event.get('session_id'):
+                    self._pending_sessions.setdefault(user_id, set()).add((day, str(event['session_id'])))
+                counted += 1
+            self._ingested_total += counted
+            overflow = self._pending_buckets >= self.max_pending
+
+        if self.flush_interval == 0 or self._stopping.is_set():
+            # 无后台线程（或进程退出中，如写缓冲排空时）直接落库
+            self.flush()
+        else:
+            self._ensure_started()
+            if overflow:
+                self._wakeup.set()
+
+    def flush(self) -> int:
+        """把内存增量叠加到汇总表；失败时增量放回内存，下次重试
+
+        Returns:
+            落库的计数桶数
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending and not self._pending_sessions:
+                    return 0
+                self._flushing, self._pending = self._pending, {}
+                self._flushing_sessions, self._pending_sessions = self._pending_sessions, {}
+                self._pending_buckets = 0
+                self._flush_epoch += 1
+                flushing, flushing_sessions = self._flushing, self._flushing_sessions
+
+            counter_rows = [
+                (user_id, day, event_type, page, bucket[0], bucket[1], bucket[2])
+                for user_id, buckets in flushing.items()
+                for (day, event_type, page), bucket in buckets.items()
+            ]
+            session_rows = [
+                (user_id, day, session_id)
+                for user_id, sessions in flushing_sessions.items()
+                for day, session_id in sessions
+            ]
+            try:
+                BehaviorStatsMapper.apply_deltas(counter_rows, session_rows)
+            except Exception as e:
+                self._failed_flushes += 1
+                self._last_error = str(e)
+                print(f"[BehaviorCounters] 计数落库失败，增量保留在内存中: {str(e)}")
+                with self._lock:
+                    self._merge_back(flushing, flushing_sessions)
+                    self._flushing, self._flushing_sessions = {}, {}
+                    self._flush_epoch += 1
+                return 0
+
+            with self._lock:
+                self._flushing, self._flushing_sessions = {}, {}
+                self._flush_epoch += 1
+            self._flushes_total += 1
+            self._flushed_buckets += len(counter_rows)
+            return len(counter_rows)
+
+    def get_user_stats(self, user_id: str, days: int = 7) -> Dict[str, Any]:
+        """
+        获取用户最近 days 个自然日（含今天）的行为统计
+
+        汇总表与内存增量须是同一时刻的快照：读库期间若有落库开始或结束（落库序号变化），
+        已落库的增量可能被重复计入或漏计，此时重新读取；多次不成功则持有落库锁读取。
+
+        Args:
+            user_id: 用户ID
+            days: 统计天数
+
+        Returns:
+            统计结果，字段与 BehaviorMapper.get_user_behavior_stats 一致，
+            另含 total_sessions、total_duration、last_timestamp
+        """
+        days = max(1, int(days))
+        start_date = date.today() - timedelta(days=days - 1)
+
+        snapshot = None
+        for _ in range(_SNAPSHOT_ATTEMPTS):
+            with self._lock:
+                epoch = self._flush_epoch
+            if epoch % 2:
+                break
+            buckets, sessions = self._read_persisted(user_id, start_date)
+            with self._lock:
+                if self._flush_epoch == epoch:
+                    self._add_pending(user_id, start_date, buckets, sessions)
+                    snapshot = buckets, sessions
+                    break
+        if snapshot is None:
+            # 正在落库或落库频繁：等当前落库结束，读取期间不会有新的落库
+            with self._flush_lock:
+                buckets, sessions = self._read_persisted(user_id, start_date)
+                with self._lock:
+                    self._add_pending(user_id, start_date, buckets, sessions)
+
+        event_type_stats: Dict[str, int] = {}
+        page_stats: Dict[str, int] = {}
+        total_events = 0
+        total_duration = 0
+        last_timestamp = 0
+        for (_, event_type, page), (count, duration, latest) in buckets.items():
+            total_events += count
+            total_duration += duration
+            last_timestamp = max(last_timestamp, latest)
+            event_type_stats[event_type] = event_type_stats.get(event_type, 0) + count
+            page = page or 'unknown'
+            page_stats[page] = page_stats.get(page, 0) + count
+
+        return {
+            'total_events': total_events,
+            'total_sessions': len(sessions),
+            'total_duration': total_duration,
+            'event_type_stats': event_type_stats,
+            'page_stats': page_stats,
+            'last_timestamp': last_timestamp or None,
+            'days': days
+        }
+
+    @staticmethod
+    def _read_persisted(user_id: str, start_date: date) -> Tuple[Dict[_BucketKey, List[int]], Set[str]]:
+        """从主库读取已落库的计数桶与会话（副本延迟会漏掉刚落库的增量）"""
+        buckets: Dict[_BucketKey, List[int]] = {}
+        with use_primary():
+            for row in BehaviorStatsMapper.get_daily_counters(user_id, start_date):
+                key = (_as_date(row['stat_date']), row['event_type'], row['page'])
+                buckets[key] = [int(row['event_count']), int(row['total_duration']), int(row['last_timestamp'])]
+            sessions = set(BehaviorStatsMapper.get_session_ids(user_id, start_date))
+        return buckets, sessions
+
+    def _add_pending(self, user_id: str, start_date: date,
+                     buckets: Dict[_BucketKey, List[int]], sessions: Set[str]) -> None:
+        """叠加尚未落库的内存增量（调用方持有 _lock，且没有正在进行的落库）"""
+        for key, bucket in self._pending.get(user_id, {}).items():
+            if key[0] >= start_date:
+                _add_bucket(buckets, key, bucket)
+        sessions.update(session_id for day, session_id in self._pending_sessions.get(user_id, ()) if day >= start_date)
+
+    def close(self) -> None:
+        """停止后台落库线程并落库剩余增量"""
+        self._stopping.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(5)
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """返回计数器实时统计"""
+        with self._lock:
+            pending_users = len(self._pending)
+            pending_buckets = self._pending_buckets
+        return {
+            'pending_users': pending_users,
+            'pending_buckets': pending_buckets,
+            'flush_interval_s': self.flush_interval,
+            'ingested_total': self._ingested_total,
+            'flushes_total': self._flushes_total,
+            'flushed_buckets': self._flushed_buckets,
+            'failed_flushes': self._failed_flushes,
+            'last_error': self._last_error,
+        }
+
+    def _merge_back(self, buckets_by_user, sessions_by_user) -> None:
+        """把落库失败的增量合并回待落库增量（调用方持有 _lock）"""
+        for user_id, buckets in buckets_by_user.items():
+            target = self._pending.setdefault(user_id, {})
+            for key, bucket in buckets.items():
+                if key not in target:
+                    self._pending_buckets += 1
+                _add_bucket(target, key, bucket)
+        for user_id, sessions in sessions_by_user.items():
+            self._pending_sessions.setdefault(user_id, set()).update(sessions)
+
+    def _ensure_started(self) -> None:
+        """首次写入时启动后台落库线程；fork 出的子进程重新启动"""
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == pid and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name='behavior-counters', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._stopping.is_set():
+                return
+            self.flush()
+
+
+def _as_int(value: Any) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _as_date(value: Any) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _add_bucket(buckets: Dict[_BucketKey, List[int]], key: _BucketKey, bucket: List[int]) -> None:
+    target = buckets.get(key)
+    if target is None:
+        buckets[key] = list(bucket)
+    else:
+        target[0] += bucket[0]
+        target[1] += bucket[1]
+        target[2] = max(target[2], bucket[2])
+
+
+_counters: Optional[BehaviorCounters] = None
+_counters_lock = threading.Lock()
+
+
+def get_behavior_counters() -> BehaviorCounters:
+    """获取全局行为计数器
+
+    环境变量:
+        BEHAVIOR_COUNTERS_FLUSH_INTERVAL: 增量落库间隔（秒），默认 10；Vercel 环境默认 0（同步落库）
+        BEHAVIOR_COUNTERS_MAX_PENDING: 待落库计数桶上限，默认 50000
+    """
+    global _counters
+    if _counters is None:
+        with _counters_lock:
+            if _counters is None:
+                default_interval = '0' if os.getenv('VERCEL') else '10'
+                _counters = BehaviorCounters(
+                    flush_interval=float(os.getenv('BEHAVIOR_COUNTERS_FLUSH_INTERVAL', default_interval)),
+                    max_pending=int(os.getenv('BEHAVIOR_COUNTERS_MAX_PENDING', '50000')),
+                )
+                atexit.register(_counters.close)
+    return _counters
+
+
+def _on_ingested(events: List[Dict[str, Any]]) -> None:
+    get_behavior_counters().ingest(events)
+
+
+BehaviorMapper.add_ingest_listener(_on_ingested)
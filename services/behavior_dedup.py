@@ -0,0 +1,261 @@
+"""
+行为日志去重
+前端 BehaviorTracker 上报失败会整批重试，重复事件原本要到 MySQL 唯一键 (event_id, timestamp)
+才被忽略，每条都要一次索引探测和写入往返。这里在写入前按相同的键在内存中过滤：
+
+    精确集合：最近 exact_ttl 秒内已写入成功的键（有上限的 LRU），命中即确定重复，直接丢弃
+    轮转布隆过滤器：更长的 window 秒内写入过的键，按 generations 代轮转淘汰；
+                   只命中布隆过滤器时无法确定，照常写入，由数据库唯一键兜底
+
+只有写入成功（BehaviorMapper 写入回调）的事件才会登记，写入失败后客户端重试不会被误丢。
+去重状态只在当前进程内有效，多进程部署时各进程独立，仍由唯一键保证最终不重复。
+"""
+
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from mapper.behavior_mapper import BehaviorMapper
+
+
+def dedup_key(event: Dict[str, Any]) -> Optional[str]:
+    """与数据库唯一键 (event_id, timestamp) 对应的去重键；缺少 event_id 时返回 None"""
+    event_id = event.get('event_id')
+    if not event_id:
+        return None
+    return f"{event_id}|{event.get('timestamp')}"
+
+
+class BloomFilter:
+    """定长布隆过滤器（双重哈希）
+
+    Args:
+        capacity: 预计写入的键数量
+        error_rate: 达到 capacity 时的误判率
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.num_bits = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RotatingBloomFilter:
+    """按时间窗口轮转的布隆过滤器
+
+    保留 generations 代过滤器，每代最长 window / generations 秒或写满 capacity 后新建一代，
+    最老的一代被丢弃，因此过滤器覆盖最近约 window 秒写入的键，内存恒定。
+
+    Args:
+        window: 时间窗口（秒）
+        capacity: 每代容量
+        error_rate: 每代误判率
+        generations: 代数
+    """
+
+    def __init__(self, window: float = 3600, capacity: int = 1000000,
+                 error_rate: float = 0.001, generations: int = 2):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.generations = max(2, generations)
+        self.rotate_after = window / self.generations
+        self._filters = [BloomFilter(capacity, error_rate)]
+        self._started_at = time.monotonic()
+        self.rotations = 0
+
+    def _maybe_rotate(self) -> None:
+        current = self._filters[-1]
+        if current.count < self.capacity and time.monotonic() - self._started_at < self.rotate_after:
+            return
+        self._filters.append(BloomFilter(self.capacity, self.error_rate))
+        if len(self._filters) > self.generations:
+            self._filters.pop(0)
+        self._started_at = time.monotonic()
+        self.rotations += 1
+
+    def add(self, key: str) -> None:
+        self._maybe_rotate()
+        self._filters[-1].add(key)
+
+    def __contains__(self, key: str) -> bool:
+        return any(key in bloom for bloom in reversed(self._filters))
+
+    def stats(self) -> Dict[str, Any]:
+        current = self._filters[-1]
+        return {
+            'generations': len(self._filters),
+            'rotations': self.rotations,
+            'current_count': current.count,
+            'bits_per_generation': current.num_bits,
+            'hashes': current.num_hashes,
+            'memory_bytes': sum(len(bloom.bits) for bloom in self._filters),
+        }
+
+
+class BehaviorDedup:
+    """行为事件写入前去重
+
+    Args:
+        window: 布隆过滤器时间窗口（秒）
+        capacity: 布隆过滤器每代容量
+        error_rate: 布隆过滤器误判率
+        exact_ttl: 精确集合保留时间（秒）
+        exact_max: 精确集合最多保留的键数量
+    """
+
+    def __init__(self, window: float = 3600, capacity: int = 1000000, error_rate: float = 0.001,
+                 exact_ttl: float = 600, exact_max: int = 200000):
+        self.exact_ttl = exact_ttl
+        self.exact_max = max(1, exact_max)
+        self._bloom = RotatingBloomFilter(window=window, capacity=capacity, error_rate=error_rate)
+        # 键 -> 登记时间（单调时钟），按登记顺序排列
+        self._exact: 'OrderedDict[str, float]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self._checked_total = 0
+        self._dropped_total = 0
+        self._batch_duplicates = 0
+        self._uncertain_total = 0
+        self._recorded_total = 0
+
+    def _expire(self, now: float) -> None:
+        deadline = now - self.exact_ttl
+        while self._exact:
+            recorded_at = next(iter(self._exact.values()))
+            if recorded_at > deadline and len(self._exact) <= self.exact_max:
+                break
+            self._exact.popitem(last=False)
+
+    def filter(self, events: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        过滤确定重复的事件（最近已写入，或与同批前面的事件重复）
+
+        Args:
+            events: 待写入的事件
+
+        Returns:
+            (需要写入的事件, 丢弃的重复条数)
+        """
+        fresh = []
+        batch_keys = set()
+        dropped = 0
+        with self._lock:
+            self._expire(time.monotonic())
+            for event in events:
+                key = dedup_key(event)
+                if key is None:
+                    fresh.append(event)
+                    continue
+                if key in batch_keys:
+                    self._batch_duplicates += 1
+                    dropped += 1
+                    continue
+                if key in self._exact:
+                    dropped += 1
+                    continue
+                if key in self._bloom:
+                    # 可能重复（误判或超出精确集合范围），交给唯一键判断
+                    self._uncertain_total += 1
+                batch_keys.add(key)
+                fresh.append(event)
+            self._checked_total += len(events)
+            self._dropped_total += dropped
+        return fresh, dropped
+
+    def record(self, events: List[Dict[str, Any]]) -> None:
+        """登记已写入成功的事件"""
+        now = time.monotonic()
+        with self._lock:
+            for event in events:
+                key = dedup_key(event)
+                if key is None:
+                    continue
+                self._exact[key] = now
+                self._exact.move_to_end(key)
+                self._bloom.add(key)
+                self._recorded_total += 1
+            self._expire(now)
+
+    def stats(self) -> Dict[str, Any]:
+        """去重统计"""
+        with self._lock:
+            checked = self._checked_total
+            return {
+                'checked_total': checked,
+                'dropped_total': self._dropped_total,
+                'batch_duplicates': self._batch_duplicates,
+                'uncertain_total': self._uncertain_total,
+                'recorded_total': self._recorded_total,
+                'duplicate_rate': round(self._dropped_total / checked, 4) if checked else 0.0,
+                'uncertain_rate': round(self._uncertain_total / checked, 4) if checked else 0.0,
+                'exact_size': len(self._exact),
+                'exact_ttl': self.exact_ttl,
+                'bloom': self._bloom.stats(),
+            }
+
+
+def is_dedup_enabled() -> bool:
+    """环境变量 BEHAVIOR_DEDUP：是否启用写入前去重，默认启用"""
+    return os.getenv('BEHAVIOR_DEDUP', '1').lower() not in ('0', 'false', 'no', 'off')
+
+
+_dedup: Optional[BehaviorDedup] = None
+_dedup_lock = threading.Lock()
+
+
+def get_behavior_dedup() -> Optional[BehaviorDedup]:
+    """获取全局去重器，未启用时返回 None
+
+    环境变量:
+        BEHAVIOR_DEDUP: 是否启用，默认 1
+        BEHAVIOR_DEDUP_WINDOW: 布隆过滤器时间窗口（秒），默认 3600
+        BEHAVIOR_DEDUP_CAPACITY: 布隆过滤器每代容量，默认 1000000
+        BEHAVIOR_DEDUP_ERROR_RATE: 布隆过滤器误判率，默认 0.001
+        BEHAVIOR_DEDUP_EXACT_TTL: 精确集合保留时间（秒），默认 600
+        BEHAVIOR_DEDUP_EXACT_MAX: 精确集合最大键数量，默认 200000
+    """
+    global _dedup
+    if not is_dedup_enabled():
+        return None
+    if _dedup is None:
+        with _dedup_lock:
+            if _dedup is None:
+                _dedup = BehaviorDedup(
+                    window=float(os.getenv('BEHAVIOR_DEDUP_WINDOW', '3600')),
+                    capacity=int(os.getenv('BEHAVIOR_DEDUP_CAPACITY', '1000000')),
+                    error_rate=float(os.getenv('BEHAVIOR_DEDUP_ERROR_RATE', '0.001')),
+                    exact_ttl=float(os.getenv('BEHAVIOR_DEDUP_EXACT_TTL', '600')),
+                    exact_max=int(os.getenv('BEHAVIOR_DEDUP_EXACT_MAX', '200000')),
+                )
+    return _dedup
+
+
+def _on_ingested(events: List[Dict[str, Any]]) -> None:
+    dedup = get_behavior_dedup()
+    if dedup is not None:
+        dedup.record(events)
+
+
+BehaviorMapper.add_ingest_listener(_on_ingested)
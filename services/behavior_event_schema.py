@@ -0,0 +1,88 @@
+"""
+行为事件校验规则
+EVENT_SCHEMA 声明字段类型、必填、长度与取值范围（与 user_behavior_logs 列定义一致），
+compile_schema 在导入时把规则生成为一个 Python 函数，校验单个事件只需一次函数调用，
+不再逐字段查表或解释规则。超长会导致整批插入失败，因此长度按列宽校验。
+"""
+
+from typing import Any, Callable, Dict, Optional
+
+# 字段 -> 规则：type(string|integer|object)、required、max_length、truncate、minimum、maximum
+EVENT_SCHEMA: Dict[str, Dict[str, Any]] = {
+    'event_id': {'type': 'string', 'required': True, 'max_length': 64},
+    'event_type': {'type': 'string', 'required': True, 'max_length': 50},
+    # 2020年-2030年
+    'timestamp': {'type': 'integer', 'required': True, 'minimum': 1577836800000, 'maximum': 1893456000000},
+    'user_id': {'type': 'string', 'max_length': 50},
+    'session_id': {'type': 'string', 'max_length': 100},
+    'page': {'type': 'string', 'max_length': 50},
+    'page_url': {'type': 'string', 'max_length': 255},
+    'referrer': {'type': 'string', 'max_length': 255},
+    'element_type': {'type': 'string', 'max_length': 50},
+    'element_id': {'type': 'string', 'max_length': 100},
+    # 元素文本只用于展示分析，超长截断而不是拒绝
+    'element_text': {'type': 'string', 'max_length': 200, 'truncate': True},
+    'element_class': {'type': 'string', 'max_length': 200},
+    'duration': {'type': 'integer', 'minimum': 0, 'maximum': 2 ** 31 - 1},
+    'scroll_depth': {'type': 'integer', 'minimum': 0, 'maximum': 2 ** 31 - 1},
+    'context': {'type': 'object'},
+}
+
+_TYPE_CHECKS = {
+    'string': ('str', '字符串'),
+    # bool 是 int 的子类，用 type() 精确匹配排除 true/false
+    'integer': ('int', '整数'),
+    'object': ('dict', '对象'),
+}
+
+
+def compile_schema(schema: Dict[str, Dict[str, Any]]) -> Callable[[Any], Optional[str]]:
+    """
+    把校验规则生成为校验函数
+
+    Args:
+        schema: 字段规则
+
+    Returns:
+        validate(event) -> 错误信息，校验通过返回 None（truncate 字段会被原地截断）
+    """
+    lines = [
+        "def validate(event):",
+        "    if type(event) is not dict:",
+        "        return '事件必须是JSON对象'",
+    ]
+    for field, rule in schema.items():
+        type_name, type_label = _TYPE_CHECKS[rule['type']]
+        lines.append(f"    v = event.get({field!r})")
+        if rule.get('required'):
+            lines.append("    if v is None:")
+            lines.append(f"        return {'缺少必填字段: ' + field!r}")
+            indent = "    "
+        else:
+            lines.append("    if v is not None:")
+            indent = "        "
+        lines.append(f"{indent}if type(v) is not {type_name}:")
+        lines.append(f"{indent}    return {field + ' 必须是' + type_label!r}")
+        if 'max_length' in rule:
+            max_length = int(rule['max_length'])
+            lines.append(f"{indent}if len(v) > {max_length}:")
+            if rule.get('truncate'):
+                lines.append(f"{indent}    event[{field!r}] = v[:{max_length}]")
+            else:
+                lines.append(f"{indent}    return {f'{field} 超过最大长度 {max_length}'!r}")
+        if 'minimum' in rule:
+            minimum = int(rule['minimum'])
+            lines.append(f"{indent}if v < {minimum}:")
+            lines.append(f"{indent}    return {f'{field} 小于最小值 {minimum}'!r}")
+        if 'maximum' in rule:
+            maximum = int(rule['maximum'])
+            lines.append(f"{indent}if v > {maximum}:")
+            lines.append(f"{indent}    return {f'{field} 大于最大值 {maximum}'!r}")
+    lines.append("    return None")
+
+    namespace: Dict[str, Any] = {}
+    exec(compile("\n".join(lines), '<behavior_event_schema>', 'exec'), namespace)
+    return namespace['validate']
+
+
+validate_behavior_event = compile_schema(EVENT_SCHEMA)
@@ -0,0 +1,243 @@
+"""
+行为日志流式导入
+/api/behavior/ingest 的请求体为 NDJSON（每行一个事件），可 gzip / deflate 压缩，
+也兼容 navigator.sendBeacon 发出的 JSON 数组或 {"events": [...]} 载荷（整体视为一行）。
+
+请求体按块读取、边解压边切行（只在新读到的块中查找换行，未结束的行累积在缓冲区，
+单行长度另有上限 max_line_bytes），每行解析后用预编译的校验函数校验，
+通过的事件攒满 batch_size 条就经去重后进入写缓冲（未启用时同步批量插入），
+内存占用与请求体大小无关；被拒绝的行逐行返回原因。
+"""
+
+import json
+import os
+import zlib
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from mapper.behavior_mapper import behavior_mapper
+from services.behavior_dedup import get_behavior_dedup
+from services.behavior_event_schema import validate_behavior_event
+from services.behavior_write_buffer import get_behavior_write_buffer
+
+READ_CHUNK_SIZE = 64 * 1024
+# 返回的逐行拒绝信息条数上限
+MAX_REPORTED_ERRORS = 100
+
+
+class IngestTooLargeError(Exception):
+    """解压后的请求体、单行长度或事件数超过上限"""
+
+
+class UnsupportedEncodingError(Exception):
+    """不支持的压缩格式"""
+
+
+def _decompressor(encoding: Optional[str]):
+    """按 Content-Encoding 创建解压器，未压缩返回 None"""
+    encoding = (encoding or 'identity').strip().lower()
+    if encoding in ('', 'identity'):
+        return None
+    if encoding in ('gzip', 'x-gzip'):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == 'deflate':
+        # HTTP 的 deflate 即 zlib 格式；部分客户端发送裸 deflate，由 _RawDeflateFallback 兜底
+        return _RawDeflateFallback()
+    raise UnsupportedEncodingError(f"不支持的压缩格式: {encoding}")
+
+
+class _RawDeflateFallback:
+    """先按 zlib 格式解压，首块头部不合法时改用裸 deflate"""
+
+    def __init__(self):
+        self._inner = zlib.decompressobj(zlib.MAX_WBITS)
+        self._started = False
+
+    def decompress(self, data: bytes, max_length: int = 0) -> bytes:
+        if not self._started:
+            self._started = True
+            try:
+                return self._inner.decompress(data, max_length)
+            except zlib.error:
+                self._inner = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._inner.decompress(data, max_length)
+
+    @property
+    def unconsumed_tail(self) -> bytes:
+        return self._inner.unconsumed_tail
+
+    def flush(self) -> bytes:
+        return self._inner.flush()
+
+
+class BehaviorIngestor:
+    """一次流式导入的状态
+
+    Args:
+        batch_size: 每批写入条数
+        max_bytes: 解压后请求体字节数上限
+        max_events: 单次导入事件数上限
+        max_line_bytes: 单行字节数上限（整行需读入内存后才能解析）
+    """
+
+    def __init__(self, batch_size: int = 500, max_bytes: int = 16 * 1024 * 1024, max_events: int = 10000,
+                 max_line_bytes: int = 1024 * 1024):
+        self.batch_size = max(1, batch_size)
+        self.max_bytes = max_bytes
+        self.max_events = max_events
+        self.max_line_bytes = max_line_bytes
+
+        self._write_buffer = get_behavior_write_buffer()
+        self._dedup = get_behavior_dedup()
+        self._batch: List[Dict[str, Any]] = []
+        self._line_no = 0
+        self._bytes = 0
+        # 尚未遇到换行的行尾部分
+        self._partial = bytearray()
+
+        self.received = 0
+        self.accepted = 0
+        self.duplicates = 0
+        self.written = 0
+        self.rejected = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    # ---------- 读取 ----------
+
+    def feed_stream(self, stream: BinaryIO, encoding: Optional[str] = None) -> None:
+        """按块读取请求体并逐行处理，结束后写入剩余事件"""
+        decompressor = _decompressor(encoding)
+        while True:
+            chunk = stream.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            if decompressor is None:
+                self._feed_bytes(chunk)
+                continue
+            data = chunk
+            while data:
+                # 限制单次解压输出，防止压缩炸弹一次性展开
+                self._feed_bytes(decompressor.decompress(data, READ_CHUNK_SIZE))
+                data = decompressor.unconsumed_tail
+        if decompressor is not None:
+            self._feed_bytes(decompressor.flush())
+        if self._partial.strip():
+            self._handle_line(bytes(self._partial))
+        self._partial.clear()
+        self.flush()
+
+    def _feed_bytes(self, data: bytes) -> None:
+        """处理新读到的一块数据中的完整行，末尾不完整的部分累积到 _partial"""
+        self._bytes += len(data)
+        if self._bytes > self.max_bytes:
+            raise IngestTooLargeError(f"请求体超过 {self.max_bytes} 字节")
+        start = 0
+        while True:
+            end = data.find(b'\n', start)
+            if end < 0:
+                break
+            if self._partial:
+                self._partial += data[start:end]
+                line = bytes(self._partial)
+                self._partial.clear()
+            else:
+                line = data[start:end]
+            if line.strip():
+                self._handle_line(line)
+            start = end + 1
+        if start < len(data):
+            self._partial += data[start:]
+            if len(self._partial) > self.max_line_bytes:
+                raise IngestTooLargeError(f"第 {self._line_no + 1} 行超过 {self.max_line_bytes} 字节")
+
+    def _handle_line(self, line: bytes) -> None:
+        self._line_no += 1
+        try:
+            payload = json.loads(line)
+        except ValueError as e:
+            self._reject(None, f"JSON 解析失败: {str(e)}")
+            return
+
+        # 一行多个事件时，拒绝信息带上事件在行内的下标
+        if isinstance(payload, dict) and isinstance(payload.get('events'), list):
+            events, multi = payload['events'], True
+        elif isinstance(payload, list):
+            events, multi = payload, True
+        else:
+            events, multi = [payload], False
+
+        for index, event in enumerate(events):
+            self.received += 1
+            if self.received > self.max_events:
+                raise IngestTooLargeError(f"单次导入事件数超过 {self.max_events}")
+            error = validate_behavior_event(event)
+            if error:
+                self._reject(index if multi else None, error)
+                continue
+            self._batch.append(event)
+            self.accepted += 1
+            if len(self._batch) >= self.batch_size:
+                self.flush()
+
+    def _reject(self, index: Optional[int], error: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            item = {'line': self._line_no, 'error': error}
+            if index is not None:
+                item['index'] = index
+            self.errors.append(item)
+
+    # ---------- 写入 ----------
+
+    def flush(self) -> None:
+        """写入已校验的事件（写缓冲已满时抛出 BufferFullError）"""
+        if not self._batch:
+            return
+        events, self._batch = self._batch, []
+        if self._dedup is not None:
+            events, duplicates = self._dedup.filter(events)
+            self.duplicates += duplicates
+        if not events:
+            return
+        if self._write_buffer is not None:
+            self._write_buffer.enqueue(events)
+        else:
+            behavior_mapper.batch_insert_logs(events)
+        self.written += len(events)
+
+    def result(self) -> Dict[str, Any]:
+        """导入结果"""
+        result = {
+            'lines': self._line_no,
+            'received': self.received,
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'duplicates': self.duplicates,
+            'queued' if self._write_buffer is not None else 'inserted': self.written,
+            'errors': self.errors,
+        }
+        if self.rejected > len(self.errors):
+            result['errors_truncated'] = True
+        return result
+
+    @property
+    def queued(self) -> bool:
+        """事件是否进入写缓冲（异步写入）"""
+        return self._write_buffer is not None
+
+
+def create_ingestor() -> BehaviorIngestor:
+    """
+    按环境变量创建导入器
+
+    环境变量:
+        BEHAVIOR_INGEST_BATCH_SIZE: 每批写入条数，默认 500
+        BEHAVIOR_INGEST_MAX_BYTES: 解压后请求体字节数上限，默认 16MB
+        BEHAVIOR_INGEST_MAX_EVENTS: 单次导入事件数上限，默认 10000
+        BEHAVIOR_INGEST_MAX_LINE_BYTES: 单行字节数上限（含 sendBeacon 的整体 JSON 载荷），默认 1MB
+    """
+    return BehaviorIngestor(
+        batch_size=int(os.getenv('BEHAVIOR_INGEST_BATCH_SIZE', '500')),
+        max_bytes=int(os.getenv('BEHAVIOR_INGEST_MAX_BYTES', str(16 * 1024 * 1024))),
+        max_events=int(os.getenv('BEHAVIOR_INGEST_MAX_EVENTS', '10000')),
+        max_line_bytes=int(os.getenv('BEHAVIOR_INGEST_MAX_LINE_BYTES', str(1024 * 1024))),
+    )
@@ -0,0 +1,215 @@
+"""
+用户行为日志分区维护
+user_behavior_logs 按事件时间戳 timestamp（毫秒）做 RANGE 分区，每天一个分区：
+
+    p_history  早于首个日分区的历史数据
+    pYYYYMMDD  当天 00:00 至次日 00:00（本地时间）
+    pmax       VALUES LESS THAN MAXVALUE，兜底未来时间戳
+
+维护任务：
+    预建分区：把 pmax 拆出未来 days_ahead 天的日分区（pmax 为空时只改元数据）
+    过期清理：整分区 DROP，替代逐行 DELETE，不产生碎片
+
+已运行过行为汇总任务（compact_behavior_logs.py）时，只删除已完成天级汇总的分区，
+避免未汇总的日志被清理。
+"""
+
+import os
+import re
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from utils.db import _backend, db_query, db_execute
+
+LOG_TABLE = 'user_behavior_logs'
+MAX_PARTITION = 'pmax'
+HISTORY_PARTITION = 'p_history'
+_DAY_PARTITION_RE = re.compile(r"^p(\d{8})$")
+
+
+def partition_name(day: date) -> str:
+    """日分区名，如 p20250101"""
+    return f"p{day.strftime('%Y%m%d')}"
+
+
+def day_upper_bound(day: date) -> int:
+    """日分区上界：次日 00:00（本地时间）的毫秒时间戳"""
+    return int(datetime.combine(day + timedelta(days=1), datetime.min.time()).timestamp() * 1000)
+
+
+def day_partition_defs(first_day: date, last_day: date) -> List[str]:
+    """生成 [first_day, last_day] 每天一个的分区定义"""
+    defs = []
+    day = first_day
+    while day <= last_day:
+        defs.append(f"PARTITION {partition_name(day)} VALUES LESS THAN ({day_upper_bound(day)})")
+        day += timedelta(days=1)
+    return defs
+
+
+def partition_clause(first_day: date, last_day: date) -> str:
+    """建表 / 转换分区表使用的 PARTITION BY 子句"""
+    first_bound = day_upper_bound(first_day - timedelta(days=1))
+    defs = [f"PARTITION {HISTORY_PARTITION} VALUES LESS THAN ({first_bound})"]
+    defs.extend(day_partition_defs(first_day, last_day))
+    defs.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE")
+    return "PARTITION BY RANGE (timestamp) (\n    " + ",\n    ".join(defs) + "\n)"
+
+
+class BehaviorPartitionManager:
+    """行为日志分区维护
+
+    Args:
+        retention_days: 保留天数，上界早于 (当前时间 - retention_days) 的分区被删除
+        days_ahead: 预建未来多少天的分区
+    """
+
+    def __init__(self, retention_days: int = 7, days_ahead: int = 7):
+        self.retention_days = max(1, retention_days)
+        self.days_ahead = max(1, days_ahead)
+
+    def is_partitioned(self) -> bool:
+        """日志表是否为分区表（SQLite 后端始终为否）"""
+        if _backend() != 'mysql':
+            return False
+        return bool(self.list_partitions())
+
+    def list_partitions(self) -> List[Dict[str, Any]]:
+        """
+        列出日志表的分区
+
+        Returns:
+            [{'name', 'bound'（MAXVALUE 为 None）, 'rows'（估算）}, ...]，按分区顺序
+        """
+        rows = db_query("""
+            SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS description, TABLE_ROWS AS table_rows
+            FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+            ORDER BY PARTITION_ORDINAL_POSITION
+        """, (LOG_TABLE,))
+        partitions = []
+        for row in rows:
+            description = str(row['description'])
+            partitions.append({
+                'name': row['name'],
+                'bound': None if description.upper() == 'MAXVALUE' else int(description),
+                'rows': int(row['table_rows'] or 0),
+            })
+        return partitions
+
+    def ensure_future_partitions(self, dry_run: bool = False) -> List[str]:
+        """
+        预建到 今天 + days_ahead 的日分区（REORGANIZE pmax）
+
+        Returns:
+            新建的分区名
+        """
+        partitions = self.list_partitions()
+        if not partitions or partitions[-1]['name'] != MAX_PARTITION:
+            raise RuntimeError(f"{LOG_TABLE} 不是按天 RANGE 分区的表，请先运行 init_behavior_logs_table.py")
+
+        last_day = None
+        for partition in partitions:
+            match = _DAY_PARTITION_RE.match(partition['name'])
+            if match:
+                last_day = datetime.strptime(match.group(1), '%Y%m%d').date()
+        first_day = (last_day + timedelta(days=1)) if last_day else date.today()
+        target_day = date.today() + timedelta(days=self.days_ahead)
+        if first_day > target_day:
+            return []
+
+        defs = day_partition_defs(first_day, target_day)
+        created = [partition_name(first_day + timedelta(days=i)) for i in range(len(defs))]
+        if partitions[-1]['rows']:
+            print(f"[BehaviorPartition] 注意：{MAX_PARTITION} 中约有 {partitions[-1]['rows']} 行，拆分时需要搬移数据")
+        if not dry_run:
+            db_execute(
+                f"ALTER TABLE {LOG_TABLE} REORGANIZE PARTITION {MAX_PARTITION} INTO (\n    "
+                + ",\n    ".join(defs + [f"PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE"])
+                + "\n)"
+            )
+            print(f"[BehaviorPartition] 已预建分区 {created[0]} ~ {created[-1]}")
+        return created
+
+    def drop_expired_partitions(self, dry_run: bool = False) -> List[str]:
+        """
+        删除上界早于保留期的分区
+
+        Returns:
+            删除的分区名
+        """
+        cutoff = int((datetime.now() - timedelta(days=self.retention_days)).timestamp() * 1000)
+        safe_id = compacted_upto_id()
+
+        expired = []
+        for partition in self.list_partitions():
+            if partition['bound'] is None or partition['bound'] > cutoff:
+                continue
+            if safe_id is not None:
+                row = db_query(
+                    f"SELECT MAX(id) AS max_id FROM {LOG_TABLE} PARTITION ({partition['name']})",
+                    fetch_one=True,
+                )
+                if row and row['max_id'] is not None and int(row['max_id']) > safe_id:
+                    print(f"[BehaviorPartition] 分区 {partition['name']} 仍有未汇总或未重建会话的日志，暂不删除")
+                    break
+            expired.append(partition['name'])
+
+        if expired and not dry_run:
+            db_execute(f"ALTER TABLE {LOG_TABLE} DROP PARTITION {', '.join(expired)}")
+            print(f"[BehaviorPartition] 已删除过期分区 {', '.join(expired)}")
+        return expired
+
+    def run(self, dry_run: bool = False) -> Dict[str, Any]:
+        """执行一次维护：预建未来分区并删除过期分区"""
+        return {
+            'created': self.ensure_future_partitions(dry_run=dry_run),
+            'dropped': self.drop_expired_partitions(dry_run=dry_run),
+        }
+
+    def drop_day_partition(self, day: date) -> bool:
+        """
+        删除某一天的日分区（调用方需保证分区内数据已另行保存，如已冷归档）
+
+        Returns:
+            分区存在并已删除时返回 True
+        """
+        name = partition_name(day)
+        if not any(partition['name'] == name for partition in self.list_partitions()):
+            return False
+        db_execute(f"ALTER TABLE {LOG_TABLE} DROP PARTITION {name}")
+        print(f"[BehaviorPartition] 已删除分区 {name}")
+        return True
+
+
+def compacted_upto_id() -> Optional[int]:
+    """
+    后台任务都已处理到的日志 id，更早的日志才可删除 / 归档
+
+    取行为汇总天级检查点与会话重建检查点中已存在者的最小值，
+    任一任务落后时都不会删掉它尚未读取的日志；两个任务都未运行过时返回 None（不做保护）
+    """
+    try:
+        from services.behavior_rollup_service import JOB_DAILY
+        from services.session_service import JOB_SESSIONS
+        rows = db_query(
+            "SELECT last_id FROM behavior_job_checkpoints WHERE job_name IN (%s, %s)",
+            (JOB_DAILY, JOB_SESSIONS),
+        )
+    except Exception:
+        return None
+    return min(int(row['last_id']) for row in rows) if rows else None
+
+
+def get_partition_manager() -> BehaviorPartitionManager:
+    """
+    按环境变量创建分区维护器
+
+    环境变量:
+        BEHAVIOR_LOG_RETENTION_DAYS: 原始日志保留天数，默认 7
+        BEHAVIOR_PARTITION_DAYS_AHEAD: 预建未来分区天数，默认 7
+    """
+    return BehaviorPartitionManager(
+        retention_days=int(os.getenv('BEHAVIOR_LOG_RETENTION_DAYS', '7')),
+        days_ahead=int(os.getenv('BEHAVIOR_PARTITION_DAYS_AHEAD', '7')),
+    )
@@ -0,0 +1,335 @@
+"""
+用户行为汇总（rollup）业务逻辑层
+把 user_behavior_logs 增量汇总到小时 / 天两级汇总表，并按请求的时间窗口
+自动选择最粗的可用粒度读取统计。
+
+汇总任务按日志 id 推进检查点，每批的汇总写入与检查点在同一事务中提交，
+中断后从检查点继续（检查点与待处理日志都从主库读取，副本延迟不会让同一批日志被重复叠加）：
+    小时级：每批取 id 递增的新日志，重算其涉及的小时桶
+    天级：跟随小时级检查点，重算涉及的日期桶
+重算只统计 id 不超过检查点的日志，重复执行结果一致；原始日志可能已被清理的
+历史桶（早于 retention_days）改为叠加新增日志，不整桶重算。
+"""
+
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from mapper.behavior_rollup_mapper import BehaviorRollupMapper
+from utils.db import unit_of_work, use_primary
+
+JOB_HOURLY = 'behavior_rollup_hourly'
+JOB_DAILY = 'behavior_rollup_daily'
+
+HOUR_MS = 3600 * 1000
+
+
+def _to_ms(moment: datetime) -> int:
+    return int(moment.timestamp() * 1000)
+
+
+def _hour_start(timestamp_ms: int) -> datetime:
+    return datetime.fromtimestamp(timestamp_ms / 1000).replace(minute=0, second=0, microsecond=0)
+
+
+def _day_start(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class BehaviorRollupJob:
+    """行为日志汇总任务
+
+    Args:
+        batch_size: 小时级每批处理的日志条数
+        daily_batch_size: 天级每批处理的日志条数
+        settle_seconds: 只处理写入超过该秒数的日志
+        retention_days: 原始日志保留天数，更早的桶不整桶重算
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 5000,
+        daily_batch_size: int = 100000,
+        settle_seconds: int = 30,
+        retention_days: int = 7,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.daily_batch_size = max(1, daily_batch_size)
+        self.settle_seconds = max(0, settle_seconds)
+        self.retention_days = max(1, retention_days)
+
+    def run(self, max_batches: Optional[int] = None) -> Dict[str, Any]:
+        """
+        处理全部（或最多 max_batches 批）新增日志
+
+        Returns:
+            本次处理摘要
+        """
+        start = time.perf_counter()
+        hourly_batches = hourly_rows = hourly_buckets = 0
+        while max_batches is None or hourly_batches < max_batches:
+            rows, buckets = self.run_hourly_batch()
+            if not rows:
+                break
+            hourly_batches += 1
+            hourly_rows += rows
+            hourly_buckets += buckets
+
+        daily_batches = daily_buckets = 0
+        while True:
+            rows, buckets = self.run_daily_batch()
+            if not rows:
+                break
+            daily_batches += 1
+            daily_buckets += buckets
+
+        return {
+            'hourly_batches': hourly_batches,
+            'hourly_rows': hourly_rows,
+            'hourly_buckets': hourly_buckets,
+            'daily_batches': daily_batches,
+            'daily_buckets': daily_buckets,
+            'checkpoints': self.checkpoints(),
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 1),
+        }
+
+    def run_hourly_batch(self) -> Tuple[int, int]:
+        """
+        处理一批新增日志到小时汇总表
+
+        Returns:
+            (处理日志条数, 重算的小时桶数)
+        """
+        with use_primary():
+            checkpoint = BehaviorRollupMapper.get_checkpoint(JOB_HOURLY)
+            rows = BehaviorRollupMapper.get_log_batch(
+                checkpoint['last_id'], self.batch_size, settle_seconds=self.settle_seconds)
+            if not rows:
+                return 0, 0
+
+            max_id = rows[-1]['id']
+            hours = {_hour_start(row['timestamp']) for row in rows}
+            with unit_of_work():
+                for hour in sorted(hours):
+                    self._rollup_bucket('hourly', hour, hour, hour + timedelta(hours=1),
+                                        checkpoint['last_id'], max_id)
+                BehaviorRollupMapper.save_checkpoint(
+                    JOB_HOURLY, max_id, max(checkpoint['last_timestamp'], max(row['timestamp'] for row in rows)))
+            return len(rows), len(hours)
+
+    def run_daily_batch(self) -> Tuple[int, int]:
+        """
+        把小时级已处理、天级尚未处理的日志汇总到日汇总表
+
+        Returns:
+            (处理日志条数, 重算的日期桶数)
+        """
+        with use_primary():
+            hourly = BehaviorRollupMapper.get_checkpoint(JOB_HOURLY)
+            checkpoint = BehaviorRollupMapper.get_checkpoint(JOB_DAILY)
+            if hourly['last_id'] <= checkpoint['last_id']:
+                return 0, 0
+
+            rows = BehaviorRollupMapper.get_log_batch(
+                checkpoint['last_id'], self.daily_batch_size, upto_id=hourly['last_id'])
+            if not rows:
+                # 区间内的日志已被删除：直接推进检查点
+                BehaviorRollupMapper.save_checkpoint(JOB_DAILY, hourly['last_id'], hourly['last_timestamp'])
+                return 0, 0
+
+            max_id = rows[-1]['id']
+            days: Set[datetime] = {_day_start(_hour_start(row['timestamp'])) for row in rows}
+            with unit_of_work():
+                for day in sorted(days):
+                    self._rollup_bucket('daily', day.date(), day, day + timedelta(days=1),
+                                        checkpoint['last_id'], max_id)
+                BehaviorRollupMapper.save_checkpoint(
+                    JOB_DAILY, max_id, max(checkpoint['last_timestamp'], max(row['timestamp'] for row in rows)))
+            return len(rows), len(days)
+
+    def purge(self, days: Optional[int] = None, limit: int = 5000) -> int:
+        """
+        删除已完成天级汇总且写入早于 days 天的原始日志
+
+        Returns:
+            删除行数合计
+        """
+        days = days or self.retention_days
+        max_id = BehaviorRollupMapper.get_checkpoint(JOB_DAILY)['last_id']
+        total = 0
+        while True:
+            deleted = BehaviorRollupMapper.purge_compacted_logs(max_id, days, limit)
+            total += deleted
+            if deleted < limit:
+                return total
+
+    def checkpoints(self) -> Dict[str, Dict[str, int]]:
+        """返回两级汇总的检查点"""
+        return {
+            'hourly': BehaviorRollupMapper.get_checkpoint(JOB_HOURLY),
+            'daily': BehaviorRollupMapper.get_checkpoint(JOB_DAILY),
+        }
+
+    def _rollup_bucket(self, resolution: str, bucket_start: Any, start: datetime, end: datetime,
+                       after_id: int, max_id: int) -> None:
+        horizon = datetime.now() - timedelta(days=self.retention_days - 1)
+        if start >= _day_start(horizon):
+            BehaviorRollupMapper.rebuild_bucket(resolution, bucket_start, _to_ms(start), _to_ms(end), max_id)
+        else:
+            BehaviorRollupMapper.add_bucket_delta(
+                resolution, bucket_start, _to_ms(start), _to_ms(end), after_id, max_id)
+
+
+def plan_segments(start_ms: int, end_ms: int) -> List[Tuple[str, datetime, datetime]]:
+    """
+    把 [start_ms, end_ms) 切分为尽量粗的时间段：
+    首尾不足一小时的部分读原始日志，整小时读小时表，整天读日表
+
+    Returns:
+        [(resolution, start, end), ...]，resolution 为 raw | hourly | daily
+    """
+    start = datetime.fromtimestamp(start_ms / 1000)
+    end = datetime.fromtimestamp(end_ms / 1000)
+    if start >= end:
+        return []
+
+    first_hour = start.replace(minute=0, second=0, microsecond=0)
+    if first_hour < start:
+        first_hour += timedelta(hours=1)
+    last_hour = end.replace(minute=0, second=0, microsecond=0)
+    if first_hour >= last_hour:
+        return [('raw', start, end)]
+
+    segments = []
+    if start < first_hour:
+        segments.append(('raw', start, first_hour))
+
+    first_day = _day_start(first_hour)
+    if first_day < first_hour:
+        first_day += timedelta(days=1)
+    last_day = _day_start(last_hour)
+    if first_day < last_day:
+        if first_hour < first_day:
+            segments.append(('hourly', first_hour, first_day))
+        segments.append(('daily', first_day, last_day))
+        if last_day < last_hour:
+            segments.append(('hourly', last_day, last_hour))
+    else:
+        segments.append(('hourly', first_hour, last_hour))
+
+    if last_hour < end:
+        segments.append(('raw', last_hour, end))
+    return segments
+
+
+def _merge_rows(totals: Dict[Tuple[str, str], Dict[str, int]], rows: Iterable[Dict[str, Any]]) -> None:
+    for row in rows:
+        key = (row['event_type'], row['page'])
+        target = totals.setdefault(key, {
+            'event_count': 0, 'session_count': 0, 'duration_sum': 0,
+            'duration_max': 0, 'scroll_depth_sum': 0, 'scroll_depth_max': 0,
+        })
+        for field in ('event_count', 'session_count', 'duration_sum', 'scroll_depth_sum'):
+            target[field] += int(row[field] or 0)
+        for field in ('duration_max', 'scroll_depth_max'):
+            target[field] = max(target[field], int(row[field] or 0))
+
+
+def get_rollup_stats(
+    start_ms: int,
+    end_ms: int,
+    user_id: Optional[str] = None,
+    page: Optional[str] = None,
+    event_type: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    按时间窗口统计行为数据，自动选择最粗的可用粒度
+
+    汇总表只覆盖检查点之前的日志，检查点之后尚未汇总的日志从原始表补齐。
+    会话数按会话集合的并集统计，跨小时 / 跨天 / 跨页面的同一会话只计一次。
+
+    Args:
+        start_ms: 开始时间戳（毫秒，含）
+        end_ms: 结束时间戳（毫秒，不含）
+        user_id: 用户ID（可选，不传为全部用户）
+        page: 页面（可选）
+        event_type: 事件类型（可选）
+
+    Returns:
+        统计结果
+    """
+    filters = {'user_id': user_id, 'page': page, 'event_type': event_type}
+    checkpoints = {
+        'hourly': BehaviorRollupMapper.get_checkpoint(JOB_HOURLY)['last_id'],
+        'daily': BehaviorRollupMapper.get_checkpoint(JOB_DAILY)['last_id'],
+    }
+
+    totals: Dict[Tuple[str, str], Dict[str, int]] = {}
+    segments = []
+    rollup_ranges: List[Tuple[str, Any, Any]] = []
+    raw_ranges: List[Tuple[int, int, int]] = []
+    for resolution, seg_start, seg_end in plan_segments(start_ms, end_ms):
+        if resolution == 'raw':
+            _merge_rows(totals, BehaviorRollupMapper.aggregate_raw(_to_ms(seg_start), _to_ms(seg_end), **filters))
+            raw_ranges.append((_to_ms(seg_start), _to_ms(seg_end), 0))
+        else:
+            if resolution == 'daily':
+                bounds = (seg_start.date(), seg_end.date())
+            else:
+                bounds = (seg_start, seg_end)
+            _merge_rows(totals, BehaviorRollupMapper.aggregate_rollup(resolution, *bounds, **filters))
+            # 检查点之后尚未汇总的日志
+            _merge_rows(totals, BehaviorRollupMapper.aggregate_raw(
+                _to_ms(seg_start), _to_ms(seg_end), after_id=checkpoints[resolution], **filters))
+            rollup_ranges.append((resolution,) + bounds)
+            raw_ranges.append((_to_ms(seg_start), _to_ms(seg_end), checkpoints[resolution]))
+        segments.append({
+            'resolution': resolution,
+            'start': seg_start.strftime('%Y-%m-%d %H:%M:%S'),
+            'end': seg_end.strftime('%Y-%m-%d %H:%M:%S'),
+        })
+
+    event_type_stats: Dict[str, int] = {}
+    page_stats: Dict[str, int] = {}
+    summary = {'event_count': 0, 'duration_sum': 0,
+               'duration_max': 0, 'scroll_depth_sum': 0, 'scroll_depth_max': 0}
+    for (row_event_type, row_page), values in totals.items():
+        event_type_stats[row_event_type] = event_type_stats.get(row_event_type, 0) + values['event_count']
+        row_page = row_page or 'unknown'
+        page_stats[row_page] = page_stats.get(row_page, 0) + values['event_count']
+        for field in ('event_count', 'duration_sum', 'scroll_depth_sum'):
+            summary[field] += values[field]
+        for field in ('duration_max', 'scroll_depth_max'):
+            summary[field] = max(summary[field], values[field])
+
+    return {
+        'total_events': summary['event_count'],
+        'total_sessions': BehaviorRollupMapper.count_distinct_sessions(rollup_ranges, raw_ranges, **filters),
+        'duration_sum': summary['duration_sum'],
+        'duration_max': summary['duration_max'],
+        'scroll_depth_sum': summary['scroll_depth_sum'],
+        'scroll_depth_max': summary['scroll_depth_max'],
+        'event_type_stats': event_type_stats,
+        'page_stats': page_stats,
+        'segments': segments,
+    }
+
+
+def get_rollup_job() -> BehaviorRollupJob:
+    """
+    按环境变量创建汇总任务
+
+    环境变量:
+        BEHAVIOR_ROLLUP_BATCH_SIZE: 小时级每批日志条数，默认 5000
+        BEHAVIOR_ROLLUP_SETTLE_SECONDS: 只处理写入超过该秒数的日志，默认 30
+        BEHAVIOR_LOG_RETENTION_DAYS: 原始日志保留天数，默认 7
+        BEHAVIOR_ARCHIVE_AFTER_DAYS: 冷归档天数，取两者较小值作为整桶重算的范围
+    """
+    from services.behavior_archive_service import get_archive_after_days
+
+    return BehaviorRollupJob(
+        batch_size=int(os.getenv('BEHAVIOR_ROLLUP_BATCH_SIZE', '5000')),
+        settle_seconds=int(os.getenv('BEHAVIOR_ROLLUP_SETTLE_SECONDS', '30')),
+        retention_days=min(int(os.getenv('BEHAVIOR_LOG_RETENTION_DAYS', '7')), get_archive_after_days()),
+    )
@@ -0,0 +1,190 @@
+"""
+行为日志 AI 建议调度
+把 analyze_user_logs（查询近 7 天日志 + 生成建议）移出行为上报的同步路径：
+每个用户按固定间隔最多触发一次后台分析，结果保存在该用户的建议槽位中，
+上报接口只读取槽位中已生成的最新建议，不等待分析完成。
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class _SuggestionSlot:
+    """单个用户的建议槽位"""
+
+    __slots__ = ('suggestion', 'ready_at', 'triggered_at', 'running')
+
+    def __init__(self):
+        self.suggestion = None
+        self.ready_at = 0.0
+        self.triggered_at = None
+        self.running = False
+
+
+class SuggestionScheduler:
+    """按用户去抖的后台建议生成
+
+    Args:
+        analyze: 分析函数，接收 user_id 返回建议字典，默认 services.mock.analyze_user_logs
+        interval: 同一用户两次分析的最小间隔（秒）
+        max_users: 最多保留多少个用户的槽位，超出后淘汰最久未上报的用户
+        workers: 后台分析线程数
+        max_pending: 排队中的分析任务上限，超出后本次不触发，等下次上报再触发
+    """
+
+    def __init__(
+        self,
+        analyze: Optional[Callable[[str], Dict[str, Any]]] = None,
+        interval: float = 30,
+        max_users: int = 10000,
+        workers: int = 2,
+        max_pending: int = 200,
+    ):
+        self.analyze = analyze
+        self.interval = max(0.0, interval)
+        self.max_users = max(1, max_users)
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+
+        self._lock = threading.Lock()
+        self._slots: 'OrderedDict[str, _SuggestionSlot]' = OrderedDict()
+        self._executor = None
+        self._pid = None
+        self._pending = 0
+
+        # 统计信息
+        self._triggered_total = 0
+        self._debounced_total = 0
+        self._skipped_total = 0
+        self._failed_total = 0
+        self._last_error = None
+
+    def request(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """上报时调用：按需触发后台分析，并立即返回该用户最新的已生成建议
+
+        Args:
+            user_id: 用户ID
+        Returns:
+            最新建议，尚未生成过时返回 None
+        """
+        now = time.monotonic()
+        submit = False
+        with self._lock:
+            slot = self._slots.get(user_id)
+            if slot is None:
+                slot = self._slots[user_id] = _SuggestionSlot()
+                if len(self._slots) > self.max_users:
+                    self._slots.popitem(last=False)
+            else:
+                self._slots.move_to_end(user_id)
+
+            due = slot.triggered_at is None or now - slot.triggered_at >= self.interval
+            if slot.running or not due:
+                self._debounced_total += 1
+            elif self._pending >= self.max_pending:
+                self._skipped_total += 1
+            else:
+                slot.running = True
+                slot.triggered_at = now
+                self._pending += 1
+                self._triggered_total += 1
+                submit = True
+            suggestion = slot.suggestion
+
+        if submit:
+            try:
+                self._get_executor().submit(self._run, user_id, slot)
+            except RuntimeError as e:  # 解释器退出中，线程池已关闭
+                with self._lock:
+                    slot.running = False
+                    self._pending -= 1
+                self._last_error = str(e)
+        return suggestion
+
+    def peek(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """读取用户最新建议，不触发分析"""
+        with self._lock:
+            slot = self._slots.get(user_id)
+            return slot.suggestion if slot else None
+
+    def stats(self) -> Dict[str, Any]:
+        """返回调度器实时统计"""
+        with self._lock:
+            users = len(self._slots)
+            running = sum(1 for slot in self._slots.values() if slot.running)
+            pending = self._pending
+        return {
+            'users': users,
+            'running': running,
+            'pending': pending,
+            'interval_s': self.interval,
+            'triggered_total': self._triggered_total,
+            'debounced_total': self._debounced_total,
+            'skipped_total': self._skipped_total,
+            'failed_total': self._failed_total,
+            'last_error': self._last_error,
+        }
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """获取线程池；fork 出的子进程重新创建"""
+        pid = os.getpid()
+        if self._executor is None or self._pid != pid:
+            with self._lock:
+                if self._executor is None or self._pid != pid:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix='behavior-analysis')
+                    self._pid = pid
+        return self._executor
+
+    def _run(self, user_id: str, slot: _SuggestionSlot) -> None:
+        """后台执行一次分析并写入槽位；失败时保留上一次的建议"""
+        try:
+            analyze = self.analyze
+            if analyze is None:
+                from services.mock import analyze_user_logs as analyze
+            suggestion = analyze(user_id)
+            with self._lock:
+                slot.suggestion = suggestion
+                slot.ready_at = time.monotonic()
+            print(f"[SuggestionScheduler] 已为用户 {user_id} 生成AI建议")
+        except Exception as e:
+            self._failed_total += 1
+            self._last_error = str(e)
+            print(f"[SuggestionScheduler] 生成AI建议失败: {str(e)}")
+        finally:
+            with self._lock:
+                slot.running = False
+                self._pending -= 1
+
+
+_scheduler: Optional[SuggestionScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_suggestion_scheduler() -> SuggestionScheduler:
+    """获取全局建议调度器
+
+    环境变量:
+        BEHAVIOR_ANALYSIS_INTERVAL: 同一用户两次分析的最小间隔（秒），默认 30
+        BEHAVIOR_ANALYSIS_WORKERS: 后台分析线程数，默认 2
+        BEHAVIOR_ANALYSIS_MAX_USERS: 保留建议槽位的用户数上限，默认 10000
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = SuggestionScheduler(
+                    interval=float(os.getenv('BEHAVIOR_ANALYSIS_INTERVAL', '30')),
+                    workers=int(os.getenv('BEHAVIOR_ANALYSIS_WORKERS', '2')),
+                    max_users=int(os.getenv('BEHAVIOR_ANALYSIS_MAX_USERS', '10000')),
+                )
+    return _scheduler
+
+
+def get_latest_suggestion(user_id: str) -> Optional[Dict[str, Any]]:
+    """按需触发用户的后台分析，返回已生成的最新建议（不等待）"""
+    return get_suggestion_scheduler().request(user_id)
@@ -0,0 +1,413 @@
+"""
+行为日志写缓冲（write-behind）
+/api/behavior/track 校验通过的事件先进入进程内有界队列，接口立即返回 202；
+后台刷写线程跨请求攒批，按条数或等待时长触发，一次多行 INSERT 写入数据库。
+
+可靠性：
+    队列满时拒绝入队（BufferFullError），由接口返回 503 让客户端稍后重试
+    刷写遇到瞬时错误（连接失败、锁等待超时、熔断）按退避重试，仍失败的批次落盘到本地 NDJSON 日志，
+    数据库恢复后回放
+    其他错误（数据过长、非法取值等重试也不会成功）二分拆批定位坏事件，单条仍写不进的事件移入
+    死信文件，不再回到落盘日志，同批的正常事件照常写入
+    进程退出时在限定时间内排空队列，未写完的事件落盘，下次启动时回放
+    event_id 有唯一索引，重复写入会被忽略，回放与重试都是幂等的
+
+Serverless 部署（VERCEL）中请求结束后进程会被冻结，后台线程无法可靠运行，默认关闭，
+接口退回同步写入。
+"""
+
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from mapper.behavior_mapper import BehaviorMapper
+from utils.db_breaker import DBUnavailableError, backoff_delay, is_failure, is_retryable
+from utils.response import _find_cause
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_JOURNAL_PATH = os.path.join(_PROJECT_ROOT, 'instance', 'behavior_journal.ndjson')
+DEFAULT_DEAD_LETTER_PATH = os.path.join(_PROJECT_ROOT, 'instance', 'behavior_dead_letter.ndjson')
+
+
+def _is_transient(error: BaseException) -> bool:
+    """沿异常链判断是否为重试可能成功的瞬时错误（熔断、连接 / 可用性问题、锁等待超时与死锁）"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, DBUnavailableError) or is_failure(error) or is_retryable(error, write=True):
+            return True
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class BufferFullError(Exception):
+    """写缓冲队列已满
+
+    Attributes:
+        retry_after: 建议客户端多少秒后重试
+    """
+
+    def __init__(self, message: str, retry_after: float = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class BehaviorWriteBuffer:
+    """行为日志写缓冲
+
+    Args:
+        writer: 批量写入函数，接收事件列表，默认 BehaviorMapper.batch_insert_logs
+        max_events: 队列容量（事件条数），超出后拒绝入队
+        batch_size: 每批最多写入条数，队列积累到该条数立即刷写
+        max_delay: 事件在队列中的最长等待秒数，超时后即使不满一批也刷写
+        journal_path: 落盘日志路径
+        drain_timeout: 进程退出时排空队列的最长秒数
+        max_attempts: 单批写入遇到瞬时错误时最多尝试次数，仍失败则落盘
+        dead_letter_path: 无法写入的事件（非瞬时错误）的死信文件路径
+    """
+
+    def __init__(
+        self,
+        writer: Optional[Callable[[List[Dict[str, Any]]], int]] = None,
+        max_events: int = 20000,
+        batch_size: int = 1000,
+        max_delay: float = 1.0,
+        journal_path: str = DEFAULT_JOURNAL_PATH,
+        drain_timeout: float = 5.0,
+        max_attempts: int = 3,
+        dead_letter_path: str = DEFAULT_DEAD_LETTER_PATH,
+    ):
+        self.writer = writer or BehaviorMapper.batch_insert_logs
+        self.max_events = max(1, max_events)
+        self.batch_size = max(1, batch_size)
+        self.max_delay = max(0.0, max_delay)
+        self.journal_path = journal_path
+        self.drain_timeout = drain_timeout
+        self.max_attempts = max(1, max_attempts)
+        self.dead_letter_path = dead_letter_path
+
+        self._cond = threading.Condition()
+        self._journal_lock = threading.Lock()
+        self._queue = deque()  # (入队时间, 事件)
+        self._inflight: List[Dict[str, Any]] = []
+        self._thread = None
+        self._pid = None
+        self._stopping = threading.Event()
+        self._closed = False
+        self._journal_dirty = True  # 启动时检查一次历史落盘日志
+        self._healthy = True  # 最近一次写入是否成功，失败期间不回放落盘日志
+        self._flush_requested = False
+
+        # 统计信息
+        self._enqueued_total = 0
+        self._rejected_total = 0
+        self._flushed_total = 0
+        self._batches_total = 0
+        self._failed_batches = 0
+        self._spilled_total = 0
+        self._replayed_total = 0
+        self._dead_lettered_total = 0
+        self._last_error = None
+        self._last_flush_ms = 0.0
+
+    def enqueue(self, events: List[Dict[str, Any]]) -> int:
+        """事件入队（整批入队或整批拒绝）
+
+        Args:
+            events: 已校验的事件列表
+        Returns:
+            入队条数
+        Raises:
+            BufferFullError: 队列剩余容量不足
+        """
+        if not events:
+            return 0
+        if self._closed:
+            # 进程正在退出：直接落盘，下次启动回放
+            self._spill(events)
+            return len(events)
+
+        self._ensure_started()
+        now = time.monotonic()
+        with self._cond:
+            if len(self._queue) + len(events) > self.max_events:
+                self._rejected_total += len(events)
+                raise BufferFullError(
+                    f"行为日志队列已满（{len(self._queue)}/{self.max_events}）",
+                    retry_after=max(1.0, self.max_delay),
+                )
+            self._queue.extend((now, event) for event in events)
+            self._enqueued_total += len(events)
+            if len(self._queue) >= self.batch_size or len(self._queue) == len(events):
+                # 攒够一批，或队列由空变为非空（刷写线程需要开始计时）
+                self._cond.notify()
+        return len(events)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待当前队列中的事件全部写出（或落盘）
+
+        Returns:
+            是否在超时前完成
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            try:
+                while self._queue or self._inflight:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self._flush_requested = False
+        return True
+
+    def close(self) -> None:
+        """停止刷写线程：限时排空队列，剩余事件落盘"""
+        if self._closed:
+            return
+        self._closed = True
+        self._stopping.set()
+        with self._cond:
+            self._cond.notify_all()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(self.drain_timeout)
+
+        with self._cond:
+            leftover = list(self._inflight) if thread is not None and thread.is_alive() else []
+            leftover.extend(event for _, event in self._queue)
+            self._queue.clear()
+        if leftover:
+            # 仍在写的批次也一并落盘；若其随后写入成功，回放时会被唯一索引忽略
+            self._spill(leftover)
+            print(f"[BehaviorWriteBuffer] 退出时 {len(leftover)} 条事件未写入，已落盘: {self.journal_path}")
+
+    def stats(self) -> Dict[str, Any]:
+        """返回写缓冲实时统计"""
+        with self._cond:
+            depth = len(self._queue)
+            oldest_ms = (time.monotonic() - self._queue[0][0]) * 1000 if depth else 0.0
+            inflight = len(self._inflight)
+        return {
+            'running': bool(self._thread and self._thread.is_alive()),
+            'queue_depth': depth,
+            'inflight': inflight,
+            'max_events': self.max_events,
+            'batch_size': self.batch_size,
+            'max_delay_s': self.max_delay,
+            'oldest_age_ms': round(oldest_ms, 1),
+            'enqueued_total': self._enqueued_total,
+            'rejected_total': self._rejected_total,
+            'flushed_total': self._flushed_total,
+            'batches_total': self._batches_total,
+            'failed_batches': self._failed_batches,
+            'spilled_total': self._spilled_total,
+            'replayed_total': self._replayed_total,
+            'dead_lettered_total': self._dead_lettered_total,
+            'last_flush_ms': round(self._last_flush_ms, 2),
+            'last_error': self._last_error,
+            'journal_path': self.journal_path,
+            'dead_letter_path': self.dead_letter_path,
+        }
+
+    def _ensure_started(self) -> None:
+        """首次入队时启动刷写线程；fork 出的子进程（如 gunicorn worker）重新启动"""
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._pid == pid and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid is not None and self._pid != pid:
+                # 父进程的队列属于父进程，子进程从空队列开始
+                self._queue.clear()
+                self._inflight = []
+            self._pid = pid
+            self._thread = threading.Thread(
+                target=self._run, name='behavior-write-buffer', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        """刷写线程主循环"""
+        while True:
+            if self._journal_dirty and self._healthy and not self._stopping.is_set():
+                self._replay_journal()
+
+            with self._cond:
+                while not self._stopping.is_set():
+                    if len(self._queue) >= self.batch_size or (self._queue and self._flush_requested):
+                        break
+                    if self._queue:
+                        wait = self._queue[0][0] + self.max_delay - time.monotonic()
+                        if wait <= 0:
+                            break
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+                if not self._queue:
+                    if self._stopping.is_set():
+                        return
+                    continue
+                count = min(self.batch_size, len(self._queue))
+                self._inflight = [self._queue.popleft()[1] for _ in range(count)]
+                batch = self._inflight
+
+            if not self._write(batch):
+                self._spill(batch)
+                self._journal_dirty = True
+            with self._cond:
+                self._inflight = []
+                self._cond.notify_all()
+
+    def _write(self, batch: List[Dict[str, Any]]) -> bool:
+        """写入一批事件：瞬时错误按退避重试（退出过程中不再等待重试）；
+        其他错误拆批定位坏事件，坏事件移入死信文件
+
+        Returns:
+            是否处理完成（写入或移入死信）；False 表示数据库暂不可用，调用方需落盘
+        """
+        for attempt in range(self.max_attempts):
+            start = time.perf_counter()
+            try:
+                self.writer(batch)
+            except Exception as e:
+                self._last_error = str(e)
+                if not _is_transient(e):
+                    return self._write_isolated(batch, e)
+                if attempt + 1 >= self.max_attempts or self._stopping.is_set():
+                    break
+                unavailable = _find_cause(e, DBUnavailableError)
+                delay = unavailable.retry_after if unavailable else backoff_delay(attempt, base=0.5, cap=5.0)
+                self._stopping.wait(delay)
+                continue
+            self._last_flush_ms = (time.perf_counter() - start) * 1000
+            self._flushed_total += len(batch)
+            self._batches_total += 1
+            self._healthy = True
+            return True
+
+        self._healthy = False
+        self._failed_batches += 1
+        print(f"[BehaviorWriteBuffer] {len(batch)} 条事件写入失败，已落盘: {self._last_error}")
+        return False
+
+    def _write_isolated(self, batch: List[Dict[str, Any]], error: Exception) -> bool:
+        """批次因非瞬时错误写入失败：二分拆批分别写入，单条仍失败的事件移入死信文件
+
+        已写入的半批若随整批一起落盘重放，会被 event_id 唯一索引忽略
+        """
+        if len(batch) == 1:
+            self._dead_letter(batch[0], error)
+            return True
+        middle = len(batch) // 2
+        return self._write(batch[:middle]) and self._write(batch[middle:])
+
+    def _dead_letter(self, event: Dict[str, Any], error: Exception) -> None:
+        """追加写入死信文件（NDJSON，每行包含事件、错误与时间），需人工排查后处理"""
+        record = {'failed_at': int(time.time() * 1000), 'error': str(error), 'event': event}
+        with self._journal_lock:
+            os.makedirs(os.path.dirname(self.dead_letter_path) or '.', exist_ok=True)
+            with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._dead_lettered_total += 1
+        print(f"[BehaviorWriteBuffer] 事件 {event.get('event_id')} 无法写入，已移入死信文件: {error}")
+
+    def _spill(self, events: List[Dict[str, Any]]) -> None:
+        """追加写入落盘日志（NDJSON，每行一个事件）"""
+        data = ''.join(json.dumps(event, ensure_ascii=False, default=str) + '\n' for event in events)
+        with self._journal_lock:
+            os.makedirs(os.path.dirname(self.journal_path) or '.', exist_ok=True)
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self._spilled_total += len(events)
+
+    def _replay_journal(self) -> None:
+        """回放落盘日志
+
+        先把日志改名为回放文件再逐批写入，回放期间新的落盘写入新日志；
+        认领回放文件（包括已退出进程遗留的）时再次改名，多进程共用日志时同一文件只被一个进程读取。
+        """
+        self._journal_dirty = False
+        prefix = f"{self.journal_path}.{os.getpid()}-"
+        with self._journal_lock:
+            if os.path.exists(self.journal_path):
+                os.replace(self.journal_path, f"{prefix}{time.time_ns()}.replay")
+
+        for path in sorted(glob.glob(f"{glob.escape(self.journal_path)}.*.replay")):
+            claimed = f"{prefix}{time.time_ns()}.replay"
+            try:
+                os.replace(path, claimed)
+            except FileNotFoundError:
+                continue  # 已被其他进程认领
+            events = []
+            with open(claimed, encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        print(f"[BehaviorWriteBuffer] 跳过损坏的日志行: {line[:100]}")
+
+            for offset in range(0, len(events), self.batch_size):
+                batch = events[offset:offset + self.batch_size]
+                if not self._write(batch):
+                    # 数据库仍不可用：剩余事件写回日志（坏事件已在 _write 中移入死信，不会写回），等下次写入成功后再回放
+                    self._spill(events[offset:])
+                    os.remove(claimed)
+                    self._journal_dirty = True
+                    return
+                self._replayed_total += len(batch)
+            os.remove(claimed)
+            if events:
+                print(f"[BehaviorWriteBuffer] 已回放落盘事件 {len(events)} 条")
+
+
+_buffer: Optional[BehaviorWriteBuffer] = None
+_buffer_lock = threading.Lock()
+
+
+def is_write_behind_enabled() -> bool:
+    """是否启用写缓冲：BEHAVIOR_WRITE_BEHIND 未配置时，Vercel 环境关闭、其余环境开启"""
+    default = '0' if os.getenv('VERCEL') else '1'
+    return os.getenv('BEHAVIOR_WRITE_BEHIND', default) == '1'
+
+
+def get_behavior_write_buffer() -> Optional[BehaviorWriteBuffer]:
+    """获取行为日志写缓冲，未启用时返回 None（调用方同步写入）
+
+    环境变量:
+        BEHAVIOR_WRITE_BEHIND: 1 开启 / 0 关闭
+        BEHAVIOR_BUFFER_MAX_EVENTS: 队列容量，默认 20000
+        BEHAVIOR_BUFFER_BATCH_SIZE: 每批写入条数，默认 1000
+        BEHAVIOR_BUFFER_MAX_DELAY: 最长攒批等待秒数，默认 1
+        BEHAVIOR_BUFFER_JOURNAL: 落盘日志路径，默认 instance/behavior_journal.ndjson
+        BEHAVIOR_BUFFER_DEAD_LETTER: 死信文件路径，默认 instance/behavior_dead_letter.ndjson
+        BEHAVIOR_BUFFER_DRAIN_TIMEOUT: 退出时排空队列的最长秒数，默认 5
+    """
+    global _buffer
+    if _buffer is None and is_write_behind_enabled():
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = BehaviorWriteBuffer(
+                    max_events=int(os.getenv('BEHAVIOR_BUFFER_MAX_EVENTS', '20000')),
+                    batch_size=int(os.getenv('BEHAVIOR_BUFFER_BATCH_SIZE', '1000')),
+                    max_delay=float(os.getenv('BEHAVIOR_BUFFER_MAX_DELAY', '1')),
+                    journal_path=os.getenv('BEHAVIOR_BUFFER_JOURNAL') or DEFAULT_JOURNAL_PATH,
+                    dead_letter_path=os.getenv('BEHAVIOR_BUFFER_DEAD_LETTER') or DEFAULT_DEAD_LETTER_PATH,
+                    drain_timeout=float(os.getenv('BEHAVIOR_BUFFER_DRAIN_TIMEOUT', '5')),
+                )
+                atexit.register(_buffer.close)
+    return _buffer
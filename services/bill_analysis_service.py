@@ -198,14 +198,11 @@ class BillAnalysisService:
         调用大模型API生成智能分析，失败时返回 None
         """
         try:
-            from services.model_provider import ModelProvider  # 延迟导入避免循环
-            model = ModelProvider()
-            prompt = (
-                "请根据以下账单摘要与分类，给出3条专业的理财建议（每条不超过40字，中文）：\n"
-                f"摘要：收入 {summary.get('totalIncome')} 元，支出 {summary.get('totalExpense')} 元，"\
-                f"节余率 {summary.get('savingRate')}%，交易笔数 {summary.get('transactionCount')}。\n"\
-                f"主要支出类别：{[c.get('category') for c in categories]}"
-            )
+            from services.model_provider import get_model_provider  # 延迟导入避免循环
+            from services.ai_prompt_builder import build_bill_prompt
+            model = get_model_provider('bill')
+            # 数值按区间分档，同档位用户共享缓存的响应
+            prompt = build_bill_prompt(summary, categories)
             return model.generate(prompt, context={"type": "bill"})
         except Exception as exc:
             print(f"[BillAnalysisService] AI 调用失败: {exc}")
@@ -83,8 +83,8 @@ class FundService:
         
         def call_ai_async():
             try:
-                from services.model_provider import ModelProvider  # 延迟导入避免循环
-                model = ModelProvider()
+                from services.model_provider import get_model_provider  # 延迟导入避免循环
+                model = get_model_provider('fund')
                 prompt = (
                     "请根据以下基金信息，给出简洁的投资建议（100字以内，中文）：\n"
                     f"基金名称：{fund.get('name','')}\n"
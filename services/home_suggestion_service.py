@@ -183,13 +183,11 @@ class HomeSuggestionService:
         调用大模型API生成智能问候，失败时返回 None
         """
         try:
-            from services.model_provider import ModelProvider
-            model = ModelProvider()
-            prompt = (
-                "请作为个人财务助理，根据以下信息用不超过80字生成个性化首页问候与理财提示（中文）：\n" +
-                f"本月总支出: {bill_stats.get('total_expense', 0)} 元，交易笔数: {bill_stats.get('total_count', 0)}；" +
-                f"本月转账总额: {transfer_stats.get('total_amount', 0)} 元，转账次数: {transfer_stats.get('total_count', 0)}。"
-            )
+            from services.model_provider import get_model_provider
+            from services.ai_prompt_builder import build_home_prompt
+            model = get_model_provider('home')
+            # 数值按区间分档，同档位用户共享缓存的响应
+            prompt = build_home_prompt(bill_stats, transfer_stats)
             return model.generate(prompt, context={"type": "home"})
         except Exception as exc:
             print(f"[HomeSuggestionService] AI 调用失败: {exc}")
@@ -52,8 +52,8 @@ class MarketAnalysisService:
         
         def call_ai_async():
             try:
-                from services.model_provider import ModelProvider  # 延迟导入避免循环
-                model = ModelProvider()
+                from services.model_provider import get_model_provider  # 延迟导入避免循环
+                model = get_model_provider('market')
                 prompt = (
                     f"当前市场趋势：{market_data.get('trend_name', '平稳')}\n"
                     f"热门板块：{', '.join(market_data.get('hotSectors', []))}\n"
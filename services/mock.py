@@ -3,11 +3,10 @@ Mock日志分析服务
 模拟大模型分析用户行为日志并返回固定响应
 """
 
-import json
 import time
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
-from utils.db import get_db_connection, close_db_connection
+from datetime import datetime
+from typing import Dict, Any, Optional
+from services.behavior_counter_service import get_behavior_counters
 
 
 class MockLogAnalysisService:
@@ -47,11 +46,11 @@ class MockLogAnalysisService:
     def analyze_user_logs(self, user_id: str, page_type: Optional[str] = None) -> Dict[str, Any]:
 
         try:
-            # 获取用户近7天的行为日志
-            logs = self._get_recent_user_logs(user_id, days=7)
+            # 获取用户近7天的行为统计（读取增量计数，不扫描原始日志）
+            stats = get_behavior_counters().get_user_stats(user_id, days=7)
             
             # 根据日志数量和内容选择合适的mock响应
-            if not logs:
+            if not stats['total_events']:
                 # 如果没有日志数据，返回默认响应
                 response = {
                     "suggestion": "欢迎回来！建议您先浏览一下热门基金，了解当前市场趋势。",
@@ -60,7 +59,7 @@ class MockLogAnalysisService:
                 }
             else:
                 # 根据日志数量选择不同的mock响应
-                log_count = len(logs)
+                log_count = stats['total_events']
                 response_index = min(log_count % len(self.mock_responses), len(self.mock_responses) - 1)
                 response = self.mock_responses[response_index].copy()
                 
@@ -68,8 +67,8 @@ class MockLogAnalysisService:
                 response["analysis_summary"] = {
                     "log_count": log_count,
                     "days_analyzed": 7,
-                    "most_active_page": self._get_most_active_page(logs),
-                    "last_activity": self._format_timestamp(logs[0]["timestamp"]) if logs else None
+                    "most_active_page": self._get_most_active_page(stats['page_stats']),
+                    "last_activity": self._format_timestamp(stats['last_timestamp']) if stats['last_timestamp'] else None
                 }
             
             # 添加元数据
@@ -90,68 +89,12 @@ class MockLogAnalysisService:
                 "error": str(e)
             }
     
-    def _get_recent_user_logs(self, user_id: str, days: int = 7) -> List[Dict[str, Any]]:
+    def _get_most_active_page(self, page_stats: Dict[str, int]) -> str:
 
-        conn = None
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            # 计算时间范围（最近7天）
-            end_time = int(time.time() * 1000)  # 当前时间戳（毫秒）
-            start_time = end_time - (days * 24 * 60 * 60 * 1000)  # 7天前的时间戳
-            
-            query_sql = """
-            SELECT 
-                id, event_id, event_type, user_id, session_id,
-                page, page_url, referrer,
-                element_type, element_id, element_text, element_class,
-                business_data, duration, scroll_depth,
-                context_data, timestamp, created_at
-            FROM user_behavior_logs
-            WHERE user_id = %s AND timestamp >= %s AND timestamp <= %s
-            ORDER BY timestamp DESC
-            LIMIT 100
-            """
-            
-            cursor.execute(query_sql, (user_id, start_time, end_time))
-            results = cursor.fetchall()
-            
-            # 解析JSON字段
-            for row in results:
-                if row.get('business_data'):
-                    try:
-                        row['business_data'] = json.loads(row['business_data'])
-                    except:
-                        pass
-                
-                if row.get('context_data'):
-                    try:
-                        row['context_data'] = json.loads(row['context_data'])
-                    except:
-                        pass
-            
-            return results
-            
-        except Exception as e:
-            print(f"获取用户行为日志失败: {str(e)}")
-            return []
-        finally:
-            if cursor:
-                cursor.close()
-            close_db_connection(conn)
-    
-    def _get_most_active_page(self, logs: List[Dict[str, Any]]) -> str:
-
-        if not logs:
+        if not page_stats:
             return "无"
         
-        page_counts = {}
-        for log in logs:
-            page = log.get('page', 'unknown')
-            page_counts[page] = page_counts.get(page, 0) + 1
-        
-        return max(page_counts.items(), key=lambda x: x[1])[0]
+        return max(page_stats.items(), key=lambda x: x[1])[0]
     
     def _format_timestamp(self, timestamp: int) -> str:
 
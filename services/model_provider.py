@@ -1,11 +1,19 @@
 """model_provider.py
 大模型抽象层，自动检测 OPENAI_API_KEY。
-当 provider='openai' 且配置正确时调用 OpenAI ChatCompletion，否则返回 mock。
+当 provider='openai' 且配置正确时调用 OpenAI ChatCompletion，否则由上层 service 处理 fallback。
+
+进程内通过 ``get_model_provider(page_type)`` 复用实例：每个 (provider, 模型, 地址) 只创建一个
+ModelProvider，OpenAI 客户端在第一次调用时才初始化，并共享带 keep-alive 连接池的 HTTP 客户端，
+避免每次生成建议都重新读取配置、建立连接。
 """
 from __future__ import annotations
 
+import atexit
 import os
-from typing import Any, Dict
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from services.ai_response_cache import get_ai_response_cache, make_cache_key
 
 # openai 为可选依赖，运行时若无需真实调用可不安装
 try:
@@ -13,6 +21,15 @@ try:
 except ImportError:  # pragma: no cover
     openai = None  # noqa: N816
 
+# httpx 随 openai 1.x 一起安装，用于共享连接池
+try:
+    import httpx  # type: ignore
+except ImportError:  # pragma: no cover
+    httpx = None
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+DEFAULT_TIMEOUT = 5.0
+
 
 class ModelProvider:
     """封装大模型调用，方便统一替换
@@ -22,37 +39,84 @@ class ModelProvider:
     provider: str | None
         指定大模型提供方。目前支持 ``mock`` 与 ``openai``，
         若为 ``None`` 则根据是否存在 ``OPENAI_API_KEY`` 环境变量自动推断。
+    model: str | None
+        模型名，默认读取 ``OPENAI_MODEL``。
+    api_key / base_url / timeout:
+        默认读取 ``OPENAI_API_KEY`` / ``OPENAI_BASE_URL`` / ``OPENAI_TIMEOUT``。
+    http_client:
+        自定义 httpx.Client，默认使用按 ``base_url`` 共享的连接池。
     """
 
-    def __init__(self, provider: str | None = None):
+    def __init__(
+        self,
+        provider: str | None = None,
+        model: str | None = None,
+        api_key: str | None = None,
+        base_url: str | None = None,
+        timeout: float | None = None,
+        http_client: Any = None,
+    ):
+        self.api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY")
+        self.base_url = base_url if base_url is not None else (os.getenv("OPENAI_BASE_URL") or None)
+        self.timeout = timeout if timeout is not None else float(os.getenv("OPENAI_TIMEOUT", str(DEFAULT_TIMEOUT)))
+        self.model = model or os.getenv("OPENAI_MODEL") or DEFAULT_MODEL
         # 自动推断 provider
-        self.provider = provider or ("openai" if os.getenv("OPENAI_API_KEY") else "mock")
-        print(f"[ModelProvider] 使用 {self.provider} 模式")
+        self.provider = provider or ("openai" if self.api_key else "mock")
+
+        self._http_client = http_client
+        self._client: Any = None
+        self._client_lock = threading.Lock()
 
-        # 如果选用 openai 且库可用，则初始化 api_key
+        # 如果选用 openai，检查库与 api_key 是否可用
         if self.provider == "openai":
             if openai is None:
                 # 未安装 openai 库，回退至 mock
                 print("[ModelProvider] openai 库未安装，回退至 mock 模式")
                 self.provider = "mock"
-            else:
-                openai.api_key = os.getenv("OPENAI_API_KEY")
-                if not openai.api_key:
-                    print("[ModelProvider] 未检测到 OPENAI_API_KEY，回退至 mock 模式")
-                    self.provider = "mock"
-                else:
-                    print(f"[ModelProvider] 使用 OpenAI 模式，API Key已配置")
+            elif not self.api_key:
+                print("[ModelProvider] 未检测到 OPENAI_API_KEY，回退至 mock 模式")
+                self.provider = "mock"
+        print(f"[ModelProvider] 使用 {self.provider} 模式，模型 {self.model}")
+
+    def _get_client(self) -> Any:
+        """第一次调用时创建 OpenAI 客户端（openai 0.x 没有客户端对象，返回 None）"""
+        if self._client is None and hasattr(openai, "OpenAI"):
+            with self._client_lock:
+                if self._client is None:
+                    self._client = openai.OpenAI(
+                        api_key=self.api_key,
+                        base_url=self.base_url,
+                        timeout=self.timeout,
+                        max_retries=0,
+                        http_client=self._http_client or _shared_http_client(self.base_url, self.timeout),
+                    )
+        return self._client
 
     # ------------------------------------------------------------------
     # 对外统一接口
     # ------------------------------------------------------------------
-    def generate(self, prompt: str, context: Dict[str, Any] | None = None) -> str:
+    def generate(
+        self,
+        prompt: str,
+        context: Dict[str, Any] | None = None,
+        temperature: float = 0.7,
+        use_cache: bool = True,
+    ) -> str:
         """根据 ``prompt`` 与 ``context`` 生成文本
 
-        1. 当 ``provider`` = ``openai`` 且配置正确时调用 OpenAI ChatCompletion
+        1. 当 ``provider`` = ``openai`` 且配置正确时调用 OpenAI ChatCompletion，
+           相同输入优先读取响应缓存（按 ``context['type']`` 的页面类型决定缓存时长）
         2. 其余情况抛出异常，让上层service处理fallback
         """
-        if self.provider == "openai" and openai is not None and openai.api_key:
+        if self.provider == "openai" and openai is not None and self.api_key:
+            cache = get_ai_response_cache() if use_cache else None
+            page_type = context.get("type") if isinstance(context, dict) else None
+            cache_key = None
+            if cache is not None:
+                cache_key = make_cache_key(prompt, context, self.model, temperature)
+                cached = cache.get(cache_key, page_type)
+                if cached is not None:
+                    return cached
             try:
                 messages = [
                     {"role": "system", "content": "你是专业的金融理财顾问。"},
@@ -61,21 +125,34 @@ class ModelProvider:
                 if context:
                     messages.append({"role": "user", "content": str(context)})
 
-                response = openai.ChatCompletion.create(
-                    model="gpt-3.5-turbo",
-                    messages=messages,
-                    temperature=0.7,
-                    timeout=5,  # 减少超时时间到5秒
-                )
-                return response.choices[0].message.content.strip()
+                client = self._get_client()
+                if client is not None:
+                    response = client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=temperature,
+                    )
+                else:
+                    # openai 0.x
+                    response = openai.ChatCompletion.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=temperature,
+                        api_key=self.api_key,
+                        request_timeout=self.timeout,
+                    )
+                text = response.choices[0].message.content.strip()
             except Exception as exc:  # pragma: no cover
                 # 打印错误并抛出异常，让上层service处理fallback
                 print(f"[ModelProvider] OpenAI 调用失败: {exc}")
                 raise Exception("OpenAI API调用失败")
+            if cache is not None and text:
+                cache.set(cache_key, text, page_type)
+            return text
 
         # 默认抛出异常，让上层service处理fallback
         raise Exception("模型未配置或API调用失败")
-    
+
     # 暂时注释掉mock响应方法，改由各服务层处理fallback逻辑
     # def _get_mock_response(self, prompt: str, context: Dict[str, Any] | None = None) -> str:
     #     """生成mock响应"""
@@ -90,4 +167,84 @@ class ModelProvider:
     #         return "转账时请仔细核对收款人信息，大额转账建议分批进行，确保资金安全。"
     #     else:
     #         ellipsis_prompt = prompt[:20] + ("..." if len(prompt) > 20 else "")
-    #         return f"[MOCK_MODEL_REPLY] prompt={ellipsis_prompt} context={context}"
\ No newline at end of file
+    #         return f"[MOCK_MODEL_REPLY] prompt={ellipsis_prompt} context={context}"
+
+
+# ----------------------------------------------------------------------
+# 进程内共享的 provider 注册表
+# ----------------------------------------------------------------------
+_providers: Dict[Tuple[str, str, Optional[str]], ModelProvider] = {}
+_page_providers: Dict[Optional[str], ModelProvider] = {}
+_http_clients: Dict[Optional[str], Any] = {}
+_registry_lock = threading.Lock()
+
+
+def _shared_http_client(base_url: str | None, timeout: float) -> Any:
+    """按 base_url 共享的 keep-alive 连接池；未安装 httpx 时返回 None（使用 openai 默认客户端）
+
+    环境变量:
+        OPENAI_MAX_CONNECTIONS: 最大连接数，默认 20
+        OPENAI_MAX_KEEPALIVE: 最多保持的空闲连接数，默认 10
+        OPENAI_KEEPALIVE_EXPIRY: 空闲连接保留秒数，默认 60
+    """
+    if httpx is None:
+        return None
+    with _registry_lock:
+        client = _http_clients.get(base_url)
+        if client is None:
+            client = httpx.Client(
+                timeout=timeout,
+                limits=httpx.Limits(
+                    max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "20")),
+                    max_keepalive_connections=int(os.getenv("OPENAI_MAX_KEEPALIVE", "10")),
+                    keepalive_expiry=float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60")),
+                ),
+            )
+            _http_clients[base_url] = client
+        return client
+
+
+def get_model_provider(page_type: str | None = None) -> ModelProvider:
+    """获取进程内共享的 ModelProvider
+
+    参数
+    ------
+    page_type: str | None
+        页面类型（market / fund / bill / transfer / home / chat），用于按页面选择模型：
+        优先读取 ``OPENAI_MODEL_<PAGE_TYPE>``（如 ``OPENAI_MODEL_FUND``），否则使用 ``OPENAI_MODEL``。
+        模型相同的页面共享同一个实例。
+    """
+    provider = _page_providers.get(page_type)
+    if provider is not None:
+        return provider
+    model = (
+        (os.getenv(f"OPENAI_MODEL_{page_type.upper()}") if page_type else None)
+        or os.getenv("OPENAI_MODEL")
+        or DEFAULT_MODEL
+    )
+    kind = "openai" if os.getenv("OPENAI_API_KEY") else "mock"
+    key = (kind, model, os.getenv("OPENAI_BASE_URL") or None)
+    with _registry_lock:
+        provider = _providers.get(key)
+        if provider is None:
+            provider = ModelProvider(provider=kind, model=model)
+            _providers[key] = provider
+        _page_providers[page_type] = provider
+    return provider
+
+
+def close_model_providers() -> None:
+    """关闭共享连接池并清空注册表（下次 get_model_provider 会按当前环境变量重新创建）"""
+    with _registry_lock:
+        clients = list(_http_clients.values())
+        _http_clients.clear()
+        _providers.clear()
+        _page_providers.clear()
+    for client in clients:
+        try:
+            client.close()
+        except Exception:
+            pass
+
+
+atexit.register(close_model_providers)
@@ -0,0 +1,349 @@
+"""
+页面跳转图（导航模型）
+从写入成功的行为日志中增量维护页面跳转计数（稀疏马尔可夫矩阵），提供：
+
+    从页面 X 出发最常去的下一页（全站 / 单个用户）
+    最常见的三页路径 A → B → C
+
+只统计同一会话内相邻的两次 page_view（同页刷新不计），乱序到达、早于该用户
+已处理事件的日志会被跳过。
+
+存储全部使用整数下标的数组，只保存出现过的跳转：
+    页面词表：页面名 -> 下标（最多 max_pages 个，超出归入 OTHER_PAGE）
+    全站跳转：每个来源页面一个 array('I')，交替存放 (to, 次数)
+    用户状态：按用户下标排列的 array（上一页、上上页、会话哈希、时间戳）
+    用户跳转：每个用户一个 array('I')，交替存放 (from << 16 | to, 次数)
+    下一页 / 路径排行：每次计数变化时增量调整前 top_k 名，查询直接返回，O(1)
+
+状态只在当前进程内存中，启动时可从最近 warmup_days 天的日志后台预热。
+"""
+
+import os
+import threading
+import time
+import zlib
+from array import array
+from typing import Any, Dict, List, Optional
+
+from mapper.behavior_mapper import BehaviorMapper
+
+OTHER_PAGE = '__other__'
+# 页面词表上限的最大值：页面下标按 16 位打包进跳转 / 路径键
+MAX_PAGES_LIMIT = 0xFFFF
+# 同一会话内两次 page_view 间隔超过该毫秒数不视为跳转
+_MAX_GAP_MS = 30 * 60 * 1000
+
+
+def _bump_edge(edges: array, key: int) -> int:
+    """在交替存放 (key, 次数) 的数组中累加一次，返回累加后的次数"""
+    for position in range(0, len(edges), 2):
+        if edges[position] == key:
+            edges[position + 1] += 1
+            return edges[position + 1]
+    edges.extend((key, 1))
+    return 1
+
+
+def _bump_top(top: List[List[int]], key: int, count: int, top_k: int) -> None:
+    """计数变化后调整排行（[key, count] 列表，按 count 倒序，最多 top_k 项）"""
+    for item in top:
+        if item[0] == key:
+            item[1] = count
+            break
+    else:
+        if len(top) >= top_k and count <= top[-1][1]:
+            return
+        top.append([key, count])
+    top.sort(key=lambda item: -item[1])
+    del top[top_k:]
+
+
+class NavigationGraph:
+    """页面跳转图
+
+    Args:
+        max_pages: 页面词表上限，取值 2 ~ MAX_PAGES_LIMIT
+        top_k: 每个页面保留的下一页排行长度
+        top_paths: 三页路径排行长度
+    """
+
+    def __init__(self, max_pages: int = MAX_PAGES_LIMIT, top_k: int = 10, top_paths: int = 50):
+        self.max_pages = max(2, min(max_pages, MAX_PAGES_LIMIT))
+        self.top_k = max(1, top_k)
+        self.top_paths = max(1, top_paths)
+
+        self._lock = threading.Lock()
+        self._pages: List[str] = []
+        self._page_index: Dict[str, int] = {}
+
+        # 全站跳转计数与排行（按页面下标，新页面加入词表时追加）
+        self._transitions: List[array] = []
+        self._out_totals = array('I')
+        self._top_next: List[List[List[int]]] = []
+        # 三页路径：打包后的整数键 -> 次数
+        self._paths: Dict[int, int] = {}
+        self._top_paths: List[List[int]] = []
+
+        # 用户状态（按用户下标）
+        self._user_index: Dict[str, int] = {}
+        self._user_last = array('i')
+        self._user_prev = array('i')
+        self._user_session = array('I')
+        self._user_ts = array('q')
+        self._user_edges: List[array] = []
+
+        self._events_total = 0
+        self._transitions_total = 0
+        self._out_of_order = 0
+        self.warming = False
+
+    # ---------- 词表 ----------
+
+    def _page_id(self, page: str) -> int:
+        index = self._page_index.get(page)
+        if index is None:
+            if len(self._pages) >= self.max_pages - 1:
+                page = OTHER_PAGE
+                index = self._page_index.get(page)
+                if index is not None:
+                    return index
+            index = len(self._pages)
+            self._pages.append(page)
+            self._page_index[page] = index
+            self._transitions.append(array('I'))
+            self._out_totals.append(0)
+            self._top_next.append([])
+        return index
+
+    def _user_id(self, user_id: str) -> int:
+        index = self._user_index.get(user_id)
+        if index is None:
+            index = len(self._user_last)
+            self._user_index[user_id] = index
+            self._user_last.append(-1)
+            self._user_prev.append(-1)
+            self._user_session.append(0)
+            self._user_ts.append(0)
+            self._user_edges.append(array('I'))
+        return index
+
+    # ---------- 写入 ----------
+
+    def ingest(self, events: List[Dict[str, Any]]) -> int:
+        """
+        累加一批已写入的事件中的页面跳转
+
+        Returns:
+            新增的跳转数
+        """
+        views = [
+            event for event in events
+            if event.get('event_type') == 'page_view' and event.get('page') and event.get('user_id')
+        ]
+        if not views:
+            return 0
+        views.sort(key=lambda event: (str(event['user_id']), int(event.get('timestamp') or 0)))
+        added = 0
+        with self._lock:
+            for event in views:
+                added += self._add_view(
+                    str(event['user_id']), event.get('session_id') or '',
+                    event['page'], int(event.get('timestamp') or 0))
+        return added
+
+    def _add_view(self, user_id: str, session_id: str, page: str, timestamp: int) -> int:
+        self._events_total += 1
+        user = self._user_id(user_id)
+        if timestamp < self._user_ts[user]:
+            self._out_of_order += 1
+            return 0
+        to_page = self._page_id(page)
+        session = zlib.crc32(session_id.encode('utf-8'))
+        from_page = self._user_last[user]
+        continues = (
+            from_page >= 0
+            and self._user_session[user] == session
+            and timestamp - self._user_ts[user] <= _MAX_GAP_MS
+        )
+        self._user_ts[user] = timestamp
+        self._user_session[user] = session
+        if not continues:
+            self._user_last[user] = to_page
+            self._user_prev[user] = -1
+            return 0
+        if from_page == to_page:
+            return 0
+
+        # 全站跳转
+        count = _bump_edge(self._transitions[from_page], to_page)
+        self._out_totals[from_page] += 1
+        _bump_top(self._top_next[from_page], to_page, count, self.top_k)
+
+        # 用户跳转
+        _bump_edge(self._user_edges[user], (from_page << 16) | to_page)
+
+        # 三页路径
+        prev_page = self._user_prev[user]
+        if prev_page >= 0:
+            path_key = (prev_page << 32) | (from_page << 16) | to_page
+            count = self._paths.get(path_key, 0) + 1
+            self._paths[path_key] = count
+            _bump_top(self._top_paths, path_key, count, self.top_paths)
+
+        self._user_prev[user] = from_page
+        self._user_last[user] = to_page
+        self._transitions_total += 1
+        return 1
+
+    # ---------- 查询 ----------
+
+    def top_next_pages(self, page: str, limit: int = 5, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        从 page 出发最常去的下一页
+
+        Args:
+            page: 当前页面
+            limit: 返回条数（全站最多 top_k）
+            user_id: 指定时只统计该用户的跳转
+
+        Returns:
+            [{'page', 'count', 'probability'}, ...]，按次数倒序
+        """
+        with self._lock:
+            from_page = self._page_index.get(page)
+            if from_page is None:
+                return []
+            if user_id is None:
+                total = self._out_totals[from_page]
+                items = [(to_page, count) for to_page, count in self._top_next[from_page][:limit]]
+            else:
+                user = self._user_index.get(str(user_id))
+                if user is None:
+                    return []
+                edges = self._user_edges[user]
+                items = [
+                    (edges[position] & 0xFFFF, edges[position + 1])
+                    for position in range(0, len(edges), 2)
+                    if edges[position] >> 16 == from_page
+                ]
+                total = sum(count for _, count in items)
+                items = sorted(items, key=lambda item: -item[1])[:limit]
+            return [
+                {
+                    'page': self._pages[to_page],
+                    'count': count,
+                    'probability': round(count / total, 4) if total else 0.0,
+                }
+                for to_page, count in items
+            ]
+
+    def common_paths(self, limit: int = 10, page: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        最常见的三页路径
+
+        Args:
+            limit: 返回条数（最多 top_paths）
+            page: 指定时只返回经过该页面的路径
+
+        Returns:
+            [{'path': [A, B, C], 'count'}, ...]，按次数倒序
+        """
+        with self._lock:
+            page_id = self._page_index.get(page) if page else None
+            if page and page_id is None:
+                return []
+            result = []
+            for key, count in self._top_paths:
+                path = [key >> 32, (key >> 16) & 0xFFFF, key & 0xFFFF]
+                if page_id is not None and page_id not in path:
+                    continue
+                result.append({'path': [self._pages[index] for index in path], 'count': count})
+                if len(result) >= limit:
+                    break
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """运行统计"""
+        with self._lock:
+            return {
+                'pages': len(self._pages),
+                'users': len(self._user_index),
+                'events_total': self._events_total,
+                'transitions_total': self._transitions_total,
+                'out_of_order': self._out_of_order,
+                'distinct_transitions': sum(len(edges) for edges in self._transitions) // 2,
+                'distinct_paths': len(self._paths),
+                'user_edges': sum(len(edges) for edges in self._user_edges) // 2,
+                'warming': self.warming,
+            }
+
+    # ---------- 预热 ----------
+
+    def warmup(self, days: int, batch_size: int = 5000) -> int:
+        """
+        从最近 days 天的 page_view 日志重建跳转图（已有状态的用户会跳过更早的日志）
+
+        Returns:
+            读取的日志条数
+        """
+        start_time = int(time.time() * 1000) - days * 24 * 3600 * 1000
+        batch: List[Dict[str, Any]] = []
+        total = 0
+        self.warming = True
+        try:
+            for row in BehaviorMapper.iter_page_views(start_time):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    self.ingest(batch)
+                    total += len(batch)
+                    batch = []
+            self.ingest(batch)
+            total += len(batch)
+        finally:
+            self.warming = False
+        return total
+
+
+_graph: Optional[NavigationGraph] = None
+_graph_lock = threading.Lock()
+
+
+def _warmup_in_background(graph: NavigationGraph, days: int) -> None:
+    try:
+        total = graph.warmup(days)
+        print(f"[NavigationGraph] 预热完成，读取 {total} 条页面访问日志")
+    except Exception as e:
+        print(f"[NavigationGraph] 预热失败: {str(e)}")
+
+
+def get_navigation_graph() -> NavigationGraph:
+    """获取全局页面跳转图
+
+    环境变量:
+        BEHAVIOR_NAV_MAX_PAGES: 页面词表上限，默认 65535（上限）
+        BEHAVIOR_NAV_TOP_K: 每个页面保留的下一页排行长度，默认 10
+        BEHAVIOR_NAV_WARMUP_DAYS: 启动时从最近多少天的日志预热，默认 7；Vercel 环境默认 0（不预热）
+    """
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                graph = NavigationGraph(
+                    max_pages=int(os.getenv('BEHAVIOR_NAV_MAX_PAGES', str(MAX_PAGES_LIMIT))),
+                    top_k=int(os.getenv('BEHAVIOR_NAV_TOP_K', '10')),
+                )
+                warmup_days = int(os.getenv('BEHAVIOR_NAV_WARMUP_DAYS', '0' if os.getenv('VERCEL') else '7'))
+                if warmup_days > 0:
+                    threading.Thread(
+                        target=_warmup_in_background, args=(graph, warmup_days),
+                        name='navigation-warmup', daemon=True,
+                    ).start()
+                _graph = graph
+    return _graph
+
+
+def _on_ingested(events: List[Dict[str, Any]]) -> None:
+    get_navigation_graph().ingest(events)
+
+
+BehaviorMapper.add_ingest_listener(_on_ingested)
@@ -0,0 +1,292 @@
+"""
+用户会话重建与停留时长
+把 user_behavior_logs 按 session_id 分组、按 timestamp 排序，一遍扫描还原出会话与页面访问：
+
+    页面访问：page_view 开始一次访问；page_leave 结束同页访问（优先使用前端上报的 duration）；
+             跳转到其他页面（新的 page_view 或带不同 page 的事件）时结束上一页；
+             会话结束时仍未离开的页面以最后一次活动（含 heartbeat）作为离开时间
+    会话：起止时间、时长、事件数、交互数、页面访问数、入口 / 出口页面、是否跳出
+         （只访问一个页面且没有 page_view / page_leave / page_focus / page_blur / heartbeat 以外的事件）
+
+增量更新：任务按日志 id 推进检查点（behavior_job_checkpoints），每批找出新日志涉及的会话，
+重新读取这些会话的全部日志重建后覆盖写入，与检查点在同一事务中提交。
+晚到、乱序的日志只会触发所在会话重建，结果与一次性全量重建一致。
+"""
+
+import os
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from mapper.behavior_rollup_mapper import BehaviorRollupMapper
+from mapper.behavior_session_mapper import BehaviorSessionMapper
+from utils.db import unit_of_work
+
+JOB_SESSIONS = 'behavior_sessions'
+
+# 不算作用户交互的被动事件
+PASSIVE_EVENTS = frozenset({'page_view', 'page_leave', 'page_focus', 'page_blur', 'heartbeat'})
+
+# 每次按 IN 列表读取的会话数
+_SESSION_CHUNK = 500
+
+
+class SessionBuilder:
+    """单个会话的重建状态：按时间顺序逐条 add，最后 finish 输出会话与页面访问"""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.user_id = ''
+        self.started_at: Optional[int] = None
+        self.ended_at: Optional[int] = None
+        self.event_count = 0
+        self.interaction_count = 0
+        self.visits: List[Dict[str, Any]] = []
+        self._current: Optional[Dict[str, Any]] = None
+
+    def _open(self, page: str, timestamp: int) -> None:
+        self._current = {
+            'page': page,
+            'entered_at': timestamp,
+            'last_seen': timestamp,
+            'event_count': 0,
+        }
+
+    def _close(self, left_at: int, reason: str, dwell_ms: Optional[int] = None) -> None:
+        visit = self._current
+        self._current = None
+        if visit is None:
+            return
+        if dwell_ms is None:
+            dwell_ms = left_at - visit['entered_at']
+        self.visits.append({
+            'session_id': self.session_id,
+            'seq': len(self.visits) + 1,
+            'user_id': self.user_id,
+            'page': visit['page'],
+            'entered_at': visit['entered_at'],
+            'left_at': left_at,
+            'dwell_ms': max(0, int(dwell_ms)),
+            'event_count': visit['event_count'],
+            'end_reason': reason,
+        })
+
+    def add(self, event: Dict[str, Any]) -> None:
+        """追加一条日志（须按 timestamp 升序）"""
+        timestamp = int(event['timestamp'])
+        event_type = event.get('event_type')
+        page = event.get('page') or ''
+        if not self.user_id and event.get('user_id'):
+            self.user_id = event['user_id']
+        if self.started_at is None:
+            self.started_at = timestamp
+        self.ended_at = timestamp
+        self.event_count += 1
+        if event_type not in PASSIVE_EVENTS:
+            self.interaction_count += 1
+
+        current = self._current
+        if event_type == 'page_view':
+            self._close(timestamp, 'navigate')
+            self._open(page, timestamp)
+        elif event_type == 'page_leave':
+            duration = event.get('duration')
+            if current is not None and (not page or page == current['page']):
+                current['event_count'] += 1
+                self._close(timestamp, 'leave', dwell_ms=duration if duration else None)
+                return
+            if page and duration:
+                # 对应的 page_view 缺失（如采样丢弃），按上报的停留时长补出这次访问
+                self._close(timestamp - int(duration), 'navigate')
+                self._open(page, timestamp - int(duration))
+                self._current['event_count'] += 1
+                self._close(timestamp, 'leave', dwell_ms=duration)
+            return
+        elif page and (current is None or current['page'] != page):
+            # 没有 page_view 但页面已变化：视为进入了新页面
+            self._close(timestamp, 'navigate')
+            self._open(page, timestamp)
+
+        if self._current is not None:
+            self._current['event_count'] += 1
+            self._current['last_seen'] = timestamp
+
+    def finish(self) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """结束会话，返回 (会话行, 页面访问行)"""
+        if self._current is not None:
+            self._close(self._current['last_seen'], 'last_seen')
+        for visit in self.visits:
+            visit['user_id'] = self.user_id
+        pages = [visit['page'] for visit in self.visits]
+        session = {
+            'session_id': self.session_id,
+            'user_id': self.user_id,
+            'started_at': self.started_at,
+            'ended_at': self.ended_at,
+            'duration_ms': self.ended_at - self.started_at,
+            'event_count': self.event_count,
+            'interaction_count': self.interaction_count,
+            'page_view_count': len(self.visits),
+            'unique_page_count': len(set(pages)),
+            'total_dwell_ms': sum(visit['dwell_ms'] for visit in self.visits),
+            'entry_page': pages[0] if pages else '',
+            'exit_page': pages[-1] if pages else '',
+            'is_bounce': 1 if len(self.visits) <= 1 and self.interaction_count == 0 else 0,
+        }
+        return session, self.visits
+
+
+def reconstruct_sessions(events: Iterable[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """
+    一遍扫描重建会话
+
+    Args:
+        events: 按 (session_id, timestamp) 排序的日志，没有 session_id 的日志被忽略
+
+    Yields:
+        (会话行, 页面访问行)
+    """
+    builder: Optional[SessionBuilder] = None
+    for event in events:
+        session_id = event.get('session_id')
+        if not session_id:
+            continue
+        if builder is None or builder.session_id != session_id:
+            if builder is not None:
+                yield builder.finish()
+            builder = SessionBuilder(session_id)
+        builder.add(event)
+    if builder is not None:
+        yield builder.finish()
+
+
+class SessionJob:
+    """会话增量重建任务
+
+    Args:
+        batch_size: 每批处理的日志条数
+        settle_seconds: 只处理写入超过该秒数的日志
+    """
+
+    def __init__(self, batch_size: int = 5000, settle_seconds: int = 30):
+        self.batch_size = max(1, batch_size)
+        self.settle_seconds = max(0, settle_seconds)
+
+    def run_batch(self) -> Tuple[int, int]:
+        """
+        处理一批新增日志
+
+        Returns:
+            (处理日志条数, 重建的会话数)
+        """
+        checkpoint = BehaviorRollupMapper.get_checkpoint(JOB_SESSIONS)
+        rows = BehaviorRollupMapper.get_log_batch(
+            checkpoint['last_id'], self.batch_size,
+            settle_seconds=self.settle_seconds, with_session=True)
+        if not rows:
+            return 0, 0
+
+        session_ids = sorted({row['session_id'] for row in rows if row['session_id']})
+        with unit_of_work():
+            rebuilt = 0
+            for offset in range(0, len(session_ids), _SESSION_CHUNK):
+                chunk = session_ids[offset:offset + _SESSION_CHUNK]
+                sessions, visits = [], []
+                for session, session_visits in reconstruct_sessions(
+                        BehaviorSessionMapper.iter_session_events(chunk)):
+                    sessions.append(session)
+                    visits.extend(session_visits)
+                rebuilt += BehaviorSessionMapper.replace_sessions(sessions, visits)
+            BehaviorRollupMapper.save_checkpoint(
+                JOB_SESSIONS, rows[-1]['id'],
+                max(checkpoint['last_timestamp'], max(row['timestamp'] for row in rows)))
+        return len(rows), rebuilt
+
+    def run(self, max_batches: Optional[int] = None) -> Dict[str, Any]:
+        """
+        处理全部（或最多 max_batches 批）新增日志
+
+        Returns:
+            本次处理摘要
+        """
+        start = time.perf_counter()
+        batches = total_rows = total_sessions = 0
+        while max_batches is None or batches < max_batches:
+            rows, sessions = self.run_batch()
+            if not rows:
+                break
+            batches += 1
+            total_rows += rows
+            total_sessions += sessions
+        return {
+            'batches': batches,
+            'rows': total_rows,
+            'sessions': total_sessions,
+            'checkpoint': BehaviorRollupMapper.get_checkpoint(JOB_SESSIONS),
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 1),
+        }
+
+    @staticmethod
+    def reset() -> None:
+        """重置检查点，下次运行从头重建全部会话"""
+        BehaviorRollupMapper.save_checkpoint(JOB_SESSIONS, 0, 0)
+
+
+def get_session_job() -> SessionJob:
+    """
+    按环境变量创建会话重建任务
+
+    环境变量:
+        BEHAVIOR_SESSION_BATCH_SIZE: 每批日志条数，默认 5000
+        BEHAVIOR_ROLLUP_SETTLE_SECONDS: 只处理写入超过该秒数的日志，默认 30
+    """
+    return SessionJob(
+        batch_size=int(os.getenv('BEHAVIOR_SESSION_BATCH_SIZE', '5000')),
+        settle_seconds=int(os.getenv('BEHAVIOR_ROLLUP_SETTLE_SECONDS', '30')),
+    )
+
+
+def get_user_session_summary(
+    user_id: str,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+    limit: int = 50,
+    include_visits: bool = False
+) -> Dict[str, Any]:
+    """
+    查询用户的会话列表与汇总指标
+
+    Args:
+        user_id: 用户ID
+        start_time: 会话开始时间下限（毫秒）
+        end_time: 会话开始时间上限（毫秒）
+        limit: 最多返回的会话数
+        include_visits: 是否附带每个会话的页面访问明细
+
+    Returns:
+        {'sessions', 'summary', 'pages'}
+    """
+    sessions = BehaviorSessionMapper.get_user_sessions(user_id, start_time, end_time, limit)
+    if include_visits and sessions:
+        visits_by_session: Dict[str, List[Dict[str, Any]]] = {}
+        for visit in BehaviorSessionMapper.get_page_visits([s['session_id'] for s in sessions]):
+            visits_by_session.setdefault(visit['session_id'], []).append(visit)
+        for session in sessions:
+            session['visits'] = visits_by_session.get(session['session_id'], [])
+
+    count = len(sessions)
+    summary = {
+        'session_count': count,
+        'avg_duration_ms': round(sum(s['duration_ms'] for s in sessions) / count) if count else 0,
+        'avg_pages_per_session': round(sum(s['page_view_count'] for s in sessions) / count, 2) if count else 0,
+        'bounce_rate': round(sum(s['is_bounce'] for s in sessions) / count, 4) if count else 0,
+    }
+    pages = [
+        {
+            'page': row['page'],
+            'visits': int(row['visits']),
+            'dwell_ms': int(row['dwell_ms'] or 0),
+            'avg_dwell_ms': round(float(row['avg_dwell_ms'] or 0)),
+        }
+        for row in BehaviorSessionMapper.get_user_page_dwell(user_id, start_time)
+    ]
+    return {'sessions': sessions, 'summary': summary, 'pages': pages}
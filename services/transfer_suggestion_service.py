@@ -213,13 +213,11 @@ class TransferSuggestionService:
         调用大模型API生成智能建议，失败时返回 None
         """
         try:
-            from services.model_provider import ModelProvider
-            model = ModelProvider()
-            prompt = (
-                "你是一名资深金融理财助手，请根据以下转账场景给出3条精炼的转账建议（每条不超过40字，中文）：\n"\
-                f"收款账户: {context.get('recipientAccount')}，账户类型: {context.get('accountType')}，"\
-                f"首次转账: {context.get('isFirstTimeAccount')}，金额: {context.get('amount')} 元，风险等级: {risk_level}。"
-            )
+            from services.model_provider import get_model_provider
+            from services.ai_prompt_builder import build_transfer_prompt
+            model = get_model_provider('transfer')
+            # 金额按档位归类且不含收款账号，同档位转账共享缓存的响应
+            prompt = build_transfer_prompt(context, risk_level)
             return model.generate(prompt, context={"type": "transfer"})
         except Exception as exc:
             print(f"[TransferSuggestionService] AI 调用失败: {exc}")
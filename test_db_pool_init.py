@@ -0,0 +1,42 @@
+"""
+连接池初始化回归检查
+在全新进程中首次调用 get_pool_stats()（如首个请求是 /health 或 /api/admin/db-pool），
+确认创建连接池与熔断器时不会因重复获取同一把锁而卡死
+
+用法:
+    python test_db_pool_init.py
+"""
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+CHECK_SCRIPT = """
+import utils.db as db
+assert db._pool is None and db._breaker is None
+stats = db.get_pool_stats()
+assert 'breaker' in stats, stats
+print('ok')
+"""
+
+
+def test_pool_stats_on_fresh_module():
+    """全新进程中直接调用 get_pool_stats()，超时即视为死锁"""
+    env = dict(os.environ, DB_BACKEND='sqlite', DB_BREAKER_ENABLED='1')
+    result = subprocess.run(
+        [sys.executable, '-c', CHECK_SCRIPT],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=30,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().endswith('ok'), result.stdout
+
+
+if __name__ == '__main__':
+    try:
+        test_pool_stats_on_fresh_module()
+    except subprocess.TimeoutExpired:
+        print("❌ get_pool_stats() 超时，连接池初始化发生死锁")
+        sys.exit(1)
+    print("✅ 连接池初始化检查通过")
@@ -0,0 +1,217 @@
+"""列式压缩文件
+按列存储、按列压缩的只读文件格式，用于冷数据归档；只依赖标准库（zlib + array + JSON 头）。
+
+文件结构：
+    MAGIC | 头长度（4 字节小端） | 头（JSON） | 各列数据块
+
+每列独立压缩，读取时只解压需要的列（列投影）。列编码：
+    int：可空整数，空值位图 + int64 数组；delta=True 时存相邻差值（适合有序的时间戳、自增ID）
+    dict：字典编码，去重值列表 + uint32 编码数组（0 表示空值），适合低基数列
+    str：可空字符串，JSON 数组
+"""
+
+import json
+import os
+import struct
+import sys
+import zlib
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+MAGIC = b'FINCOL1\n'
+_HEADER_LEN = struct.Struct('<I')
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+class ColumnarFormatError(Exception):
+    """文件不是合法的列式文件"""
+
+
+def _to_bytes(values: array) -> bytes:
+    if not _LITTLE_ENDIAN:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if not _LITTLE_ENDIAN:
+        values.byteswap()
+    return values
+
+
+def _encode_int(values: Sequence[Optional[int]], delta: bool) -> bytes:
+    nulls = bytearray((len(values) + 7) // 8)
+    numbers = array('q', bytes(8 * len(values)))
+    previous = 0
+    for index, value in enumerate(values):
+        if value is None:
+            nulls[index >> 3] |= 1 << (index & 7)
+            continue
+        value = int(value)
+        numbers[index] = value - previous if delta else value
+        if delta:
+            previous = value
+    return bytes(nulls) + _to_bytes(numbers)
+
+
+def _decode_int(data: bytes, rows: int, delta: bool) -> List[Optional[int]]:
+    null_len = (rows + 7) // 8
+    nulls = data[:null_len]
+    numbers = _from_bytes('q', data[null_len:])
+    result: List[Optional[int]] = []
+    previous = 0
+    for index in range(rows):
+        if nulls[index >> 3] & (1 << (index & 7)):
+            result.append(None)
+            continue
+        value = numbers[index] + previous if delta else numbers[index]
+        if delta:
+            previous = value
+        result.append(value)
+    return result
+
+
+def _encode_dict(values: Sequence[Optional[str]]) -> bytes:
+    dictionary: Dict[str, int] = {}
+    codes = array('I')
+    for value in values:
+        if value is None:
+            codes.append(0)
+            continue
+        code = dictionary.get(value)
+        if code is None:
+            code = dictionary[value] = len(dictionary) + 1
+        codes.append(code)
+    words = json.dumps(list(dictionary), ensure_ascii=False).encode('utf-8')
+    return _HEADER_LEN.pack(len(words)) + words + _to_bytes(codes)
+
+
+def _decode_dict(data: bytes) -> 'DictColumn':
+    (words_len,) = _HEADER_LEN.unpack_from(data)
+    words = json.loads(data[4:4 + words_len].decode('utf-8'))
+    return DictColumn([None] + words, _from_bytes('I', data[4 + words_len:]))
+
+
+class DictColumn(Sequence):
+    """字典编码列：按下标取值时才查字典；可直接按编码过滤"""
+
+    def __init__(self, dictionary: List[Optional[str]], codes: array):
+        self.dictionary = dictionary
+        self.codes = codes
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.dictionary[code] for code in self.codes[index]]
+        return self.dictionary[self.codes[index]]
+
+    def code_of(self, value: Optional[str]) -> Optional[int]:
+        """值对应的编码；值不在本列中时返回 None（可据此跳过整个文件）"""
+        if value is None:
+            return 0
+        try:
+            return self.dictionary.index(value, 1)
+        except ValueError:
+            return None
+
+
+def write_table(path: str, columns: Dict[str, Dict[str, Any]], rows: int,
+                meta: Optional[Dict[str, Any]] = None, level: int = 6) -> int:
+    """
+    写入列式文件（先写临时文件再原子替换）
+
+    Args:
+        path: 目标路径
+        columns: {列名: {'encoding': 'int'|'dict'|'str', 'values': [...], 'delta': bool}}
+        rows: 行数，每列 values 长度必须相同
+        meta: 附加元数据（写入文件头）
+        level: zlib 压缩级别
+    Returns:
+        文件字节数
+    """
+    header_columns = {}
+    blocks = []
+    offset = 0
+    for name, column in columns.items():
+        values = column['values']
+        if len(values) != rows:
+            raise ValueError(f"列 {name} 行数 {len(values)} 与 rows={rows} 不一致")
+        encoding = column['encoding']
+        if encoding == 'int':
+            raw = _encode_int(values, column.get('delta', False))
+        elif encoding == 'dict':
+            raw = _encode_dict(values)
+        elif encoding == 'str':
+            raw = json.dumps(list(values), ensure_ascii=False).encode('utf-8')
+        else:
+            raise ValueError(f"未知的列编码: {encoding}")
+        block = zlib.compress(raw, level)
+        header_columns[name] = {
+            'encoding': encoding,
+            'delta': bool(column.get('delta', False)),
+            'offset': offset,
+            'length': len(block),
+            'raw_length': len(raw),
+        }
+        blocks.append(block)
+        offset += len(block)
+
+    header = json.dumps({'rows': rows, 'columns': header_columns, 'meta': meta or {}},
+                        ensure_ascii=False).encode('utf-8')
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(_HEADER_LEN.pack(len(header)))
+        f.write(header)
+        for block in blocks:
+            f.write(block)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(MAGIC) + _HEADER_LEN.size + len(header) + offset
+
+
+class ColumnarReader:
+    """列式文件读取器：打开时只读文件头，列按需解压并缓存"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ColumnarFormatError(f"不是列式文件: {path}")
+            (header_len,) = _HEADER_LEN.unpack(f.read(_HEADER_LEN.size))
+            header = json.loads(f.read(header_len).decode('utf-8'))
+        self._data_start = len(MAGIC) + _HEADER_LEN.size + header_len
+        self.rows: int = header['rows']
+        self.columns: Dict[str, Dict[str, Any]] = header['columns']
+        self.meta: Dict[str, Any] = header.get('meta', {})
+        self._cache: Dict[str, Sequence] = {}
+
+    def column(self, name: str) -> Sequence:
+        """读取一列（dict 编码列返回 DictColumn）"""
+        if name in self._cache:
+            return self._cache[name]
+        info = self.columns[name]
+        with open(self.path, 'rb') as f:
+            f.seek(self._data_start + info['offset'])
+            raw = zlib.decompress(f.read(info['length']))
+        if info['encoding'] == 'int':
+            values = _decode_int(raw, self.rows, info.get('delta', False))
+        elif info['encoding'] == 'dict':
+            values = _decode_dict(raw)
+        else:
+            values = json.loads(raw.decode('utf-8'))
+        self._cache[name] = values
+        return values
+
+    def read(self, names: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """按行读取（可指定列）"""
+        names = list(names or self.columns)
+        data = [self.column(name) for name in names]
+        return [{name: values[index] for name, values in zip(names, data)} for index in range(self.rows)]
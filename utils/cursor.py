@@ -0,0 +1,80 @@
+"""分页游标
+把 keyset 分页的位置（如上一页最后一条的 timestamp、id）编码为不透明的游标字符串：
+base64url(JSON) + HMAC-SHA256 签名，客户端无法篡改位置；游标同时绑定查询条件的摘要，
+换了过滤条件再使用旧游标会被拒绝。
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+from typing import Any, Dict
+
+_SIGNATURE_BYTES = 12
+
+
+class InvalidCursorError(ValueError):
+    """游标格式错误、签名不匹配或与查询条件不一致"""
+
+
+def _secret() -> bytes:
+    return os.getenv('SECRET_KEY', 'dev-secret-key').encode('utf-8')
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def filters_digest(filters: Dict[str, Any]) -> str:
+    """查询条件摘要（键顺序无关）"""
+    canonical = json.dumps(filters, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return _b64encode(hashlib.sha256(canonical.encode('utf-8')).digest()[:8])
+
+
+def encode_cursor(position: Dict[str, Any], filters: Dict[str, Any]) -> str:
+    """
+    生成游标
+
+    Args:
+        position: 分页位置，如 {'t': 1700000000000, 'i': 123}
+        filters: 生成该页时使用的查询条件
+
+    Returns:
+        游标字符串
+    """
+    body = json.dumps({'p': position, 'f': filters_digest(filters)}, separators=(',', ':')).encode('utf-8')
+    signature = hmac.new(_secret(), body, hashlib.sha256).digest()[:_SIGNATURE_BYTES]
+    return f"{_b64encode(body)}.{_b64encode(signature)}"
+
+
+def decode_cursor(cursor: str, filters: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    校验并解析游标
+
+    Args:
+        cursor: 游标字符串
+        filters: 本次请求的查询条件，须与生成游标时一致
+
+    Returns:
+        分页位置
+    Raises:
+        InvalidCursorError: 游标无效
+    """
+    try:
+        body_text, signature_text = str(cursor).split('.', 1)
+        body = _b64decode(body_text)
+        signature = _b64decode(signature_text)
+    except (ValueError, TypeError):
+        raise InvalidCursorError('游标格式错误')
+    expected = hmac.new(_secret(), body, hashlib.sha256).digest()[:_SIGNATURE_BYTES]
+    if not hmac.compare_digest(signature, expected):
+        raise InvalidCursorError('游标无效')
+    payload = json.loads(body)
+    if payload.get('f') != filters_digest(filters):
+        raise InvalidCursorError('游标与查询条件不一致')
+    return payload['p']
@@ -1,33 +1,490 @@
 import pymysql
-from pymysql.cursors import DictCursor
+from pymysql.cursors import DictCursor, SSDictCursor
+from pymysql.constants import SERVER_STATUS
+import functools
 import os
+import re
+import threading
+import time
+from itertools import islice
+from contextlib import contextmanager
 from dotenv import load_dotenv
+from flask import current_app, g, has_app_context
+
+from utils.db_pool import ConnectionPool, PooledConnection, PoolTimeoutError
+from utils.db_router import ReplicaRouter
+from utils.db_metrics import InstrumentedCursor, query_stats
+from utils.db_sqlite import connect as connect_sqlite
+from utils.db_breaker import CircuitBreaker, DBUnavailableError, backoff_delay, is_retryable
 
 # 加载环境变量
 load_dotenv()
 
-def get_db_connection():
-    """创建并返回数据库连接对象
-    自动读取环境变量配置，使用DictCursor以便返回字典格式结果
+__all__ = [
+    'get_db_connection', 'close_db_connection', 'db_query', 'db_execute',
+    'get_pool', 'get_pool_stats', 'PoolTimeoutError',
+    'init_app', 'unit_of_work', 'TransactionRollbackError',
+    'db_execute_many', 'BulkWriteError', 'db_stream',
+    'get_router', 'read_your_writes', 'use_primary', 'query_stats',
+    'get_breaker', 'DBUnavailableError',
+]
+
+_pool = None
+_router = None
+_breaker = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+
+class TransactionRollbackError(Exception):
+    """事务内有语句失败且异常被吞掉，提交时改为回滚"""
+
+
+class BulkWriteError(Exception):
+    """db_execute_many 有批次写入失败
+
+    Attributes:
+        affected_rows: 成功批次的影响行数合计
+        failures: 失败批次列表，每项包含 chunk（批次序号）、start（起始行号）、
+            size（行数）和 error（错误信息）
+    """
+
+    def __init__(self, affected_rows, failures):
+        self.affected_rows = affected_rows
+        self.failures = failures
+        super().__init__(
+            f"批量写入有 {len(failures)} 个批次失败，成功写入 {affected_rows} 行"
+        )
+
+
+# 与 pymysql executemany 相同的 INSERT ... VALUES (...) 识别规则
+_INSERT_VALUES_RE = re.compile(
+    r"\s*((?:INSERT|REPLACE)\b.+\bVALUES?\s*)"
+    r"(\(\s*(?:%s|%\(.+\)s)\s*(?:,\s*(?:%s|%\(.+\)s)\s*)*\))"
+    r"(\s*(?:ON DUPLICATE.*)?);?\s*\Z",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+class _DBScope:
+    """连接作用域：同一请求（或同一 unit_of_work）内共享连接
+
+    主库与读库各懒加载一个连接；事务中或需要读己之写时读请求也走主库。
+    """
+
+    def __init__(self):
+        self.conns = {}
+        self.tx_depth = 0
+        self.rollback_only = False
+        self.primary_only = False
+
+    def connection(self, readonly=False):
+        """懒加载借出连接，连接失效时重新借出"""
+        role = 'replica' if readonly and not self.tx_depth and not self.primary_only else 'primary'
+        conn = self.conns.get(role)
+        if conn is not None and conn._closed:
+            conn.close()
+            conn = None
+        if conn is None:
+            conn = self.conns[role] = _acquire(readonly=role == 'replica')
+        return conn
+
+    def drop_replica(self, error=None):
+        """读库连接出错：摘除该副本，本请求剩余的读请求改走主库"""
+        conn = self.conns.pop('replica', None)
+        self.primary_only = True
+        if conn is not None:
+            _drop_replica_connection(conn, error)
+
+    def close(self):
+        """回滚未完成的事务并归还连接"""
+        conns, self.conns = self.conns, {}
+        for role, conn in conns.items():
+            try:
+                if role == 'primary' and self.tx_depth:
+                    conn.rollback()
+            except pymysql.MySQLError:
+                pass
+            finally:
+                conn.close()
+        self.tx_depth = 0
+
+
+class _ScopedConnection:
+    """作用域连接代理
+
+    close() 不归还连接（由作用域结束时统一归还）；处于事务中时 commit() 推迟到
+    unit_of_work 结束，rollback() 仅把事务标记为回滚。
     """
+
+    def __init__(self, scope, readonly=False):
+        self._scope = scope
+        self._readonly = readonly
+
+    @property
+    def _closed(self):
+        return False
+
+    def close(self):
+        pass
+
+    def commit(self):
+        if not self._scope.tx_depth:
+            self._scope.connection().commit()
+
+    def rollback(self):
+        if self._scope.tx_depth:
+            self._scope.rollback_only = True
+        else:
+            self._scope.connection().rollback()
+
+    def __getattr__(self, name):
+        return getattr(self._scope.connection(self._readonly), name)
+
+
+def _app_scoped():
+    """当前是否处于已通过 init_app 启用请求级连接的 Flask 应用上下文"""
+    return has_app_context() and 'utils.db' in current_app.extensions
+
+
+def _current_scope(create=False):
+    """获取当前连接作用域
+
+    在 Flask 应用上下文中作用域挂在 ``g`` 上，随请求结束由 init_app 注册的
+    teardown 归还；其他线程只有在 unit_of_work 内才有作用域。
+    """
+    if _app_scoped():
+        scope = g.get('_db_scope')
+        if scope is None:
+            scope = g._db_scope = _DBScope()
+        return scope
+    scope = getattr(_local, 'scope', None)
+    if scope is None and create:
+        scope = _local.scope = _DBScope()
+    return scope
+
+
+def _teardown_scope(exc=None):
+    scope = g.pop('_db_scope', None)
+    if scope is not None:
+        scope.close()
+
+
+def init_app(app):
+    """为 Flask 应用启用请求级共享连接
+
+    同一请求内所有 Mapper 调用复用一个连接，请求结束时归还连接池。
+    连接在整个请求期间被占用，DB_POOL_SIZE 应不小于并发工作线程数。
+    """
+    app.extensions['utils.db'] = True
+    app.teardown_appcontext(_teardown_scope)
+
+
+@contextmanager
+def unit_of_work():
+    """显式事务：块内所有 db_query/db_execute/Mapper 调用共享同一连接
+
+    正常退出时提交，抛出异常时回滚；嵌套调用并入最外层事务。
+
+    用法:
+        with unit_of_work():
+            UserMapper.insert_user(...)
+            BillMapper.insert_bill(...)
+    """
+    scope = _current_scope(create=True)
+    outermost = scope.tx_depth == 0
+    try:
+        if outermost:
+            scope.connection().begin()
+            scope.rollback_only = False
+        scope.tx_depth += 1
+        try:
+            yield _ScopedConnection(scope)
+        except BaseException:
+            scope.tx_depth -= 1
+            if outermost:
+                scope.connection().rollback()
+            else:
+                scope.rollback_only = True
+            raise
+        scope.tx_depth -= 1
+        if outermost:
+            if scope.rollback_only:
+                scope.connection().rollback()
+                raise TransactionRollbackError("事务中有语句执行失败，已回滚")
+            scope.connection().commit()
+    finally:
+        if outermost and not _app_scoped():
+            scope.close()
+            _local.scope = None
+
+
+def _backend():
+    """数据库后端：mysql（默认）或 sqlite（嵌入式，用于压测与基准测试）"""
+    return os.getenv('DB_BACKEND', 'mysql').lower()
+
+
+def _create_connection(host=None, port=None):
+    """创建原始数据库连接
+    自动读取环境变量配置，使用DictCursor以便返回字典格式结果。
+    连接开启 autocommit，需要事务时显式 begin()，归还连接池时无需额外回滚。
+    DB_BACKEND=sqlite 时改为连接 DB_SQLITE_PATH 指定的 SQLite 库。
+    """
+    if _backend() == 'sqlite':
+        return connect_sqlite()
     try:
         conn = pymysql.connect(
-            host=os.getenv('DB_HOST', 'localhost'),
+            host=host or os.getenv('DB_HOST', 'localhost'),
             user=os.getenv('DB_USER', 'root'),
             password=os.getenv('DB_PASSWORD', ''),
             database=os.getenv('DB_NAME', 'Fin'),
-            port=int(os.getenv('DB_PORT', '3306')),
+            port=int(port or os.getenv('DB_PORT', '3306')),
             cursorclass=DictCursor,
             charset='utf8mb4',
-            connect_timeout=10
+            connect_timeout=int(os.getenv('DB_CONNECT_TIMEOUT', '10')),
+            read_timeout=_optional_float(os.getenv('DB_READ_TIMEOUT')),
+            write_timeout=_optional_float(os.getenv('DB_WRITE_TIMEOUT')),
+            autocommit=True
         )
         return conn
     except pymysql.MySQLError as e:
         print(f"数据库连接失败: {str(e)}")
         raise
 
+
+def _optional_float(value):
+    return float(value) if value else None
+
+
+def _reset_connection(conn):
+    """归还连接前回滚未结束的事务，保证下一个借用者拿到干净的会话"""
+    if not conn.open:
+        return False
+    if conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+        conn.rollback()
+    return True
+
+
+def _instrument_cursor(cursor, listener=None):
+    """为游标加上语句计时，结果汇总到 utils.db_metrics.query_stats，并上报给 listener（熔断器）"""
+    return InstrumentedCursor(cursor, query_stats, listener)
+
+
+def _new_pool(name, host=None, port=None, listener=None):
+    return ConnectionPool(
+        functools.partial(_create_connection, host, port),
+        max_size=int(os.getenv('DB_POOL_SIZE', '10')),
+        timeout=float(os.getenv('DB_POOL_TIMEOUT', '5')),
+        max_idle_time=float(os.getenv('DB_POOL_MAX_IDLE', '300')),
+        max_lifetime=float(os.getenv('DB_POOL_MAX_LIFETIME', '1800')),
+        reset=_reset_connection,
+        wrap_cursor=functools.partial(_instrument_cursor, listener=listener),
+        name=name,
+    )
+
+
+def get_pool():
+    """获取主库连接池（首次调用时按环境变量创建）
+
+    环境变量:
+        DB_POOL_SIZE: 连接数上限，默认 10
+        DB_POOL_TIMEOUT: 借出连接最大等待秒数，默认 5
+        DB_POOL_MAX_IDLE: 空闲连接回收秒数，默认 300
+        DB_POOL_MAX_LIFETIME: 连接最大存活秒数，默认 1800
+    """
+    global _pool
+    if _pool is None:
+        # 熔断器须在加锁前取得：get_breaker 也会获取 _pool_lock（不可重入）
+        breaker = get_breaker()
+        with _pool_lock:
+            if _pool is None:
+                _pool = _new_pool(_backend(), listener=breaker.record if breaker else None)
+    return _pool
+
+
+def get_breaker():
+    """获取主库熔断器，DB_BREAKER_ENABLED=0 时返回 None
+
+    环境变量:
+        DB_BREAKER_WINDOW: 统计最近多少次调用，默认 20
+        DB_BREAKER_MIN_CALLS: 窗口内至少多少次调用才判断熔断，默认 10
+        DB_BREAKER_ERROR_RATE: 错误率阈值，默认 0.5
+        DB_BREAKER_SLOW_MS: 慢调用阈值（毫秒），默认 2000
+        DB_BREAKER_SLOW_RATE: 慢调用率阈值，默认 0.8
+        DB_BREAKER_OPEN_SECONDS: 熔断持续秒数，默认 10
+    """
+    global _breaker
+    if _breaker is None and os.getenv('DB_BREAKER_ENABLED', '1') == '1':
+        with _pool_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker(
+                    name='mysql',
+                    window=int(os.getenv('DB_BREAKER_WINDOW', '20')),
+                    min_calls=int(os.getenv('DB_BREAKER_MIN_CALLS', '10')),
+                    error_rate=float(os.getenv('DB_BREAKER_ERROR_RATE', '0.5')),
+                    slow_ms=float(os.getenv('DB_BREAKER_SLOW_MS', '2000')),
+                    slow_rate=float(os.getenv('DB_BREAKER_SLOW_RATE', '0.8')),
+                    open_seconds=float(os.getenv('DB_BREAKER_OPEN_SECONDS', '10')),
+                )
+    return _breaker
+
+
+def get_router():
+    """获取读库路由器，未配置副本时返回 None
+
+    环境变量:
+        DB_REPLICA_HOSTS: 逗号分隔的副本地址，如 ``replica1:3306,replica2``，
+            账号与库名同主库
+        DB_REPLICA_STRATEGY: ``round_robin``（默认）或 ``least_connections``
+        DB_REPLICA_EJECT_SECONDS: 副本出错后首次摘除秒数，默认 10
+    """
+    global _router
+    if _router is None:
+        if _backend() == 'sqlite':
+            return None
+        hosts = [h.strip() for h in os.getenv('DB_REPLICA_HOSTS', '').split(',') if h.strip()]
+        if not hosts:
+            return None
+        with _pool_lock:
+            if _router is None:
+                pools = []
+                for address in hosts:
+                    host, _, port = address.partition(':')
+                    pools.append(_new_pool(f"replica:{address}", host, port or None))
+                _router = ReplicaRouter(
+                    pools,
+                    strategy=os.getenv('DB_REPLICA_STRATEGY', 'round_robin'),
+                    eject_seconds=float(os.getenv('DB_REPLICA_EJECT_SECONDS', '10')),
+                )
+    return _router
+
+
+def _acquire(readonly=False):
+    """从连接池借出连接：只读请求优先走副本，无可用副本时回退主库
+
+    主库熔断时直接抛出 DBUnavailableError，不再等待连接超时。
+    """
+    if readonly and not getattr(_local, 'primary_only', False):
+        router = get_router()
+        if router is not None:
+            conn = router.acquire()
+            if conn is not None:
+                return conn
+    breaker = get_breaker()
+    if breaker is None:
+        return get_pool().acquire()
+    breaker.before_call()
+    start = time.monotonic()
+    try:
+        return get_pool().acquire()
+    except (pymysql.MySQLError, PoolTimeoutError) as e:
+        breaker.record(time.monotonic() - start, e)
+        raise
+
+
+def _in_transaction():
+    scope = _current_scope()
+    return scope is not None and scope.tx_depth > 0
+
+
+def _with_retry(operation, write=False):
+    """执行 operation，遇到瞬时错误（死锁、锁等待超时、连接断开等）时退避重试
+
+    事务内不重试（事务已被服务端回滚或连接已失效，需由调用方整体重做）。
+
+    环境变量:
+        DB_RETRY_ATTEMPTS: 最多重试次数，默认 2
+    """
+    attempts = int(os.getenv('DB_RETRY_ATTEMPTS', '2'))
+    attempt = 0
+    while True:
+        try:
+            return operation()
+        except pymysql.MySQLError as e:
+            if attempt >= attempts or not is_retryable(e, write) or _in_transaction():
+                raise
+            delay = backoff_delay(attempt)
+            attempt += 1
+            print(f"[db] 瞬时错误，{delay * 1000:.0f}ms 后第 {attempt} 次重试: {str(e)}")
+            time.sleep(delay)
+
+
+def _drop_replica_connection(conn, error=None):
+    """关闭出错的副本连接并摘除该副本"""
+    router = get_router()
+    if router is not None:
+        router.eject(conn._pool, error)
+    conn.discard()
+
+
+def _is_replica_connection(conn):
+    router = get_router()
+    if router is None:
+        return False
+    if isinstance(conn, _ScopedConnection):
+        conn = conn._scope.connection(conn._readonly)
+    return isinstance(conn, PooledConnection) and router.owns(conn._pool)
+
+
+def _mark_written():
+    """请求内发生写操作后，后续读请求走主库以读到刚写入的数据"""
+    scope = _current_scope()
+    if scope is not None and os.getenv('DB_READ_YOUR_WRITES', '1') == '1':
+        scope.primary_only = True
+
+
+def read_your_writes():
+    """强制当前请求剩余的读请求全部走主库"""
+    scope = _current_scope()
+    if scope is not None:
+        scope.primary_only = True
+
+
+@contextmanager
+def use_primary():
+    """块内的读请求全部走主库（请求内外均可使用）"""
+    scope = _current_scope()
+    if scope is not None:
+        previous, scope.primary_only = scope.primary_only, True
+    else:
+        previous, _local.primary_only = getattr(_local, 'primary_only', False), True
+    try:
+        yield
+    finally:
+        if scope is not None:
+            scope.primary_only = previous
+        else:
+            _local.primary_only = previous
+
+
+def get_pool_stats():
+    """返回连接池实时统计（借出数、空闲数、等待耗时等），配置副本时附带各副本统计"""
+    stats = get_pool().stats()
+    breaker = get_breaker()
+    if breaker is not None:
+        stats['breaker'] = breaker.stats()
+    router = get_router()
+    if router is not None:
+        stats['replicas'] = router.stats()
+    return stats
+
+
+def get_db_connection(readonly=False):
+    """获取数据库连接
+    在请求或 unit_of_work 作用域内返回共享连接，否则从连接池借出；
+    返回的连接调用 close() 或 close_db_connection() 即归还（共享连接由作用域统一归还）
+
+    Args:
+        readonly: 仅用于读取时传 True，连接会路由到只读副本
+    """
+    scope = _current_scope()
+    if scope is not None:
+        return _ScopedConnection(scope, readonly)
+    return _acquire(readonly)
+
+
 def close_db_connection(conn):
-    """安全关闭数据库连接
+    """安全归还数据库连接
     忽略已关闭连接的异常
     """
     if conn:
@@ -37,41 +494,190 @@ def close_db_connection(conn):
         except pymysql.MySQLError:
             pass
 
+def _fetch(conn, sql, params, fetch_one):
+    with conn.cursor() as cursor:
+        cursor.execute(sql, params or ())
+        if fetch_one:
+            return cursor.fetchone()
+        return cursor.fetchall()
+
 def db_query(sql, params=None, fetch_one=False):
     """执行查询并自动处理连接
+    配置只读副本时查询路由到副本，副本连接出错时摘除该副本并改在主库重试；
+    遇到死锁、连接断开等瞬时错误时退避重试
     Args:
         sql: SQL查询语句
         params: 查询参数
         fetch_one: 是否只返回单条结果
     Returns:
         查询结果列表或单条结果
+    Raises:
+        DBUnavailableError: 熔断器打开，数据库暂不可用
     """
+    return _with_retry(functools.partial(_query_once, sql, params, fetch_one))
+
+
+def _query_once(sql, params, fetch_one):
     conn = None
     try:
-        conn = get_db_connection()
-        with conn.cursor() as cursor:
-            cursor.execute(sql, params or ())
-            if fetch_one:
-                return cursor.fetchone()
-            return cursor.fetchall()
+        conn = get_db_connection(readonly=True)
+        try:
+            return _fetch(conn, sql, params, fetch_one)
+        except pymysql.OperationalError as e:
+            if not _is_replica_connection(conn):
+                raise
+            if isinstance(conn, _ScopedConnection):
+                conn._scope.drop_replica(e)
+            else:
+                _drop_replica_connection(conn, e)
+            conn = get_db_connection()
+            return _fetch(conn, sql, params, fetch_one)
     finally:
         close_db_connection(conn)
 
 def db_execute(sql, params=None):
     """执行写操作(INSERT/UPDATE/DELETE)并自动提交
+    死锁、锁等待超时等确定未生效的瞬时错误会退避重试
     Returns:
         影响行数
+    Raises:
+        DBUnavailableError: 熔断器打开，数据库暂不可用
     """
+    return _with_retry(functools.partial(_execute_once, sql, params), write=True)
+
+
+def _execute_once(sql, params):
     conn = None
     try:
         conn = get_db_connection()
         with conn.cursor() as cursor:
             affected_rows = cursor.execute(sql, params or ())
             conn.commit()
+            _mark_written()
             return affected_rows
     except pymysql.MySQLError as e:
         if conn:
-            conn.rollback()
+            try:
+                conn.rollback()
+            except pymysql.MySQLError:
+                pass
         raise
     finally:
-        close_db_connection(conn)
\ No newline at end of file
+        close_db_connection(conn)
+
+
+def _chunked(rows, chunk_size):
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _bulk_statement(match, sql, chunk):
+    """生成一批写入的语句与参数：INSERT 改写为多行 VALUES，其他语句退回 executemany
+
+    Returns:
+        (statement, args, many)：many 为 True 时应调用 executemany
+    """
+    if match and not isinstance(chunk[0], dict):
+        prefix, values, postfix = match.groups()
+        statement = prefix + ", ".join([values] * len(chunk)) + postfix
+        return statement, [v for row in chunk for v in row], False
+    return sql, chunk, True
+
+
+def db_execute_many(sql, rows, chunk_size=500, stop_on_error=False):
+    """批量执行写操作，按批次提交
+
+    ``INSERT ... VALUES (%s, ...)`` 语句会被改写为多行 VALUES，每批一条语句；
+    其他语句（如 UPDATE）按批次 executemany。每批独立提交，失败的批次回滚后
+    继续处理后续批次，全部完成后以 BulkWriteError 汇报失败批次。
+    在 unit_of_work 内调用时不按批提交，任一批次失败直接抛出由事务统一回滚。
+
+    Args:
+        sql: 单行写入语句，参数占位符为 %s
+        rows: 参数序列（可为生成器），每项为一行参数
+        chunk_size: 每批行数
+        stop_on_error: 遇到失败批次后是否停止处理后续批次
+    Returns:
+        影响行数合计
+    Raises:
+        BulkWriteError: 有批次写入失败
+    """
+    match = _INSERT_VALUES_RE.match(sql)
+    scope = _current_scope()
+    in_transaction = scope is not None and scope.tx_depth > 0
+
+    total = 0
+    failures = []
+    start = 0
+    conn = None
+    try:
+        conn = get_db_connection()
+        for index, chunk in enumerate(_chunked(rows, max(1, chunk_size))):
+            try:
+                if not in_transaction:
+                    conn.begin()
+                with conn.cursor() as cursor:
+                    statement, args, many = _bulk_statement(match, sql, chunk)
+                    affected = cursor.executemany(statement, args) if many else cursor.execute(statement, args)
+                if not in_transaction:
+                    conn.commit()
+                total += affected or 0
+            except pymysql.MySQLError as e:
+                if in_transaction:
+                    raise
+                conn.rollback()
+                print(f"[db_execute_many] 第 {index} 批（{len(chunk)} 行）写入失败: {str(e)}")
+                failures.append({
+                    'chunk': index,
+                    'start': start,
+                    'size': len(chunk),
+                    'error': str(e),
+                })
+                if stop_on_error:
+                    break
+            start += len(chunk)
+    finally:
+        close_db_connection(conn)
+
+    _mark_written()
+    if failures:
+        raise BulkWriteError(total, failures)
+    return total
+
+
+def db_stream(sql, params=None, batch_size=500):
+    """流式查询：使用服务端游标逐批读取结果，内存占用与结果集大小无关
+
+    始终使用独立连接（不复用请求级共享连接，配置副本时走副本），因为未读完的服务端游标会独占连接。
+    调用方中途停止迭代时应关闭生成器（如 contextlib.closing），
+    此时连接上仍有未读取的结果，直接关闭该连接而不是排空剩余数据。
+
+    Args:
+        sql: SQL查询语句
+        params: 查询参数
+        batch_size: 每次从服务端拉取的行数
+    Yields:
+        字典格式的结果行
+    """
+    conn = _acquire(readonly=True)
+    exhausted = False
+    try:
+        # 不使用 with：提前关闭服务端游标会读完剩余结果
+        cursor = conn.cursor(SSDictCursor)
+        cursor.execute(sql, params or ())
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                exhausted = True
+                break
+            yield from rows
+        cursor.close()
+    finally:
+        if exhausted:
+            conn.close()
+        else:
+            conn.discard()
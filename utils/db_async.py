@@ -0,0 +1,197 @@
+"""异步数据库访问
+提供与 utils.db 同名的协程版本 API（``await db_query(...)``），供异步 Flask 视图
+或 ASGI 部署在单个进程内同时挂起大量数据库调用。
+
+两种驱动：
+    aiomysql：原生异步连接池，每个事件循环一个连接池，适合事件循环长期存在的 ASGI 部署
+    thread：把同步 API 交给线程池执行，复用 utils.db 的连接池与读写分离
+
+环境变量 DB_ASYNC_DRIVER 选择驱动，默认 auto：安装了 aiomysql 且不在 Flask 请求内时
+使用 aiomysql，否则使用 thread（Flask 异步视图每个请求运行在新的事件循环中，
+按循环建立的连接池无法跨请求复用）。
+"""
+
+import asyncio
+import os
+import time
+import weakref
+from typing import Iterable, List, Optional
+
+import pymysql
+from flask import has_request_context
+
+from utils import db as sync_db
+from utils.db import _INSERT_VALUES_RE, _bulk_statement, _chunked, BulkWriteError
+from utils.db_metrics import caller_context, find_caller, query_stats
+
+try:
+    import aiomysql
+except ImportError:  # 未安装时回退到线程池驱动
+    aiomysql = None
+
+__all__ = [
+    'db_query', 'db_execute', 'db_execute_many', 'close_async_pools', 'get_async_driver',
+]
+
+# 事件循环 -> 创建连接池的任务；事件循环被回收时对应条目自动移除
+_pools = weakref.WeakKeyDictionary()
+
+
+def get_async_driver():
+    """返回当前调用应使用的驱动：aiomysql 或 thread"""
+    driver = os.getenv('DB_ASYNC_DRIVER', 'auto').lower()
+    if driver == 'aiomysql' and aiomysql is None:
+        raise RuntimeError("DB_ASYNC_DRIVER=aiomysql 但未安装 aiomysql")
+    if driver == 'auto':
+        native = (aiomysql is not None and sync_db._backend() == 'mysql'
+                  and not has_request_context())
+        return 'aiomysql' if native else 'thread'
+    return driver
+
+
+def _run_with_caller(caller, func, args):
+    with caller_context(caller):
+        return func(*args)
+
+
+async def _in_thread(func, *args):
+    """在线程池中执行同步 API
+
+    不传递 Flask 上下文：并发的协程各自从连接池借出连接，不共用请求级共享连接
+    （一个连接不能被多个线程同时使用）；SQL 统计仍归属到发起调用的协程。
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _run_with_caller, find_caller(), func, args)
+
+
+async def _get_pool():
+    """获取当前事件循环的 aiomysql 连接池（首次调用时创建）"""
+    loop = asyncio.get_running_loop()
+    task = _pools.get(loop)
+    if task is None:
+        task = loop.create_task(aiomysql.create_pool(
+            host=os.getenv('DB_HOST', 'localhost'),
+            user=os.getenv('DB_USER', 'root'),
+            password=os.getenv('DB_PASSWORD', ''),
+            db=os.getenv('DB_NAME', 'Fin'),
+            port=int(os.getenv('DB_PORT', '3306')),
+            cursorclass=aiomysql.DictCursor,
+            charset='utf8mb4',
+            connect_timeout=10,
+            autocommit=True,
+            minsize=1,
+            maxsize=int(os.getenv('DB_POOL_SIZE', '10')),
+            pool_recycle=int(float(os.getenv('DB_POOL_MAX_LIFETIME', '1800'))),
+        ))
+        _pools[loop] = task
+    try:
+        return await task
+    except Exception:
+        _pools.pop(loop, None)
+        raise
+
+
+async def _timed_execute(cursor, sql, args, many=False):
+    """执行语句并写入 SQL 统计（与同步路径的 InstrumentedCursor 一致）"""
+    start = time.perf_counter()
+    try:
+        if many:
+            affected = await cursor.executemany(sql, args)
+        else:
+            affected = await cursor.execute(sql, args)
+    except Exception as e:
+        query_stats.record(sql, time.perf_counter() - start, error=e)
+        raise
+    query_stats.record(sql, time.perf_counter() - start, rows=cursor.rowcount)
+    return affected
+
+
+async def db_query(sql, params=None, fetch_one=False):
+    """执行查询（协程版 utils.db.db_query）
+
+    Args:
+        sql: SQL查询语句
+        params: 查询参数
+        fetch_one: 是否只返回单条结果
+    Returns:
+        查询结果列表或单条结果
+    """
+    if get_async_driver() == 'thread':
+        return await _in_thread(sync_db.db_query, sql, params, fetch_one)
+
+    pool = await _get_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cursor:
+            await _timed_execute(cursor, sql, params or ())
+            if fetch_one:
+                return await cursor.fetchone()
+            return await cursor.fetchall()
+
+
+async def db_execute(sql, params=None):
+    """执行写操作并提交（协程版 utils.db.db_execute）
+
+    Returns:
+        影响行数
+    """
+    if get_async_driver() == 'thread':
+        return await _in_thread(sync_db.db_execute, sql, params)
+
+    pool = await _get_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cursor:
+            return await _timed_execute(cursor, sql, params or ())
+
+
+async def db_execute_many(sql, rows: Iterable, chunk_size=500, stop_on_error=False):
+    """批量执行写操作，按批次提交（协程版 utils.db.db_execute_many）
+
+    Returns:
+        影响行数合计
+    Raises:
+        BulkWriteError: 有批次写入失败
+    """
+    if get_async_driver() == 'thread':
+        return await _in_thread(sync_db.db_execute_many, sql, rows, chunk_size, stop_on_error)
+
+    match = _INSERT_VALUES_RE.match(sql)
+    total = 0
+    failures: List[dict] = []
+    start = 0
+    pool = await _get_pool()
+    async with pool.acquire() as conn:
+        for index, chunk in enumerate(_chunked(rows, max(1, chunk_size))):
+            try:
+                await conn.begin()
+                async with conn.cursor() as cursor:
+                    statement, args, many = _bulk_statement(match, sql, chunk)
+                    affected = await _timed_execute(cursor, statement, args, many)
+                await conn.commit()
+                total += affected or 0
+            except pymysql.MySQLError as e:
+                await conn.rollback()
+                print(f"[db_execute_many] 第 {index} 批（{len(chunk)} 行）写入失败: {str(e)}")
+                failures.append({
+                    'chunk': index,
+                    'start': start,
+                    'size': len(chunk),
+                    'error': str(e),
+                })
+                if stop_on_error:
+                    break
+            start += len(chunk)
+
+    if failures:
+        raise BulkWriteError(total, failures)
+    return total
+
+
+async def close_async_pools(loop: Optional[asyncio.AbstractEventLoop] = None):
+    """关闭当前（或指定）事件循环的 aiomysql 连接池，应用关闭时调用"""
+    loop = loop or asyncio.get_running_loop()
+    task = _pools.pop(loop, None)
+    if task is None:
+        return
+    pool = await task
+    pool.close()
+    await pool.wait_closed()
@@ -0,0 +1,217 @@
+"""数据库熔断器与瞬时错误重试策略
+数据库变慢或不可用时快速失败，避免每个请求都等满连接超时、工作线程堆积。
+
+状态机：
+    closed：正常放行，统计最近调用的错误率与慢调用率，超过阈值后转为 open
+    open：直接抛出 DBUnavailableError，持续 open_seconds 后转为 half_open
+    half_open：放行一次探测调用，成功则恢复 closed，失败则重新 open
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+import pymysql
+
+from utils.db_pool import PoolTimeoutError
+
+# 可安全重试的 MySQL 错误码
+#   1040 连接数过多 / 2003 无法连接：语句未发出
+#   1205 锁等待超时 / 1213 死锁：语句已被服务端回滚
+#   2006 服务端已断开：发送语句时即失败
+#   2013 查询中断开：写操作可能已生效，仅对读重试
+RETRYABLE_WRITE_ERRORS = {1040, 1205, 1213, 2003, 2006}
+RETRYABLE_READ_ERRORS = RETRYABLE_WRITE_ERRORS | {2013}
+
+# 计入熔断错误率的错误码：连接失败、连接数耗尽、服务端关闭、连接中断与读写超时
+AVAILABILITY_ERRORS = {1040, 1053, 2002, 2003, 2005, 2006, 2013, 2055}
+
+
+class DBUnavailableError(Exception):
+    """熔断器打开，数据库暂不可用；调用方可据此返回降级或缓存数据
+
+    Attributes:
+        retry_after: 预计多少秒后重新尝试
+    """
+
+    def __init__(self, message: str, retry_after: float = 0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def error_code(error: BaseException) -> Optional[int]:
+    """取 pymysql 异常的 MySQL 错误码"""
+    if isinstance(error, pymysql.MySQLError) and error.args and isinstance(error.args[0], int):
+        return error.args[0]
+    return None
+
+
+def is_retryable(error: BaseException, write: bool = False) -> bool:
+    """是否为可重试的瞬时错误"""
+    code = error_code(error)
+    return code in (RETRYABLE_WRITE_ERRORS if write else RETRYABLE_READ_ERRORS)
+
+
+def is_failure(error: Optional[BaseException]) -> bool:
+    """是否计入熔断错误率：只统计连接与服务端可用性问题，
+    不统计 SQL 语法、约束冲突、死锁等与数据库可用性无关的错误"""
+    if error is None:
+        return False
+    if isinstance(error, (PoolTimeoutError, pymysql.InterfaceError)):
+        return True
+    return isinstance(error, pymysql.OperationalError) and error_code(error) in AVAILABILITY_ERRORS
+
+
+def backoff_delay(attempt: int, base: float = 0.05, cap: float = 1.0) -> float:
+    """指数退避 + 全抖动：第 attempt 次重试前等待 [0, min(cap, base * 2^attempt)] 秒"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """按最近调用的错误率和慢调用率熔断
+
+    Args:
+        name: 名称，用于日志与统计
+        window: 统计最近多少次调用
+        window_seconds: 早于该秒数的调用不再参与统计
+        min_calls: 窗口内调用数达到该值才判断是否熔断
+        error_rate: 错误率阈值
+        slow_ms: 慢调用耗时阈值（毫秒）
+        slow_rate: 慢调用率阈值
+        open_seconds: 熔断持续秒数，之后进入半开状态
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self,
+        name: str = 'db',
+        window: int = 20,
+        window_seconds: float = 30,
+        min_calls: int = 10,
+        error_rate: float = 0.5,
+        slow_ms: float = 2000,
+        slow_rate: float = 0.8,
+        open_seconds: float = 10,
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = max(1, min_calls)
+        self.error_rate = error_rate
+        self.slow_ms = slow_ms
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+
+        self._lock = threading.Lock()
+        self._calls = deque(maxlen=max(1, window))
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_at = None
+
+        # 统计信息
+        self._opened_total = 0
+        self._rejected_total = 0
+        self._last_error = None
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def before_call(self) -> None:
+        """调用前检查：熔断中直接抛出 DBUnavailableError"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            now = time.monotonic()
+            if self._state == self.OPEN:
+                remaining = self._opened_at + self.open_seconds - now
+                if remaining > 0:
+                    self._rejected_total += 1
+                    raise DBUnavailableError(
+                        f"数据库暂不可用（熔断中，{remaining:.1f}s 后重试）：{self._last_error}",
+                        retry_after=remaining,
+                    )
+                self._state = self.HALF_OPEN
+                self._probe_at = None
+                print(f"[CircuitBreaker] {self.name} 进入半开状态，放行探测请求")
+            # 半开：同一时间只放行一个探测；探测结果迟迟未上报时视为丢失，允许重新探测
+            if self._probe_at is not None and now - self._probe_at < self.open_seconds:
+                self._rejected_total += 1
+                raise DBUnavailableError(f"数据库暂不可用（探测中）：{self._last_error}",
+                                         retry_after=self.open_seconds)
+            self._probe_at = now
+
+    def record(self, elapsed: float, error: Optional[BaseException] = None) -> None:
+        """上报一次调用结果
+
+        Args:
+            elapsed: 耗时（秒）
+            error: 调用异常，None 表示成功
+        """
+        failed = is_failure(error)
+        slow = elapsed * 1000 >= self.slow_ms
+        now = time.monotonic()
+        with self._lock:
+            if failed:
+                self._last_error = str(error)
+            if self._state == self.HALF_OPEN:
+                if failed or slow:
+                    self._trip(now)
+                else:
+                    self._state = self.CLOSED
+                    self._calls.clear()
+                    self._probe_at = None
+                    print(f"[CircuitBreaker] {self.name} 探测成功，已恢复")
+                return
+            if self._state == self.OPEN:
+                return
+
+            self._calls.append((now, failed, slow))
+            while self._calls and now - self._calls[0][0] > self.window_seconds:
+                self._calls.popleft()
+            total = len(self._calls)
+            if total < self.min_calls:
+                return
+            failures = sum(1 for _, f, _ in self._calls if f)
+            slows = sum(1 for _, _, s in self._calls if s)
+            if failures / total >= self.error_rate or slows / total >= self.slow_rate:
+                self._trip(now)
+
+    def reset(self) -> None:
+        """手动恢复为 closed"""
+        with self._lock:
+            self._state = self.CLOSED
+            self._calls.clear()
+            self._probe_at = None
+
+    def stats(self) -> Dict[str, Any]:
+        """返回熔断器实时状态"""
+        with self._lock:
+            total = len(self._calls)
+            failures = sum(1 for _, f, _ in self._calls if f)
+            slows = sum(1 for _, _, s in self._calls if s)
+            open_for = 0.0
+            if self._state == self.OPEN:
+                open_for = max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+            return {
+                'state': self._state,
+                'window_calls': total,
+                'error_rate': round(failures / total, 3) if total else 0.0,
+                'slow_rate': round(slows / total, 3) if total else 0.0,
+                'open_for_s': round(open_for, 1),
+                'opened_total': self._opened_total,
+                'rejected_total': self._rejected_total,
+                'last_error': self._last_error,
+            }
+
+    def _trip(self, now: float) -> None:
+        self._state = self.OPEN
+        self._opened_at = now
+        self._probe_at = None
+        self._calls.clear()
+        self._opened_total += 1
+        print(f"[CircuitBreaker] {self.name} 已熔断 {self.open_seconds:.0f}s：{self._last_error}")
@@ -0,0 +1,286 @@
+"""SQL 执行指标
+按「SQL 指纹 + 调用方 Mapper 方法」聚合语句耗时直方图、返回行数与错误数，
+超过阈值的语句写入慢查询日志。
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+# 耗时直方图桶上界（毫秒），最后一个桶为 +inf
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%s|%\([^)]+\)s")
+_IN_LIST_RE = re.compile(r"\bin\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_RE = re.compile(r"\bvalues\s*(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+# 调用方识别时跳过的数据访问层内部文件
+_INTERNAL_FILES = {'db.py', 'db_pool.py', 'db_router.py', 'db_metrics.py', 'db_async.py', 'contextlib.py'}
+
+# 显式指定的调用方，用于语句在其他线程执行（如 asyncio.to_thread）时保留原调用方
+_caller_var = contextvars.ContextVar('db_caller', default=None)
+
+# 语句执行前回调，签名为 hook(cursor, query, args)，供执行计划审计等离线工具使用
+_statement_hooks: List[Callable[[Any, str, Any], None]] = []
+
+
+def add_statement_hook(hook: Callable[[Any, str, Any], None]) -> None:
+    """注册语句执行前回调，回调收到的是原始游标"""
+    _statement_hooks.append(hook)
+
+
+def remove_statement_hook(hook: Callable[[Any, str, Any], None]) -> None:
+    """移除语句执行前回调"""
+    if hook in _statement_hooks:
+        _statement_hooks.remove(hook)
+
+
+@functools.lru_cache(maxsize=2048)
+def fingerprint(sql: str) -> str:
+    """归一化 SQL：去掉注释与字面量，占位符统一为 ?，IN 列表与多行 VALUES 折叠"""
+    text = _COMMENT_RE.sub(' ', sql)
+    text = _STRING_RE.sub('?', text)
+    text = _PLACEHOLDER_RE.sub('?', text)
+    text = _NUMBER_RE.sub('?', text)
+    text = _SPACE_RE.sub(' ', text).strip().lower()
+    text = _IN_LIST_RE.sub('in (...)', text)
+    text = _VALUES_RE.sub(r'values \1', text)
+    return text
+
+
+@contextmanager
+def caller_context(caller: str):
+    """在上下文内把语句统计归属到指定调用方（上下文变量随 asyncio.to_thread 传递）"""
+    token = _caller_var.set(caller)
+    try:
+        yield
+    finally:
+        _caller_var.reset(token)
+
+
+def find_caller() -> str:
+    """定位发起查询的业务方法，如 ``BillMapper.get_bill_statistics``"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if os.path.basename(code.co_filename) not in _INTERNAL_FILES:
+            name = getattr(code, 'co_qualname', code.co_name)
+            if '.' not in name:
+                module = frame.f_globals.get('__name__', '')
+                name = f"{module.rsplit('.', 1)[-1]}.{name}"
+            return name
+        frame = frame.f_back
+    return 'unknown'
+
+
+class _StatEntry:
+    __slots__ = ('count', 'errors', 'rows', 'total_ms', 'max_ms', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+
+class QueryStats:
+    """SQL 执行统计汇总
+
+    Args:
+        slow_query_ms: 慢查询阈值（毫秒）
+        slow_log_path: 慢查询日志文件路径，为空时输出到标准错误
+    """
+
+    def __init__(self, slow_query_ms: float = 200, slow_log_path: Optional[str] = None):
+        self.slow_query_ms = slow_query_ms
+        self._entries: Dict[tuple, _StatEntry] = {}
+        self._lock = threading.Lock()
+        self._started_at = time.time()
+        self._slow_logger = logging.getLogger('fin.slow_query')
+        if not self._slow_logger.handlers:
+            handler = logging.FileHandler(slow_log_path, encoding='utf-8') if slow_log_path else logging.StreamHandler()
+            handler.setFormatter(logging.Formatter('%(asctime)s [slow_query] %(message)s'))
+            self._slow_logger.addHandler(handler)
+            self._slow_logger.setLevel(logging.INFO)
+            self._slow_logger.propagate = False
+
+    def record(self, sql: str, elapsed: float, rows: Optional[int] = None,
+               error: Optional[BaseException] = None, caller: Optional[str] = None) -> None:
+        """记录一次语句执行
+
+        Args:
+            sql: 原始 SQL（不含参数）
+            elapsed: 耗时（秒）
+            rows: 返回或影响的行数
+            error: 执行异常
+            caller: 调用方方法名，默认自动识别
+        """
+        elapsed_ms = elapsed * 1000
+        fp = fingerprint(sql)
+        caller = caller or _caller_var.get() or find_caller()
+        bucket = len(BUCKETS_MS)
+        for index, bound in enumerate(BUCKETS_MS):
+            if elapsed_ms <= bound:
+                bucket = index
+                break
+
+        with self._lock:
+            entry = self._entries.get((fp, caller))
+            if entry is None:
+                entry = self._entries[(fp, caller)] = _StatEntry()
+            entry.count += 1
+            entry.total_ms += elapsed_ms
+            entry.max_ms = max(entry.max_ms, elapsed_ms)
+            entry.buckets[bucket] += 1
+            if rows is not None and rows >= 0:
+                entry.rows += rows
+            if error is not None:
+                entry.errors += 1
+
+        if elapsed_ms >= self.slow_query_ms:
+            self._slow_logger.info(json.dumps({
+                'ms': round(elapsed_ms, 2),
+                'caller': caller,
+                'rows': rows,
+                'error': str(error) if error else None,
+                'fingerprint': fp,
+            }, ensure_ascii=False))
+
+    def top(self, limit: int = 20, order_by: str = 'total_ms') -> List[Dict[str, Any]]:
+        """按总耗时（或 count / max_ms / avg_ms / errors）排序返回前 N 个指纹"""
+        with self._lock:
+            items = [(key, self._snapshot(entry)) for key, entry in self._entries.items()]
+
+        result = []
+        for (fp, caller), data in items:
+            data['fingerprint'] = fp
+            data['caller'] = caller
+            result.append(data)
+        if order_by not in ('total_ms', 'count', 'max_ms', 'avg_ms', 'errors', 'rows'):
+            order_by = 'total_ms'
+        result.sort(key=lambda item: item[order_by], reverse=True)
+        return result[:limit]
+
+    def summary(self) -> Dict[str, Any]:
+        """全局汇总：统计起始时间、语句总数与总耗时"""
+        with self._lock:
+            count = sum(entry.count for entry in self._entries.values())
+            total_ms = sum(entry.total_ms for entry in self._entries.values())
+            fingerprints = len(self._entries)
+        return {
+            'since': int(self._started_at),
+            'statements': count,
+            'total_ms': round(total_ms, 2),
+            'fingerprints': fingerprints,
+            'slow_query_ms': self.slow_query_ms,
+        }
+
+    def reset(self) -> None:
+        """清空统计"""
+        with self._lock:
+            self._entries.clear()
+            self._started_at = time.time()
+
+    @staticmethod
+    def _snapshot(entry: _StatEntry) -> Dict[str, Any]:
+        histogram = {f"le_{bound}ms": n for bound, n in zip(BUCKETS_MS, entry.buckets)}
+        histogram['le_inf'] = entry.buckets[-1]
+        return {
+            'count': entry.count,
+            'errors': entry.errors,
+            'rows': entry.rows,
+            'total_ms': round(entry.total_ms, 2),
+            'avg_ms': round(entry.total_ms / entry.count, 2) if entry.count else 0.0,
+            'max_ms': round(entry.max_ms, 2),
+            'p50_ms': _percentile(entry.buckets, entry.count, 0.50, entry.max_ms),
+            'p95_ms': _percentile(entry.buckets, entry.count, 0.95, entry.max_ms),
+            'p99_ms': _percentile(entry.buckets, entry.count, 0.99, entry.max_ms),
+            'histogram': histogram,
+        }
+
+
+def _percentile(buckets: List[int], count: int, q: float, max_ms: float) -> Optional[float]:
+    """由直方图估算分位数（取所在桶的上界，不超过实际最大值）"""
+    if not count:
+        return None
+    target = q * count
+    seen = 0
+    for index, n in enumerate(buckets):
+        seen += n
+        if seen >= target and index < len(BUCKETS_MS):
+            return min(float(BUCKETS_MS[index]), round(max_ms, 2))
+    return round(max_ms, 2)
+
+
+class InstrumentedCursor:
+    """游标代理：对 execute / executemany 计时并写入 QueryStats
+
+    Args:
+        cursor: 原始游标
+        stats: 统计汇总
+        listener: 每条语句执行后回调 listener(elapsed, error)，如熔断器上报
+    """
+
+    def __init__(self, cursor: Any, stats: QueryStats,
+                 listener: Optional[Callable[[float, Optional[BaseException]], None]] = None):
+        self._cursor = cursor
+        self._stats = stats
+        self._listener = listener
+
+    def execute(self, query, args=None):
+        return self._timed(self._cursor.execute, query, args)
+
+    def executemany(self, query, args):
+        return self._timed(self._cursor.executemany, query, args)
+
+    def _timed(self, method, query, args):
+        for hook in _statement_hooks:
+            hook(self._cursor, query, args)
+        start = time.perf_counter()
+        try:
+            result = method(query, args)
+        except Exception as exc:
+            elapsed = time.perf_counter() - start
+            self._stats.record(query, elapsed, error=exc)
+            if self._listener is not None:
+                self._listener(elapsed, exc)
+            raise
+        elapsed = time.perf_counter() - start
+        rowcount = getattr(self._cursor, 'rowcount', -1)
+        rows = rowcount if isinstance(rowcount, int) and 0 <= rowcount < 2 ** 63 else None
+        self._stats.record(query, elapsed, rows=rows)
+        if self._listener is not None:
+            self._listener(elapsed, None)
+        return result
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+query_stats = QueryStats(
+    slow_query_ms=float(os.getenv('DB_SLOW_QUERY_MS', '200')),
+    slow_log_path=os.getenv('DB_SLOW_QUERY_LOG') or None,
+)
@@ -0,0 +1,282 @@
+"""数据库连接池
+提供有界、线程安全的连接池，供 utils.db 复用数据库连接，
+避免每次查询都重新建立 TCP 连接并完成认证握手。
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+
+class PoolTimeoutError(Exception):
+    """在最大等待时间内未能从连接池借出连接"""
+
+
+class _PoolEntry:
+    """连接池内部记录：原始连接及其生命周期时间点"""
+
+    __slots__ = ('raw', 'created_at', 'last_used_at')
+
+    def __init__(self, raw: Any):
+        now = time.monotonic()
+        self.raw = raw
+        self.created_at = now
+        self.last_used_at = now
+
+
+class PooledConnection:
+    """借出的连接代理
+
+    除 ``close`` 外的属性和方法全部转发给原始连接，``close`` 会把连接归还连接池，
+    因此直接调用 ``conn.close()`` 的旧代码无需修改即可复用连接。
+    """
+
+    def __init__(self, pool: 'ConnectionPool', entry: _PoolEntry):
+        self._pool = pool
+        self._entry = entry
+        self._released = False
+
+    @property
+    def raw(self) -> Any:
+        """原始数据库连接"""
+        return self._entry.raw
+
+    @property
+    def _closed(self) -> bool:
+        raw = self._entry.raw
+        return self._released or bool(getattr(raw, '_closed', False)) or not getattr(raw, 'open', True)
+
+    def cursor(self, *args: Any, **kwargs: Any) -> Any:
+        """创建游标，连接池配置了 wrap_cursor 时返回包装后的游标"""
+        cursor = self._entry.raw.cursor(*args, **kwargs)
+        if self._pool.wrap_cursor is not None:
+            cursor = self._pool.wrap_cursor(cursor)
+        return cursor
+
+    def close(self) -> None:
+        """归还连接到连接池（重复调用无副作用）"""
+        if not self._released:
+            self._released = True
+            self._pool.release(self._entry)
+
+    def discard(self) -> None:
+        """关闭底层连接而不归还，用于连接状态不可复用的场景"""
+        if not self._released:
+            self._released = True
+            self._pool.retire(self._entry, in_use=True)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._entry.raw, name)
+
+    def __enter__(self) -> 'PooledConnection':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+class ConnectionPool:
+    """有界线程安全连接池
+
+    Args:
+        connect: 创建原始连接的工厂函数
+        max_size: 连接总数上限（空闲 + 借出）
+        max_idle_time: 空闲超过该秒数的连接在借出时被回收
+        max_lifetime: 存活超过该秒数的连接被回收
+        timeout: 借出连接的最大等待秒数，超时抛出 PoolTimeoutError
+        ping_interval: 空闲超过该秒数的连接在借出前 ping 校验
+        reset: 归还连接时调用的重置函数，返回 False 表示连接不可复用
+        wrap_cursor: 包装新建游标的函数，用于语句级计时等埋点
+        name: 连接池名称，用于日志与统计
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        max_size: int = 10,
+        max_idle_time: float = 300,
+        max_lifetime: float = 1800,
+        timeout: float = 5.0,
+        ping_interval: float = 0.5,
+        reset: Optional[Callable[[Any], bool]] = None,
+        wrap_cursor: Optional[Callable[[Any], Any]] = None,
+        name: str = 'default',
+    ):
+        self._connect = connect
+        self.max_size = max(1, int(max_size))
+        self.max_idle_time = max_idle_time
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self._reset = reset
+        self.wrap_cursor = wrap_cursor
+        self.name = name
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._size = 0
+        self._in_use = 0
+        self._closed = False
+
+        # 统计信息
+        self._borrowed_total = 0
+        self._created_total = 0
+        self._retired_total = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._timeouts = 0
+
+    # ------------------------------------------------------------------
+    # 借出 / 归还
+    # ------------------------------------------------------------------
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        """借出一个可用连接
+
+        优先复用最近归还的空闲连接；没有空闲连接且未达上限时新建连接；
+        否则等待其他线程归还，超过 ``timeout`` 抛出 PoolTimeoutError。
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        waited = False
+
+        while True:
+            entry = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolTimeoutError(f"连接池 {self.name} 已关闭")
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f"连接池 {self.name} 已耗尽：{self.max_size} 个连接全部借出，"
+                            f"等待 {timeout:.1f}s 后仍无可用连接"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+                self._in_use += 1
+
+            if entry is None:
+                try:
+                    entry = _PoolEntry(self._connect())
+                except BaseException:
+                    with self._cond:
+                        self._size -= 1
+                        self._in_use -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._created_total += 1
+            elif self._is_expired(entry) or not self._validate(entry):
+                self.retire(entry, in_use=True)
+                continue
+
+            waited_for = time.monotonic() - start
+            with self._cond:
+                self._borrowed_total += 1
+                if waited:
+                    self._waits += 1
+                    self._wait_time_total += waited_for
+                    self._wait_time_max = max(self._wait_time_max, waited_for)
+            return PooledConnection(self, entry)
+
+    def release(self, entry: _PoolEntry) -> None:
+        """归还连接；连接不可复用、超龄或连接池已关闭时直接关闭"""
+        reusable = not self._closed and self._reset_entry(entry)
+        if not reusable or time.monotonic() - entry.created_at > self.max_lifetime:
+            self.retire(entry, in_use=True)
+            return
+
+        entry.last_used_at = time.monotonic()
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append(entry)
+            self._cond.notify()
+
+    def retire(self, entry: _PoolEntry, in_use: bool = False) -> None:
+        """关闭连接并释放其占用的名额"""
+        try:
+            entry.raw.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            if in_use:
+                self._in_use -= 1
+            self._retired_total += 1
+            self._cond.notify()
+
+    def close(self) -> None:
+        """关闭连接池及全部空闲连接，借出中的连接在归还时关闭"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for entry in idle:
+            self.retire(entry)
+
+    # ------------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------------
+    @property
+    def in_use(self) -> int:
+        """当前借出的连接数"""
+        return self._in_use
+
+    def stats(self) -> Dict[str, Any]:
+        """返回连接池实时统计信息"""
+        with self._cond:
+            return {
+                'name': self.name,
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'borrowed_total': self._borrowed_total,
+                'created_total': self._created_total,
+                'retired_total': self._retired_total,
+                'waits': self._waits,
+                'wait_time_total_ms': round(self._wait_time_total * 1000, 2),
+                'wait_time_max_ms': round(self._wait_time_max * 1000, 2),
+                'wait_time_avg_ms': round(self._wait_time_total * 1000 / self._waits, 2) if self._waits else 0.0,
+                'timeouts': self._timeouts,
+            }
+
+    # ------------------------------------------------------------------
+    # 内部方法
+    # ------------------------------------------------------------------
+    def _is_expired(self, entry: _PoolEntry) -> bool:
+        now = time.monotonic()
+        return (
+            now - entry.last_used_at > self.max_idle_time
+            or now - entry.created_at > self.max_lifetime
+        )
+
+    def _validate(self, entry: _PoolEntry) -> bool:
+        """借出前 ping 校验，刚归还不久的连接跳过校验"""
+        if time.monotonic() - entry.last_used_at < self.ping_interval:
+            return True
+        try:
+            entry.raw.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _reset_entry(self, entry: _PoolEntry) -> bool:
+        if getattr(entry.raw, '_closed', False):
+            return False
+        if self._reset is None:
+            return True
+        try:
+            return self._reset(entry.raw) is not False
+        except Exception:
+            return False
@@ -0,0 +1,112 @@
+"""读库路由
+在多个只读副本的连接池之间分配读请求，支持轮询与最少连接两种策略，
+连接失败的副本会被暂时摘除，冷却期后自动重新参与路由。
+"""
+
+import itertools
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from utils.db_pool import ConnectionPool, PooledConnection, PoolTimeoutError
+
+
+class _ReplicaNode:
+    """单个副本的路由状态"""
+
+    __slots__ = ('pool', 'failures', 'ejected_until', 'ejections')
+
+    def __init__(self, pool: ConnectionPool):
+        self.pool = pool
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.ejections = 0
+
+
+class ReplicaRouter:
+    """副本路由器
+
+    Args:
+        pools: 各副本的连接池
+        strategy: ``round_robin``（轮询）或 ``least_connections``（最少借出连接）
+        eject_seconds: 首次摘除时长，连续失败时按指数退避，最长 ``max_eject_seconds``
+        max_eject_seconds: 摘除时长上限
+    """
+
+    def __init__(
+        self,
+        pools: List[ConnectionPool],
+        strategy: str = 'round_robin',
+        eject_seconds: float = 10,
+        max_eject_seconds: float = 300,
+    ):
+        self._nodes = [_ReplicaNode(pool) for pool in pools]
+        self.strategy = strategy if strategy in ('round_robin', 'least_connections') else 'round_robin'
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def owns(self, pool: Any) -> bool:
+        """连接池是否属于某个副本"""
+        return any(node.pool is pool for node in self._nodes)
+
+    def acquire(self) -> Optional[PooledConnection]:
+        """按策略从健康副本借出连接，没有可用副本时返回 None（由调用方回退主库）
+
+        优先选择仍有空闲名额的副本；所有副本都满载时在首选副本上排队等待。
+        """
+        candidates = self._candidates()
+        if not candidates:
+            return None
+
+        available = [node for node in candidates if node.pool.in_use < node.pool.max_size]
+        for node in available or candidates[:1]:
+            try:
+                conn = node.pool.acquire()
+            except PoolTimeoutError:
+                continue
+            except Exception as exc:
+                self.eject(node.pool, exc)
+                continue
+            if node.failures:
+                with self._lock:
+                    node.failures = 0
+                print(f"[ReplicaRouter] 副本 {node.pool.name} 已恢复")
+            return conn
+        return None
+
+    def eject(self, pool: Any, error: Optional[BaseException] = None) -> None:
+        """摘除出错的副本，连续失败时摘除时长指数增长"""
+        for node in self._nodes:
+            if node.pool is not pool:
+                continue
+            with self._lock:
+                node.failures += 1
+                node.ejections += 1
+                backoff = min(self.eject_seconds * (2 ** (node.failures - 1)), self.max_eject_seconds)
+                node.ejected_until = time.monotonic() + backoff
+            print(f"[ReplicaRouter] 副本 {pool.name} 已摘除 {backoff:.0f}s: {error}")
+            return
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """各副本连接池统计及健康状态"""
+        now = time.monotonic()
+        result = []
+        for node in self._nodes:
+            stats = node.pool.stats()
+            stats['healthy'] = node.ejected_until <= now
+            stats['ejected_for_s'] = round(max(0.0, node.ejected_until - now), 1)
+            stats['ejections'] = node.ejections
+            result.append(stats)
+        return result
+
+    def _candidates(self) -> List[_ReplicaNode]:
+        now = time.monotonic()
+        healthy = [node for node in self._nodes if node.ejected_until <= now]
+        if not healthy:
+            return []
+        if self.strategy == 'least_connections':
+            return sorted(healthy, key=lambda node: node.pool.in_use)
+        offset = next(self._counter) % len(healthy)
+        return healthy[offset:] + healthy[:offset]
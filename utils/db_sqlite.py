@@ -0,0 +1,565 @@
+"""SQLite 嵌入式数据库后端
+在没有 MySQL 的环境（压测、基准测试、CI）中代替 MySQL 运行同一套 Mapper SQL。
+
+提供与 pymysql.Connection 兼容的连接对象：字典格式结果行、%s 占位符、
+autocommit + 显式 begin()，并把 Mapper 中用到的 MySQL 方言翻译为 SQLite 语法：
+DATE_FORMAT、DATE_SUB/DATE_ADD、NOW()/CURDATE()、GREATEST/LEAST、INSERT IGNORE 与
+ON DUPLICATE KEY UPDATE。表结构与示例数据从 init_*.py 初始化脚本中提取，
+与 MySQL 建表语句保持同一来源。
+"""
+
+import ast
+import datetime
+import functools
+import os
+import re
+import sqlite3
+import threading
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+import pymysql
+from pymysql.constants import SERVER_STATUS
+
+# 表结构来源脚本（相对项目根目录），按顺序执行
+SCHEMA_SCRIPTS = (
+    'init_db.py',
+    'init_behavior_logs_table.py',
+    'init_user_profile_extension.py',
+    'init_behavior_counters_table.py',
+    'init_behavior_rollup_tables.py',
+    'init_behavior_sessions_table.py',
+)
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_init_lock = threading.Lock()
+_initialized = set()
+# 内存库需要至少一个连接保持打开，否则最后一个连接关闭时数据随之销毁
+_keepalive = {}
+# 共享缓存内存库的写事务锁：共享缓存的表锁冲突直接返回 SQLITE_LOCKED，不会按 busy timeout 等待，
+# 因此同一进程内的写事务在这里排队
+_write_locks: Dict[str, threading.Lock] = {}
+
+
+# ----------------------------------------------------------------------
+# 读取时的类型转换：与 pymysql 返回的 Python 类型保持一致
+# ----------------------------------------------------------------------
+def _convert_datetime(value: bytes) -> datetime.datetime:
+    return datetime.datetime.fromisoformat(value.decode())
+
+
+def _convert_date(value: bytes) -> datetime.date:
+    return datetime.date.fromisoformat(value.decode()[:10])
+
+
+def _convert_time(value: bytes) -> datetime.timedelta:
+    hours, minutes, seconds = value.decode().split(':')
+    return datetime.timedelta(hours=int(hours), minutes=int(minutes), seconds=float(seconds))
+
+
+sqlite3.register_converter('DATETIME', _convert_datetime)
+sqlite3.register_converter('TIMESTAMP', _convert_datetime)
+sqlite3.register_converter('DATE', _convert_date)
+sqlite3.register_converter('TIME', _convert_time)
+sqlite3.register_converter('DECIMAL', lambda value: Decimal(value.decode()))
+
+
+def _bind_value(value: Any) -> Any:
+    """写入时的类型转换，不注册全局 adapter 以免影响其他 sqlite3 使用方"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        seconds = int(value.total_seconds())
+        return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+# ----------------------------------------------------------------------
+# 查询翻译
+# ----------------------------------------------------------------------
+# MySQL DATE_FORMAT 格式符 -> strftime 格式符
+_DATE_FORMAT_CODES = {
+    '%Y': '%Y', '%m': '%m', '%d': '%d', '%H': '%H', '%i': '%M', '%s': '%S',
+    '%S': '%S', '%j': '%j', '%w': '%w', '%%': '%%',
+}
+_INTERVAL_UNITS = {
+    'SECOND': 'seconds', 'MINUTE': 'minutes', 'HOUR': 'hours',
+    'DAY': 'days', 'MONTH': 'months', 'YEAR': 'years',
+}
+
+_DATE_FORMAT_RE = re.compile(r"DATE_FORMAT\(\s*([\w.`]+)\s*,\s*'([^']*)'\s*\)", re.IGNORECASE)
+_DATE_ARITH_RE = re.compile(
+    r"DATE_(SUB|ADD)\(\s*(NOW\(\)|CURRENT_TIMESTAMP|CURDATE\(\))\s*,\s*"
+    r"INTERVAL\s+(%s|\d+)\s+(SECOND|MINUTE|HOUR|DAY|MONTH|YEAR)\s*\)",
+    re.IGNORECASE,
+)
+_NOW_RE = re.compile(r"\bNOW\(\)", re.IGNORECASE)
+_GREATEST_RE = re.compile(r"\b(GREATEST|LEAST)\(", re.IGNORECASE)
+_CURDATE_RE = re.compile(r"\bCURDATE\(\)", re.IGNORECASE)
+_INSERT_IGNORE_RE = re.compile(r"\bINSERT\s+IGNORE\b", re.IGNORECASE)
+_ON_DUPLICATE_RE = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b(.*?)(;?\s*)\Z", re.IGNORECASE | re.DOTALL)
+_VALUES_FUNC_RE = re.compile(r"\bVALUES\(\s*`?(\w+)`?\s*\)", re.IGNORECASE)
+_SELF_ASSIGN_RE = re.compile(r"^\s*`?(\w+)`?\s*=\s*`?(\w+)`?\s*$")
+_FOR_UPDATE_RE = re.compile(r"\s+FOR\s+UPDATE\b", re.IGNORECASE)
+# 字符串字面量原样保留，其余位置的占位符翻译为 SQLite 形式
+_PARAM_TOKEN_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"|%\((\w+)\)s|%s|%%")
+
+
+def _split_top_level(text: str) -> List[str]:
+    """按顶层逗号切分（忽略括号和引号内的逗号）"""
+    parts, depth, quote, current = [], 0, None, []
+    for ch in text:
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in ("'", '"'):
+            quote = ch
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            parts.append(''.join(current))
+            current = []
+            continue
+        current.append(ch)
+    if ''.join(current).strip():
+        parts.append(''.join(current))
+    return parts
+
+
+def _translate_date_format(match: 're.Match') -> str:
+    column, fmt = match.group(1), match.group(2).replace('%%', '%')
+    fmt = re.sub(r'%.', lambda m: _DATE_FORMAT_CODES.get(m.group(0), m.group(0)), fmt)
+    return f"strftime('{fmt}', {column})"
+
+
+def _translate_date_arith(match: 're.Match') -> str:
+    op, base, amount, unit = match.groups()
+    sign = '-' if op.upper() == 'SUB' else '+'
+    modifier = f"'{sign}' || {amount} || ' {_INTERVAL_UNITS[unit.upper()]}'"
+    if base.upper() == 'CURDATE()':
+        return f"date('now', 'localtime', {modifier})"
+    return f"datetime('now', {modifier})"
+
+
+def _translate_upsert(match: 're.Match') -> str:
+    assignments = _split_top_level(match.group(1))
+    # col = col 形式的空更新只为忽略重复行
+    self_assigns = [_SELF_ASSIGN_RE.match(a) for a in assignments]
+    if all(m and m.group(1) == m.group(2) for m in self_assigns):
+        return 'ON CONFLICT DO NOTHING' + match.group(2)
+    updates = ', '.join(_VALUES_FUNC_RE.sub(r'excluded.\1', a.strip()) for a in assignments)
+    return f"ON CONFLICT DO UPDATE SET {updates}" + match.group(2)
+
+
+@functools.lru_cache(maxsize=1024)
+def translate_sql(sql: str, has_params: bool = True) -> str:
+    """把 Mapper 使用的 MySQL 语句翻译为 SQLite 语句
+
+    Args:
+        sql: pymysql 风格的 SQL（%s / %(name)s 占位符）
+        has_params: 是否带参数执行；与 pymysql 一致，带参数时 %% 表示字面量 %
+    """
+    text = _DATE_FORMAT_RE.sub(_translate_date_format, sql)
+    text = _DATE_ARITH_RE.sub(_translate_date_arith, text)
+    text = _NOW_RE.sub('CURRENT_TIMESTAMP', text)
+    # SQLite 的多参数 MAX()/MIN() 即标量最大/最小值
+    text = _GREATEST_RE.sub(lambda m: 'MAX(' if m.group(1).upper() == 'GREATEST' else 'MIN(', text)
+    text = _CURDATE_RE.sub("date('now', 'localtime')", text)
+    text = _INSERT_IGNORE_RE.sub('INSERT OR IGNORE', text)
+    text = _ON_DUPLICATE_RE.sub(_translate_upsert, text)
+    text = _FOR_UPDATE_RE.sub('', text)
+    if not has_params:
+        return text
+
+    def replace(match):
+        token = match.group(0)
+        if match.group(1):
+            return f":{match.group(1)}"
+        if token == '%s':
+            return '?'
+        if token == '%%':
+            return '%'
+        return token
+
+    return _PARAM_TOKEN_RE.sub(replace, text)
+
+
+def translate_query(query: str, args: Any = None) -> Tuple[str, Any]:
+    """翻译语句并转换参数，返回 sqlite3 可执行的 (sql, params)"""
+    if args is None:
+        return translate_sql(query, False), ()
+    if isinstance(args, dict):
+        return translate_sql(query), {key: _bind_value(value) for key, value in args.items()}
+    if not isinstance(args, (list, tuple)):
+        args = (args,)
+    return translate_sql(query), tuple(_bind_value(value) for value in args)
+
+
+# ----------------------------------------------------------------------
+# 建表语句翻译
+# ----------------------------------------------------------------------
+_CREATE_TABLE_RE = re.compile(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?`?(\w+)`?\s*\(", re.IGNORECASE)
+_SQL_COMMENT_RE = re.compile(r"--[^\n]*")
+_INDEX_DEF_RE = re.compile(r"^(UNIQUE\s+)?(?:INDEX|KEY)\s+`?(\w+)`?\s*\((.*)\)$", re.IGNORECASE | re.DOTALL)
+_AUTO_INCREMENT_COLUMN_RE = re.compile(r"^`?(\w+)`?\s+(?:BIG|TINY|SMALL|MEDIUM)?INT\b(?!.*\bPRIMARY\s+KEY\b).*\bAUTO_INCREMENT\b",
+                                       re.IGNORECASE | re.DOTALL)
+_PRIMARY_KEY_RE = re.compile(r"^PRIMARY\s+KEY\s*\((.*)\)$", re.IGNORECASE | re.DOTALL)
+_UNIQUE_KEY_RE = re.compile(r"^UNIQUE\s+`?(\w+)`?\s*\((.*)\)$", re.IGNORECASE | re.DOTALL)
+_COLUMN_CLEANUPS = (
+    (re.compile(r"\s+COMMENT\s+'(?:[^'\\]|\\.|'')*'", re.IGNORECASE), ''),
+    (re.compile(r"\s+ON\s+UPDATE\s+CURRENT_TIMESTAMP", re.IGNORECASE), ''),
+    (re.compile(r"\s+(?:CHARACTER\s+SET|CHARSET|COLLATE)\s+\w+", re.IGNORECASE), ''),
+    (re.compile(r"\s+UNSIGNED\b", re.IGNORECASE), ''),
+    (re.compile(r"\b(?:BIG|TINY|SMALL|MEDIUM)?INT(?:\(\d+\))?\s+(?:NOT\s+NULL\s+)?AUTO_INCREMENT\s+PRIMARY\s+KEY",
+                re.IGNORECASE), 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+    (re.compile(r"\s+AUTO_INCREMENT\b", re.IGNORECASE), ''),
+    (re.compile(r"\bJSON\b", re.IGNORECASE), 'TEXT'),
+    (re.compile(r"\bENUM\s*\([^)]*\)", re.IGNORECASE), 'TEXT'),
+)
+
+
+def translate_ddl(sql: str) -> List[str]:
+    """把 MySQL CREATE TABLE 翻译为 SQLite 建表与建索引语句
+
+    行内 INDEX/KEY 拆为独立的 CREATE INDEX（索引名加表名前缀，SQLite 索引名全库唯一），
+    表选项（ENGINE、CHARSET、COMMENT 等）与列注释被去掉。
+    """
+    sql = _SQL_COMMENT_RE.sub('', sql)
+    match = _CREATE_TABLE_RE.search(sql)
+    if not match:
+        return []
+    table = match.group(1)
+
+    # 找到与 CREATE TABLE ( 匹配的右括号，之后是表选项
+    depth, end = 1, None
+    for index in range(match.end(), len(sql)):
+        if sql[index] == '(':
+            depth += 1
+        elif sql[index] == ')':
+            depth -= 1
+            if depth == 0:
+                end = index
+                break
+    body = sql[match.end():end]
+
+    columns, indexes = [], []
+    auto_increment = False
+    for item in _split_top_level(body):
+        item = item.strip()
+        if not item:
+            continue
+        # 复合主键中的自增列（如分区表的 PRIMARY KEY (id, timestamp)）：
+        # SQLite 只有 INTEGER PRIMARY KEY 能自增，复合主键改为唯一约束
+        auto_match = _AUTO_INCREMENT_COLUMN_RE.match(item)
+        if auto_match:
+            columns.append(f"{auto_match.group(1)} INTEGER PRIMARY KEY AUTOINCREMENT")
+            auto_increment = True
+            continue
+        primary_match = _PRIMARY_KEY_RE.match(item)
+        if primary_match and auto_increment:
+            columns.append(f"UNIQUE ({primary_match.group(1)})")
+            continue
+        index_match = _INDEX_DEF_RE.match(item)
+        if index_match:
+            unique = 'UNIQUE ' if index_match.group(1) else ''
+            indexes.append(
+                f"CREATE {unique}INDEX IF NOT EXISTS {table}_{index_match.group(2)} "
+                f"ON {table} ({index_match.group(3)})"
+            )
+            continue
+        unique_match = _UNIQUE_KEY_RE.match(item)
+        if unique_match:
+            columns.append(f"UNIQUE ({unique_match.group(2)})")
+            continue
+        for pattern, replacement in _COLUMN_CLEANUPS:
+            item = pattern.sub(replacement, item)
+        columns.append(item)
+
+    create = f"CREATE TABLE IF NOT EXISTS {table} (\n    " + ",\n    ".join(columns) + "\n)"
+    return [create] + indexes
+
+
+def _literal(node: ast.AST, names: Dict[str, Any]) -> Any:
+    if isinstance(node, ast.Name):
+        return names.get(node.id)
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        return None
+
+
+def _script_statements(path: str) -> Tuple[List[str], List[Tuple[str, Any]]]:
+    """从初始化脚本中提取建表/加列语句与字面量示例数据（只解析不执行脚本）
+
+    Returns:
+        (ddl, inserts)：ddl 为 SQLite 语句列表，inserts 为 (sql, rows) 列表，
+        rows 为 None 表示不带参数执行
+    """
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    # 模块内所有可字面量求值的赋值，如 fund_data = [...]、columns_to_add = [...]
+    names = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            value = _literal(node.value, {})
+            if value is not None:
+                names[node.targets[0].id] = value
+
+    ddl, inserts = [], []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            if node.value.lstrip().upper().startswith('CREATE TABLE'):
+                ddl.extend(translate_ddl(node.value))
+        elif isinstance(node, ast.JoinedStr) and node.values and isinstance(node.values[0], ast.Constant):
+            # ALTER TABLE X ADD COLUMN {name} {type} ...：配合同脚本中的字段列表生成加列语句
+            alter = re.match(r"\s*ALTER\s+TABLE\s+`?(\w+)`?\s+ADD\s+COLUMN", str(node.values[0].value), re.IGNORECASE)
+            if alter:
+                for value in names.values():
+                    if isinstance(value, list) and value and all(
+                            isinstance(item, tuple) and len(item) >= 2 for item in value):
+                        ddl.extend(f"ALTER TABLE {alter.group(1)} ADD COLUMN {item[0]} {item[1]}" for item in value)
+        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+              and node.func.attr in ('execute', 'executemany') and node.args):
+            sql = _literal(node.args[0], names)
+            if not isinstance(sql, str) or not sql.lstrip().upper().startswith('INSERT'):
+                continue
+            if node.func.attr == 'executemany' and len(node.args) > 1:
+                rows = _literal(node.args[1], names)
+                if isinstance(rows, (list, tuple)):
+                    inserts.append((sql, rows))
+            elif len(node.args) == 1:
+                inserts.append((sql, None))
+    return ddl, inserts
+
+
+def init_schema(conn: 'SQLiteConnection', seed: bool = True) -> None:
+    """按 SCHEMA_SCRIPTS 建表；seed 为 True 且为新库时写入脚本中的字面量示例数据"""
+    raw = conn.raw
+    existing = raw.execute("SELECT COUNT(*) AS n FROM sqlite_master WHERE type = 'table'").fetchone()['n']
+    seed = seed and existing == 0
+    for script in SCHEMA_SCRIPTS:
+        path = os.path.join(_ROOT, script)
+        if not os.path.exists(path):
+            continue
+        ddl, inserts = _script_statements(path)
+        for statement in ddl:
+            try:
+                raw.execute(statement)
+            except sqlite3.OperationalError as e:
+                # 重复执行时 ADD COLUMN 会报列已存在
+                if 'duplicate column' not in str(e):
+                    raise
+        if seed:
+            with conn.cursor() as cursor:
+                for sql, rows in inserts:
+                    if rows is None:
+                        cursor.execute(sql)
+                    else:
+                        cursor.executemany(sql, rows)
+
+
+# ----------------------------------------------------------------------
+# 连接与游标
+# ----------------------------------------------------------------------
+def _translate_error(error: sqlite3.Error) -> pymysql.MySQLError:
+    """转换为 pymysql 异常，调用方按 MySQL 的异常类型处理"""
+    message = str(error)
+    if isinstance(error, sqlite3.IntegrityError):
+        return pymysql.err.IntegrityError(1062 if 'UNIQUE' in message else 1452, message)
+    if isinstance(error, sqlite3.OperationalError):
+        if 'locked' in message or 'busy' in message:
+            return pymysql.err.OperationalError(1205, message)
+        if 'no such table' in message:
+            return pymysql.err.ProgrammingError(1146, message)
+        if 'no such column' in message:
+            return pymysql.err.OperationalError(1054, message)
+        if 'syntax error' in message:
+            return pymysql.err.ProgrammingError(1064, message)
+        return pymysql.err.OperationalError(0, message)
+    return pymysql.err.DatabaseError(0, message)
+
+
+def _dict_row(cursor: sqlite3.Cursor, row: tuple) -> Dict[str, Any]:
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+class SQLiteCursor:
+    """与 pymysql DictCursor 兼容的游标，execute 返回影响行数"""
+
+    def __init__(self, connection: 'SQLiteConnection'):
+        self.connection = connection
+        self._cursor = connection.raw.cursor()
+        self.rowcount = -1
+        self.lastrowid = None
+        self.arraysize = 1
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def execute(self, query: str, args: Any = None) -> int:
+        sql, params = translate_query(query, args)
+        try:
+            self._cursor.execute(sql, params)
+        except sqlite3.Error as e:
+            raise _translate_error(e) from e
+        self.rowcount = self._cursor.rowcount
+        self.lastrowid = self._cursor.lastrowid
+        return max(self.rowcount, 0)
+
+    def executemany(self, query: str, args: Any) -> int:
+        rows = [translate_query(query, row)[1] for row in args]
+        if not rows:
+            return 0
+        try:
+            self._cursor.executemany(translate_sql(query), rows)
+        except sqlite3.Error as e:
+            raise _translate_error(e) from e
+        self.rowcount = self._cursor.rowcount
+        return max(self.rowcount, 0)
+
+    def fetchone(self) -> Optional[Dict[str, Any]]:
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self._cursor.fetchmany(size or self.arraysize)
+
+    def fetchall(self) -> List[Dict[str, Any]]:
+        return self._cursor.fetchall()
+
+    def close(self) -> None:
+        self._cursor.close()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self) -> 'SQLiteCursor':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+class SQLiteConnection:
+    """与 pymysql.Connection 兼容的 SQLite 连接（autocommit，事务需显式 begin()）
+
+    begin() 使用 BEGIN IMMEDIATE 在事务开始时就取得写锁：先读后写的事务若用默认的
+    BEGIN DEFERRED，两个事务都持有读锁后升级写锁会直接失败（database is locked）。
+    """
+
+    def __init__(self, raw: sqlite3.Connection, path: str, shared_cache: bool = False, timeout: float = 5):
+        self.raw = raw
+        self.path = path
+        self.timeout = timeout
+        self._write_lock = _write_locks.setdefault(path, threading.Lock()) if shared_cache else None
+        self._holding_write_lock = False
+        self._closed = False
+
+    @property
+    def open(self) -> bool:
+        return not self._closed
+
+    @property
+    def server_status(self) -> int:
+        """模拟 MySQL 会话状态位，供连接池归还时判断是否有未结束的事务"""
+        if self.raw.in_transaction:
+            return SERVER_STATUS.SERVER_STATUS_IN_TRANS
+        return SERVER_STATUS.SERVER_STATUS_AUTOCOMMIT
+
+    def cursor(self, cursor_class: Any = None) -> SQLiteCursor:
+        # 服务端游标参数（SSDictCursor）忽略：sqlite3 游标本身就是逐行读取
+        return SQLiteCursor(self)
+
+    def begin(self) -> None:
+        if self._write_lock is not None and not self._holding_write_lock:
+            if not self._write_lock.acquire(timeout=self.timeout):
+                raise pymysql.err.OperationalError(1205, 'Lock wait timeout exceeded（SQLite 写事务排队超时）')
+            self._holding_write_lock = True
+        try:
+            self.raw.execute('BEGIN IMMEDIATE')
+        except sqlite3.Error as e:
+            self._release_write_lock()
+            raise _translate_error(e) from e
+
+    def _release_write_lock(self) -> None:
+        if self._holding_write_lock:
+            self._holding_write_lock = False
+            self._write_lock.release()
+
+    def commit(self) -> None:
+        try:
+            if self.raw.in_transaction:
+                self.raw.commit()
+        finally:
+            self._release_write_lock()
+
+    def rollback(self) -> None:
+        try:
+            if self.raw.in_transaction:
+                self.raw.rollback()
+        finally:
+            self._release_write_lock()
+
+    def ping(self, reconnect: bool = False) -> None:
+        if self._closed:
+            raise pymysql.err.InterfaceError(0, 'SQLite 连接已关闭')
+        self.raw.execute('SELECT 1')
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._release_write_lock()
+            self.raw.close()
+
+
+def connect(path: Optional[str] = None, seed: Optional[bool] = None) -> SQLiteConnection:
+    """创建 SQLite 连接，首次连接某个库时按初始化脚本建表
+
+    Args:
+        path: 数据库文件路径，``:memory:`` 为进程内共享的内存库；
+            默认读取环境变量 DB_SQLITE_PATH
+        seed: 建表后是否写入初始化脚本中的示例数据，默认读取 DB_SQLITE_SEED（默认 1）
+    """
+    path = path or os.getenv('DB_SQLITE_PATH', ':memory:')
+    if seed is None:
+        seed = os.getenv('DB_SQLITE_SEED', '1') == '1'
+
+    if path == ':memory:':
+        # 共享缓存的内存库，同一进程内所有连接看到同一份数据
+        target, uri = 'file:fin_memdb?mode=memory&cache=shared', True
+    else:
+        target, uri = path, False
+
+    timeout = float(os.getenv('DB_POOL_TIMEOUT', '5'))
+    raw = sqlite3.connect(
+        target,
+        uri=uri,
+        timeout=timeout,
+        isolation_level=None,
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        check_same_thread=False,
+    )
+    raw.row_factory = _dict_row
+    if not uri:
+        raw.execute('PRAGMA journal_mode=WAL')
+        raw.execute('PRAGMA synchronous=NORMAL')
+    conn = SQLiteConnection(raw, path, shared_cache=uri, timeout=timeout)
+
+    if path not in _initialized:
+        with _init_lock:
+            if path not in _initialized:
+                init_schema(conn, seed=seed)
+                _initialized.add(path)
+                if uri:
+                    _keepalive[path] = sqlite3.connect(target, uri=True, check_same_thread=False)
+    return conn
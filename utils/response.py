@@ -3,11 +3,14 @@
 方便在各个 Controller 中统一返回格式并集中处理异常。
 """
 
+import math
 from functools import wraps
 from typing import Any, Callable, Dict, Tuple
 
 from flask import jsonify
 
+from utils.db_breaker import DBUnavailableError
+
 JsonResponse = Tuple[Any, int]
 
 
@@ -41,6 +44,17 @@ def error_response(error: str = "", message: str = "error", status_code: int = 5
     }), status_code
 
 
+def _find_cause(exc: BaseException, exc_type: type):
+    """沿异常链（__cause__ / __context__）查找指定类型的异常"""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        if isinstance(exc, exc_type):
+            return exc
+        seen.add(id(exc))
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
 def handle_exceptions(func: Callable) -> Callable:
     """装饰器：捕获路由处理函数中的异常并统一返回错误响应"""
 
@@ -49,6 +63,11 @@ def handle_exceptions(func: Callable) -> Callable:
         try:
             return func(*args, **kwargs)
         except Exception as exc:
+            # 数据库熔断（可能被 Mapper 包装过）：返回 503 并提示客户端稍后重试
+            unavailable = _find_cause(exc, DBUnavailableError)
+            if unavailable is not None:
+                response, status_code = error_response(str(unavailable), message="Service Unavailable", status_code=503)
+                return response, status_code, {"Retry-After": str(max(1, math.ceil(unavailable.retry_after)))}
             # 这里可以根据异常类型做更细粒度的处理，例如数据库错误、验证错误等
             return error_response(str(exc), message="Internal Server Error", status_code=500)
 